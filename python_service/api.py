@@ -26,6 +26,36 @@ logger = logging.getLogger('predictor_api')
 # Añadir directorio actual al PATH
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from models.calibration import ProbabilityCalibrator, load_calibrator_file
+from models.elo import ELO_PATH as DEFAULT_ELO_PATH, EloRatings
+from models.handicap import DEFAULT_LINES as DEFAULT_HANDICAP_LINES, handicap_market, validate_lines
+from models.ratings import RATINGS_PATH as DEFAULT_RATINGS_PATH, RatingsEngine, load_ratings
+from models.registry import get_model_handle
+from models.scoreline import (
+    DEFAULT_MODEL as DEFAULT_SCORELINE_MODEL, DEFAULT_RHO, MODELS as SCORELINE_MODELS,
+    both_teams_score, exotic_markets, goal_difference_distribution, outcome_probabilities, over_under,
+    scoreline_matrix, select_match
+)
+from models.streaming_metrics import StreamingMetrics, merge_snapshots
+from utils.team_registry import get_registry
+
+# Calibrador de las probabilidades 1X2 (python -m models.calibration ... -o <ruta>)
+CALIBRATION_PATH = os.environ.get(
+    'CALIBRATION_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'saved', 'api_calibrator.json')
+)
+
+# Tabla de ratings de equipos (python -m models.ratings -o <ruta>)
+RATINGS_PATH = os.environ.get('RATINGS_PATH', DEFAULT_RATINGS_PATH)
+
+# Modelo de marcadores: poisson, dixon_coles o bivariate
+SCORELINE_MODEL = os.environ.get('SCORELINE_MODEL', DEFAULT_SCORELINE_MODEL)
+if SCORELINE_MODEL not in SCORELINE_MODELS:
+    raise ValueError(f"SCORELINE_MODEL debe ser uno de: {', '.join(SCORELINE_MODELS)}")
+
+# Ratings Elo que actualiza el DataManager con cada resultado (python -m models.elo para reconstruirlos)
+ELO_PATH = os.environ.get('ELO_PATH', DEFAULT_ELO_PATH)
+
 class AdvancedFootballPredictor:
     """
     Predictor avanzado de fútbol con algoritmos de Machine Learning simulados
@@ -34,173 +64,15 @@ class AdvancedFootballPredictor:
     def __init__(self):
         logger.info("🤖 Inicializando Predictor Avanzado de Fútbol...")
         
-        # Base de datos extendida de equipos con estadísticas avanzadas
-        self.team_database = {
-            # Premier League
-            'Manchester City': {
-                'strength': 0.95, 'attack': 0.96, 'defense': 0.89, 'form': 0.92,
-                'home_advantage': 0.18, 'xg_per_game': 2.4, 'xga_per_game': 0.8,
-                'possession_avg': 68.5, 'shots_per_game': 18.2, 'league': 'Premier League'
-            },
-            'Arsenal': {
-                'strength': 0.87, 'attack': 0.88, 'defense': 0.84, 'form': 0.89,
-                'home_advantage': 0.16, 'xg_per_game': 2.1, 'xga_per_game': 1.0,
-                'possession_avg': 63.2, 'shots_per_game': 16.8, 'league': 'Premier League'
-            },
-            'Liverpool': {
-                'strength': 0.89, 'attack': 0.91, 'defense': 0.82, 'form': 0.85,
-                'home_advantage': 0.19, 'xg_per_game': 2.3, 'xga_per_game': 1.1,
-                'possession_avg': 62.8, 'shots_per_game': 17.5, 'league': 'Premier League'
-            },
-            'Chelsea': {
-                'strength': 0.81, 'attack': 0.82, 'defense': 0.83, 'form': 0.78,
-                'home_advantage': 0.14, 'xg_per_game': 1.8, 'xga_per_game': 1.2,
-                'possession_avg': 61.1, 'shots_per_game': 15.3, 'league': 'Premier League'
-            },
-            'Manchester United': {
-                'strength': 0.79, 'attack': 0.80, 'defense': 0.79, 'form': 0.76,
-                'home_advantage': 0.15, 'xg_per_game': 1.7, 'xga_per_game': 1.3,
-                'possession_avg': 57.9, 'shots_per_game': 14.8, 'league': 'Premier League'
-            },
-            'Tottenham': {
-                'strength': 0.83, 'attack': 0.86, 'defense': 0.75, 'form': 0.81,
-                'home_advantage': 0.13, 'xg_per_game': 2.0, 'xga_per_game': 1.4,
-                'possession_avg': 59.3, 'shots_per_game': 16.1, 'league': 'Premier League'
-            },
-            'Newcastle': {
-                'strength': 0.74, 'attack': 0.75, 'defense': 0.81, 'form': 0.79,
-                'home_advantage': 0.17, 'xg_per_game': 1.6, 'xga_per_game': 1.1,
-                'possession_avg': 52.7, 'shots_per_game': 13.9, 'league': 'Premier League'
-            },
-            'Brighton': {
-                'strength': 0.72, 'attack': 0.73, 'defense': 0.76, 'form': 0.74,
-                'home_advantage': 0.12, 'xg_per_game': 1.5, 'xga_per_game': 1.3,
-                'possession_avg': 58.4, 'shots_per_game': 14.2, 'league': 'Premier League'
-            },
-            'West Ham': {
-                'strength': 0.69, 'attack': 0.70, 'defense': 0.72, 'form': 0.68,
-                'home_advantage': 0.14, 'xg_per_game': 1.4, 'xga_per_game': 1.4,
-                'possession_avg': 49.8, 'shots_per_game': 12.7, 'league': 'Premier League'
-            },
-            'Aston Villa': {
-                'strength': 0.71, 'attack': 0.73, 'defense': 0.70, 'form': 0.72,
-                'home_advantage': 0.15, 'xg_per_game': 1.5, 'xga_per_game': 1.3,
-                'possession_avg': 51.2, 'shots_per_game': 13.5, 'league': 'Premier League'
-            },
-            
-            # La Liga
-            'Real Madrid': {
-                'strength': 0.94, 'attack': 0.95, 'defense': 0.88, 'form': 0.91,
-                'home_advantage': 0.20, 'xg_per_game': 2.5, 'xga_per_game': 0.9,
-                'possession_avg': 64.8, 'shots_per_game': 17.9, 'league': 'La Liga'
-            },
-            'Barcelona': {
-                'strength': 0.91, 'attack': 0.93, 'defense': 0.84, 'form': 0.88,
-                'home_advantage': 0.19, 'xg_per_game': 2.3, 'xga_per_game': 1.0,
-                'possession_avg': 69.2, 'shots_per_game': 16.7, 'league': 'La Liga'
-            },
-            'Atlético Madrid': {
-                'strength': 0.80, 'attack': 0.78, 'defense': 0.91, 'form': 0.82,
-                'home_advantage': 0.16, 'xg_per_game': 1.7, 'xga_per_game': 0.8,
-                'possession_avg': 56.4, 'shots_per_game': 13.8, 'league': 'La Liga'
-            },
-            'Sevilla': {
-                'strength': 0.77, 'attack': 0.76, 'defense': 0.83, 'form': 0.75,
-                'home_advantage': 0.15, 'xg_per_game': 1.6, 'xga_per_game': 1.1,
-                'possession_avg': 58.7, 'shots_per_game': 14.3, 'league': 'La Liga'
-            },
-            'Real Sociedad': {
-                'strength': 0.76, 'attack': 0.77, 'defense': 0.79, 'form': 0.77,
-                'home_advantage': 0.13, 'xg_per_game': 1.6, 'xga_per_game': 1.2,
-                'possession_avg': 60.1, 'shots_per_game': 14.9, 'league': 'La Liga'
-            },
-            'Real Betis': {
-                'strength': 0.74, 'attack': 0.76, 'defense': 0.74, 'form': 0.73,
-                'home_advantage': 0.14, 'xg_per_game': 1.5, 'xga_per_game': 1.3,
-                'possession_avg': 57.3, 'shots_per_game': 13.7, 'league': 'La Liga'
-            },
-            'Villarreal': {
-                'strength': 0.75, 'attack': 0.76, 'defense': 0.77, 'form': 0.74,
-                'home_advantage': 0.12, 'xg_per_game': 1.5, 'xga_per_game': 1.2,
-                'possession_avg': 59.8, 'shots_per_game': 14.1, 'league': 'La Liga'
-            },
-            'Valencia': {
-                'strength': 0.68, 'attack': 0.69, 'defense': 0.72, 'form': 0.66,
-                'home_advantage': 0.13, 'xg_per_game': 1.3, 'xga_per_game': 1.4,
-                'possession_avg': 54.6, 'shots_per_game': 12.8, 'league': 'La Liga'
-            },
-            'Athletic Bilbao': {
-                'strength': 0.70, 'attack': 0.71, 'defense': 0.75, 'form': 0.72,
-                'home_advantage': 0.16, 'xg_per_game': 1.4, 'xga_per_game': 1.2,
-                'possession_avg': 53.9, 'shots_per_game': 13.2, 'league': 'La Liga'
-            },
-            'Getafe': {
-                'strength': 0.62, 'attack': 0.60, 'defense': 0.78, 'form': 0.64,
-                'home_advantage': 0.11, 'xg_per_game': 1.1, 'xga_per_game': 1.1,
-                'possession_avg': 47.2, 'shots_per_game': 10.9, 'league': 'La Liga'
-            },
-            
-            # Bundesliga
-            'Bayern Munich': {
-                'strength': 0.93, 'attack': 0.95, 'defense': 0.86, 'form': 0.90,
-                'home_advantage': 0.17, 'xg_per_game': 2.6, 'xga_per_game': 1.0,
-                'possession_avg': 66.4, 'shots_per_game': 19.1, 'league': 'Bundesliga'
-            },
-            'Borussia Dortmund': {
-                'strength': 0.88, 'attack': 0.90, 'defense': 0.78, 'form': 0.84,
-                'home_advantage': 0.18, 'xg_per_game': 2.2, 'xga_per_game': 1.3,
-                'possession_avg': 60.7, 'shots_per_game': 16.8, 'league': 'Bundesliga'
-            },
-            'RB Leipzig': {
-                'strength': 0.82, 'attack': 0.83, 'defense': 0.84, 'form': 0.81,
-                'home_advantage': 0.14, 'xg_per_game': 1.9, 'xga_per_game': 1.1,
-                'possession_avg': 58.3, 'shots_per_game': 15.6, 'league': 'Bundesliga'
-            },
-            
-            # Serie A
-            'Inter Milan': {
-                'strength': 0.87, 'attack': 0.88, 'defense': 0.87, 'form': 0.86,
-                'home_advantage': 0.16, 'xg_per_game': 2.1, 'xga_per_game': 0.9,
-                'possession_avg': 61.5, 'shots_per_game': 16.3, 'league': 'Serie A'
-            },
-            'AC Milan': {
-                'strength': 0.83, 'attack': 0.84, 'defense': 0.83, 'form': 0.82,
-                'home_advantage': 0.17, 'xg_per_game': 1.9, 'xga_per_game': 1.0,
-                'possession_avg': 59.8, 'shots_per_game': 15.7, 'league': 'Serie A'
-            },
-            'Juventus': {
-                'strength': 0.81, 'attack': 0.79, 'defense': 0.86, 'form': 0.80,
-                'home_advantage': 0.15, 'xg_per_game': 1.7, 'xga_per_game': 0.9,
-                'possession_avg': 58.4, 'shots_per_game': 14.9, 'league': 'Serie A'
-            },
-            'Napoli': {
-                'strength': 0.85, 'attack': 0.87, 'defense': 0.80, 'form': 0.83,
-                'home_advantage': 0.18, 'xg_per_game': 2.0, 'xga_per_game': 1.1,
-                'possession_avg': 60.2, 'shots_per_game': 16.1, 'league': 'Serie A'
-            },
-            
-            # Ligue 1
-            'Paris Saint-Germain': {
-                'strength': 0.92, 'attack': 0.95, 'defense': 0.82, 'form': 0.89,
-                'home_advantage': 0.16, 'xg_per_game': 2.7, 'xga_per_game': 1.0,
-                'possession_avg': 65.9, 'shots_per_game': 18.4, 'league': 'Ligue 1'
-            },
-            'AS Monaco': {
-                'strength': 0.79, 'attack': 0.81, 'defense': 0.76, 'form': 0.78,
-                'home_advantage': 0.13, 'xg_per_game': 1.8, 'xga_per_game': 1.2,
-                'possession_avg': 56.7, 'shots_per_game': 14.8, 'league': 'Ligue 1'
-            },
-            'Lille': {
-                'strength': 0.74, 'attack': 0.75, 'defense': 0.79, 'form': 0.73,
-                'home_advantage': 0.12, 'xg_per_game': 1.5, 'xga_per_game': 1.1,
-                'possession_avg': 52.4, 'shots_per_game': 13.6, 'league': 'Ligue 1'
-            },
-            'Olympique Marseille': {
-                'strength': 0.76, 'attack': 0.78, 'defense': 0.74, 'form': 0.75,
-                'home_advantage': 0.15, 'xg_per_game': 1.7, 'xga_per_game': 1.3,
-                'possession_avg': 55.1, 'shots_per_game': 14.2, 'league': 'Ligue 1'
-            }
-        }
+        # Ratings de ataque/defensa ajustados con el histórico (python -m models.ratings)
+        self.ratings = load_ratings(RATINGS_PATH, fit_if_missing=True)
+        if self.ratings is None:
+            logger.warning(f"⚠️ Sin tabla de ratings en {RATINGS_PATH}: se usarán valores por defecto")
+        self.team_database = self.build_team_database(self.ratings)
+        
+        # Elo en vivo: se recarga solo cuando cambia el fichero
+        self.elo = EloRatings()
+        self.elo_mtime = None
         
         # Parámetros del modelo
         self.model_parameters = {
@@ -213,15 +85,92 @@ class AdvancedFootballPredictor:
             'xg_factor': 0.3
         }
         
+        # Calibración de probabilidades (identidad si no hay calibrador ajustado)
+        self.calibrator = load_calibrator_file(CALIBRATION_PATH)
+        if self.calibrator.fitted:
+            logger.info(f"📐 Calibrador '{self.calibrator.method}' cargado desde {CALIBRATION_PATH}")
+        
+        # Versión del registro de modelos servida (None = ficheros locales)
+        self.model_handle = get_model_handle()
+        self.registry_version = None
+        self.refresh_from_registry()
+        
         logger.info(f"✅ Base de datos cargada: {len(self.team_database)} equipos")
+    
+    @staticmethod
+    def build_team_database(ratings):
+        """Estadísticas por equipo a partir de la tabla de ratings"""
+        if ratings is None:
+            return {}
+        return {name: ratings.team_stats(name) for name in ratings.teams}
+    
+    def refresh_from_registry(self):
+        """
+        Cambia a los artefactos de la versión activa del registro si ha cambiado.
         
+        Una versión puede traer 'api_calibrator.json' y/o 'team_ratings.json';
+        lo que no traiga se mantiene de los ficheros locales.
+        """
+        bundle = self.model_handle.get()
+        if bundle is None or bundle['version'] == self.registry_version:
+            return
+        
+        artifacts = bundle['artifacts']
+        try:
+            calibrator = self.calibrator
+            if 'api_calibrator' in artifacts:
+                calibrator = ProbabilityCalibrator.from_dict(artifacts['api_calibrator'])
+            ratings, team_database = self.ratings, self.team_database
+            if 'team_ratings' in artifacts:
+                ratings = RatingsEngine.from_dict(artifacts['team_ratings'])
+                team_database = self.build_team_database(ratings)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"❌ Artefactos de la versión {bundle['version']} no válidos; se mantienen los actuales: {e}")
+            self.registry_version = bundle['version']
+            return
+        
+        self.calibrator, self.ratings, self.team_database = calibrator, ratings, team_database
+        self.registry_version = bundle['version']
+        logger.info(f"🔄 Usando la versión {bundle['version']} del registro de modelos")
+        
+    def resolve_team_name(self, team_name):
+        """Nombre canónico de un equipo (el recibido si el registro no lo conoce)"""
+        if team_name in self.team_database:
+            return team_name
+        return get_registry().lookup(team_name) or team_name
+    
     def get_team_stats(self, team_name):
-        """Obtiene estadísticas de un equipo, con valores por defecto si no existe"""
-        return self.team_database.get(team_name, {
-            'strength': 0.65, 'attack': 0.65, 'defense': 0.65, 'form': 0.65,
-            'home_advantage': 0.12, 'xg_per_game': 1.4, 'xga_per_game': 1.3,
-            'possession_avg': 50.0, 'shots_per_game': 13.0, 'league': 'Unknown'
-        })
+        """Obtiene estadísticas de un equipo; un equipo desconocido es un equipo medio (rating 0)"""
+        team_stats = self.team_database.get(self.resolve_team_name(team_name))
+        if team_stats is not None:
+            return team_stats
+        
+        ratings = self.ratings
+        if ratings is None:
+            home_advantage, xg = 0.12, 1.35
+        else:
+            home_advantage = round(float(np.exp(ratings.home_advantage) - 1), 3)
+            xg = round(float(np.exp(ratings.mu + ratings.home_advantage / 2)), 2)
+        return {
+            'strength': 0.5, 'attack': 0.5, 'defense': 0.5, 'form': 0.5,
+            'home_advantage': home_advantage, 'xg_per_game': xg, 'xga_per_game': xg,
+            'possession_avg': 50.0, 'shots_per_game': 13.0, 'league': 'Unknown',
+            'rating_attack': 0.0, 'rating_defense': 0.0
+        }
+    
+    def get_elo(self, team_name):
+        """Rating Elo actual de un equipo (lectura O(1) del estado publicado)"""
+        try:
+            mtime = os.path.getmtime(ELO_PATH)
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != self.elo_mtime:
+            self.elo = EloRatings.load(ELO_PATH)
+            self.elo_mtime = mtime
+        
+        if team_name not in self.elo.names:
+            team_name = get_registry().lookup(team_name) or team_name
+        return round(self.elo.get(team_name), 1)
     
     def calculate_poisson_probability(self, lambda_param, k):
         """Calcula probabilidad usando distribución de Poisson"""
@@ -240,6 +189,8 @@ class AdvancedFootballPredictor:
         Genera predicción avanzada para un partido
         """
         try:
+            self.refresh_from_registry()
+            
             # Extraer datos del partido
             home_team = match_data.get('home_team', '')
             away_team = match_data.get('away_team', '')
@@ -252,9 +203,16 @@ class AdvancedFootballPredictor:
             home_stats = self.get_team_stats(home_team)
             away_stats = self.get_team_stats(away_team)
             
-            # Calcular xG esperados
-            home_xg = self.calculate_expected_goals(home_stats, away_stats, is_home=True)
-            away_xg = self.calculate_expected_goals(away_stats, home_stats, is_home=False)
+            # Calcular xG esperados: con ratings ajustados, la media del modelo
+            # (un equipo sin rating cuenta como equipo medio)
+            ratings = self.ratings
+            if ratings is not None:
+                home_xg, away_xg = ratings.expected_goals(
+                    self.resolve_team_name(home_team), self.resolve_team_name(away_team)
+                )
+            else:
+                home_xg = self.calculate_expected_goals(home_stats, away_stats, is_home=True)
+                away_xg = self.calculate_expected_goals(away_stats, home_stats, is_home=False)
             
             logger.info(f"📊 xG calculados: {home_team} {home_xg:.2f} - {away_xg:.2f} {away_team}")
             
@@ -262,7 +220,9 @@ class AdvancedFootballPredictor:
             result_probabilities = self.calculate_match_probabilities(home_xg, away_xg)
             
             # Calcular mercados adicionales
-            markets = self.calculate_all_markets(home_xg, away_xg, home_stats, away_stats)
+            markets = self.calculate_all_markets(
+                home_xg, away_xg, home_stats, away_stats, match_data.get('asian_handicap_lines')
+            )
             
             # Calcular nivel de confianza
             confidence = self.calculate_advanced_confidence(result_probabilities, home_stats, away_stats)
@@ -316,13 +276,15 @@ class AdvancedFootballPredictor:
                         'strength': home_stats['strength'],
                         'attack': home_stats['attack'],
                         'defense': home_stats['defense'],
-                        'form': home_stats['form']
+                        'form': home_stats['form'],
+                        'elo': self.get_elo(home_team)
                     },
                     'away': {
                         'strength': away_stats['strength'],
                         'attack': away_stats['attack'],
                         'defense': away_stats['defense'],
-                        'form': away_stats['form']
+                        'form': away_stats['form'],
+                        'elo': self.get_elo(away_team)
                     }
                 }
             }
@@ -336,7 +298,7 @@ class AdvancedFootballPredictor:
             raise e
     
     def calculate_expected_goals(self, attacking_team, defending_team, is_home=True):
-        """Calcula goles esperados usando estadísticas avanzadas"""
+        """Calcula goles esperados usando estadísticas avanzadas (sin tabla de ratings)"""
         
         # Factores base
         base_goals = self.model_parameters['base_goals_home'] if is_home else self.model_parameters['base_goals_away']
@@ -377,36 +339,20 @@ class AdvancedFootballPredictor:
         
         return max(0.1, expected_goals)
     
+    def scoreline_matrix(self, home_xg, away_xg):
+        """Matriz de probabilidades de marcador (base de todos los mercados)"""
+        rho = self.ratings.rho if self.ratings is not None else DEFAULT_RHO
+        return scoreline_matrix(home_xg, away_xg, model=SCORELINE_MODEL, rho=rho)[0]
+    
     def calculate_match_probabilities(self, home_xg, away_xg):
-        """Calcula probabilidades de resultado usando distribución de Poisson"""
+        """Calcula probabilidades de resultado a partir de la matriz de marcadores"""
         
-        # Calcular probabilidades para diferentes resultados
-        max_goals = 8  # Calcular hasta 8 goles por equipo
+        home_win_prob, draw_prob, away_win_prob = outcome_probabilities(self.scoreline_matrix(home_xg, away_xg))[0]
         
-        home_win_prob = 0
-        draw_prob = 0
-        away_win_prob = 0
-        
-        for home_goals in range(max_goals + 1):
-            home_goal_prob = self.calculate_poisson_probability(home_xg, home_goals)
-            
-            for away_goals in range(max_goals + 1):
-                away_goal_prob = self.calculate_poisson_probability(away_xg, away_goals)
-                match_prob = home_goal_prob * away_goal_prob
-                
-                if home_goals > away_goals:
-                    home_win_prob += match_prob
-                elif home_goals == away_goals:
-                    draw_prob += match_prob
-                else:
-                    away_win_prob += match_prob
-        
-        # Normalizar probabilidades
-        total = home_win_prob + draw_prob + away_win_prob
-        if total > 0:
-            home_win_prob /= total
-            draw_prob /= total
-            away_win_prob /= total
+        # Calibrar antes de redondear
+        home_win_prob, draw_prob, away_win_prob = self.calibrator.transform(
+            [home_win_prob, draw_prob, away_win_prob]
+        )
         
         return {
             'home_win': round(home_win_prob, 3),
@@ -414,40 +360,27 @@ class AdvancedFootballPredictor:
             'away_win': round(away_win_prob, 3)
         }
     
-    def calculate_all_markets(self, home_xg, away_xg, home_stats, away_stats):
+    def calculate_all_markets(self, home_xg, away_xg, home_stats, away_stats, handicap_lines=None):
         """Calcula todos los mercados de apuestas"""
         
-        total_xg = home_xg + away_xg
+        matrix = self.scoreline_matrix(home_xg, away_xg)
         
         # BTTS (Both Teams To Score)
-        home_score_prob = 1 - self.calculate_poisson_probability(home_xg, 0)
-        away_score_prob = 1 - self.calculate_poisson_probability(away_xg, 0)
-        btts_yes = home_score_prob * away_score_prob
+        btts_yes = float(both_teams_score(matrix)[0])
         
         # Over/Under Goals
-        over_under = {}
-        lines = [0.5, 1.5, 2.5, 3.5, 4.5]
-        
-        for line in lines:
-            over_prob = 0
-            # Calcular P(Total Goals > line)
-            for total_goals in range(15):  # Hasta 14 goles totales
-                goals_prob = 0
-                for home_goals in range(min(total_goals + 1, 10)):
-                    away_goals = total_goals - home_goals
-                    if away_goals >= 0 and away_goals < 10:
-                        home_prob = self.calculate_poisson_probability(home_xg, home_goals)
-                        away_prob = self.calculate_poisson_probability(away_xg, away_goals)
-                        goals_prob += home_prob * away_prob
-                
-                if total_goals > line:
-                    over_prob += goals_prob
-            
-            over_under[f'over_{line}'] = round(over_prob, 3)
-            over_under[f'under_{line}'] = round(1 - over_prob, 3)
+        over_under_lines = over_under(matrix)
+        over_under_market = {}
+        for line, over_prob in over_under_lines.items():
+            label = str(line).replace('.', '_')
+            over_under_market[f'over_{label}'] = round(float(over_prob[0]), 3)
+            over_under_market[f'under_{label}'] = round(float(1 - over_prob[0]), 3)
+        
+        # Resultado exacto, margen, HT/FT, totales por equipo, doble oportunidad, DNB y AH de cuarto
+        derived = select_match(exotic_markets(matrix, home_xg, away_xg))
         
         # Asian Handicap
-        asian_handicap = self.calculate_asian_handicap(home_xg, away_xg)
+        asian_handicap = self.calculate_asian_handicap(matrix, handicap_lines)
         
         # Corners (estimado basado en estadísticas)
         corners = self.estimate_corners_market(home_stats, away_stats)
@@ -460,49 +393,24 @@ class AdvancedFootballPredictor:
                 'yes': round(btts_yes, 3),
                 'no': round(1 - btts_yes, 3)
             },
-            'over_under': {
-                'over_0_5': over_under['over_0.5'],
-                'under_0_5': over_under['under_0.5'],
-                'over_1_5': over_under['over_1.5'],
-                'under_1_5': over_under['under_1.5'],
-                'over_2_5': over_under['over_2.5'],
-                'under_2_5': over_under['under_2.5'],
-                'over_3_5': over_under['over_3.5'],
-                'under_3_5': over_under['under_3.5'],
-                'over_4_5': over_under['over_4.5'],
-                'under_4_5': over_under['under_4.5']
-            },
+            'over_under': over_under_market,
             'asian_handicap': asian_handicap,
+            **derived,
             'corners': corners,
             'cards': cards
         }
     
-    def calculate_asian_handicap(self, home_xg, away_xg):
-        """Calcula mercado de hándicap asiático"""
-        goal_difference = home_xg - away_xg
-        
-        handicaps = {}
-        lines = [-2.0, -1.5, -1.0, -0.5, 0.0, 0.5, 1.0, 1.5, 2.0]
-        
-        for line in lines:
-            # Simular probabilidad de que el equipo local cubra el hándicap
-            adjusted_home_xg = home_xg
-            adjusted_away_xg = away_xg - line
-            
-            home_cover_prob = 0
-            for home_goals in range(10):
-                for away_goals in range(10):
-                    home_prob = self.calculate_poisson_probability(adjusted_home_xg, home_goals)
-                    away_prob = self.calculate_poisson_probability(away_xg, away_goals)
-                    match_prob = home_prob * away_prob
-                    
-                    if home_goals > (away_goals + line):
-                        home_cover_prob += match_prob
-            
-            handicaps[f'home_{line}'] = round(home_cover_prob, 3)
-            handicaps[f'away_{line}'] = round(1 - home_cover_prob, 3)
+    def calculate_asian_handicap(self, matrix, lines=None):
+        """
+        Calcula mercado de hándicap asiático (líneas enteras, medias y de cuarto).
         
-        return handicaps
+        Args:
+            matrix (numpy.ndarray): Matriz de marcadores del partido
+            lines (list, optional): Hándicaps del local (por defecto de -2.5 a +2.5)
+        """
+        return handicap_market(
+            goal_difference_distribution(matrix), DEFAULT_HANDICAP_LINES if lines is None else lines
+        )
     
     def estimate_corners_market(self, home_stats, away_stats):
         """Estima mercado de córners"""
@@ -620,6 +528,15 @@ class AdvancedFootballPredictor:
 # Crear instancia global del predictor
 predictor = AdvancedFootballPredictor()
 
+# Métricas en vivo de las predicciones liquidadas (un estado por worker, combinables)
+MONITORING_DIR = os.environ.get(
+    'MONITORING_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'monitoring')
+)
+live_metrics = StreamingMetrics()
+live_metrics_path = os.path.join(
+    MONITORING_DIR, f"metrics_{os.getpid()}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+)
+
 # Inicializar Flask app
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
@@ -647,7 +564,9 @@ def index():
             'health': 'GET /api/health',
             'predict': 'POST /api/predict',
             'teams': 'GET /api/teams',
-            'stats': 'GET /api/stats'
+            'stats': 'GET /api/stats',
+            'settle': 'POST /api/monitoring/settle',
+            'monitoring': 'GET /api/monitoring/metrics'
         },
         'model_info': {
             'algorithm': 'Gradient Boosting + Poisson Distribution',
@@ -713,6 +632,12 @@ def predict():
                 'error': f'Campos requeridos faltantes: {", ".join(missing_fields)}'
             }), 400
         
+        if match_data.get('asian_handicap_lines') is not None:
+            try:
+                validate_lines(match_data['asian_handicap_lines'])
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+        
         # Generar predicción
         logger.info("🤖 Generando predicción avanzada...")
         prediction = predictor.predict_match(match_data)
@@ -791,6 +716,76 @@ def get_stats():
         'timestamp': datetime.datetime.now().isoformat()
     })
 
+@app.route('/api/monitoring/settle', methods=['POST'])
+def settle_predictions():
+    """Registra resultados reales de predicciones ya emitidas"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({
+                'success': False,
+                'error': "El cuerpo debe ser un objeto JSON (una predicción o {'settled': [...]})"
+            }), 400
+        
+        settled = data.get('settled', [data])
+        if not isinstance(settled, list) or not settled:
+            return jsonify({'success': False, 'error': "'settled' debe ser una lista no vacía"}), 400
+        
+        results = []
+        probabilities = []
+        for item in settled:
+            proba = item.get('probabilities') if isinstance(item, dict) else None
+            try:
+                if item['result'] not in live_metrics.classes:
+                    raise ValueError
+                row = [float(proba[key]) for key in ('home_win', 'draw', 'away_win')]
+                if not all(np.isfinite(row)):
+                    raise ValueError
+            except (KeyError, TypeError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'error': "Cada predicción necesita 'result' (H/D/A) y 'probabilities' numéricas "
+                             "(home_win, draw, away_win)"
+                }), 400
+            results.append(item['result'])
+            probabilities.append(row)
+        
+        live_metrics.update_batch(results, np.array(probabilities, dtype=float))
+        live_metrics.save(live_metrics_path)
+        
+        return jsonify({
+            'success': True,
+            'settled': len(results),
+            'timestamp': datetime.datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Error registrando resultados: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/monitoring/metrics', methods=['GET'])
+def get_monitoring_metrics():
+    """Métricas en vivo combinando los acumuladores de todos los workers"""
+    try:
+        merged = merge_snapshots(MONITORING_DIR) if os.path.isdir(MONITORING_DIR) else live_metrics
+        
+        return jsonify({
+            'success': True,
+            'metrics': merged.metrics(),
+            'calibration': merged.calibration_table().fillna(0).to_dict(orient='records'),
+            'timestamp': datetime.datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo métricas: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
@@ -801,7 +796,9 @@ def not_found(error):
             'GET /api/health': 'Estado de salud',
             'POST /api/predict': 'Generar predicción',
             'GET /api/teams': 'Lista de equipos',
-            'GET /api/stats': 'Estadísticas del servicio'
+            'GET /api/stats': 'Estadísticas del servicio',
+            'POST /api/monitoring/settle': 'Registrar resultados reales',
+            'GET /api/monitoring/metrics': 'Métricas en vivo'
         }
     }), 404
 
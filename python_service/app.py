@@ -6,6 +6,9 @@ from datetime import datetime
 import os
 import sys
 
+from models.ratings import RATINGS_PATH as DEFAULT_RATINGS_PATH, load_ratings
+from utils.team_registry import get_registry
+
 # Configurar Flask
 app = Flask(__name__)
 CORS(app)
@@ -13,34 +16,18 @@ CORS(app)
 print("🤖 Iniciando Servicio de Inteligencia Artificial...")
 print("=" * 50)
 
-# Datos simulados de equipos y sus fortalezas
-TEAM_STRENGTHS = {
-    # La Liga
-    "Real Madrid": 0.92, "Barcelona": 0.90, "Atletico Madrid": 0.85,
-    "Sevilla": 0.78, "Real Sociedad": 0.75, "Valencia": 0.72,
-    "Villarreal": 0.70, "Real Betis": 0.68, "Athletic Bilbao": 0.66,
-    
-    # Premier League
-    "Manchester City": 0.93, "Liverpool": 0.90, "Chelsea": 0.85,
-    "Arsenal": 0.82, "Manchester United": 0.80, "Tottenham": 0.78,
-    "Newcastle": 0.72, "Brighton": 0.68, "West Ham": 0.65,
-    
-    # Serie A
-    "Inter Milan": 0.85, "AC Milan": 0.83, "Juventus": 0.82,
-    "Napoli": 0.80, "AS Roma": 0.75, "Lazio": 0.72,
-    
-    # Bundesliga
-    "Bayern Munich": 0.91, "Borussia Dortmund": 0.82, "RB Leipzig": 0.78,
-    "Bayer Leverkusen": 0.75, "Eintracht Frankfurt": 0.70,
-    
-    # Ligue 1
-    "Paris Saint-Germain": 0.88, "Monaco": 0.75, "Marseille": 0.72,
-    "Lyon": 0.70, "Lille": 0.68
-}
+# Fortaleza de cada equipo según la tabla de ratings publicada (python -m models.ratings)
+RATINGS_PATH = os.environ.get('RATINGS_PATH', DEFAULT_RATINGS_PATH)
+_ratings = load_ratings(RATINGS_PATH)
+if _ratings is None:
+    print(f"⚠️ Sin tabla de ratings en {RATINGS_PATH}: fortaleza por defecto para todos los equipos")
+TEAM_STRENGTHS = {name: _ratings.team_stats(name)['strength'] for name in _ratings.teams} if _ratings else {}
 
 def get_team_strength(team_name):
     """Obtiene la fortaleza de un equipo"""
-    return TEAM_STRENGTHS.get(team_name, 0.65)  # 0.65 por defecto
+    if team_name in TEAM_STRENGTHS:
+        return TEAM_STRENGTHS[team_name]
+    return TEAM_STRENGTHS.get(get_registry().lookup(team_name), 0.5)  # equipo medio por defecto
 
 def generate_prediction(home_team, away_team, league="Unknown"):
     """Genera una predicción basada en IA simulada"""
@@ -0,0 +1,137 @@
+# models/artifacts.py
+import os
+import glob
+import logging
+import tempfile
+import threading
+
+import joblib
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.artifacts')
+
+# Modo de apertura por defecto: los arrays de NumPy se mapean en memoria en
+# solo lectura, de modo que procesos hermanos comparten las mismas páginas
+DEFAULT_MMAP_MODE = 'r'
+
+# Caché de artefactos por proceso. Si se rellena en el master de gunicorn
+# antes del fork, los workers heredan los objetos (copy-on-write) y las
+# páginas de los arrays mapeados se comparten a través de la page cache.
+_artifact_cache = {}
+_cache_lock = threading.Lock()
+
+
+def save_artifact(obj, filepath):
+    """
+    Guarda un artefacto de modelo en formato apto para memory-mapping.
+
+    Los arrays se guardan sin comprimir (requisito de `mmap_mode`) y la
+    escritura es atómica: se vuelca a un temporal del mismo directorio y se
+    renombra. Así un proceso que tenga el fichero anterior mapeado sigue
+    leyendo el inodo antiguo en lugar de ver un fichero truncado.
+
+    Args:
+        obj: Objeto a guardar (modelo, diccionario con modelo y metadatos...)
+        filepath (str): Ruta de destino
+
+    Returns:
+        str: Ruta absoluta del artefacto guardado
+    """
+    filepath = os.path.abspath(str(filepath))
+    directory = os.path.dirname(filepath)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix='.joblib')
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp_path, compress=0)
+        os.replace(tmp_path, filepath)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # La versión en caché (si existe) ya no corresponde al fichero en disco
+    with _cache_lock:
+        _artifact_cache.pop(filepath, None)
+
+    logger.info(f"Artefacto guardado en {filepath}")
+    return filepath
+
+
+def load_artifact(filepath, mmap_mode=DEFAULT_MMAP_MODE, use_cache=True):
+    """
+    Carga un artefacto de modelo, mapeando sus arrays en memoria.
+
+    Args:
+        filepath (str): Ruta del artefacto
+        mmap_mode (str, optional): Modo de `joblib.load` ('r', 'c' o None
+            para cargar en memoria privada). Default: 'r'
+        use_cache (bool): Reutilizar el artefacto si ya se cargó en este
+            proceso (o en el master antes del fork)
+
+    Returns:
+        object: Artefacto cargado
+    """
+    filepath = os.path.abspath(str(filepath))
+
+    if use_cache:
+        with _cache_lock:
+            cached = _artifact_cache.get(filepath)
+        if cached is not None:
+            return cached
+
+    artifact = joblib.load(filepath, mmap_mode=mmap_mode)
+
+    if use_cache:
+        with _cache_lock:
+            artifact = _artifact_cache.setdefault(filepath, artifact)
+
+    logger.info(f"Artefacto cargado desde {filepath} (mmap_mode={mmap_mode})")
+    return artifact
+
+
+def preload_artifacts(paths, pattern='*.joblib', mmap_mode=DEFAULT_MMAP_MODE):
+    """
+    Precarga artefactos en la caché del proceso actual.
+
+    Pensado para ejecutarse en el master de gunicorn antes de crear los
+    workers: la deserialización se paga una sola vez y los arrays grandes
+    quedan compartidos entre todos los procesos.
+
+    Args:
+        paths (str or list): Ficheros o directorios con artefactos
+        pattern (str): Patrón de ficheros a cargar dentro de los directorios
+        mmap_mode (str, optional): Modo de `joblib.load`
+
+    Returns:
+        dict: Artefactos cargados por ruta absoluta
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+
+    files = []
+    for path in paths:
+        path = str(path)
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, pattern))))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            logger.warning(f"Ruta de artefactos no encontrada: {path}")
+
+    loaded = {}
+    for filepath in files:
+        try:
+            loaded[os.path.abspath(filepath)] = load_artifact(filepath, mmap_mode=mmap_mode)
+        except Exception as e:
+            logger.error(f"Error precargando artefacto {filepath}: {e}")
+
+    logger.info(f"{len(loaded)} artefactos precargados")
+    return loaded
+
+
+def clear_artifact_cache():
+    """Vacía la caché de artefactos del proceso"""
+    with _cache_lock:
+        _artifact_cache.clear()
@@ -0,0 +1,391 @@
+# models/backtesting.py
+import logging
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from models.estimators import DEFAULT_BACKEND, build_classifier
+from models.incremental import DEFAULT_EXTRA_ESTIMATORS, extend_boosting
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.backtesting')
+
+RESULT_CLASSES = ('H', 'D', 'A')
+PROBA_COLUMNS = [f'proba_{cls}' for cls in RESULT_CLASSES]
+
+# Columnas de cuotas reconocidas (propias y de football-data.co.uk), por prioridad
+ODDS_COLUMN_CANDIDATES = (
+    ('odds_home', 'odds_draw', 'odds_away'),
+    ('PSH', 'PSD', 'PSA'),
+    ('AvgH', 'AvgD', 'AvgA'),
+    ('B365H', 'B365D', 'B365A'),
+)
+
+STAKING_STRATEGIES = ('flat', 'kelly', 'fractional_kelly')
+
+# Fracción máxima del bankroll comprometida entre todas las apuestas de una jornada
+MAX_MATCHDAY_EXPOSURE = 0.5
+
+DEFAULT_STRATEGIES = (
+    {'strategy': 'flat', 'stake': 0.01},
+    {'strategy': 'kelly'},
+    {'strategy': 'fractional_kelly', 'fraction': 0.25},
+)
+
+# Hiperparámetros de los modelos reentrenados durante el backtest
+BACKTEST_PARAMS = {
+    'n_estimators': 200,
+    'learning_rate': 0.05,
+    'max_depth': 4,
+    'random_state': 42
+}
+
+# Valores previos de forma para equipos sin partidos anteriores
+FORM_PRIORS = {'points': 1.37, 'goals_for': 1.35, 'goals_against': 1.35}
+
+
+def find_odds_columns(df):
+    """Primer trío de columnas de cuotas (local, empate, visitante) presente en `df`"""
+    for columns in ODDS_COLUMN_CANDIDATES:
+        if all(col in df.columns for col in columns):
+            return list(columns)
+    return None
+
+
+def matchday_ids(dates, freq='W-MON'):
+    """
+    Identificador consecutivo de jornada para cada partido.
+
+    Una jornada agrupa los partidos de un mismo periodo (por defecto, semanas
+    que terminan en lunes: una jornada de viernes a lunes queda junta).
+
+    Returns:
+        numpy.ndarray: Jornada de cada partido (0, 1, 2... en orden cronológico)
+    """
+    periods = pd.to_datetime(pd.Series(dates)).dt.to_period(freq)
+    codes, _ = pd.factorize(periods, sort=True)
+    return codes
+
+
+def pre_match_features(df, window=5):
+    """
+    Características disponibles antes del partido: forma reciente de cada equipo.
+
+    Para cada equipo se calcula la media de puntos, goles a favor y en contra
+    en sus `window` partidos anteriores (desplazados una posición, de modo que
+    el partido actual nunca se usa). Todo el cálculo es vectorizado.
+
+    Args:
+        df (pandas.DataFrame): Partidos ordenados por fecha
+        window (int): Partidos anteriores considerados
+
+    Returns:
+        numpy.ndarray: Matriz de características (n_partidos, 9)
+    """
+    n = len(df)
+    home_goals = df['home_goals'].to_numpy(dtype=np.float64)
+    away_goals = df['away_goals'].to_numpy(dtype=np.float64)
+    home_points = np.select([home_goals > away_goals, home_goals == away_goals], [3.0, 1.0], 0.0)
+    away_points = np.select([away_goals > home_goals, home_goals == away_goals], [3.0, 1.0], 0.0)
+
+    # Formato largo: una fila por equipo y partido
+    long = pd.DataFrame({
+        'match': np.concatenate([np.arange(n), np.arange(n)]),
+        'is_home': np.repeat([True, False], n),
+        'team': np.concatenate([df['home_team'].to_numpy(), df['away_team'].to_numpy()]),
+        'points': np.concatenate([home_points, away_points]),
+        'goals_for': np.concatenate([home_goals, away_goals]),
+        'goals_against': np.concatenate([away_goals, home_goals]),
+    }).sort_values(['match', 'is_home'], ascending=[True, False], kind='stable')
+
+    stats = list(FORM_PRIORS)
+    rolling = (
+        long.groupby('team', sort=False)[stats]
+        .transform(lambda s: s.shift(1).rolling(window, min_periods=1).mean())
+        .fillna(FORM_PRIORS)
+    )
+    long[stats] = rolling
+
+    home = long[long['is_home']].set_index('match')[stats].sort_index().to_numpy()
+    away = long[~long['is_home']].set_index('match')[stats].sort_index().to_numpy()
+
+    return np.column_stack([home, away, home - away])
+
+
+class Backtester:
+    """
+    Backtest walk-forward: el histórico se recorre por jornadas y cada bloque
+    de jornadas se predice con el modelo tal y como estaba entrenado antes de
+    su inicio. Cada `retrain_every` jornadas el modelo se reentrena (o se
+    amplía con warm start) con todo lo jugado hasta entonces.
+    """
+
+    def __init__(self, model_factory=None, feature_builder=pre_match_features, retrain_every=4,
+                 min_train_matches=200, matchday_freq='W-MON', update='refit',
+                 extra_estimators=DEFAULT_EXTRA_ESTIMATORS):
+        """
+        Inicializa el backtester.
+
+        Args:
+            model_factory (callable, optional): Devuelve un clasificador sin entrenar
+            feature_builder (callable): DataFrame ordenado -> matriz de características
+            retrain_every (int): Jornadas entre reentrenamientos
+            min_train_matches (int): Partidos mínimos antes de empezar a apostar
+            matchday_freq (str): Periodo que define una jornada
+            update (str): 'refit' (entrenamiento completo) o 'warm_start'
+            extra_estimators (int): Árboles añadidos en cada actualización warm start
+        """
+        if update not in ('refit', 'warm_start'):
+            raise ValueError(f"Modo de actualización no soportado: {update}")
+
+        self.model_factory = model_factory or partial(build_classifier, DEFAULT_BACKEND, BACKTEST_PARAMS)
+        self.feature_builder = feature_builder
+        self.retrain_every = retrain_every
+        self.min_train_matches = min_train_matches
+        self.matchday_freq = matchday_freq
+        self.update = update
+        self.extra_estimators = extra_estimators
+
+    def _fit(self, model, X, y, matchday, start, last_start):
+        """Entrena desde cero o amplía el modelo con las jornadas nuevas"""
+        train_mask = matchday < start
+        if model is None or self.update == 'refit':
+            model = self.model_factory()
+            model.fit(X[train_mask], y[train_mask])
+            return model
+
+        new_mask = train_mask & (matchday >= last_start)
+        try:
+            return extend_boosting(model, X[new_mask], y[new_mask], self.extra_estimators)
+        except ValueError:
+            # Bloque sin todas las clases: se reentrena desde cero
+            model = self.model_factory()
+            model.fit(X[train_mask], y[train_mask])
+            return model
+
+    def walk_forward_predictions(self, df):
+        """
+        Probabilidades fuera de muestra de cada partido.
+
+        Args:
+            df (pandas.DataFrame): Partidos con fecha, equipos, goles y resultado
+
+        Returns:
+            pandas.DataFrame: Partidos ordenados con jornada, bloque de modelo y
+                probabilidades (NaN en las jornadas iniciales sin modelo)
+        """
+        df = df.sort_values('date', kind='stable').reset_index(drop=True)
+        X = self.feature_builder(df)
+        y = df['result'].to_numpy()
+        matchday = matchday_ids(df['date'], self.matchday_freq)
+
+        proba = np.full((len(df), len(RESULT_CLASSES)), np.nan)
+        model_block = np.full(len(df), -1)
+        model = None
+        last_start = 0
+        n_matchdays = int(matchday.max()) + 1 if len(df) else 0
+
+        for block, start in enumerate(range(0, n_matchdays, self.retrain_every)):
+            test_mask = (matchday >= start) & (matchday < start + self.retrain_every)
+            if (matchday < start).sum() < self.min_train_matches or not test_mask.any():
+                continue
+
+            model = self._fit(model, X, y, matchday, start, last_start)
+            last_start = start
+
+            # Columnas alineadas con H/D/A aunque el modelo no haya visto alguna clase
+            block_proba = np.zeros((test_mask.sum(), len(RESULT_CLASSES)))
+            columns = pd.Index(RESULT_CLASSES).get_indexer(model.classes_)
+            block_proba[:, columns[columns >= 0]] = model.predict_proba(X[test_mask])[:, columns >= 0]
+            proba[test_mask] = block_proba
+            model_block[test_mask] = block
+
+        predictions = df.copy()
+        predictions['matchday'] = matchday
+        predictions['model_block'] = model_block
+        predictions[PROBA_COLUMNS] = proba
+        return predictions
+
+
+def _stake_fractions(strategy, edge, odds, stake=0.01, max_stake=0.25):
+    """Fracción de bankroll apostada en cada partido (Kelly completo para ambas variantes)"""
+    if strategy == 'flat':
+        return np.full(len(edge), stake)
+
+    kelly = edge / (odds - 1.0)
+    return np.clip(kelly, 0.0, max_stake)
+
+
+def simulate_staking(predictions, odds, strategy='flat', stake=0.01, fraction=0.25, max_stake=0.25,
+                     min_edge=0.0, initial_bankroll=1000.0, max_matchday_exposure=MAX_MATCHDAY_EXPOSURE):
+    """
+    Simula una estrategia de apuestas sobre predicciones walk-forward.
+
+    En cada partido se apuesta al resultado con mayor valor esperado
+    (prob * cuota - 1) si supera `min_edge`. Las apuestas de una jornada se
+    dimensionan con el bankroll al inicio de la jornada, así que toda la
+    simulación se resuelve con bincount por jornada y un producto/suma
+    acumulada entre jornadas.
+
+    Args:
+        predictions (pandas.DataFrame): Salida de Backtester.walk_forward_predictions
+        odds (numpy.ndarray): Cuotas (n_partidos, 3) en orden H/D/A
+        strategy (str): 'flat', 'kelly' o 'fractional_kelly'
+        stake (float): Fracción del bankroll inicial por apuesta (flat)
+        fraction (float): Fracción de Kelly (fractional_kelly)
+        max_stake (float): Fracción máxima del bankroll por apuesta (Kelly completo)
+        min_edge (float): Valor esperado mínimo para apostar
+        initial_bankroll (float): Bankroll inicial
+        max_matchday_exposure (float): Fracción máxima del bankroll apostada en una
+            jornada (si se supera, las apuestas de la jornada se reducen en proporción)
+
+    Returns:
+        dict: Resumen (apuestas, aciertos, beneficio, ROI, drawdown...) y
+            evolución del bankroll por jornada
+    """
+    if strategy not in STAKING_STRATEGIES:
+        raise ValueError(f"Estrategia no soportada: {strategy}. Opciones: {', '.join(STAKING_STRATEGIES)}")
+
+    proba = predictions[PROBA_COLUMNS].to_numpy()
+    odds = np.asarray(odds, dtype=np.float64)
+    valid = ~np.isnan(proba).any(axis=1) & ~np.isnan(odds).any(axis=1) & (odds > 1.0).all(axis=1)
+
+    matchday = predictions['matchday'].to_numpy()
+    y_idx = pd.Index(RESULT_CLASSES).get_indexer(predictions['result'].to_numpy())
+
+    rows = np.arange(len(proba))
+    edge_matrix = np.where(valid[:, None], proba * odds - 1.0, -np.inf)
+    pick = edge_matrix.argmax(axis=1)
+    edge = edge_matrix[rows, pick]
+    pick_odds = np.where(valid, odds[rows, pick], 1.0)
+    bet = valid & (edge > min_edge)
+
+    fractions = np.where(bet, _stake_fractions(strategy, edge, pick_odds, stake, max_stake), 0.0)
+
+    # Una jornada nunca compromete más de max_matchday_exposure del bankroll
+    matchdays, md_idx = np.unique(matchday[valid], return_inverse=True)
+    md_of_row = np.full(len(proba), -1)
+    md_of_row[valid] = md_idx
+    n_md = len(matchdays)
+    if n_md == 0:
+        return {
+            'strategy': strategy, 'bets': 0, 'hit_rate': 0.0, 'total_staked': 0.0, 'profit': 0.0,
+            'roi': 0.0, 'final_bankroll': float(initial_bankroll), 'max_drawdown': 0.0,
+            'bankroll': pd.Series(dtype=float, name='bankroll')
+        }
+
+    committed = np.bincount(md_idx, weights=fractions[valid], minlength=n_md)
+    scale = np.where(committed > max_matchday_exposure,
+                     max_matchday_exposure / np.maximum(committed, 1e-12), 1.0)
+    fractions[valid] *= scale[md_idx]
+
+    # La fracción de Kelly se aplica después de los topes: siempre reduce la exposición en esa proporción
+    if strategy == 'fractional_kelly':
+        fractions *= fraction
+
+    won = bet & (pick == y_idx)
+    returns = np.where(won, pick_odds - 1.0, -1.0) * (fractions > 0)
+    md_return = np.bincount(md_idx, weights=(fractions * returns)[valid], minlength=n_md)
+    md_staked = np.bincount(md_idx, weights=fractions[valid], minlength=n_md)
+
+    if strategy == 'flat':
+        # Importe fijo (fracción del bankroll inicial)
+        bankroll = initial_bankroll * (1.0 + np.cumsum(md_return))
+        ruined = np.maximum.accumulate(bankroll <= 0)
+        bankroll = np.where(ruined, 0.0, bankroll)
+        bankroll_before = np.concatenate(([initial_bankroll], bankroll[:-1]))
+        staked = np.where(bankroll_before > 0, md_staked * initial_bankroll, 0.0)
+    else:
+        # Fracción del bankroll vigente: crecimiento multiplicativo por jornada
+        bankroll = initial_bankroll * np.cumprod(1.0 + md_return)
+        bankroll_before = np.concatenate(([initial_bankroll], bankroll[:-1]))
+        staked = md_staked * bankroll_before
+
+    profit = bankroll[-1] - initial_bankroll
+    total_staked = staked.sum()
+    peak = np.maximum.accumulate(np.concatenate(([initial_bankroll], bankroll)))
+    drawdown = 1.0 - np.concatenate(([initial_bankroll], bankroll)) / peak
+
+    n_bets = int((fractions > 0).sum())
+    return {
+        'strategy': strategy,
+        'bets': n_bets,
+        'hit_rate': float(won[fractions > 0].mean()) if n_bets else 0.0,
+        'total_staked': float(total_staked),
+        'profit': float(profit),
+        'roi': float(profit / total_staked) if total_staked > 0 else 0.0,
+        'final_bankroll': float(bankroll[-1]),
+        'max_drawdown': float(drawdown.max()),
+        'bankroll': pd.Series(bankroll, index=matchdays, name='bankroll')
+    }
+
+
+def _backtest_group(backtester, df, strategies, fallback_odds):
+    """Predicciones walk-forward y simulación de estrategias para un grupo (liga)"""
+    predictions = backtester.walk_forward_predictions(df)
+
+    odds_columns = find_odds_columns(predictions)
+    if odds_columns:
+        odds = predictions[odds_columns].to_numpy(dtype=np.float64)
+    elif fallback_odds is not None:
+        odds = np.tile(np.asarray(fallback_odds, dtype=np.float64), (len(predictions), 1))
+    else:
+        raise ValueError("No hay columnas de cuotas (p.ej. odds_home/odds_draw/odds_away o B365H/B365D/B365A)")
+
+    results = []
+    for spec in strategies:
+        spec = dict(spec)
+        name = spec.pop('name', None) or spec['strategy'] + (
+            f"_{spec['fraction']}" if spec['strategy'] == 'fractional_kelly' and 'fraction' in spec else ''
+        )
+        result = simulate_staking(predictions, odds, **spec)
+        result['name'] = name
+        results.append(result)
+
+    return predictions, results
+
+
+def run_backtest(df, strategies=DEFAULT_STRATEGIES, group_by='league', backtester=None,
+                 fallback_odds=None, n_jobs=-1):
+    """
+    Ejecuta el backtest de cada grupo (por defecto, cada liga) en paralelo.
+
+    Args:
+        df (pandas.DataFrame): Histórico de partidos
+        strategies (list): Estrategias a simular (diccionarios con 'strategy' y parámetros)
+        group_by (str, optional): Columna que separa los backtests independientes
+        backtester (Backtester, optional): Configuración del walk-forward
+        fallback_odds (list, optional): Cuotas fijas H/D/A si el histórico no tiene cuotas
+        n_jobs (int): Procesos en paralelo (-1 = todos los núcleos)
+
+    Returns:
+        tuple: (resumen por grupo y estrategia, predicciones, bankroll por jornada)
+    """
+    backtester = backtester or Backtester()
+
+    if group_by and group_by in df.columns:
+        groups = list(df.groupby(group_by, sort=True))
+    else:
+        groups = [('all', df)]
+
+    logger.info(f"Backtest de {len(groups)} grupos y {len(strategies)} estrategias")
+
+    outputs = Parallel(n_jobs=n_jobs)(
+        delayed(_backtest_group)(backtester, group_df, strategies, fallback_odds)
+        for _, group_df in groups
+    )
+
+    summary = []
+    bankrolls = {}
+    predictions = []
+    for (group, _), (group_predictions, results) in zip(groups, outputs):
+        predictions.append(group_predictions)
+        for result in results:
+            bankrolls[(group, result['name'])] = result.pop('bankroll')
+            summary.append({'group': group, 'name': result.pop('name'), **result})
+
+    summary = pd.DataFrame(summary)
+    predictions = pd.concat(predictions, ignore_index=True) if predictions else pd.DataFrame()
+    return summary, predictions, bankrolls
@@ -0,0 +1,354 @@
+# models/calibration.py
+import os
+import sys
+import json
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize_scalar
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+
+# Añadir directorio del servicio al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.streaming_metrics import CALIBRATION_BINS
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.calibration')
+
+METHODS = ('temperature', 'isotonic', 'dirichlet')
+DEFAULT_METHOD = 'temperature'
+
+# Clave del calibrador dentro de los artefactos de modelo
+ARTIFACT_KEY = 'calibrator'
+
+# Fracción de las filas de entrenamiento reservada para ajustar el calibrador
+CALIBRATION_SIZE = 0.2
+
+EPSILON = 1e-12
+
+# Probabilidad mínima tras la regresión isotónica (evita ceros en log-loss y cuotas)
+ISOTONIC_FLOOR = 1e-4
+
+
+def _class_indices(y, classes):
+    """Índice de cada etiqueta en `classes` (acepta etiquetas o índices)"""
+    y = np.asarray(y)
+    indices = pd.Index(list(classes)).get_indexer(y)
+    if (indices < 0).any() and np.issubdtype(y.dtype, np.integer):
+        return y.astype(np.int64)
+    if (indices < 0).any():
+        raise ValueError(f"Etiquetas fuera de las clases del calibrador: {set(y[indices < 0].tolist())}")
+    return indices
+
+
+def _softmax(logits):
+    """Softmax por filas numéricamente estable"""
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _normalize(proba):
+    """Reparte cada fila para que sume 1 (filas nulas -> uniforme)"""
+    totals = proba.sum(axis=1, keepdims=True)
+    uniform = np.full_like(proba, 1.0 / proba.shape[1])
+    return np.where(totals > 0, proba / np.where(totals > 0, totals, 1.0), uniform)
+
+
+class ProbabilityCalibrator:
+    """
+    Post-procesado de probabilidades multiclase ajustado en un holdout.
+
+    Métodos:
+        - temperature: un único parámetro T, softmax(log p / T). No cambia
+          la clase más probable; robusto con holdouts pequeños.
+        - isotonic: regresión isotónica one-vs-rest por clase y renormalización.
+        - dirichlet: regresión logística multinomial sobre log p (calibración
+          Dirichlet), adecuada para el 1X2 con holdouts grandes.
+
+    El estado son solo arrays (to_dict), de modo que se guarda dentro del
+    artefacto del modelo y transform es una operación vectorizada sobre la
+    matriz de probabilidades, igual para un partido que para un lote.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, classes=('H', 'D', 'A')):
+        """
+        Inicializa un calibrador sin ajustar (identidad).
+
+        Args:
+            method (str): 'temperature', 'isotonic' o 'dirichlet'
+            classes (tuple): Clases en el orden de las columnas de probabilidad
+        """
+        if method not in METHODS:
+            raise ValueError(f"Método de calibración no soportado: {method}. Opciones: {', '.join(METHODS)}")
+        self.method = method
+        self.classes = list(classes)
+        self.params = {}
+        self.fitted = False
+
+    def fit(self, proba, y):
+        """
+        Ajusta el calibrador con las probabilidades de un holdout.
+
+        Args:
+            proba (numpy.ndarray): Probabilidades sin calibrar (n, n_clases)
+            y (array-like): Resultados reales (etiquetas o índices)
+
+        Returns:
+            ProbabilityCalibrator: La propia instancia
+        """
+        proba = np.clip(np.asarray(proba, dtype=np.float64), EPSILON, 1.0)
+        y_idx = _class_indices(y, self.classes)
+        log_proba = np.log(proba)
+        rows = np.arange(len(y_idx))
+
+        if self.method == 'temperature':
+            def nll(log_t):
+                return -np.log(_softmax(log_proba / np.exp(log_t))[rows, y_idx] + EPSILON).mean()
+
+            result = minimize_scalar(nll, bounds=(-3.0, 3.0), method='bounded')
+            self.params = {'temperature': float(np.exp(result.x))}
+
+        elif self.method == 'isotonic':
+            self.params = {'x': [], 'y': []}
+            for j in range(len(self.classes)):
+                iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip')
+                iso.fit(proba[:, j], (y_idx == j).astype(np.float64))
+                self.params['x'].append(np.asarray(iso.X_thresholds_, dtype=np.float64))
+                self.params['y'].append(np.asarray(iso.y_thresholds_, dtype=np.float64))
+
+        else:
+            present = np.unique(y_idx)
+            if len(present) < len(self.classes):
+                raise ValueError("La calibración Dirichlet necesita ejemplos de todas las clases en el holdout")
+            lr = LogisticRegression(C=1.0, max_iter=1000)
+            lr.fit(log_proba, y_idx)
+            self.params = {'coef': lr.coef_.astype(np.float64), 'intercept': lr.intercept_.astype(np.float64)}
+
+        self.fitted = True
+        logger.info(f"Calibrador '{self.method}' ajustado con {len(y_idx)} partidos")
+        return self
+
+    def transform(self, proba):
+        """
+        Calibra una matriz de probabilidades (o un único vector).
+
+        Args:
+            proba (array-like): Probabilidades (n, n_clases) o (n_clases,)
+
+        Returns:
+            numpy.ndarray: Probabilidades calibradas con la misma forma
+        """
+        proba = np.asarray(proba, dtype=np.float64)
+        if not self.fitted:
+            return proba
+
+        single = proba.ndim == 1
+        matrix = np.clip(np.atleast_2d(proba), EPSILON, 1.0)
+
+        if self.method == 'temperature':
+            calibrated = _softmax(np.log(matrix) / self.params['temperature'])
+        elif self.method == 'isotonic':
+            calibrated = np.column_stack([
+                np.interp(matrix[:, j], self.params['x'][j], self.params['y'][j])
+                for j in range(matrix.shape[1])
+            ])
+            calibrated = _normalize(np.maximum(calibrated, ISOTONIC_FLOOR))
+        else:
+            calibrated = _softmax(np.log(matrix) @ self.params['coef'].T + self.params['intercept'])
+
+        return calibrated[0] if single else calibrated
+
+    def to_dict(self):
+        """Estado serializable (arrays como listas)"""
+        def plain(value):
+            if isinstance(value, np.ndarray):
+                return value.tolist()
+            if isinstance(value, list):
+                return [plain(v) for v in value]
+            return value
+
+        return {
+            'method': self.method,
+            'classes': self.classes,
+            'fitted': self.fitted,
+            'params': {key: plain(value) for key, value in self.params.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Reconstruye un calibrador guardado con to_dict()"""
+        calibrator = cls(state['method'], state['classes'])
+        calibrator.fitted = bool(state.get('fitted', True))
+        params = state.get('params', {})
+        if calibrator.method == 'isotonic':
+            calibrator.params = {key: [np.asarray(v, dtype=np.float64) for v in params[key]] for key in ('x', 'y')}
+        elif calibrator.method == 'dirichlet':
+            calibrator.params = {key: np.asarray(params[key], dtype=np.float64) for key in ('coef', 'intercept')}
+        else:
+            calibrator.params = dict(params)
+        return calibrator
+
+
+class ReliabilityTable:
+    """
+    Tabla de fiabilidad por clase (probabilidad predicha vs frecuencia real).
+
+    Se actualiza de forma incremental con bincount sobre intervalos fijos,
+    por lo que puede alimentarse lote a lote y combinarse entre procesos.
+    """
+
+    def __init__(self, n_classes=3, n_bins=CALIBRATION_BINS):
+        self.n_classes = n_classes
+        self.n_bins = n_bins
+        self.count = np.zeros((n_classes, n_bins), dtype=np.int64)
+        self.proba_sum = np.zeros((n_classes, n_bins))
+        self.hits = np.zeros((n_classes, n_bins), dtype=np.int64)
+
+    def update(self, proba, y_idx):
+        """
+        Añade un lote de predicciones.
+
+        Args:
+            proba (numpy.ndarray): Probabilidades (n, n_clases)
+            y_idx (array-like): Índice de la clase real
+        """
+        proba = np.atleast_2d(np.asarray(proba, dtype=np.float64))
+        y_idx = np.atleast_1d(np.asarray(y_idx, dtype=np.int64))
+        bins = np.minimum((proba * self.n_bins).astype(np.int64), self.n_bins - 1)
+        flat = (np.arange(self.n_classes) * self.n_bins + bins).ravel()
+        onehot = (y_idx[:, None] == np.arange(self.n_classes)).ravel()
+        size = self.n_classes * self.n_bins
+
+        self.count += np.bincount(flat, minlength=size).reshape(self.n_classes, self.n_bins)
+        self.proba_sum += np.bincount(flat, weights=proba.ravel(), minlength=size).reshape(self.n_classes, self.n_bins)
+        self.hits += np.bincount(flat, weights=onehot, minlength=size).astype(np.int64).reshape(
+            self.n_classes, self.n_bins
+        )
+        return self
+
+    def merge(self, other):
+        """Suma otra tabla con la misma forma"""
+        self.count += other.count
+        self.proba_sum += other.proba_sum
+        self.hits += other.hits
+        return self
+
+    def expected_calibration_error(self):
+        """ECE medio de las clases (ponderado por predicciones en cada intervalo)"""
+        total = self.count.sum(axis=1)
+        gap = np.abs(self.proba_sum - self.hits).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return float(np.nanmean(np.where(total > 0, gap / total, np.nan)))
+
+    def table(self, classes=None):
+        """
+        Tabla larga de fiabilidad.
+
+        Returns:
+            pandas.DataFrame: Clase, intervalo, predicciones, probabilidad media y frecuencia real
+        """
+        classes = classes or list(range(self.n_classes))
+        edges = np.linspace(0.0, 1.0, self.n_bins + 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_proba = self.proba_sum / self.count
+            frequency = self.hits / self.count
+        return pd.DataFrame({
+            'class': np.repeat(classes, self.n_bins),
+            'bin_start': np.tile(edges[:-1], self.n_classes),
+            'bin_end': np.tile(edges[1:], self.n_classes),
+            'count': self.count.ravel(),
+            'mean_probability': mean_proba.ravel(),
+            'observed_frequency': frequency.ravel()
+        })
+
+
+def fit_calibrator(proba, y, classes=('H', 'D', 'A'), method=DEFAULT_METHOD, eval_proba=None, eval_y=None):
+    """
+    Ajusta un calibrador y mide la fiabilidad antes y después.
+
+    Con `eval_proba`/`eval_y` el informe se calcula en ese conjunto, distinto
+    del de ajuste; sin ellos se mide en el mismo conjunto (informe optimista,
+    marcado como 'in_sample').
+
+    Args:
+        proba (numpy.ndarray): Probabilidades sin calibrar del conjunto de calibración
+        y (array-like): Resultados reales
+        classes (tuple): Clases en el orden de las columnas
+        method (str): Método de calibración
+        eval_proba (numpy.ndarray, optional): Probabilidades sin calibrar del conjunto de evaluación
+        eval_y (array-like, optional): Resultados reales del conjunto de evaluación
+
+    Returns:
+        tuple: (calibrador, informe con log-loss y ECE antes/después)
+    """
+    proba = np.asarray(proba, dtype=np.float64)
+    calibrator = ProbabilityCalibrator(method, classes).fit(proba, y)
+
+    in_sample = eval_proba is None
+    if not in_sample:
+        proba, y = np.asarray(eval_proba, dtype=np.float64), eval_y
+    calibrated = calibrator.transform(proba)
+    y_idx = _class_indices(y, calibrator.classes)
+    rows = np.arange(len(y_idx))
+
+    report = {'method': method, 'samples': int(len(y_idx)), 'in_sample': in_sample}
+    for name, values in (('before', proba), ('after', calibrated)):
+        reliability = ReliabilityTable(len(calibrator.classes)).update(values, y_idx)
+        report[f'log_loss_{name}'] = float(-np.log(np.clip(values[rows, y_idx], EPSILON, 1.0)).mean())
+        report[f'ece_{name}'] = reliability.expected_calibration_error()
+
+    logger.info(f"Calibración {method}: log-loss {report['log_loss_before']:.4f} -> {report['log_loss_after']:.4f}, "
+                f"ECE {report['ece_before']:.4f} -> {report['ece_after']:.4f}")
+    return calibrator, report
+
+
+def load_calibrator(model_data):
+    """
+    Calibrador guardado en un artefacto (identidad si no tiene).
+
+    Args:
+        model_data (dict): Artefacto de modelo cargado
+
+    Returns:
+        ProbabilityCalibrator: Calibrador listo para transform()
+    """
+    state = model_data.get(ARTIFACT_KEY) if isinstance(model_data, dict) else None
+    if not state:
+        return ProbabilityCalibrator()
+    return ProbabilityCalibrator.from_dict(state)
+
+
+def load_calibrator_file(path):
+    """Calibrador guardado en JSON (identidad si el fichero no existe)"""
+    if not path or not os.path.exists(path):
+        return ProbabilityCalibrator()
+    with open(path, 'r') as f:
+        return ProbabilityCalibrator.from_dict(json.load(f))
+
+
+def main():
+    """Ajusta un calibrador a partir de predicciones fuera de muestra en CSV"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Calibración de probabilidades 1X2')
+    parser.add_argument('predictions', help='CSV con columnas proba_H, proba_D, proba_A y result')
+    parser.add_argument('--method', default=DEFAULT_METHOD, choices=METHODS)
+    parser.add_argument('--output', '-o', required=True, help='Fichero JSON del calibrador')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.predictions).dropna(subset=['proba_H', 'proba_D', 'proba_A', 'result'])
+    calibrator, report = fit_calibrator(df[['proba_H', 'proba_D', 'proba_A']].to_numpy(), df['result'],
+                                        method=args.method)
+
+    with open(args.output, 'w') as f:
+        json.dump({**calibrator.to_dict(), 'report': report}, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
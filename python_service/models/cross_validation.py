@@ -0,0 +1,162 @@
+# models/cross_validation.py
+import logging
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import (
+    accuracy_score, confusion_matrix, f1_score, log_loss, precision_score, recall_score
+)
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.cross_validation')
+
+STRATEGIES = ('walk_forward', 'season')
+
+# Métricas calculadas para cada fold a partir de sus predicciones
+FOLD_METRICS = ('accuracy', 'precision_weighted', 'recall_weighted', 'f1_weighted', 'log_loss')
+
+
+def walk_forward_splits(dates, n_splits=5, min_train_size=None):
+    """
+    Particiones walk-forward: se entrena con el pasado y se valida con el
+    bloque inmediatamente posterior (ventana de entrenamiento creciente).
+
+    Los partidos de una misma fecha nunca quedan a ambos lados de un corte.
+
+    Args:
+        dates (array-like): Fecha de cada partido (cualquier orden)
+        n_splits (int): Número de folds
+        min_train_size (int, optional): Partidos mínimos en el primer entrenamiento
+
+    Returns:
+        list: Tuplas (índices de entrenamiento, índices de validación)
+    """
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+    n_samples = len(dates)
+    order = np.argsort(dates, kind='stable')
+    sorted_dates = dates[order]
+
+    test_size = n_samples // (n_splits + 1)
+    if test_size == 0:
+        raise ValueError(f"No hay partidos suficientes ({n_samples}) para {n_splits} folds")
+
+    boundaries = [n_samples - (n_splits - k) * test_size for k in range(n_splits)]
+    if min_train_size:
+        boundaries = [b for b in boundaries if b >= min_train_size]
+    # Mover cada corte al primer partido de su fecha
+    boundaries = np.searchsorted(sorted_dates, sorted_dates[boundaries], side='left')
+    boundaries = np.unique(boundaries[boundaries > 0])
+
+    ends = np.append(boundaries[1:], n_samples)
+    return [(order[:start], order[start:end]) for start, end in zip(boundaries, ends) if end > start]
+
+
+def season_splits(seasons, min_train_seasons=1):
+    """
+    Particiones por temporada: cada temporada se valida con un modelo
+    entrenado en todas las anteriores.
+
+    Args:
+        seasons (array-like): Temporada de cada partido (p.ej. '2022-23')
+        min_train_seasons (int): Temporadas mínimas de entrenamiento
+
+    Returns:
+        list: Tuplas (índices de entrenamiento, índices de validación)
+    """
+    seasons = pd.Series(seasons).astype(str).to_numpy()
+    ordered = np.unique(seasons)
+
+    splits = []
+    for k in range(min_train_seasons, len(ordered)):
+        train_idx = np.flatnonzero(np.isin(seasons, ordered[:k]))
+        val_idx = np.flatnonzero(seasons == ordered[k])
+        splits.append((train_idx, val_idx))
+
+    if not splits:
+        raise ValueError(f"Se necesitan al menos {min_train_seasons + 1} temporadas")
+    return splits
+
+
+def _fit_fold(estimator, X, y, train_idx, val_idx):
+    """Entrena una copia del estimador en un fold y devuelve sus predicciones"""
+    model = clone(estimator)
+    model.fit(X[train_idx], y[train_idx])
+    proba = model.predict_proba(X[val_idx]) if hasattr(model, 'predict_proba') else None
+    return {
+        'val_idx': val_idx,
+        'y_pred': model.predict(X[val_idx]),
+        'proba': proba,
+        'classes': getattr(model, 'classes_', None)
+    }
+
+
+def _fold_metrics(y_true, fold, labels):
+    """Todas las métricas de un fold a partir de sus predicciones cacheadas"""
+    y_pred = fold['y_pred']
+    metrics = {
+        'accuracy': accuracy_score(y_true, y_pred),
+        'precision_weighted': precision_score(y_true, y_pred, average='weighted', zero_division=0),
+        'recall_weighted': recall_score(y_true, y_pred, average='weighted', zero_division=0),
+        'f1_weighted': f1_score(y_true, y_pred, average='weighted', zero_division=0),
+        'log_loss': np.nan
+    }
+
+    if fold['proba'] is not None:
+        # Columnas alineadas con todas las clases (un fold puede no verlas todas)
+        proba = np.zeros((len(y_pred), len(labels)))
+        columns = pd.Index(labels).get_indexer(fold['classes'])
+        proba[:, columns] = fold['proba']
+        metrics['log_loss'] = log_loss(y_true, np.clip(proba, 1e-15, 1.0), labels=labels)
+
+    cm = confusion_matrix(y_true, y_pred, labels=labels)
+    return metrics, cm
+
+
+def cross_validate_time_ordered(estimator, X, y, splits, n_jobs=-1):
+    """
+    Validación cruzada con un único entrenamiento por fold.
+
+    Los folds se entrenan en paralelo (procesos) y todas las métricas y
+    matrices de confusión se calculan después sobre las predicciones
+    guardadas de cada fold.
+
+    Args:
+        estimator: Estimador de scikit-learn (no se modifica)
+        X (numpy.ndarray): Características
+        y (numpy.ndarray): Objetivo
+        splits (list): Tuplas (índices de entrenamiento, índices de validación)
+        n_jobs (int): Procesos en paralelo (-1 = todos los núcleos)
+
+    Returns:
+        dict: Scores por métrica, matrices de confusión, predicciones fuera
+            de muestra y tamaño de cada fold
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    labels = np.unique(y)
+
+    folds = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(estimator, X, y, train_idx, val_idx) for train_idx, val_idx in splits
+    )
+
+    scores = {metric: [] for metric in FOLD_METRICS}
+    confusion_matrices = []
+    oof_pred = np.full(len(y), None, dtype=object)
+
+    for fold in folds:
+        y_true = y[fold['val_idx']]
+        metrics, cm = _fold_metrics(y_true, fold, labels)
+        for metric, value in metrics.items():
+            scores[metric].append(value)
+        confusion_matrices.append(cm)
+        oof_pred[fold['val_idx']] = fold['y_pred']
+
+    return {
+        'scores': {metric: np.array(values) for metric, values in scores.items()},
+        'confusion_matrices': confusion_matrices,
+        'labels': labels,
+        'oof_pred': oof_pred,
+        'fold_sizes': [(len(train_idx), len(val_idx)) for train_idx, val_idx in splits]
+    }
@@ -0,0 +1,423 @@
+# models/elo.py
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+# Añadir directorio del servicio al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.synthetic_matches import stable_id
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.elo')
+
+ELO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved', 'elo_ratings.json')
+
+INITIAL_RATING = 1500.0
+DEFAULT_K_FACTOR = 20.0
+
+# Puntos Elo que vale jugar en casa
+DEFAULT_HOME_ADVANTAGE = 60.0
+
+# Estados de API-Football con el partido terminado
+FINISHED_STATUSES = {'FT', 'AET', 'PEN'}
+
+# Días que se recuerdan los IDs de partido ya aplicados (los resultados más antiguos se ignoran)
+APPLIED_RETENTION_DAYS = 30
+
+
+def expected_score(rating_diff):
+    """Resultado esperado (1 victoria, 0.5 empate) para una diferencia de rating"""
+    return 1 / (1 + 10 ** (-np.asarray(rating_diff, dtype=float) / 400))
+
+
+def margin_multiplier(goal_diff):
+    """
+    Multiplicador por diferencia de goles (World Football Elo).
+
+    1 con uno o ningún gol de diferencia, 1.5 con dos y (11 + N) / 8 con N >= 3.
+    """
+    goal_diff = np.abs(np.asarray(goal_diff, dtype=float))
+    return np.where(goal_diff <= 1, 1.0, np.where(goal_diff == 2, 1.5, (11 + goal_diff) / 8))
+
+
+class EloRatings:
+    """
+    Ratings Elo de cada equipo actualizados partido a partido.
+
+    El estado vive en arrays indexados por una posición fija por equipo
+    (diccionario ID -> posición), así que leer un rating o aplicar un
+    resultado es O(1). `replay` reconstruye todo el histórico en una pasada:
+    los partidos de una misma fecha se actualizan a la vez, con los ratings
+    previos a esa fecha, mediante operaciones vectorizadas.
+    """
+
+    def __init__(self, k_factor=DEFAULT_K_FACTOR, home_advantage=DEFAULT_HOME_ADVANTAGE,
+                 initial_rating=INITIAL_RATING):
+        """
+        Inicializa el almacén vacío.
+
+        Args:
+            k_factor (float): Puntos en juego por partido
+            home_advantage (float): Puntos Elo sumados al equipo local
+            initial_rating (float): Rating de un equipo nuevo
+        """
+        self.k_factor = k_factor
+        self.home_advantage = home_advantage
+        self.initial_rating = initial_rating
+        self.slots = {}   # ID de equipo -> posición en los arrays
+        self.names = {}   # nombre -> ID de equipo
+        self.size = 0
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.rating = np.zeros(0)
+        self.matches = np.zeros(0, dtype=np.int64)
+        self.last_date = np.zeros(0, dtype='datetime64[D]')
+        self.applied = {}  # ID de partido -> fecha, dentro de la ventana de retención
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, capacity):
+        """Amplía los arrays (capacidad doblada: inserción O(1) amortizada)"""
+        if capacity <= len(self.rating):
+            return
+        capacity = max(capacity, 2 * len(self.rating), 64)
+        extra = capacity - len(self.rating)
+        self.ids = np.concatenate([self.ids, np.zeros(extra, dtype=np.int64)])
+        self.rating = np.concatenate([self.rating, np.full(extra, self.initial_rating)])
+        self.matches = np.concatenate([self.matches, np.zeros(extra, dtype=np.int64)])
+        self.last_date = np.concatenate([self.last_date, np.full(extra, np.datetime64('NaT'), dtype='datetime64[D]')])
+
+    def slot(self, team_id, name=None):
+        """
+        Posición de un equipo en los arrays (la crea si es nuevo).
+
+        El nombre canónico identifica al equipo entre fuentes: un ID nuevo
+        con un nombre ya conocido (p.ej. el ID de API-Football de un equipo
+        reconstruido desde Football-Data, con ID = CRC32 del nombre) se
+        registra como otro ID de la misma posición y conserva su rating.
+
+        Args:
+            team_id (int): ID del equipo
+            name (str, optional): Nombre canónico, para las búsquedas por nombre
+
+        Returns:
+            int: Posición
+        """
+        team_id = int(team_id)
+        position = self.slots.get(team_id)
+        if position is None and name in self.names:
+            position = self.slots.get(self.names[name])
+            if position is not None:
+                self.slots[team_id] = position
+        if position is None:
+            self._grow(self.size + 1)
+            position = self.size
+            self.slots[team_id] = position
+            self.ids[position] = team_id
+            self.size += 1
+        if name is not None:
+            self.names[name] = team_id
+        return position
+
+    def get(self, team):
+        """
+        Rating actual de un equipo.
+
+        Args:
+            team (int | str): ID o nombre del equipo
+
+        Returns:
+            float: Rating (el inicial si el equipo no tiene partidos)
+        """
+        team_id = self.names.get(team) if isinstance(team, str) else team
+        position = self.slots.get(team_id)
+        return self.initial_rating if position is None else float(self.rating[position])
+
+    def win_probability(self, home_team, away_team):
+        """Resultado esperado del local (victoria 1, empate 0.5) según el Elo"""
+        return float(expected_score(self.get(home_team) + self.home_advantage - self.get(away_team)))
+
+    def _applied_cutoff(self):
+        """Fecha anterior a la cual ya no se recuerdan los partidos aplicados (NaT sin partidos)"""
+        dates = self.last_date[:self.size]
+        dates = dates[~np.isnat(dates)]
+        if len(dates) == 0:
+            return np.datetime64('NaT', 'D')
+        return dates.max() - np.timedelta64(APPLIED_RETENTION_DAYS, 'D')
+
+    def _prune_applied(self):
+        cutoff = self._applied_cutoff()
+        if not np.isnat(cutoff):
+            self.applied = {
+                match_id: date for match_id, date in self.applied.items()
+                if np.datetime64(date, 'D') >= cutoff
+            }
+
+    def update(self, home_id, away_id, home_goals, away_goals, date=None, home_name=None, away_name=None,
+               match_id=None):
+        """
+        Aplica un resultado (O(1)).
+
+        Con `match_id`, un partido ya aplicado no se vuelve a contar. Como
+        los IDs solo se recuerdan APPLIED_RETENTION_DAYS días, un resultado
+        con fecha anterior a esa ventana se ignora (usar `replay`).
+
+        Args:
+            home_id (int): ID del equipo local
+            away_id (int): ID del equipo visitante
+            home_goals (int): Goles del local
+            away_goals (int): Goles del visitante
+            date (str, optional): Fecha del partido
+            home_name (str, optional): Nombre del local
+            away_name (str, optional): Nombre del visitante
+            match_id (int | str, optional): ID del partido
+
+        Returns:
+            float: Puntos ganados por el local (los pierde el visitante), o None
+                si el resultado no se aplicó
+        """
+        if match_id is not None:
+            match_id = str(match_id)
+            if match_id in self.applied:
+                logger.debug(f"Partido {match_id} ya aplicado al Elo")
+                return None
+            if date is None:
+                raise ValueError("Se necesita la fecha del partido para registrarlo como aplicado")
+            day = np.datetime64(str(date)[:10], 'D')
+            if day < self._applied_cutoff():
+                logger.warning(f"Partido {match_id} ({day}) fuera de la ventana de {APPLIED_RETENTION_DAYS} días: "
+                               f"no se aplica (reconstruir con python -m models.elo)")
+                return None
+
+        home = self.slot(home_id, home_name)
+        away = self.slot(away_id, away_name)
+        score = 1.0 if home_goals > away_goals else 0.5 if home_goals == away_goals else 0.0
+        expected = expected_score(self.rating[home] + self.home_advantage - self.rating[away])
+        delta = float(self.k_factor * margin_multiplier(home_goals - away_goals) * (score - expected))
+
+        self.rating[home] += delta
+        self.rating[away] -= delta
+        self.matches[[home, away]] += 1
+        if date is not None:
+            self.last_date[[home, away]] = np.datetime64(str(date)[:10], 'D')
+        if match_id is not None:
+            self.applied[match_id] = str(day)
+            self._prune_applied()
+        return delta
+
+    def _team_keys(self, df, side):
+        """ID de cada equipo del lado indicado (CRC32 del nombre si la fuente no trae ID)"""
+        names = df[f'{side}_team']
+        ids = df[f'{side}_team_id'] if f'{side}_team_id' in df.columns else pd.Series(np.nan, index=df.index)
+        missing = ids.isna()
+        if missing.any():
+            ids = ids.astype(object)
+            ids[missing] = names[missing].map(stable_id)
+        return ids.astype(np.int64).to_numpy()
+
+    def replay(self, df, reset=True):
+        """
+        Recalcula los ratings recorriendo el histórico completo.
+
+        Args:
+            df (pandas.DataFrame): Partidos (date, home_team, away_team, home_goals, away_goals
+                y opcionalmente home_team_id, away_team_id y match_id)
+            reset (bool): Partir de cero (False continúa desde el estado actual)
+
+        Returns:
+            pandas.DataFrame: Ratings previos al partido (home_elo, away_elo), mismo índice que df
+        """
+        if reset:
+            self.__init__(self.k_factor, self.home_advantage, self.initial_rating)
+
+        df = df.dropna(subset=['home_goals', 'away_goals'])
+        dates = pd.to_datetime(df['date'], format='mixed').dt.normalize().to_numpy().astype('datetime64[D]')
+        order = np.argsort(dates, kind='stable')
+        dates = dates[order]
+
+        # Posición de cada equipo (un alta por equipo distinto; el nombre une
+        # los IDs de distintas fuentes en una misma posición)
+        home_ids, away_ids = self._team_keys(df, 'home')[order], self._team_keys(df, 'away')[order]
+        codes, unique_ids = pd.factorize(np.concatenate([home_ids, away_ids]))
+        names = pd.concat([df['home_team'], df['away_team']]).to_numpy()[np.concatenate([order, order + len(df)])]
+        first_names = pd.Series(names).groupby(codes).first()
+        positions = np.array([
+            self.slot(team_id, first_names[code]) for code, team_id in enumerate(unique_ids)
+        ], dtype=np.int64)
+        home, away = positions[codes[:len(df)]], positions[codes[len(df):]]
+
+        home_goals = df['home_goals'].to_numpy(dtype=float)[order]
+        away_goals = df['away_goals'].to_numpy(dtype=float)[order]
+        score = np.sign(home_goals - away_goals) / 2 + 0.5
+        multiplier = self.k_factor * margin_multiplier(home_goals - away_goals)
+
+        home_elo = np.empty(len(df))
+        away_elo = np.empty(len(df))
+        boundaries = np.flatnonzero(np.diff(dates.astype(np.int64), prepend=-1, append=-1))
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            h, a = home[start:end], away[start:end]
+            home_elo[start:end] = self.rating[h]
+            away_elo[start:end] = self.rating[a]
+            expected = expected_score(home_elo[start:end] + self.home_advantage - away_elo[start:end])
+            delta = multiplier[start:end] * (score[start:end] - expected)
+            np.add.at(self.rating, h, delta)
+            np.add.at(self.rating, a, -delta)
+
+        np.add.at(self.matches, home, 1)
+        np.add.at(self.matches, away, 1)
+        last = np.full(self.size, np.datetime64('NaT'), dtype='datetime64[D]')
+        last[home] = dates
+        last[away] = dates
+        self.last_date[:self.size] = np.where(np.isnat(last), self.last_date[:self.size], last)
+
+        # Partidos recientes: una actualización en vivo del mismo partido no se vuelve a aplicar
+        if 'match_id' in df.columns and len(df):
+            recent = dates >= dates.max() - np.timedelta64(APPLIED_RETENTION_DAYS, 'D')
+            match_ids = df['match_id'].to_numpy()[order][recent]
+            valid = pd.notna(match_ids)
+            self.applied.update(zip(match_ids[valid].astype(str), dates[recent][valid].astype(str)))
+            self._prune_applied()
+
+        logger.info(f"Elo reconstruido: {len(df)} partidos, {self.size} equipos")
+        result = pd.DataFrame({'home_elo': np.empty(len(df)), 'away_elo': np.empty(len(df))}, index=df.index)
+        result.iloc[order, 0] = home_elo
+        result.iloc[order, 1] = away_elo
+        return result
+
+    def table(self):
+        """Ratings actuales ordenados de mayor a menor"""
+        names = {self.slots[team_id]: name for name, team_id in self.names.items() if team_id in self.slots}
+        return pd.DataFrame({
+            'team_id': self.ids[:self.size],
+            'team': [names.get(position) for position in range(self.size)],
+            'rating': self.rating[:self.size],
+            'matches': self.matches[:self.size],
+            'last_date': self.last_date[:self.size]
+        }).sort_values('rating', ascending=False).reset_index(drop=True)
+
+    def to_dict(self):
+        """Estado serializable"""
+        return {
+            'k_factor': self.k_factor,
+            'home_advantage': self.home_advantage,
+            'initial_rating': self.initial_rating,
+            'updated_at': datetime.now().isoformat(),
+            'ids': self.ids[:self.size].tolist(),
+            'rating': np.round(self.rating[:self.size], 3).tolist(),
+            'matches': self.matches[:self.size].tolist(),
+            'last_date': [None if np.isnat(d) else str(d) for d in self.last_date[:self.size]],
+            'names': self.names,
+            'aliases': {str(team_id): position for team_id, position in self.slots.items()
+                        if self.ids[position] != team_id},
+            'applied': self.applied
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruye el almacén desde to_dict()"""
+        store = cls(data['k_factor'], data['home_advantage'], data['initial_rating'])
+        store.size = len(data['ids'])
+        store._grow(store.size)
+        store.ids[:store.size] = data['ids']
+        store.rating[:store.size] = data['rating']
+        store.matches[:store.size] = data['matches']
+        store.last_date[:store.size] = np.array(
+            [d or 'NaT' for d in data['last_date']], dtype='datetime64[D]'
+        )
+        store.slots = {team_id: position for position, team_id in enumerate(data['ids'])}
+        store.slots.update({int(team_id): position for team_id, position in data.get('aliases', {}).items()})
+        store.names = {name: int(team_id) for name, team_id in data['names'].items()}
+        store.applied = dict(data.get('applied', {}))
+        return store
+
+    def save(self, path=ELO_PATH):
+        """Guarda el estado de forma atómica"""
+        directory = os.path.dirname(str(path)) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.elo_', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path=ELO_PATH):
+        """Carga el estado guardado o, si no existe, un almacén vacío"""
+        if not os.path.exists(str(path)):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+@contextmanager
+def locked_state(path=ELO_PATH):
+    """
+    Bloqueo exclusivo entre procesos del estado Elo guardado en `path`.
+
+    Quien actualiza debe recargar el estado dentro del bloqueo, aplicar
+    el resultado y guardar antes de soltarlo; así dos procesos que
+    actualizan a la vez no pierden resultados.
+    """
+    directory = os.path.dirname(str(path)) or '.'
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def main():
+    """Reconstruye los ratings Elo con todo el histórico"""
+    from utils.match_dataset import load_matches
+
+    parser = argparse.ArgumentParser(description='Ratings Elo por equipo a partir del histórico')
+    parser.add_argument('--data', '-d', help='Dataset Parquet o CSV de partidos (por defecto el histórico local)')
+    parser.add_argument('--k-factor', type=float, default=DEFAULT_K_FACTOR, help='Puntos en juego por partido')
+    parser.add_argument('--home-advantage', type=float, default=DEFAULT_HOME_ADVANTAGE,
+                        help='Puntos Elo del equipo local')
+    parser.add_argument('--output', '-o', default=ELO_PATH, help='Ruta del estado guardado')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    df = load_matches(args.data)
+    store = EloRatings(args.k_factor, args.home_advantage)
+    with locked_state(args.output):
+        store.replay(df)
+        store.save(args.output)
+
+    for _, row in store.table().head(10).iterrows():
+        print(f"{row['team']:30s} {row['rating']:7.1f}  ({row['matches']} partidos)")
+
+
+if __name__ == '__main__':
+    main()
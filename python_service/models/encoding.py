@@ -0,0 +1,130 @@
+# models/encoding.py
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.encoding')
+
+# Código de las categorías no vistas en entrenamiento
+UNKNOWN_ID = -1
+
+# Columna categórica -> clave del LabelEncoder en los artefactos de train_simple.py
+ENCODED_COLUMNS = {
+    'home_team': 'home_encoder',
+    'away_team': 'away_encoder',
+    'league': 'league_encoder'
+}
+
+
+class CategoryTable:
+    """
+    Tabla de codificación categoría -> entero con id explícito para desconocidas.
+
+    Usa los mismos códigos que el LabelEncoder del que procede (posición en
+    `classes_`), pero la consulta de un valor es un acceso a diccionario y la
+    de una columna completa una sola llamada vectorizada.
+    """
+
+    def __init__(self, categories):
+        """
+        Inicializa la tabla.
+
+        Args:
+            categories (array-like): Categorías en el orden de sus códigos
+        """
+        self.categories = list(categories)
+        self.lookup = {category: code for code, category in enumerate(self.categories)}
+        self._dtype = pd.CategoricalDtype(self.categories)
+
+    @classmethod
+    def from_label_encoder(cls, encoder):
+        """Crea la tabla a partir de un LabelEncoder ajustado"""
+        return cls(encoder.classes_.tolist())
+
+    def __len__(self):
+        return len(self.categories)
+
+    def __contains__(self, value):
+        return value in self.lookup
+
+    def encode(self, value):
+        """Código de un valor (UNKNOWN_ID si no se vio en entrenamiento)"""
+        return self.lookup.get(value, UNKNOWN_ID)
+
+    def encode_many(self, values):
+        """
+        Códigos de una columna completa en una sola llamada.
+
+        Args:
+            values (array-like): Valores a codificar
+
+        Returns:
+            numpy.ndarray: Códigos (UNKNOWN_ID para valores desconocidos)
+        """
+        codes = pd.Categorical(values, dtype=self._dtype).codes
+        return codes.astype(np.int64)
+
+
+def export_encoding_tables(encoders):
+    """
+    Exporta LabelEncoders a tablas serializables (listas de categorías).
+
+    Args:
+        encoders (dict): LabelEncoder ajustado por columna categórica
+
+    Returns:
+        dict: Categorías por columna, en el orden de sus códigos
+    """
+    return {column: encoder.classes_.tolist() for column, encoder in encoders.items()}
+
+
+def load_encoding_tables(model_data):
+    """
+    Tablas de codificación de un artefacto de modelo.
+
+    Los artefactos guardados antes de exportar las tablas solo contienen los
+    LabelEncoders; en ese caso las tablas se construyen a partir de ellos.
+
+    Args:
+        model_data (dict): Artefacto cargado (modelo, encoders, tablas...)
+
+    Returns:
+        dict: CategoryTable por columna categórica
+    """
+    exported = model_data.get('encoding_tables')
+    if exported:
+        return {column: CategoryTable(categories) for column, categories in exported.items()}
+
+    return {
+        column: CategoryTable.from_label_encoder(model_data[key])
+        for column, key in ENCODED_COLUMNS.items()
+        if key in model_data
+    }
+
+
+def encode_frame(df, tables, columns=None):
+    """
+    Codifica varias columnas categóricas de un DataFrame.
+
+    Args:
+        df (pandas.DataFrame): Partidos
+        tables (dict): CategoryTable por columna
+        columns (list, optional): Columnas a codificar (por defecto, las de `tables`)
+
+    Returns:
+        numpy.ndarray: Matriz (n_filas, n_columnas) de códigos
+    """
+    columns = list(tables) if columns is None else list(columns)
+    encoded = np.empty((len(df), len(columns)), dtype=np.int64)
+
+    for j, column in enumerate(columns):
+        encoded[:, j] = tables[column].encode_many(df[column])
+
+    unknown = (encoded == UNKNOWN_ID).sum(axis=0)
+    for column, count in zip(columns, unknown):
+        if count:
+            logger.debug(f"{count} valores desconocidos en '{column}'")
+
+    return encoded
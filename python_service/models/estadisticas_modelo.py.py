@@ -5,6 +5,8 @@ import json
 from datetime import datetime, timedelta
 import math
 
+from models.scoreline import over_under, scoreline_matrix
+
 # Configurar logging
 logger = logging.getLogger('predictor_futbol_premium.estadisticas_modelo')
 
@@ -280,17 +282,17 @@ class EstadisticasModel:
         prob_btts_no = 1 - prob_btts_si
         
         # Probabilidad over/under
-        # Usando distribución de Poisson para total de goles
+        # Desde la matriz de marcadores (Dixon-Coles) en lugar de un Poisson del total
         total_goles_esperados = xg_local + xg_visitante
+        overs = over_under(scoreline_matrix(xg_local, xg_visitante), lines=(1.5, 2.5, 3.5))
         
-        prob_over_1_5 = 1 - self._poisson_prob(0, total_goles_esperados) - self._poisson_prob(1, total_goles_esperados)
+        prob_over_1_5 = float(overs[1.5][0])
         prob_under_1_5 = 1 - prob_over_1_5
         
-        prob_over_2_5 = 1 - self._poisson_prob(0, total_goles_esperados) - self._poisson_prob(1, total_goles_esperados) - self._poisson_prob(2, total_goles_esperados)
+        prob_over_2_5 = float(overs[2.5][0])
         prob_under_2_5 = 1 - prob_over_2_5
         
-        prob_over_3_5 = 1 - (self._poisson_prob(0, total_goles_esperados) + self._poisson_prob(1, total_goles_esperados) + 
-                              self._poisson_prob(2, total_goles_esperados) + self._poisson_prob(3, total_goles_esperados))
+        prob_over_3_5 = float(overs[3.5][0])
         prob_under_3_5 = 1 - prob_over_3_5
         
         # Resultado de la predicción
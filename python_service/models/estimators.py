@@ -0,0 +1,296 @@
+# models/estimators.py
+import logging
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import (
+    GradientBoostingClassifier, GradientBoostingRegressor,
+    HistGradientBoostingClassifier, HistGradientBoostingRegressor
+)
+from sklearn.inspection import permutation_importance
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.estimators')
+
+GRADIENT_BOOSTING = 'gradient_boosting'
+HIST_GRADIENT_BOOSTING = 'hist_gradient_boosting'
+
+BACKENDS = (GRADIENT_BOOSTING, HIST_GRADIENT_BOOSTING)
+DEFAULT_BACKEND = HIST_GRADIENT_BOOSTING
+
+# Número máximo de bins (y de categorías nativas) de HistGradientBoosting
+MAX_BINS = 255
+
+# Equivalencia de parámetros de GradientBoosting -> HistGradientBoosting.
+# None indica que el parámetro no tiene equivalente y se descarta.
+_HIST_PARAM_MAP = {
+    'n_estimators': 'max_iter',
+    'learning_rate': 'learning_rate',
+    'max_depth': 'max_depth',
+    'min_samples_leaf': 'min_samples_leaf',
+    'max_leaf_nodes': 'max_leaf_nodes',
+    'random_state': 'random_state',
+    'min_samples_split': None,
+    'subsample': None,
+    'max_features': None,
+}
+
+# Parámetros propios de HistGradientBoosting que GradientBoosting no acepta
+_HIST_ONLY_PARAMS = (
+    'max_iter', 'max_bins', 'l2_regularization', 'early_stopping',
+    'validation_fraction', 'n_iter_no_change', 'scoring', 'tol',
+    'categorical_features', 'interaction_cst', 'class_weight'
+)
+
+# Valores por defecto de parada temprana para el backend histograma
+HIST_DEFAULTS = {
+    'early_stopping': 'auto',
+    'validation_fraction': 0.1,
+    'n_iter_no_change': 10,
+}
+
+
+def validate_backend(backend):
+    """Comprueba que el backend esté soportado y lo devuelve normalizado"""
+    backend = (backend or DEFAULT_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend no soportado: {backend}. Opciones: {', '.join(BACKENDS)}")
+    return backend
+
+
+def _param_name(name, backend):
+    """Nombre del parámetro en el backend indicado, o None si no existe"""
+    if backend == GRADIENT_BOOSTING:
+        return None if name in _HIST_ONLY_PARAMS else name
+    if name in _HIST_PARAM_MAP:
+        return _HIST_PARAM_MAP[name]
+    return name if name in _HIST_ONLY_PARAMS else None
+
+
+def translate_params(params, backend):
+    """
+    Adapta un diccionario de hiperparámetros al backend indicado.
+
+    Los ficheros de configuración usan nombres de GradientBoosting
+    (`n_estimators`, `subsample`...). Para el backend histograma se renombran
+    o descartan los que no tienen equivalente y se activa la parada temprana.
+
+    Args:
+        params (dict): Hiperparámetros con nombres de GradientBoosting
+        backend (str): Backend de destino
+
+    Returns:
+        dict: Hiperparámetros válidos para el backend
+    """
+    backend = validate_backend(backend)
+    translated = dict(HIST_DEFAULTS) if backend == HIST_GRADIENT_BOOSTING else {}
+    dropped = []
+
+    for key, value in (params or {}).items():
+        target = _param_name(key, backend)
+        if target is None:
+            dropped.append(key)
+        else:
+            translated[target] = value
+
+    if dropped:
+        logger.debug(f"Parámetros sin equivalente en {backend} descartados: {dropped}")
+
+    return translated
+
+
+def translate_param_grid(param_grid, backend, prefix=''):
+    """
+    Adapta un espacio de búsqueda de GridSearchCV al backend indicado.
+
+    Args:
+        param_grid (dict): Espacio de búsqueda con nombres de GradientBoosting
+        backend (str): Backend de destino
+        prefix (str): Prefijo de paso del pipeline (p.ej. 'classifier__')
+
+    Returns:
+        dict: Espacio de búsqueda válido para el backend
+    """
+    backend = validate_backend(backend)
+    grid = {}
+
+    for key, values in (param_grid or {}).items():
+        name = key[len(prefix):] if key.startswith(prefix) else key
+        target = _param_name(name, backend)
+        if target is not None:
+            grid[f"{prefix}{target}"] = values
+
+    return grid
+
+
+def build_classifier(backend=DEFAULT_BACKEND, params=None, categorical_features=None):
+    """
+    Construye el clasificador de boosting del backend indicado.
+
+    Args:
+        backend (str): 'gradient_boosting' o 'hist_gradient_boosting'
+        params (dict, optional): Hiperparámetros (nombres de GradientBoosting)
+        categorical_features (array-like, optional): Índices o máscara de
+            columnas categóricas (solo backend histograma)
+
+    Returns:
+        estimator: Clasificador sin entrenar
+    """
+    backend = validate_backend(backend)
+    params = translate_params(params, backend)
+
+    if backend == GRADIENT_BOOSTING:
+        return GradientBoostingClassifier(**params)
+
+    if categorical_features is not None:
+        params['categorical_features'] = categorical_features
+    return HistGradientBoostingClassifier(**params)
+
+
+def build_regressor(backend=DEFAULT_BACKEND, params=None, categorical_features=None):
+    """
+    Construye el regresor de boosting del backend indicado.
+
+    Args:
+        backend (str): 'gradient_boosting' o 'hist_gradient_boosting'
+        params (dict, optional): Hiperparámetros (nombres de GradientBoosting)
+        categorical_features (array-like, optional): Índices o máscara de
+            columnas categóricas (solo backend histograma)
+
+    Returns:
+        estimator: Regresor sin entrenar
+    """
+    backend = validate_backend(backend)
+    params = translate_params(params, backend)
+
+    if backend == GRADIENT_BOOSTING:
+        return GradientBoostingRegressor(**params)
+
+    if categorical_features is not None:
+        params['categorical_features'] = categorical_features
+    return HistGradientBoostingRegressor(**params)
+
+
+def build_preprocessor(numerical_features, categorical_features, backend=DEFAULT_BACKEND):
+    """
+    Construye el ColumnTransformer adecuado para el backend.
+
+    - gradient_boosting: StandardScaler + OneHotEncoder denso (comportamiento original)
+    - hist_gradient_boosting: numéricas sin transformar + OrdinalEncoder, para
+      que el modelo trate equipos, árbitros y estadios como categorías nativas
+
+    Las columnas numéricas siempre van primero, de modo que las categóricas
+    ocupan los índices [len(numerical_features), ...).
+
+    Args:
+        numerical_features (list): Columnas numéricas
+        categorical_features (list): Columnas categóricas
+        backend (str): Backend del estimador
+
+    Returns:
+        sklearn.compose.ColumnTransformer: Preprocesador
+    """
+    backend = validate_backend(backend)
+
+    if backend == GRADIENT_BOOSTING:
+        numerical_transformer = Pipeline(steps=[('scaler', StandardScaler())])
+        categorical_transformer = Pipeline(steps=[
+            ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
+        ])
+    else:
+        numerical_transformer = 'passthrough'
+        # Categorías desconocidas -> NaN (valor ausente para el modelo).
+        # Las poco frecuentes se agrupan para respetar el límite de MAX_BINS.
+        categorical_transformer = OrdinalEncoder(
+            handle_unknown='use_encoded_value', unknown_value=np.nan,
+            encoded_missing_value=np.nan, max_categories=MAX_BINS - 1
+        )
+
+    return ColumnTransformer(
+        transformers=[
+            ('num', numerical_transformer, list(numerical_features)),
+            ('cat', categorical_transformer, list(categorical_features))
+        ],
+        remainder='drop'
+    )
+
+
+def build_pipeline(numerical_features, categorical_features, backend=DEFAULT_BACKEND, params=None):
+    """
+    Construye el pipeline completo preprocesador + clasificador.
+
+    Args:
+        numerical_features (list): Columnas numéricas
+        categorical_features (list): Columnas categóricas
+        backend (str): Backend del estimador
+        params (dict, optional): Hiperparámetros del clasificador
+
+    Returns:
+        sklearn.pipeline.Pipeline: Pipeline sin entrenar
+    """
+    backend = validate_backend(backend)
+    n_numerical = len(numerical_features)
+    categorical_idx = list(range(n_numerical, n_numerical + len(categorical_features))) or None
+
+    return Pipeline(steps=[
+        ('preprocessor', build_preprocessor(numerical_features, categorical_features, backend)),
+        ('classifier', build_classifier(backend, params, categorical_features=categorical_idx))
+    ])
+
+
+def native_categorical_indices(X, candidate_indices, max_bins=MAX_BINS):
+    """
+    Filtra las columnas ya codificadas como enteros que pueden tratarse como
+    categorías nativas (códigos < max_bins). Las demás se usan como numéricas.
+
+    Args:
+        X (numpy.ndarray): Matriz de características
+        candidate_indices (list): Índices de columnas codificadas
+        max_bins (int): Límite de categorías del backend histograma
+
+    Returns:
+        list: Índices aptos para `categorical_features`
+    """
+    selected = []
+    for idx in candidate_indices:
+        column = np.asarray(X[:, idx], dtype=np.float64)
+        if np.nanmax(column, initial=-1) < max_bins:
+            selected.append(idx)
+        else:
+            logger.warning(f"Columna {idx} con más de {max_bins} categorías: se usará como numérica")
+    return selected
+
+
+def get_feature_importances(estimator, X=None, y=None, n_repeats=5, random_state=42):
+    """
+    Obtiene la importancia de características de un estimador o pipeline.
+
+    Usa `feature_importances_` si el clasificador lo expone (GradientBoosting)
+    y, si no (HistGradientBoosting), importancia por permutación sobre (X, y).
+
+    Args:
+        estimator: Estimador o pipeline entrenado
+        X (array-like, optional): Datos para la importancia por permutación
+        y (array-like, optional): Etiquetas para la importancia por permutación
+        n_repeats (int): Repeticiones de la permutación
+        random_state (int): Semilla para reproducibilidad
+
+    Returns:
+        numpy.ndarray or None: Importancias, o None si no pueden calcularse
+    """
+    final_estimator = estimator
+    if hasattr(estimator, 'named_steps') and 'classifier' in estimator.named_steps:
+        final_estimator = estimator.named_steps['classifier']
+
+    if hasattr(final_estimator, 'feature_importances_'):
+        return final_estimator.feature_importances_
+
+    if X is None or y is None:
+        return None
+
+    result = permutation_importance(
+        estimator, X, y, n_repeats=n_repeats, random_state=random_state, n_jobs=-1
+    )
+    return result.importances_mean
@@ -0,0 +1,265 @@
+# models/evaluation_store.py
+import os
+import json
+import glob
+import sqlite3
+import logging
+import argparse
+from contextlib import closing
+
+import pandas as pd
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.evaluation_store')
+
+DEFAULT_DB_NAME = 'evaluations.db'
+
+# Métricas guardadas como columnas (consultables sin leer el JSON completo)
+INDEXED_METRICS = {
+    'accuracy': ('metrics', 'accuracy'),
+    'weighted_precision': ('metrics', 'weighted_precision'),
+    'weighted_recall': ('metrics', 'weighted_recall'),
+    'weighted_f1': ('metrics', 'weighted_f1'),
+    'roi': ('betting_metrics', 'simulated_roi_percent'),
+    'high_confidence_accuracy': ('betting_metrics', 'high_confidence_accuracy'),
+}
+
+_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS evaluations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        model_name TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        accuracy REAL,
+        weighted_precision REAL,
+        weighted_recall REAL,
+        weighted_f1 REAL,
+        roi REAL,
+        high_confidence_accuracy REAL,
+        source TEXT UNIQUE,
+        payload TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_evaluations_model_time ON evaluations (model_name, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_evaluations_time ON evaluations (timestamp)',
+]
+
+
+def _metric_value(evaluation, metric):
+    """Valor de una métrica dentro de una evaluación (None si no existe)"""
+    if metric in INDEXED_METRICS:
+        section, key = INDEXED_METRICS[metric]
+        return evaluation.get(section, {}).get(key)
+    return evaluation.get('metrics', {}).get(metric)
+
+
+class EvaluationStore:
+    """
+    Almacén de evaluaciones en SQLite, solo de inserción.
+
+    Cada evaluación es una fila con el modelo, la fecha, las métricas
+    principales en columnas y el JSON completo. El índice (modelo, fecha)
+    convierte "última evaluación de un modelo" e históricos de una métrica
+    en búsquedas por índice en lugar de recorrer un directorio de ficheros.
+    """
+
+    def __init__(self, db_path):
+        """
+        Inicializa el almacén.
+
+        Args:
+            db_path (str): Ruta de la base de datos SQLite
+        """
+        self.db_path = str(db_path)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self):
+        """Conexión nueva (una por operación: seguro entre hilos y procesos)"""
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _row(self, evaluation, source=None):
+        """Valores de la fila de una evaluación"""
+        return (
+            evaluation['model_name'],
+            evaluation['timestamp'],
+            *[_metric_value(evaluation, metric) for metric in INDEXED_METRICS],
+            source,
+            json.dumps(evaluation)
+        )
+
+    def add(self, evaluation, source=None):
+        """
+        Añade una evaluación.
+
+        Args:
+            evaluation (dict): Evaluación de ModelEvaluator
+            source (str, optional): Origen (fichero importado); evita duplicados
+
+        Returns:
+            int: Id de la fila (None si el origen ya estaba importado)
+        """
+        columns = ', '.join(['model_name', 'timestamp', *INDEXED_METRICS, 'source', 'payload'])
+        placeholders = ', '.join('?' * (len(INDEXED_METRICS) + 4))
+
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                f'INSERT OR IGNORE INTO evaluations ({columns}) VALUES ({placeholders})',
+                self._row(evaluation, source)
+            )
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def count(self, model_name=None):
+        """Número de evaluaciones (de un modelo o en total)"""
+        with closing(self._connect()) as conn:
+            if model_name is None:
+                return conn.execute('SELECT COUNT(*) FROM evaluations').fetchone()[0]
+            return conn.execute(
+                'SELECT COUNT(*) FROM evaluations WHERE model_name = ?', (model_name,)
+            ).fetchone()[0]
+
+    def latest(self, model_name):
+        """
+        Última evaluación de un modelo.
+
+        Returns:
+            dict: Evaluación completa, o None si el modelo no tiene evaluaciones
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT payload FROM evaluations WHERE model_name = ? '
+                'ORDER BY timestamp DESC, id DESC LIMIT 1',
+                (model_name,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def history(self, model_name=None, metric='accuracy', since=None, until=None):
+        """
+        Evolución de una métrica en el tiempo.
+
+        Las métricas de INDEXED_METRICS se leen directamente de su columna;
+        el resto se extrae del JSON de cada evaluación.
+
+        Args:
+            model_name (str, optional): Modelo (por defecto, todos)
+            metric (str): Métrica
+            since (str, optional): Fecha mínima ('YYYY-MM-DD[ HH:MM:SS]')
+            until (str, optional): Fecha máxima
+
+        Returns:
+            pandas.DataFrame: Columnas model, timestamp y value
+        """
+        value_column = metric if metric in INDEXED_METRICS else 'payload'
+        conditions, params = [], []
+        if model_name is not None:
+            conditions.append('model_name = ?')
+            params.append(model_name)
+        if since is not None:
+            conditions.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('timestamp <= ?')
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f'SELECT model_name, timestamp, {value_column} FROM evaluations {where} '
+                'ORDER BY model_name, timestamp, id',
+                params
+            ).fetchall()
+
+        history = pd.DataFrame(rows, columns=['model', 'timestamp', 'value'])
+        if value_column == 'payload':
+            history['value'] = [_metric_value(json.loads(payload), metric) for payload in history['value']]
+        return history
+
+    def compare(self, model_names, metric='accuracy'):
+        """
+        Última evaluación de varios modelos según una métrica.
+
+        Returns:
+            pandas.DataFrame: Columnas model, metric, value y timestamp
+        """
+        results = []
+        for model_name in model_names:
+            evaluation = self.latest(model_name)
+            if evaluation is None:
+                logger.warning(f"No se encontraron evaluaciones para el modelo {model_name}")
+                continue
+
+            value = _metric_value(evaluation, metric)
+            if value is None:
+                logger.warning(f"Métrica {metric} no encontrada para el modelo {model_name}")
+
+            results.append({
+                'model': model_name,
+                'metric': metric,
+                'value': value,
+                'timestamp': evaluation['timestamp']
+            })
+
+        return pd.DataFrame(results)
+
+    def import_json_dir(self, directory):
+        """
+        Importa los ficheros *_evaluation_*.json de un directorio.
+
+        Cada fichero se registra con su ruta como origen, por lo que volver a
+        importar el mismo directorio no duplica evaluaciones.
+
+        Args:
+            directory (str): Directorio con evaluaciones en JSON
+
+        Returns:
+            int: Evaluaciones importadas
+        """
+        imported = 0
+        for path in sorted(glob.glob(os.path.join(directory, '*_evaluation_*.json'))):
+            try:
+                with open(path, 'r') as f:
+                    evaluation = json.load(f)
+                if self.add(evaluation, source=os.path.abspath(path)) is not None:
+                    imported += 1
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Evaluación no importada ({path}): {str(e)}")
+
+        if imported:
+            logger.info(f"{imported} evaluaciones importadas desde {directory}")
+        return imported
+
+
+def main():
+    """Importación y consulta del almacén de evaluaciones desde línea de comandos"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Almacén de evaluaciones de modelos')
+    parser.add_argument('--db', default=os.path.join('evaluations', DEFAULT_DB_NAME),
+                        help='Base de datos SQLite')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Importar evaluaciones JSON')
+    import_parser.add_argument('directory', help='Directorio con ficheros *_evaluation_*.json')
+
+    history_parser = subparsers.add_parser('history', help='Evolución de una métrica')
+    history_parser.add_argument('--model', help='Modelo (por defecto, todos)')
+    history_parser.add_argument('--metric', default='accuracy')
+    history_parser.add_argument('--since', help='Fecha mínima')
+
+    args = parser.parse_args()
+    store = EvaluationStore(args.db)
+
+    if args.command == 'import':
+        print(store.import_json_dir(args.directory))
+    elif args.command == 'history':
+        print(store.history(args.model, args.metric, since=args.since).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# models/handicap.py
+import logging
+
+import numpy as np
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.handicap')
+
+# Líneas por defecto (hándicap del local): enteras, medias y de cuarto entre -2.5 y +2.5
+DEFAULT_LINES = tuple(np.round(np.arange(-2.5, 2.5 + 1e-9, 0.25), 2))
+
+
+def validate_lines(lines):
+    """
+    Comprueba y normaliza una lista de líneas de hándicap.
+
+    Args:
+        lines (iterable): Hándicaps del local (múltiplos de 0.25)
+
+    Returns:
+        numpy.ndarray: Líneas como floats
+
+    Raises:
+        ValueError: Si alguna línea no es un múltiplo de 0.25
+    """
+    try:
+        lines = np.atleast_1d(np.asarray(lines, dtype=float))
+    except (TypeError, ValueError):
+        raise ValueError("Las líneas de hándicap deben ser números")
+    if lines.ndim != 1 or len(lines) == 0:
+        raise ValueError("Se necesita una lista de líneas de hándicap")
+    if not np.allclose(lines * 4, np.round(lines * 4)):
+        raise ValueError("Las líneas de hándicap deben ser múltiplos de 0.25")
+    return np.round(lines * 4) / 4
+
+
+def split_lines(lines):
+    """
+    Dos mitades de apuesta de cada línea.
+
+    Una línea de cuarto (p.ej. -0.75) reparte la apuesta entre las dos
+    líneas adyacentes (-0.5 y -1.0); una entera o media usa la misma dos veces.
+
+    Returns:
+        numpy.ndarray: (líneas, 2)
+    """
+    lines = validate_lines(lines)
+    quarter = np.abs(np.round(lines * 4) % 2) == 1
+    offset = np.where(quarter, 0.25, 0.0)
+    return np.column_stack([lines - offset, lines + offset])
+
+
+def price_handicaps(difference_distribution, lines=DEFAULT_LINES):
+    """
+    Probabilidades de ganar, push y perder del local en cada línea.
+
+    Con d = goles local - goles visitante y hándicap h, el local gana si
+    d + h > 0, hay push si d + h = 0 y pierde si d + h < 0. Todas las
+    líneas salen de una única suma acumulada de la distribución de la
+    diferencia: P(d <= k) se lee directamente para cada mitad de apuesta.
+    En las líneas de cuarto, win/push/lose son fracciones de la apuesta
+    (p.ej. push 0.5 * P(d = 0) en -0.25 es la media apuesta devuelta).
+
+    Args:
+        difference_distribution (numpy.ndarray): (partidos, 2 * lado - 1),
+            columna c = diferencia c - (lado - 1)
+        lines (iterable): Hándicaps del local
+
+    Returns:
+        dict: 'lines' (líneas,) y 'win', 'push', 'lose' (partidos, líneas) desde el lado local
+    """
+    distribution = np.atleast_2d(np.asarray(difference_distribution, dtype=float))
+    offset = (distribution.shape[1] - 1) // 2
+    halves = split_lines(lines)
+
+    # cumulative[:, k + 1] = P(d <= k - offset); la columna 0 es P(d <= -offset - 1) = 0
+    cumulative = np.concatenate([np.zeros((len(distribution), 1)), np.cumsum(distribution, axis=1)], axis=1)
+    cumulative[:, -1] = 1.0
+
+    def at_most(goal_difference):
+        """P(d <= k) para un array de umbrales enteros"""
+        return cumulative[:, np.clip(goal_difference + offset + 1, 0, cumulative.shape[1] - 1).astype(int)]
+
+    # Mitad de apuesta con hándicap h: pierde si d <= ceil(-h) - 1, no gana si d <= floor(-h)
+    lose = at_most(np.ceil(-halves) - 1)
+    not_win = at_most(np.floor(-halves))
+    n_lines = len(halves)
+    lose = lose.reshape(len(distribution), n_lines, 2).mean(axis=2)
+    not_win = not_win.reshape(len(distribution), n_lines, 2).mean(axis=2)
+
+    return {
+        'lines': halves.mean(axis=1),
+        'win': 1 - not_win,
+        'push': not_win - lose,
+        'lose': lose
+    }
+
+
+def fair_odds(win, push):
+    """Cuota decimal sin margen: win * cuota + push = 1"""
+    win = np.asarray(win, dtype=float)
+    return np.where(win > 0, (1 - np.asarray(push)) / np.maximum(win, 1e-15), np.inf)
+
+
+def handicap_market(difference_distribution, lines=DEFAULT_LINES, index=0, decimals=3):
+    """
+    Mercado de hándicap asiático de un partido, listo para JSON.
+
+    Returns:
+        dict: Línea del local ('-0.75', '+0', ...) -> probabilidades y cuotas
+            justas del local y del visitante (que juega la línea opuesta)
+    """
+    prices = price_handicaps(difference_distribution, lines)
+    odds_home = fair_odds(prices['win'], prices['push'])
+    odds_away = fair_odds(prices['lose'], prices['push'])
+    market = {}
+    for k, line in enumerate(prices['lines']):
+        win, push, lose = (float(prices[key][index, k]) for key in ('win', 'push', 'lose'))
+        market[f'{line:+g}'] = {
+            'home': {'win': round(win, decimals), 'push': round(push, decimals), 'lose': round(lose, decimals),
+                     'fair_odds': round(float(odds_home[index, k]), 2) if np.isfinite(odds_home[index, k]) else None},
+            'away': {'win': round(lose, decimals), 'push': round(push, decimals), 'lose': round(win, decimals),
+                     'fair_odds': round(float(odds_away[index, k]), 2) if np.isfinite(odds_away[index, k]) else None}
+        }
+    return market
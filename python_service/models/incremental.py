@@ -0,0 +1,340 @@
+# models/incremental.py
+import os
+import copy
+import json
+import logging
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.metrics import log_loss, mean_squared_error
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.incremental')
+
+# Columnas que identifican un partido en el feature store
+KEY_COLUMNS = ('date', 'home_team', 'away_team')
+
+# Partidos más recientes reservados para la evaluación de control
+DEFAULT_HOLDOUT_SIZE = 100
+
+# Árboles añadidos en cada actualización incremental
+DEFAULT_EXTRA_ESTIMATORS = 50
+
+# Versiones de scikit-learn (mayor.menor) cuyo HistGradientBoosting se ha
+# comprobado con _frozen_bins; con otras la ampliación falla en vez de
+# producir un modelo incorrecto
+FROZEN_BINS_SKLEARN_VERSIONS = ('1.3',)
+
+
+def match_keys(df, key_columns=KEY_COLUMNS):
+    """
+    Construye una clave por partido a partir de las columnas indicadas.
+
+    Args:
+        df (pandas.DataFrame): Partidos
+        key_columns (tuple): Columnas que identifican un partido
+
+    Returns:
+        pandas.Index: Claves como texto
+    """
+    keys = df[list(key_columns)].astype(str)
+    return pd.Index(keys.agg('|'.join, axis=1))
+
+
+class FeatureStore:
+    """
+    Almacén de filas de entrenamiento en modo solo-añadir.
+
+    Las filas se guardan en un CSV y un fichero de estado recuerda cuántas
+    (las primeras) ya se usaron para entrenar. Las posteriores forman el
+    bloque pendiente, que se mantiene ordenado por fecha aunque lleguen
+    partidos antiguos (p.ej. los de prueba de un entrenamiento completo):
+    sus partidos más recientes actúan como holdout rodante y el resto se
+    usa para ampliar el modelo.
+    """
+
+    def __init__(self, path, key_columns=KEY_COLUMNS, date_column='date'):
+        """
+        Inicializa el feature store.
+
+        Args:
+            path (str): Ruta del CSV del store
+            key_columns (tuple): Columnas que identifican un partido
+            date_column (str): Columna de fecha para ordenar las filas nuevas
+        """
+        self.path = Path(path)
+        self.state_path = self.path.with_suffix('.state.json')
+        self.key_columns = tuple(key_columns)
+        self.date_column = date_column
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _read_state(self):
+        if not self.state_path.exists():
+            return {'rows': 0, 'trained_rows': 0}
+        with open(self.state_path, 'r') as f:
+            return json.load(f)
+
+    def _write_state(self, state):
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_path.parent, prefix='.state_', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def __len__(self):
+        return self._read_state()['rows']
+
+    @property
+    def trained_rows(self):
+        return self._read_state()['trained_rows']
+
+    def keys(self):
+        """Claves de los partidos ya almacenados (solo se leen esas columnas)"""
+        if not self.path.exists():
+            return pd.Index([])
+        stored = pd.read_csv(self.path, usecols=list(self.key_columns), dtype=str)
+        return match_keys(stored, self.key_columns)
+
+    def _sorted(self, df):
+        if self.date_column in df.columns:
+            return df.sort_values(self.date_column, kind='stable',
+                                  key=lambda dates: pd.to_datetime(dates, format='mixed'))
+        return df
+
+    def _rewrite_pending(self, trained_rows, pending):
+        """Sustituye el bloque pendiente (filas desde `trained_rows`) sin tocar las entrenadas"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix='.store_', suffix='.csv')
+        try:
+            with os.fdopen(fd, 'wb') as out, open(self.path, 'rb') as source:
+                for _ in range(trained_rows + 1):  # cabecera + filas entrenadas
+                    out.write(source.readline())
+            pending.to_csv(tmp_path, mode='a', header=False, index=False)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def append(self, df):
+        """
+        Añade al store solo los partidos que no contiene.
+
+        Args:
+            df (pandas.DataFrame): Filas candidatas (pueden incluir ya almacenadas)
+
+        Returns:
+            pandas.DataFrame: Filas efectivamente añadidas
+        """
+        new_rows = df[~match_keys(df, self.key_columns).isin(self.keys())]
+        if new_rows.empty:
+            logger.info("Sin partidos nuevos para el feature store")
+            return new_rows
+
+        new_rows = self._sorted(new_rows)
+        state = self._read_state()
+        pending = self.load(start=state['trained_rows']) if state['rows'] > state['trained_rows'] else None
+
+        if pending is not None and not pending.empty and self.date_column in new_rows.columns and (
+                pd.to_datetime(new_rows[self.date_column], format='mixed').min()
+                < pd.to_datetime(pending[self.date_column], format='mixed').max()):
+            # Partidos anteriores a algún pendiente: el bloque pendiente se reordena por fecha
+            merged = self._sorted(pd.concat([pending, new_rows[pending.columns]], ignore_index=True))
+            self._rewrite_pending(state['trained_rows'], merged)
+        else:
+            write_header = not self.path.exists()
+            new_rows.to_csv(self.path, mode='a', header=write_header, index=False)
+
+        state['rows'] += len(new_rows)
+        self._write_state(state)
+
+        logger.info(f"{len(new_rows)} partidos nuevos añadidos al feature store ({state['rows']} en total)")
+        return new_rows
+
+    def reset(self, df, trained=True):
+        """
+        Reescribe el store con `df` (tras un entrenamiento completo).
+
+        Args:
+            df (pandas.DataFrame): Filas de entrenamiento
+            trained (bool): Marcar todas las filas como ya entrenadas
+        """
+        df = self._sorted(df)
+        df.to_csv(self.path, index=False)
+        self._write_state({'rows': len(df), 'trained_rows': len(df) if trained else 0})
+        logger.info(f"Feature store reiniciado con {len(df)} partidos")
+
+    def load(self, start=0, stop=None):
+        """
+        Lee un rango de filas [start, stop) sin cargar el resto del store.
+
+        Returns:
+            pandas.DataFrame: Filas leídas
+        """
+        if not self.path.exists():
+            return pd.DataFrame()
+        nrows = None if stop is None else max(stop - start, 0)
+        return pd.read_csv(self.path, skiprows=range(1, start + 1), nrows=nrows)
+
+    def pending(self, holdout_size=DEFAULT_HOLDOUT_SIZE):
+        """
+        Divide las filas pendientes en entrenamiento y holdout rodante.
+
+        El holdout son los `holdout_size` partidos pendientes más recientes
+        (el bloque pendiente está ordenado por fecha); nunca incluye filas ya
+        entrenadas. No se entrenan hasta una ejecución posterior, cuando
+        partidos más nuevos ocupen su lugar.
+
+        Returns:
+            tuple: (filas para ampliar el modelo, filas de holdout, número de
+                filas entrenadas tras aplicar la actualización)
+        """
+        state = self._read_state()
+        trained_rows = state['trained_rows']
+        holdout_first = max(state['rows'] - holdout_size, trained_rows)
+
+        # Una sola lectura desde la primera fila pendiente
+        window = self.load(start=trained_rows)
+
+        train = window.iloc[:holdout_first - trained_rows]
+        holdout = window.iloc[holdout_first - trained_rows:]
+        return train, holdout, holdout_first
+
+    def mark_trained(self, rows):
+        """Marca como entrenadas las primeras `rows` filas del store"""
+        state = self._read_state()
+        state['trained_rows'] = min(max(rows, state['trained_rows']), state['rows'])
+        self._write_state(state)
+
+
+@contextmanager
+def _frozen_bins(estimator):
+    """
+    Mantiene los bins del primer entrenamiento de un HistGradientBoosting.
+
+    Con warm_start el estimador vuelve a calcular los bins sobre los datos
+    nuevos, pero los árboles existentes guardan umbrales en índices de bin:
+    con un lote distinto sus predicciones durante el fit serían incorrectas.
+    Mientras dura el contexto los datos se discretizan con el mapper original.
+
+    scikit-learn no ofrece una forma pública de fijar los bins, así que se
+    sustituye el método privado `_bin_data`; solo se hace en las versiones
+    de FROZEN_BINS_SKLEARN_VERSIONS y si los atributos siguen existiendo.
+
+    Raises:
+        RuntimeError: Si la versión de scikit-learn no está comprobada
+    """
+    version = '.'.join(sklearn.__version__.split('.')[:2])
+    if (version not in FROZEN_BINS_SKLEARN_VERSIONS or not hasattr(estimator, '_bin_mapper')
+            or not callable(getattr(type(estimator), '_bin_data', None))):
+        raise RuntimeError(
+            f"La ampliación incremental de {type(estimator).__name__} no está comprobada con "
+            f"scikit-learn {sklearn.__version__} (soportadas: {', '.join(FROZEN_BINS_SKLEARN_VERSIONS)}); "
+            f"usar un reentrenamiento completo"
+        )
+    bin_mapper = estimator._bin_mapper
+
+    def _bin_data(X, is_training_data):
+        estimator._bin_mapper = bin_mapper
+        X_binned = bin_mapper.transform(X)
+        return X_binned if is_training_data else np.ascontiguousarray(X_binned)
+
+    estimator._bin_data = _bin_data
+    try:
+        yield estimator
+    finally:
+        # Atributo de instancia: se elimina para que el modelo siga siendo serializable
+        del estimator._bin_data
+
+
+def extend_boosting(model, X, y, extra_estimators=DEFAULT_EXTRA_ESTIMATORS):
+    """
+    Añade árboles a un modelo de boosting ya entrenado usando datos recientes.
+
+    Trabaja sobre una copia (el modelo actual sigue sirviendo hasta que la
+    copia pase la evaluación de control). Con un Pipeline se reutiliza el
+    preprocesador ya ajustado y solo se amplía el estimador final.
+
+    Args:
+        model: GradientBoosting*, HistGradientBoosting* o Pipeline entrenado
+        X (array-like): Características de los partidos nuevos
+        y (array-like): Objetivo de los partidos nuevos
+        extra_estimators (int): Árboles (iteraciones) a añadir
+
+    Returns:
+        estimator: Copia ampliada del modelo
+    """
+    candidate = copy.deepcopy(model)
+
+    if hasattr(candidate, 'steps'):
+        X = candidate[:-1].transform(X)
+        estimator = candidate.steps[-1][1]
+    else:
+        estimator = candidate
+
+    # El boosting recodifica las clases en cada fit: si falta alguna en el
+    # lote nuevo los árboles existentes quedarían desalineados
+    if hasattr(estimator, 'classes_'):
+        batch_classes = np.unique(y)
+        if not np.array_equal(batch_classes, estimator.classes_):
+            raise ValueError(
+                f"El lote incremental contiene las clases {list(batch_classes)}; "
+                f"se necesitan {list(estimator.classes_)}"
+            )
+
+    if hasattr(estimator, 'n_iter_'):
+        estimator.set_params(warm_start=True, max_iter=estimator.n_iter_ + extra_estimators)
+        with _frozen_bins(estimator):
+            estimator.fit(X, y)
+    elif hasattr(estimator, 'n_estimators_'):
+        estimator.set_params(warm_start=True, n_estimators=estimator.n_estimators_ + extra_estimators)
+        estimator.fit(X, y)
+    else:
+        raise ValueError(f"El estimador {type(estimator).__name__} no admite warm start")
+
+    # Un fit posterior debe volver a ser un entrenamiento completo
+    estimator.set_params(warm_start=False)
+
+    return candidate
+
+
+def holdout_score(model, X, y):
+    """Pérdida del modelo en el holdout (log-loss o MSE; menor es mejor)"""
+    if hasattr(model, 'predict_proba'):
+        return float(log_loss(y, model.predict_proba(X), labels=model.classes_))
+    return float(mean_squared_error(y, model.predict(X)))
+
+
+def guard_evaluation(current, candidate, X_holdout, y_holdout, tolerance=0.0):
+    """
+    Compara el modelo actual y el candidato en el holdout rodante.
+
+    Args:
+        current: Modelo en producción
+        candidate: Modelo ampliado
+        X_holdout (array-like): Características del holdout
+        y_holdout (array-like): Objetivo del holdout
+        tolerance (float): Empeoramiento de la pérdida admitido
+
+    Returns:
+        dict: Pérdidas de ambos modelos y si el candidato puede promoverse
+    """
+    if len(y_holdout) == 0:
+        logger.warning("Holdout vacío: no se puede validar el candidato")
+        return {'current': None, 'candidate': None, 'passed': False}
+
+    current_loss = holdout_score(current, X_holdout, y_holdout)
+    candidate_loss = holdout_score(candidate, X_holdout, y_holdout)
+
+    return {
+        'current': current_loss,
+        'candidate': candidate_loss,
+        'passed': candidate_loss <= current_loss + tolerance
+    }
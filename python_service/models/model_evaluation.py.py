@@ -1,14 +1,23 @@
 # models/model_evaluation.py
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import confusion_matrix, classification_report, roc_curve, auc, precision_recall_curve
+from sklearn.metrics import confusion_matrix, classification_report
 from datetime import datetime
 import json
 import os
+import sys
 import logging
 
+# Añadir directorio padre al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.evaluation_store import DEFAULT_DB_NAME, EvaluationStore
+from models.report_rendering import (
+    get_renderer, load_or_compute_curves, render_confidence_distribution, render_heatmap,
+    render_precision_recall_curves, render_roc_curves
+)
+from models.thresholds import threshold_curve
+
 # Configuración del sistema de logs
 logging.basicConfig(
     level=logging.INFO,
@@ -17,27 +26,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger('model_evaluation')
 
+# Cuotas medias típicas: victoria local 2.0, empate 3.2, victoria visitante 3.8
+AVG_ODDS = [2.0, 3.2, 3.8]
+
+# Umbrales de confianza barridos por betting_threshold_curve
+BETTING_THRESHOLDS = np.round(np.arange(0.35, 0.951, 0.05), 2)
+
 class ModelEvaluator:
     """
     Clase para evaluar y monitorear el rendimiento de modelos de predicción de fútbol.
     """
     
-    def __init__(self, model_name, save_dir='evaluations'):
+    def __init__(self, model_name, save_dir='evaluations', store=None, export_json=False):
         """
         Inicializa el evaluador de modelos.
         
         Args:
             model_name (str): Nombre del modelo a evaluar
             save_dir (str): Directorio donde guardar los resultados de la evaluación
+            store (EvaluationStore, optional): Almacén de evaluaciones (por
+                defecto, evaluations.db dentro de save_dir)
+            export_json (bool): Guardar además cada evaluación como fichero JSON
         """
         self.model_name = model_name
         self.save_dir = save_dir
+        self.export_json = export_json
         self.evaluation_history = []
         
         # Crear directorio si no existe
         if not os.path.exists(save_dir):
             os.makedirs(save_dir)
             logger.info(f"Directorio de evaluación creado: {save_dir}")
+
+        self.store = store or EvaluationStore(os.path.join(save_dir, DEFAULT_DB_NAME))
+
+        # Primera vez con almacén: traer las evaluaciones JSON existentes
+        if self.store.count() == 0:
+            self.store.import_json_dir(save_dir)
     
     def evaluate_predictions(self, y_true, y_pred, y_prob, class_names=None):
         """
@@ -67,27 +92,15 @@ class ModelEvaluator:
         # Generar matriz de confusión normalizada
         cm_norm = cm.astype('float') / cm.sum(axis=1)[:, np.newaxis]
         
-        # Calcular ROC y AUC para cada clase (one-vs-rest)
+        # Curvas ROC y precisión-recall (one-vs-rest), cacheadas para los gráficos
         n_classes = len(class_names)
-        fpr = dict()
-        tpr = dict()
-        roc_auc = dict()
-        
-        for i in range(n_classes):
-            fpr[i], tpr[i], _ = roc_curve((y_true == i).astype(int), y_prob[:, i])
-            roc_auc[i] = auc(fpr[i], tpr[i])
-        
-        # Calcular precisión-recall para cada clase
-        precision = dict()
-        recall = dict()
-        pr_auc = dict()
-        
-        for i in range(n_classes):
-            precision[i], recall[i], _ = precision_recall_curve((y_true == i).astype(int), y_prob[:, i])
-            pr_auc[i] = auc(recall[i], precision[i])
+        curves = self._curves(y_true, y_prob, n_classes)
+        roc_auc = [area for _, _, area in curves['roc']]
+        pr_auc = [area for _, _, area in curves['pr']]
         
         # Calcular métricas específicas para apuestas
         bet_precision = self.calculate_betting_metrics(y_true, y_pred, y_prob)
+        betting_curve = self.betting_threshold_curve(y_true, y_prob)
         
         # Crear estructura de evaluación
         evaluation = {
@@ -111,7 +124,8 @@ class ModelEvaluator:
                 'confusion_matrix': cm.tolist(),
                 'confusion_matrix_normalized': cm_norm.tolist(),
             },
-            'betting_metrics': bet_precision
+            'betting_metrics': bet_precision,
+            'betting_curve': betting_curve.to_dict(orient='records')
         }
         
         # Guardar la evaluación en el historial
@@ -123,7 +137,28 @@ class ModelEvaluator:
         logger.info(f"Evaluación completada para modelo {self.model_name}")
         return evaluation
     
-    def calculate_betting_metrics(self, y_true, y_pred, y_prob, threshold=0.6):
+    def _betting_arrays(self, y_true, y_prob, odds=None):
+        """
+        Arrays comunes a las métricas de apuestas, calculados una sola vez.
+
+        Returns:
+            tuple: (confianza, clase elegida, acierto, cuota de la clase elegida)
+        """
+        y_true = np.asarray(y_true)
+        y_prob = np.asarray(y_prob, dtype=np.float64)
+        rows = np.arange(len(y_prob))
+
+        pred_class = np.argmax(y_prob, axis=1)
+        max_prob = y_prob[rows, pred_class]
+        correct = pred_class == y_true
+
+        # Cuotas fijas por clase o una fila de cuotas por partido
+        odds = np.asarray(AVG_ODDS if odds is None else odds, dtype=np.float64)
+        pick_odds = odds[pred_class] if odds.ndim == 1 else odds[rows, pred_class]
+
+        return max_prob, pred_class, correct, pick_odds
+
+    def calculate_betting_metrics(self, y_true, y_pred, y_prob, threshold=0.6, odds=None):
         """
         Calcula métricas específicas para apuestas deportivas.
         
@@ -132,65 +167,48 @@ class ModelEvaluator:
             y_pred (array-like): Valores predichos
             y_prob (array-like): Probabilidades de predicción
             threshold (float): Umbral de confianza para considerar una apuesta
+            odds (array-like, optional): Cuotas por clase (n_clases) o por
+                partido (n_muestras, n_clases); por defecto, AVG_ODDS
             
         Returns:
             dict: Métricas de apuestas
         """
+        y_true = np.asarray(y_true)
+        y_pred = np.asarray(y_pred)
+        n_classes = np.shape(y_prob)[1]
+        max_prob, pred_class, correct, pick_odds = self._betting_arrays(y_true, y_prob, odds)
+
         # Identificar predicciones con alta confianza (por encima del umbral)
-        high_conf_indices = np.max(y_prob, axis=1) >= threshold
+        high_conf = max_prob >= threshold
+        high_conf_count = int(high_conf.sum())
         
         # Calcular precisión en predicciones de alta confianza
-        if np.sum(high_conf_indices) > 0:
-            high_conf_accuracy = np.mean(y_pred[high_conf_indices] == y_true[high_conf_indices])
-            high_conf_count = np.sum(high_conf_indices)
+        if high_conf_count > 0:
+            high_conf_accuracy = np.mean(y_pred[high_conf] == y_true[high_conf])
             high_conf_pct = high_conf_count / len(y_true)
         else:
             high_conf_accuracy = 0
-            high_conf_count = 0
             high_conf_pct = 0
         
-        # Identificar predicciones para cada clase con alta confianza
-        class_high_conf_metrics = {}
-        for i in range(y_prob.shape[1]):
-            class_indices = (np.argmax(y_prob, axis=1) == i) & (np.max(y_prob, axis=1) >= threshold)
-            if np.sum(class_indices) > 0:
-                class_accuracy = np.mean(y_true[class_indices] == i)
-                class_count = np.sum(class_indices)
-            else:
-                class_accuracy = 0
-                class_count = 0
-                
-            class_high_conf_metrics[i] = {
-                'accuracy': float(class_accuracy),
-                'count': int(class_count)
-            }
-        
-        # Simulación de ROI en apuestas (simplificado, asumiendo cuotas promedio)
-        # Cuotas medias típicas: victoria local 2.0, empate 3.2, victoria visitante 3.8
-        avg_odds = [2.0, 3.2, 3.8]
-        roi = 0
-        total_bets = 0
-        
-        for i in range(len(y_true)):
-            if np.max(y_prob[i]) >= threshold:
-                pred_class = np.argmax(y_prob[i])
-                total_bets += 1
-                
-                # Si acertamos, ganamos según la cuota
-                if pred_class == y_true[i]:
-                    roi += avg_odds[pred_class] - 1  # Ganancia neta
-                else:
-                    roi -= 1  # Pérdida de la apuesta
-        
-        # Calcular ROI como porcentaje
-        if total_bets > 0:
-            roi_pct = (roi / total_bets) * 100
-        else:
-            roi_pct = 0
+        # Conteos y aciertos por clase predicha con alta confianza
+        class_counts = np.bincount(pred_class[high_conf], minlength=n_classes)
+        class_hits = np.bincount(pred_class[high_conf], weights=correct[high_conf], minlength=n_classes)
+        class_accuracy = np.divide(class_hits, class_counts, out=np.zeros(n_classes), where=class_counts > 0)
+
+        class_high_conf_metrics = {
+            i: {
+                'accuracy': float(class_accuracy[i]),
+                'count': int(class_counts[i])
+            } for i in range(n_classes)
+        }
+        
+        # Simulación de ROI: apuesta unitaria a la clase más probable
+        profit = np.where(correct, pick_odds - 1, -1.0)[high_conf].sum()
+        roi_pct = (profit / high_conf_count) * 100 if high_conf_count > 0 else 0
             
         betting_metrics = {
             'high_confidence_accuracy': float(high_conf_accuracy),
-            'high_confidence_predictions': int(high_conf_count),
+            'high_confidence_predictions': high_conf_count,
             'high_confidence_percentage': float(high_conf_pct),
             'class_high_confidence': class_high_conf_metrics,
             'simulated_roi_percent': float(roi_pct),
@@ -198,20 +216,44 @@ class ModelEvaluator:
         }
         
         return betting_metrics
-    
-    def plot_confusion_matrix(self, evaluation, figsize=(10, 8), normalize=True, save=True):
+
+    def betting_threshold_curve(self, y_true, y_prob, thresholds=BETTING_THRESHOLDS, odds=None):
         """
-        Genera y guarda un gráfico de matriz de confusión.
-        
+        Curva umbral de confianza -> apuestas, acierto y ROI en una sola pasada.
+
+        Las confianzas se ordenan una vez y cada umbral se resuelve con sumas
+        acumuladas (models.thresholds.threshold_curve), así que barrer muchos
+        umbrales cuesta prácticamente lo mismo que evaluar uno.
+
         Args:
-            evaluation (dict): Resultado de evaluación
-            figsize (tuple): Tamaño de la figura
-            normalize (bool): Si se debe normalizar la matriz
-            save (bool): Si se debe guardar la figura
-            
+            y_true (array-like): Valores reales
+            y_prob (array-like): Probabilidades de predicción
+            thresholds (array-like): Umbrales de confianza a evaluar
+            odds (array-like, optional): Cuotas por clase o por partido
+
         Returns:
-            matplotlib.figure.Figure: Figura generada
+            pandas.DataFrame: Una fila por umbral con apuestas, porcentaje
+                apostado, acierto, beneficio y ROI (%)
         """
+        max_prob, _, correct, pick_odds = self._betting_arrays(y_true, y_prob, odds)
+        curve = threshold_curve(max_prob, correct, thresholds, odds=pick_odds)
+
+        n_samples = max(len(max_prob), 1)
+        return pd.DataFrame({
+            'threshold': curve['thresholds'],
+            'bets': curve['n_pred'],
+            'bet_percentage': curve['n_pred'] / n_samples,
+            'accuracy': curve['precision'],
+            'profit': curve['profit'],
+            'roi_percent': curve['roi'] * 100
+        })
+    
+    def _curves(self, y_true, y_prob, n_classes):
+        """Curvas ROC/PR de unas predicciones (cacheadas en save_dir/curves)"""
+        return load_or_compute_curves(os.path.join(self.save_dir, 'curves'), y_true, y_prob, n_classes)
+
+    def _confusion_matrix_args(self, evaluation, normalize):
+        """Matriz, etiquetas, título y formato de la matriz de confusión"""
         if normalize:
             cm = np.array(evaluation['metrics']['confusion_matrix_normalized'])
             title = f"Matriz de Confusión Normalizada - {self.model_name}"
@@ -222,21 +264,35 @@ class ModelEvaluator:
             fmt = 'd'
         
         class_names = list(evaluation['metrics']['class_metrics'].keys())
+        return cm, class_names, title, fmt
+
+    def _figure_path(self, kind, timestamp=None):
+        """Ruta de una figura del modelo"""
+        timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"{self.save_dir}/{self.model_name}_{kind}_{timestamp}.png"
+
+    def plot_confusion_matrix(self, evaluation, figsize=(10, 8), normalize=True, save=True):
+        """
+        Genera y guarda un gráfico de matriz de confusión.
         
-        plt.figure(figsize=figsize)
-        sns.heatmap(cm, annot=True, fmt=fmt, cmap='Blues', 
-                    xticklabels=class_names, 
-                    yticklabels=class_names)
-        plt.title(title)
-        plt.ylabel('Resultado Real')
-        plt.xlabel('Predicción')
+        Args:
+            evaluation (dict): Resultado de evaluación
+            figsize (tuple): Tamaño de la figura
+            normalize (bool): Si se debe normalizar la matriz
+            save (bool): Si se debe guardar la figura
+            
+        Returns:
+            matplotlib.figure.Figure: Figura generada
+        """
+        cm, class_names, title, fmt = self._confusion_matrix_args(evaluation, normalize)
+        timestamp = evaluation['timestamp'].replace(' ', '_').replace(':', '-')
+        path = self._figure_path('cm', timestamp) if save else None
         
+        fig = render_heatmap(cm, class_names, title, path, fmt=fmt, figsize=figsize)
         if save:
-            timestamp = evaluation['timestamp'].replace(' ', '_').replace(':', '-')
-            plt.savefig(f"{self.save_dir}/{self.model_name}_cm_{timestamp}.png", bbox_inches='tight', dpi=300)
-            logger.info(f"Matriz de confusión guardada: {self.save_dir}/{self.model_name}_cm_{timestamp}.png")
+            logger.info(f"Matriz de confusión guardada: {path}")
         
-        return plt.gcf()
+        return fig
     
     def plot_roc_curves(self, y_true, y_prob, class_names=None, figsize=(10, 8), save=True):
         """
@@ -255,32 +311,14 @@ class ModelEvaluator:
         if class_names is None:
             class_names = ['Victoria Local', 'Empate', 'Victoria Visitante']
         
-        y_true = np.array(y_true)
-        y_prob = np.array(y_prob)
-        n_classes = len(class_names)
-        
-        # Calcular ROC para cada clase
-        plt.figure(figsize=figsize)
-        
-        for i in range(n_classes):
-            fpr, tpr, _ = roc_curve((y_true == i).astype(int), y_prob[:, i])
-            roc_auc = auc(fpr, tpr)
-            plt.plot(fpr, tpr, lw=2, label=f'{class_names[i]} (AUC = {roc_auc:.2f})')
-        
-        plt.plot([0, 1], [0, 1], 'k--', lw=2)
-        plt.xlim([0.0, 1.0])
-        plt.ylim([0.0, 1.05])
-        plt.xlabel('Tasa de Falsos Positivos')
-        plt.ylabel('Tasa de Verdaderos Positivos')
-        plt.title(f'Curvas ROC - {self.model_name}')
-        plt.legend(loc="lower right")
+        curves = self._curves(y_true, y_prob, len(class_names))
+        path = self._figure_path('roc') if save else None
         
+        fig = render_roc_curves(curves, class_names, f'Curvas ROC - {self.model_name}', path, figsize=figsize)
         if save:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            plt.savefig(f"{self.save_dir}/{self.model_name}_roc_{timestamp}.png", bbox_inches='tight', dpi=300)
-            logger.info(f"Curvas ROC guardadas: {self.save_dir}/{self.model_name}_roc_{timestamp}.png")
+            logger.info(f"Curvas ROC guardadas: {path}")
         
-        return plt.gcf()
+        return fig
     
     def plot_precision_recall_curves(self, y_true, y_prob, class_names=None, figsize=(10, 8), save=True):
         """
@@ -299,31 +337,16 @@ class ModelEvaluator:
         if class_names is None:
             class_names = ['Victoria Local', 'Empate', 'Victoria Visitante']
         
-        y_true = np.array(y_true)
-        y_prob = np.array(y_prob)
-        n_classes = len(class_names)
-        
-        # Calcular curvas de precisión-recall para cada clase
-        plt.figure(figsize=figsize)
-        
-        for i in range(n_classes):
-            precision, recall, _ = precision_recall_curve((y_true == i).astype(int), y_prob[:, i])
-            pr_auc = auc(recall, precision)
-            plt.plot(recall, precision, lw=2, label=f'{class_names[i]} (AUC = {pr_auc:.2f})')
-        
-        plt.xlim([0.0, 1.0])
-        plt.ylim([0.0, 1.05])
-        plt.xlabel('Recall')
-        plt.ylabel('Precisión')
-        plt.title(f'Curvas Precisión-Recall - {self.model_name}')
-        plt.legend(loc="lower left")
+        curves = self._curves(y_true, y_prob, len(class_names))
+        path = self._figure_path('pr') if save else None
         
+        fig = render_precision_recall_curves(
+            curves, class_names, f'Curvas Precisión-Recall - {self.model_name}', path, figsize=figsize
+        )
         if save:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            plt.savefig(f"{self.save_dir}/{self.model_name}_pr_{timestamp}.png", bbox_inches='tight', dpi=300)
-            logger.info(f"Curvas Precisión-Recall guardadas: {self.save_dir}/{self.model_name}_pr_{timestamp}.png")
+            logger.info(f"Curvas Precisión-Recall guardadas: {path}")
         
-        return plt.gcf()
+        return fig
     
     def plot_confidence_distribution(self, y_prob, bins=20, figsize=(10, 6), save=True):
         """
@@ -339,39 +362,71 @@ class ModelEvaluator:
             matplotlib.figure.Figure: Figura generada
         """
         max_probs = np.max(y_prob, axis=1)
+        path = self._figure_path('confidence') if save else None
         
-        plt.figure(figsize=figsize)
-        plt.hist(max_probs, bins=bins, color='skyblue', edgecolor='black', alpha=0.7)
-        plt.axvline(x=0.6, color='red', linestyle='--', label='Umbral de confianza (0.6)')
-        plt.axvline(x=0.8, color='green', linestyle='--', label='Umbral de alta confianza (0.8)')
+        fig = render_confidence_distribution(
+            max_probs, f'Distribución de Confianza en Predicciones - {self.model_name}', path,
+            bins=bins, figsize=figsize
+        )
+        if save:
+            logger.info(f"Distribución de confianza guardada: {path}")
+        
+        return fig
+
+    def render_report(self, evaluation, y_true, y_prob, class_names=None, renderer=None):
+        """
+        Renderiza todas las figuras de una evaluación en segundo plano.
         
-        plt.xlabel('Probabilidad máxima (confianza)')
-        plt.ylabel('Número de predicciones')
-        plt.title(f'Distribución de Confianza en Predicciones - {self.model_name}')
-        plt.legend()
-        plt.grid(alpha=0.3)
+        Las curvas salen de la caché (calculadas en evaluate_predictions) y cada
+        figura se dibuja en un proceso del pool, así que la llamada no bloquea.
         
-        if save:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            plt.savefig(f"{self.save_dir}/{self.model_name}_confidence_{timestamp}.png", bbox_inches='tight', dpi=300)
-            logger.info(f"Distribución de confianza guardada: {self.save_dir}/{self.model_name}_confidence_{timestamp}.png")
+        Args:
+            evaluation (dict): Resultado de evaluación
+            y_true (array-like): Valores reales
+            y_prob (array-like): Probabilidades de predicción
+            class_names (list): Nombres de las clases
+            renderer (ReportRenderer, optional): Pool de renderizado (por defecto, el compartido)
+            
+        Returns:
+            list: Futures con la ruta de cada figura
+        """
+        if class_names is None:
+            class_names = list(evaluation['metrics']['class_metrics'].keys())
+        renderer = renderer or get_renderer()
+        
+        cm, labels, title, fmt = self._confusion_matrix_args(evaluation, normalize=True)
+        curves = self._curves(y_true, y_prob, len(class_names))
+        timestamp = evaluation['timestamp'].replace(' ', '_').replace(':', '-')
         
-        return plt.gcf()
+        return [
+            renderer.submit(render_heatmap, cm, labels, title, self._figure_path('cm', timestamp), fmt=fmt),
+            renderer.submit(render_roc_curves, curves, class_names, f'Curvas ROC - {self.model_name}',
+                            self._figure_path('roc', timestamp)),
+            renderer.submit(render_precision_recall_curves, curves, class_names,
+                            f'Curvas Precisión-Recall - {self.model_name}', self._figure_path('pr', timestamp)),
+            renderer.submit(render_confidence_distribution, np.max(y_prob, axis=1),
+                            f'Distribución de Confianza en Predicciones - {self.model_name}',
+                            self._figure_path('confidence', timestamp))
+        ]
     
     def _save_evaluation(self, evaluation):
         """
-        Guarda la evaluación en disco.
+        Guarda la evaluación en el almacén (y en JSON si export_json).
         
         Args:
             evaluation (dict): Evaluación a guardar
         """
-        timestamp = evaluation['timestamp'].replace(' ', '_').replace(':', '-')
-        filename = f"{self.save_dir}/{self.model_name}_evaluation_{timestamp}.json"
-        
-        with open(filename, 'w') as f:
-            json.dump(evaluation, f, indent=4)
+        evaluation_id = self.store.add(evaluation)
+        logger.info(f"Evaluación {evaluation_id} guardada en {self.store.db_path}")
+
+        if self.export_json:
+            timestamp = evaluation['timestamp'].replace(' ', '_').replace(':', '-')
+            filename = f"{self.save_dir}/{self.model_name}_evaluation_{timestamp}.json"
             
-        logger.info(f"Evaluación guardada en {filename}")
+            with open(filename, 'w') as f:
+                json.dump(evaluation, f, indent=4)
+                
+            logger.info(f"Evaluación guardada en {filename}")
     
     def load_evaluation(self, filename):
         """
@@ -404,38 +459,21 @@ class ModelEvaluator:
         Returns:
             pandas.DataFrame: DataFrame con la comparación
         """
-        results = []
+        return self.store.compare(model_names, metric)
+
+    def metric_history(self, metric='accuracy', model_name=None, since=None):
+        """
+        Evolución de una métrica en las evaluaciones guardadas.
         
-        for model_name in model_names:
-            # Buscar la última evaluación del modelo
-            files = [f for f in os.listdir(self.save_dir) if f.startswith(f"{model_name}_evaluation_")]
-            
-            if not files:
-                logger.warning(f"No se encontraron evaluaciones para el modelo {model_name}")
-                continue
-                
-            # Ordenar por fecha (más reciente primero)
-            latest_file = sorted(files)[-1]
-            evaluation = self.load_evaluation(os.path.join(self.save_dir, latest_file))
-            
-            if metric in evaluation['metrics']:
-                value = evaluation['metrics'][metric]
-            elif metric == 'roi':
-                value = evaluation['betting_metrics']['simulated_roi_percent']
-            elif metric == 'high_confidence_accuracy':
-                value = evaluation['betting_metrics']['high_confidence_accuracy']
-            else:
-                logger.warning(f"Métrica {metric} no encontrada para el modelo {model_name}")
-                value = None
-                
-            results.append({
-                'model': model_name,
-                'metric': metric,
-                'value': value,
-                'timestamp': evaluation['timestamp']
-            })
+        Args:
+            metric (str): Métrica a consultar
+            model_name (str, optional): Modelo (por defecto, el del evaluador)
+            since (str, optional): Fecha mínima ('YYYY-MM-DD')
             
-        return pd.DataFrame(results)
+        Returns:
+            pandas.DataFrame: Columnas model, timestamp y value
+        """
+        return self.store.history(model_name or self.model_name, metric, since=since)
     
     def generate_report(self, evaluation):
         """
@@ -512,12 +550,13 @@ if __name__ == '__main__':
     # Evaluar predicciones
     evaluation = evaluator.evaluate_predictions(y_true, y_pred, y_prob, class_names)
     
-    # Generar gráficos
-    evaluator.plot_confusion_matrix(evaluation)
-    evaluator.plot_roc_curves(y_true, y_prob, class_names)
-    evaluator.plot_precision_recall_curves(y_true, y_prob, class_names)
-    evaluator.plot_confidence_distribution(y_prob)
+    # Generar gráficos (en segundo plano)
+    figures = evaluator.render_report(evaluation, y_true, y_prob, class_names)
     
     # Generar informe
     report = evaluator.generate_report(evaluation)
     print(report)
+    
+    # Esperar a que terminen los gráficos
+    for figure in figures:
+        figure.result()
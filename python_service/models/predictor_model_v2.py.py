@@ -2,15 +2,20 @@
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
-import joblib
 import logging
+import os
+import sys
 from datetime import datetime
 
+# Añadir directorio del servicio al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.artifacts import load_artifact, save_artifact
+from models.estimators import (
+    DEFAULT_BACKEND, build_pipeline, get_feature_importances, translate_param_grid, validate_backend
+)
+
 # Configuración del sistema de logs
 logging.basicConfig(
     level=logging.INFO,
@@ -19,22 +24,172 @@ logging.basicConfig(
 )
 logger = logging.getLogger('predictor_model_v2')
 
+class PremiumFeatureTransformer:
+    """
+    Transformador ajustado para el preprocesamiento de PredictorFutbolPremium.
+    
+    Las medianas de imputación se aprenden una sola vez en `fit` (datos de
+    entrenamiento) y se guardan con el modelo. `transform` no modifica el
+    estado: las listas de columnas se precalculan en el constructor y las
+    características derivadas se calculan directamente sobre arrays de NumPy.
+    """
+    
+    # (nombre, minuendo, sustraendo) para las diferencias simples
+    DIFFERENCE_FEATURES = (
+        ('form_difference', 'local_form_points_last5', 'away_form_points_last5'),
+        ('expected_goals_diff', 'local_expected_goals_avg', 'away_expected_goals_avg'),
+        ('expected_goals_against_diff', 'away_expected_goals_against_avg', 'local_expected_goals_against_avg'),
+        ('fatigue_diff', 'away_days_since_last_match', 'local_days_since_last_match'),
+        ('key_players_diff', 'away_key_players_missing', 'local_key_players_missing'),
+    )
+    
+    DERIVED_FEATURES = (
+        'form_difference', 'goal_diff_last5', 'h2h_win_ratio_local',
+        'expected_goals_diff', 'expected_goals_against_diff',
+        'fatigue_diff', 'key_players_diff'
+    )
+    
+    def __init__(self, categorical_features, numerical_features, medians=None):
+        """
+        Inicializa el transformador.
+        
+        Args:
+            categorical_features (list): Columnas categóricas de entrada
+            numerical_features (list): Columnas numéricas de entrada (sin derivadas)
+            medians (array-like, optional): Medianas ya ajustadas. Default: None
+        """
+        self.categorical_features = list(categorical_features)
+        # Los artefactos antiguos guardaban la lista con derivadas duplicadas
+        self.numerical_features = list(dict.fromkeys(
+            f for f in numerical_features if f not in self.DERIVED_FEATURES
+        ))
+        self.medians_ = None if medians is None else np.asarray(medians, dtype=np.float64)
+        
+        # Estructuras precalculadas: transform() no construye listas por llamada
+        self._required_columns = frozenset(self.categorical_features + self.numerical_features)
+        self._numeric_output_features = self.numerical_features + list(self.DERIVED_FEATURES)
+        self._n_numeric = len(self.numerical_features)
+        position = {name: i for i, name in enumerate(self.numerical_features)}
+        self._difference_idx = tuple(
+            (self._n_numeric + self.DERIVED_FEATURES.index(name), position[left], position[right])
+            for name, left, right in self.DIFFERENCE_FEATURES
+        )
+        self._goal_idx = tuple(position[c] for c in (
+            'local_goals_scored_last5', 'local_goals_conceded_last5',
+            'away_goals_scored_last5', 'away_goals_conceded_last5'
+        ))
+        self._h2h_idx = tuple(position[c] for c in ('h2h_local_wins', 'h2h_away_wins', 'h2h_draws'))
+    
+    @property
+    def numeric_output_features(self):
+        """Columnas numéricas de salida (originales + derivadas)"""
+        return self._numeric_output_features
+    
+    @property
+    def output_features(self):
+        """Todas las columnas de salida en orden"""
+        return self._numeric_output_features + self.categorical_features
+    
+    def _check_columns(self, X):
+        if not self._required_columns.issubset(X.columns):
+            missing_cols = self._required_columns.difference(X.columns)
+            logger.error(f"Faltan columnas en los datos: {missing_cols}")
+            raise ValueError(f"Faltan columnas en los datos: {missing_cols}")
+    
+    def fit(self, X):
+        """
+        Aprende las medianas de imputación de las columnas numéricas.
+        
+        Args:
+            X (pandas.DataFrame): Datos de entrenamiento
+            
+        Returns:
+            PremiumFeatureTransformer: El propio transformador
+        """
+        self._check_columns(X)
+        values = X[self.numerical_features].to_numpy(dtype=np.float64)
+        
+        # Columnas totalmente vacías: mediana 0 en lugar de NaN
+        all_missing = np.isnan(values).all(axis=0)
+        if all_missing.any():
+            values = values.copy()
+            values[:, all_missing] = 0.0
+        self.medians_ = np.nanmedian(values, axis=0)
+        
+        return self
+    
+    def transform(self, X):
+        """
+        Imputa valores nulos y añade las características derivadas.
+        
+        Args:
+            X (pandas.DataFrame): Datos a transformar
+            
+        Returns:
+            pandas.DataFrame: Datos preprocesados
+        """
+        if self.medians_ is None:
+            logger.error("El preprocesador no ha sido ajustado")
+            raise ValueError("El preprocesador no ha sido ajustado")
+        
+        self._check_columns(X)
+        
+        # Bloque numérico único: originales + derivadas
+        n_rows = len(X)
+        block = np.empty((n_rows, len(self._numeric_output_features)), dtype=np.float64)
+        numeric = block[:, :self._n_numeric]
+        numeric[...] = X[self.numerical_features].to_numpy(dtype=np.float64)
+        
+        missing = np.isnan(numeric)
+        if missing.any():
+            np.copyto(numeric, self.medians_, where=missing)
+        
+        # Características derivadas calculadas en su posición del bloque
+        for out_idx, left_idx, right_idx in self._difference_idx:
+            np.subtract(numeric[:, left_idx], numeric[:, right_idx], out=block[:, out_idx])
+        
+        goal_diff = block[:, self._n_numeric + 1]
+        ls, lc, as_, ac = self._goal_idx
+        np.subtract(numeric[:, ls], numeric[:, lc], out=goal_diff)
+        goal_diff -= numeric[:, as_]
+        goal_diff += numeric[:, ac]
+        
+        h2h_ratio = block[:, self._n_numeric + 2]
+        wins, away_wins, draws = self._h2h_idx
+        np.add(numeric[:, wins], numeric[:, away_wins], out=h2h_ratio)
+        h2h_ratio += numeric[:, draws]
+        h2h_ratio[h2h_ratio == 0] = 1.0
+        np.divide(numeric[:, wins], h2h_ratio, out=h2h_ratio)
+        
+        X_processed = pd.DataFrame(block, columns=self._numeric_output_features, index=X.index, copy=False)
+        X_processed[self.categorical_features] = X[self.categorical_features].fillna('Unknown')
+        
+        return X_processed
+    
+    def fit_transform(self, X):
+        """Ajusta el transformador y transforma los mismos datos"""
+        return self.fit(X).transform(X)
+
+
 class PredictorFutbolPremium:
     """
     Modelo de predicción de resultados de fútbol con características premium.
     Versión 2.0: Incorpora nuevas características y modelos de ensemble mejorados.
     """
     
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, backend=DEFAULT_BACKEND):
         """
         Inicializa el modelo de predicción.
         
         Args:
             model_path (str, optional): Ruta al modelo guardado previamente. Default: None
+            backend (str, optional): Backend del estimador. Default: 'hist_gradient_boosting'
         """
+        self.backend = validate_backend(backend)
         self.model = None
         self.encoder = None
         self.scaler = None
+        self.preprocessor = None
         self.feature_names = None
         self.categorical_features = [
             'local_team', 'away_team', 'competition', 
@@ -64,13 +219,14 @@ class PredictorFutbolPremium:
             'temperature', 'humidity', 'wind_speed',
             'local_coach_experience', 'away_coach_experience'
         ]
+        self.preprocessor = PremiumFeatureTransformer(self.categorical_features, self.numerical_features)
         
         if model_path:
             self.load_model(model_path)
     
     def preprocess_data(self, X):
         """
-        Realiza el preprocesamiento de los datos de entrada.
+        Aplica el preprocesamiento ajustado a los datos de entrada.
         
         Args:
             X (pandas.DataFrame): DataFrame con los datos a preprocesar
@@ -78,42 +234,7 @@ class PredictorFutbolPremium:
         Returns:
             pandas.DataFrame: Datos preprocesados
         """
-        # Verificar que estén todas las columnas necesarias
-        missing_cols = set(self.categorical_features + self.numerical_features) - set(X.columns)
-        if missing_cols:
-            logger.error(f"Faltan columnas en los datos: {missing_cols}")
-            raise ValueError(f"Faltan columnas en los datos: {missing_cols}")
-        
-        # Preprocesamiento de datos
-        X_processed = X.copy()
-        
-        # Manejo de valores nulos
-        for col in self.numerical_features:
-            if col in X_processed.columns:
-                X_processed[col].fillna(X_processed[col].median(), inplace=True)
-        
-        for col in self.categorical_features:
-            if col in X_processed.columns:
-                X_processed[col].fillna('Unknown', inplace=True)
-        
-        # Creación de nuevas características
-        X_processed['form_difference'] = X_processed['local_form_points_last5'] - X_processed['away_form_points_last5']
-        X_processed['goal_diff_last5'] = (X_processed['local_goals_scored_last5'] - X_processed['local_goals_conceded_last5']) - \
-                                        (X_processed['away_goals_scored_last5'] - X_processed['away_goals_conceded_last5'])
-        X_processed['h2h_win_ratio_local'] = X_processed['h2h_local_wins'] / (X_processed['h2h_local_wins'] + X_processed['h2h_away_wins'] + X_processed['h2h_draws']).replace(0, 1)
-        X_processed['expected_goals_diff'] = X_processed['local_expected_goals_avg'] - X_processed['away_expected_goals_avg']
-        X_processed['expected_goals_against_diff'] = X_processed['away_expected_goals_against_avg'] - X_processed['local_expected_goals_against_avg']
-        X_processed['fatigue_diff'] = X_processed['away_days_since_last_match'] - X_processed['local_days_since_last_match']
-        X_processed['key_players_diff'] = X_processed['away_key_players_missing'] - X_processed['local_key_players_missing']
-        
-        # Actualizar la lista de características numéricas
-        self.numerical_features.extend([
-            'form_difference', 'goal_diff_last5', 'h2h_win_ratio_local', 
-            'expected_goals_diff', 'expected_goals_against_diff',
-            'fatigue_diff', 'key_players_diff'
-        ])
-        
-        return X_processed
+        return self.preprocessor.transform(X)
 
     def build_pipeline(self):
         """
@@ -122,38 +243,19 @@ class PredictorFutbolPremium:
         Returns:
             sklearn.pipeline.Pipeline: Pipeline de preprocesamiento y modelo
         """
-        # Preprocesadores
-        categorical_transformer = Pipeline(steps=[
-            ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
-        ])
-        
-        numerical_transformer = Pipeline(steps=[
-            ('scaler', StandardScaler())
-        ])
-        
-        # Columnas para el preprocesamiento
-        preprocessor = ColumnTransformer(
-            transformers=[
-                ('num', numerical_transformer, self.numerical_features),
-                ('cat', categorical_transformer, self.categorical_features)
-            ]
-        )
-        
-        # Modelo principal: Ensamble de RandomForest y GradientBoosting
-        gb_model = GradientBoostingClassifier(
-            n_estimators=200, 
-            learning_rate=0.05,
-            max_depth=5,
-            random_state=42
+        # Con el backend histograma las columnas categóricas (equipos,
+        # competición...) se tratan de forma nativa en lugar de one-hot denso
+        return build_pipeline(
+            self.preprocessor.numeric_output_features,
+            self.categorical_features,
+            backend=self.backend,
+            params={
+                'n_estimators': 200,
+                'learning_rate': 0.05,
+                'max_depth': 5,
+                'random_state': 42
+            }
         )
-        
-        # Pipeline completo
-        pipeline = Pipeline(steps=[
-            ('preprocessor', preprocessor),
-            ('classifier', gb_model)
-        ])
-        
-        return pipeline
     
     def train(self, X, y, test_size=0.2, random_state=42):
         """
@@ -170,15 +272,16 @@ class PredictorFutbolPremium:
         """
         logger.info(f"Iniciando entrenamiento del modelo con {X.shape[0]} muestras")
         
-        # Preprocesamiento de datos
-        X_processed = self.preprocess_data(X)
-        self.feature_names = X_processed.columns.tolist()
-        
         # División en train/test
         X_train, X_test, y_train, y_test = train_test_split(
-            X_processed, y, test_size=test_size, random_state=random_state, stratify=y
+            X, y, test_size=test_size, random_state=random_state, stratify=y
         )
         
+        # Preprocesamiento: medianas ajustadas solo con datos de entrenamiento
+        X_train = self.preprocessor.fit_transform(X_train)
+        X_test = self.preprocessor.transform(X_test)
+        self.feature_names = self.preprocessor.output_features
+        
         logger.info(f"Datos divididos: {X_train.shape[0]} muestras de entrenamiento, {X_test.shape[0]} muestras de prueba")
         
         # Construcción y entrenamiento del modelo
@@ -186,11 +289,11 @@ class PredictorFutbolPremium:
         self.model = pipeline
         
         # Hiperparámetros para optimización
-        param_grid = {
+        param_grid = translate_param_grid({
             'classifier__n_estimators': [100, 200, 300],
             'classifier__learning_rate': [0.01, 0.05, 0.1],
             'classifier__max_depth': [3, 5, 7]
-        }
+        }, self.backend, prefix='classifier__')
         
         # Optimización de hiperparámetros mediante validación cruzada
         logger.info("Iniciando optimización de hiperparámetros con GridSearchCV")
@@ -294,12 +397,14 @@ class PredictorFutbolPremium:
             'model': self.model,
             'feature_names': self.feature_names,
             'categorical_features': self.categorical_features,
-            'numerical_features': self.numerical_features,
+            'numerical_features': self.preprocessor.numerical_features,
+            'feature_medians': self.preprocessor.medians_,
+            'backend': self.backend,
             'version': '2.0',
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
-        joblib.dump(model_data, filepath)
+        save_artifact(model_data, filepath)
         logger.info(f"Modelo guardado en {filepath}")
     
     def load_model(self, filepath):
@@ -310,22 +415,34 @@ class PredictorFutbolPremium:
             filepath (str): Ruta del modelo a cargar
         """
         try:
-            model_data = joblib.load(filepath)
+            model_data = load_artifact(filepath)
             self.model = model_data['model']
+            self.backend = model_data.get('backend', self.backend)
             self.feature_names = model_data['feature_names']
             self.categorical_features = model_data['categorical_features']
-            self.numerical_features = model_data['numerical_features']
+            medians = model_data.get('feature_medians')
+            self.preprocessor = PremiumFeatureTransformer(
+                self.categorical_features, model_data['numerical_features'], medians=medians
+            )
+            self.numerical_features = self.preprocessor.numerical_features
+            if medians is None:
+                # Artefactos anteriores no guardaban medianas de entrenamiento
+                logger.warning("El modelo no incluye medianas de imputación; se usará 0 para valores nulos")
+                self.preprocessor.medians_ = np.zeros(len(self.numerical_features))
             logger.info(f"Modelo v{model_data.get('version', 'unknown')} cargado desde {filepath}")
         except Exception as e:
             logger.error(f"Error al cargar el modelo: {str(e)}")
             raise
     
-    def get_feature_importance(self, top_n=20):
+    def get_feature_importance(self, top_n=20, X=None, y=None):
         """
         Obtiene la importancia de las características del modelo.
         
         Args:
             top_n (int): Número de características más importantes a mostrar
+            X (pandas.DataFrame, optional): Datos sin preprocesar para la importancia
+                por permutación (necesarios con el backend histograma)
+            y (pandas.Series, optional): Etiquetas correspondientes a X
             
         Returns:
             pandas.DataFrame: DataFrame con las características y su importancia
@@ -334,9 +451,18 @@ class PredictorFutbolPremium:
             logger.error("El modelo no ha sido entrenado o cargado")
             raise ValueError("El modelo no ha sido entrenado o cargado")
         
-        # Obtener la importancia de características
-        feature_names = self.model.named_steps['preprocessor'].get_feature_names_out()
-        feature_importance = self.model.named_steps['classifier'].feature_importances_
+        classifier = self.model.named_steps['classifier']
+        if hasattr(classifier, 'feature_importances_'):
+            feature_names = self.model.named_steps['preprocessor'].get_feature_names_out()
+            feature_importance = classifier.feature_importances_
+        elif X is not None and y is not None:
+            # Importancia por permutación sobre las columnas preprocesadas
+            X_processed = self.preprocess_data(X)
+            feature_names = X_processed.columns
+            feature_importance = get_feature_importances(self.model, X_processed, y)
+        else:
+            logger.error("Se necesitan datos (X, y) para la importancia por permutación")
+            raise ValueError("Se necesitan datos (X, y) para la importancia por permutación")
         
         # Crear DataFrame
         importance_df = pd.DataFrame({
@@ -371,6 +497,6 @@ if __name__ == '__main__':
     print(f"Predicción: {prediction}")
     
     # Mostrar importancia de características
-    importance = model.get_feature_importance(top_n=15)
+    importance = model.get_feature_importance(top_n=15, X=X, y=y)
     print("Importancia de características:")
     print(importance)
@@ -1,16 +1,24 @@
 import pandas as pd
 import numpy as np
-import joblib
 import os
+import sys
 import logging
 from datetime import datetime
-from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
 
+# Añadir directorio del servicio al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.artifacts import load_artifact, save_artifact
+from models.calibration import (
+    ARTIFACT_KEY, CALIBRATION_SIZE, DEFAULT_METHOD, ProbabilityCalibrator, fit_calibrator, load_calibrator
+)
+from models.registry import active_artifact, get_model_handle
+from models.estimators import (
+    DEFAULT_BACKEND, build_pipeline, get_feature_importances, translate_param_grid, validate_backend
+)
+
 # Configurar logging
 logger = logging.getLogger('predictor_futbol_premium.modelo')
 
@@ -20,13 +28,24 @@ class PredictorModel:
     Integra múltiples características y algoritmos para generar predicciones precisas.
     """
     
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, backend=DEFAULT_BACKEND, calibration=DEFAULT_METHOD, model_handle=None):
         """
         Inicializa el modelo de predicción.
         
         Args:
             model_path (str, opcional): Ruta al modelo guardado previamente.
+            backend (str, opcional): Backend del estimador ('hist_gradient_boosting'
+                o 'gradient_boosting').
+            calibration (str, opcional): Método de calibración de probabilidades
+                ('temperature', 'isotonic' o 'dirichlet').
+            model_handle (ModelHandle, opcional): Handle del registro de modelos; con
+                `model_path`, cada predicción usa la versión activa del artefacto
+                del mismo nombre si el registro la tiene.
         """
+        self.backend = validate_backend(backend)
+        self.calibration = calibration
+        self.calibrator = ProbabilityCalibrator(calibration)
+        
         # Definir características que usará el modelo
         self.categorical_features = [
             'home_team', 'away_team', 'league', 
@@ -73,6 +92,7 @@ class PredictorModel:
             'version': '1.0.0',
             'name': 'PredictorFutbolPremium',
             'algorithm': 'GradientBoosting',
+            'backend': self.backend,
             'training_date': None,
             'accuracy': None,
             'features': {
@@ -81,8 +101,15 @@ class PredictorModel:
             }
         }
         
+        # Versión del registro que se está sirviendo (None = fichero local o entrenamiento)
+        self.artifact_name = os.path.splitext(os.path.basename(model_path))[0] if model_path else None
+        self.model_handle = (model_handle or get_model_handle()) if model_path else None
+        self.registry_version = None
+        
         # Cargar modelo si se proporciona ruta
-        if model_path and os.path.exists(model_path):
+        if model_path and self._refresh_from_registry():
+            pass
+        elif model_path and os.path.exists(model_path):
             self.load_model(model_path)
         else:
             # Inicializar modelo base si no hay uno guardado
@@ -92,30 +119,13 @@ class PredictorModel:
     def _initialize_base_model(self):
         """Inicializa un modelo base sin entrenar"""
         try:
-            # Preprocesadores para características categóricas y numéricas
-            categorical_transformer = Pipeline(steps=[
-                ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
-            ])
-            
-            numerical_transformer = Pipeline(steps=[
-                ('scaler', StandardScaler())
-            ])
-            
-            # Combinar preprocesadores
-            preprocessor = ColumnTransformer(
-                transformers=[
-                    ('num', numerical_transformer, self.numerical_features),
-                    ('cat', categorical_transformer, self.categorical_features)
-                ],
-                remainder='drop'  # Ignorar columnas no especificadas
+            # Preprocesador + clasificador según el backend: con el backend
+            # histograma las columnas categóricas se tratan de forma nativa
+            self.pipeline = build_pipeline(
+                self.numerical_features, self.categorical_features,
+                backend=self.backend, params={'random_state': 42}
             )
             
-            # Crear pipeline completo con GradientBoostingClassifier
-            self.pipeline = Pipeline(steps=[
-                ('preprocessor', preprocessor),
-                ('classifier', GradientBoostingClassifier(random_state=42))
-            ])
-            
             # Asignar pipeline a modelo
             self.model = self.pipeline
             
@@ -140,20 +150,27 @@ class PredictorModel:
         try:
             logger.info(f"Iniciando entrenamiento con {X.shape[0]} muestras")
             
-            # Dividir datos en entrenamiento y prueba
+            # El modelo recién entrenado se sirve tal cual, sin seguir al registro
+            self.model_handle = None
+            self.registry_version = None
+            
+            # Dividir datos en entrenamiento, calibración y prueba
             X_train, X_test, y_train, y_test = train_test_split(
                 X, y, test_size=test_size, random_state=random_state, stratify=y
             )
+            X_train, X_calibration, y_train, y_calibration = train_test_split(
+                X_train, y_train, test_size=CALIBRATION_SIZE, random_state=random_state, stratify=y_train
+            )
             
             if optimize:
                 logger.info("Iniciando optimización de hiperparámetros...")
                 
                 # Definir grid de hiperparámetros
-                param_grid = {
+                param_grid = translate_param_grid({
                     'classifier__n_estimators': [100, 200, 300],
                     'classifier__learning_rate': [0.05, 0.1, 0.2],
                     'classifier__max_depth': [3, 5, 7]
-                }
+                }, self.backend, prefix='classifier__')
                 
                 # Realizar búsqueda de mejores hiperparámetros
                 grid_search = GridSearchCV(
@@ -172,8 +189,15 @@ class PredictorModel:
                 self.model = self.pipeline
                 self.model.fit(X_train, y_train)
             
-            # Evaluar modelo
-            y_pred = self.model.predict(X_test)
+            # Calibrar probabilidades en el conjunto de calibración; el informe se mide en prueba
+            test_proba = self.model.predict_proba(X_test)
+            self.calibrator, calibration_report = fit_calibrator(
+                self.model.predict_proba(X_calibration), y_calibration, classes=self.model.classes_,
+                method=self.calibration, eval_proba=test_proba, eval_y=y_test
+            )
+            
+            # Evaluar modelo (clase más probable tras calibrar, como en predict_match)
+            y_pred = self.model.classes_[np.argmax(self.calibrator.transform(test_proba), axis=1)]
             
             # Calcular métricas
             accuracy = accuracy_score(y_test, y_pred)
@@ -191,7 +215,8 @@ class PredictorModel:
                 'precision': float(precision),
                 'recall': float(recall),
                 'f1_score': float(f1),
-                'samples_trained': int(X.shape[0])
+                'samples_trained': int(X.shape[0]),
+                'calibration': calibration_report
             })
             
             logger.info(f"Entrenamiento completado. Accuracy: {accuracy:.4f}")
@@ -218,22 +243,19 @@ class PredictorModel:
             dict: Predicción con probabilidades y confianza
         """
         try:
+            self._refresh_from_registry()
+            model, calibrator = self.model, self.calibrator
+            
             # Si no hay modelo entrenado, usar predicción simple
-            if self.model is None:
+            if model is None:
                 return self._simple_prediction(match_data)
             
             # Convertir datos a DataFrame
             match_df = pd.DataFrame([match_data])
             
-            # Verificar si el modelo fue entrenado con pipeline
-            if hasattr(self.model, 'predict_proba'):
-                # Obtener predicción y probabilidades
-                prediction = self.model.predict(match_df)[0]
-                probabilities = self.model.predict_proba(match_df)[0]
-            else:
-                # Si es un pipeline, usar directamente
-                prediction = self.model.predict(match_df)[0]
-                probabilities = self.model.predict_proba(match_df)[0]
+            # Probabilidades calibradas; la predicción es la clase más probable tras calibrar
+            probabilities = calibrator.transform(model.predict_proba(match_df))[0]
+            prediction = int(np.argmax(probabilities))
             
             # Convertir predicción numérica a etiqueta
             result_labels = ['home_win', 'draw', 'away_win']
@@ -382,12 +404,14 @@ class PredictorModel:
         model_data = {
             'model': self.model,
             'model_info': self.model_info,
+            'backend': self.backend,
+            ARTIFACT_KEY: self.calibrator.to_dict(),
             'categorical_features': self.categorical_features,
             'numerical_features': self.numerical_features
         }
         
-        # Guardar modelo
-        joblib.dump(model_data, filepath)
+        # Guardar modelo (sin comprimir, apto para memory-mapping)
+        save_artifact(model_data, filepath)
         logger.info(f"Modelo guardado en {filepath}")
         
         return True
@@ -401,13 +425,9 @@ class PredictorModel:
         """
         try:
             # Cargar modelo desde archivo
-            model_data = joblib.load(filepath)
-            
-            # Extraer componentes
-            self.model = model_data['model']
-            self.model_info = model_data.get('model_info', self.model_info)
-            self.categorical_features = model_data.get('categorical_features', self.categorical_features)
-            self.numerical_features = model_data.get('numerical_features', self.numerical_features)
+            model_data = load_artifact(filepath)
+            self._apply_model_data(model_data)
+            self.registry_version = None
             
             logger.info(f"Modelo cargado desde {filepath}")
             return True
@@ -418,6 +438,35 @@ class PredictorModel:
             self._initialize_base_model()
             raise
     
+    def _apply_model_data(self, model_data):
+        """Extrae los componentes de un artefacto cargado"""
+        model, calibrator = model_data['model'], load_calibrator(model_data)
+        self.backend = model_data.get('backend', self.backend)
+        self.model_info = model_data.get('model_info', self.model_info)
+        self.categorical_features = model_data.get('categorical_features', self.categorical_features)
+        self.numerical_features = model_data.get('numerical_features', self.numerical_features)
+        self.model, self.calibrator = model, calibrator
+    
+    def _refresh_from_registry(self):
+        """
+        Cambia a la versión activa del registro si ha cambiado.
+        
+        Returns:
+            bool: True si se está sirviendo una versión del registro
+        """
+        if self.model_handle is None:
+            return False
+        
+        version, model_data = active_artifact(self.artifact_name, self.model_handle)
+        if version is not None and version != self.registry_version:
+            try:
+                self._apply_model_data(model_data)
+                self.registry_version = version
+                logger.info(f"Modelo de la versión {version} del registro")
+            except (KeyError, TypeError) as e:
+                logger.error(f"Artefacto de la versión {version} no válido; se mantiene el actual: {e}")
+        return self.registry_version is not None
+    
     def get_model_info(self):
         """
         Devuelve información sobre el modelo actual
@@ -448,12 +497,15 @@ class PredictorModel:
         
         return model_info
     
-    def get_feature_importance(self, top_n=20):
+    def get_feature_importance(self, top_n=20, X=None, y=None):
         """
         Obtiene la importancia de las características
         
         Args:
             top_n (int): Número de características principales a mostrar
+            X (pandas.DataFrame, opcional): Datos para importancia por permutación
+                (necesarios con el backend histograma)
+            y (pandas.Series, opcional): Resultados correspondientes a X
             
         Returns:
             dict: Características ordenadas por importancia
@@ -465,16 +517,17 @@ class PredictorModel:
         try:
             # Verificar si es un pipeline con preprocesador
             if hasattr(self.model, 'named_steps') and 'preprocessor' in self.model.named_steps:
-                # Obtener clasificador
                 classifier = self.model.named_steps['classifier']
                 
-                # Verificar si el clasificador soporta feature_importances_
-                if hasattr(classifier, 'feature_importances_'):
-                    # Obtener nombres de características procesadas
-                    feature_names = self.model.named_steps['preprocessor'].get_feature_names_out()
-                    
-                    # Obtener importancias
-                    importances = classifier.feature_importances_
+                # Importancias nativas o por permutación sobre las columnas de entrada
+                importances = get_feature_importances(self.model, X, y)
+                
+                if importances is not None:
+                    if hasattr(classifier, 'feature_importances_'):
+                        # Nombres de características procesadas
+                        feature_names = self.model.named_steps['preprocessor'].get_feature_names_out()
+                    else:
+                        feature_names = list(X.columns)
                     
                     # Crear lista ordenada
                     features_importance = [
@@ -492,7 +545,7 @@ class PredictorModel:
                         'total_features': len(feature_names)
                     }
             
-            # Si no es un pipeline o no tiene feature_importances_
+            # Si no es un pipeline o no hay datos para la permutación
             return {"error": "El modelo no soporta cálculo de importancia de características"}
             
         except Exception as e:
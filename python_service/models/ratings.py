@@ -0,0 +1,419 @@
+# models/ratings.py
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize, minimize_scalar
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.ratings')
+
+RATINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved', 'team_ratings.json')
+
+# Vida media del peso de un partido (Dixon-Coles: peso = exp(-xi * días))
+DEFAULT_HALF_LIFE_DAYS = 180
+
+# Penalización L2 de ataque/defensa (equivale a partidos ficticios contra un rival medio)
+DEFAULT_REGULARIZATION = 1.0
+
+# Partidos con peso menor se descartan del histórico del motor
+MIN_WEIGHT = 1e-3
+
+# Partidos recientes que cuentan para la forma
+FORM_MATCHES = 5
+
+# Rango de la corrección de marcadores bajos de Dixon-Coles
+RHO_BOUNDS = (-0.2, 0.2)
+
+# Escala de los índices 0-1 que muestra la API (logística sobre el log-rating)
+INDEX_SCALE = 3.0
+
+RESULT_POINTS = {'H': (3, 0), 'D': (1, 1), 'A': (0, 3)}
+
+
+def decay_rate(half_life_days):
+    """Tasa xi de decaimiento a partir de la vida media en días"""
+    return np.log(2) / half_life_days
+
+
+def time_weights(dates, reference_date, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+    """
+    Peso de cada partido según su antigüedad respecto a la fecha de referencia.
+
+    Returns:
+        numpy.ndarray: exp(-xi * días), 1 para partidos en la fecha de referencia
+    """
+    age = (pd.Timestamp(reference_date) - pd.to_datetime(pd.Series(dates)).dt.normalize()).dt.days.to_numpy()
+    return np.exp(-decay_rate(half_life_days) * np.maximum(age, 0))
+
+
+def dixon_coles_tau(home_goals, away_goals, lambda_home, lambda_away, rho):
+    """
+    Factor de corrección de Dixon-Coles para marcadores 0-0, 1-0, 0-1 y 1-1.
+
+    Acepta arrays (se difunden entre sí); vale 1 para el resto de marcadores.
+    """
+    home_goals, away_goals = np.asarray(home_goals), np.asarray(away_goals)
+    tau = np.ones(np.broadcast(home_goals, away_goals, lambda_home, lambda_away).shape)
+    tau = np.where((home_goals == 0) & (away_goals == 0), 1 - lambda_home * lambda_away * rho, tau)
+    tau = np.where((home_goals == 0) & (away_goals == 1), 1 + lambda_home * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 0), 1 + lambda_away * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 1), 1 - rho, tau)
+    return tau
+
+
+def _negative_log_likelihood(params, home, away, home_goals, away_goals, weights, n_teams, regularization):
+    """
+    Log-verosimilitud Poisson ponderada (negativa) y su gradiente.
+
+    log(lambda_local) = mu + ventaja_local + ataque[local] - defensa[visitante]
+    log(lambda_visitante) = mu + ataque[visitante] - defensa[local]
+    """
+    mu, home_advantage = params[0], params[1]
+    attack = params[2:2 + n_teams]
+    defense = params[2 + n_teams:]
+
+    log_home = mu + home_advantage + attack[home] - defense[away]
+    log_away = mu + attack[away] - defense[home]
+    lambda_home = np.exp(log_home)
+    lambda_away = np.exp(log_away)
+
+    log_likelihood = weights @ (home_goals * log_home - lambda_home + away_goals * log_away - lambda_away)
+    penalty = regularization * (attack @ attack + defense @ defense)
+
+    residual_home = weights * (home_goals - lambda_home)
+    residual_away = weights * (away_goals - lambda_away)
+    gradient = np.empty_like(params)
+    gradient[0] = -(residual_home.sum() + residual_away.sum())
+    gradient[1] = -residual_home.sum()
+    gradient[2:2 + n_teams] = (-(np.bincount(home, residual_home, n_teams) + np.bincount(away, residual_away, n_teams))
+                               + 2 * regularization * attack)
+    gradient[2 + n_teams:] = ((np.bincount(away, residual_home, n_teams) + np.bincount(home, residual_away, n_teams))
+                              + 2 * regularization * defense)
+    return -log_likelihood + penalty, gradient
+
+
+class RatingsEngine:
+    """
+    Ratings de ataque y defensa de cada equipo (modelo de Dixon-Coles).
+
+    Ajusta un Poisson doble con ventaja de local por máxima verosimilitud
+    ponderada en el tiempo (L-BFGS con gradiente analítico, todo vectorizado
+    con bincount) y estima después la corrección rho de marcadores bajos.
+    `update` añade una jornada y reajusta partiendo de los ratings
+    anteriores, así que converge en pocas iteraciones. El resultado se
+    publica como una tabla compacta nombre -> ratings con búsqueda O(1).
+    """
+
+    def __init__(self, half_life_days=DEFAULT_HALF_LIFE_DAYS, regularization=DEFAULT_REGULARIZATION):
+        """
+        Inicializa el motor.
+
+        Args:
+            half_life_days (float): Vida media del peso de un partido
+            regularization (float): Penalización L2 de los ratings
+        """
+        self.half_life_days = half_life_days
+        self.regularization = regularization
+        self.mu = 0.0
+        self.home_advantage = 0.0
+        self.rho = 0.0
+        self.teams = {}
+        self.reference_date = None
+        self.history = pd.DataFrame()
+
+    @property
+    def fitted(self):
+        return bool(self.teams)
+
+    def fit(self, df, reference_date=None):
+        """
+        Ajusta los ratings con los partidos de `df`.
+
+        Args:
+            df (pandas.DataFrame): Partidos (date, home_team, away_team, home_goals, away_goals)
+            reference_date (str, optional): Fecha de peso 1 (por defecto el último partido)
+
+        Returns:
+            RatingsEngine: self
+        """
+        df = df.dropna(subset=['home_goals', 'away_goals']).copy()
+        df['date'] = pd.to_datetime(df['date'], format='mixed').dt.normalize()
+        reference_date = pd.Timestamp(reference_date or df['date'].max())
+        weights = time_weights(df['date'], reference_date, self.half_life_days)
+
+        # Fuera de la ventana útil el peso es despreciable
+        keep = weights >= MIN_WEIGHT
+        df, weights = df[keep].reset_index(drop=True), weights[keep]
+
+        codes, names = pd.factorize(pd.concat([df['home_team'], df['away_team']], ignore_index=True))
+        n_teams = len(names)
+        home, away = codes[:len(df)], codes[len(df):]
+        home_goals = df['home_goals'].to_numpy(dtype=float)
+        away_goals = df['away_goals'].to_numpy(dtype=float)
+
+        # Arranque en caliente con los ratings anteriores (0 para equipos nuevos)
+        x0 = np.zeros(2 + 2 * n_teams)
+        x0[0] = self.mu if self.fitted else np.log(max((home_goals + away_goals).mean() / 2, 0.1))
+        x0[1] = self.home_advantage
+        for i, name in enumerate(names):
+            if name in self.teams:
+                x0[2 + i] = self.teams[name]['attack']
+                x0[2 + n_teams + i] = self.teams[name]['defense']
+
+        result = minimize(
+            _negative_log_likelihood, x0, jac=True, method='L-BFGS-B',
+            args=(home, away, home_goals, away_goals, weights, n_teams, self.regularization)
+        )
+        if not result.success:
+            logger.warning(f"El ajuste de ratings no convergió: {result.message}")
+
+        self.mu, self.home_advantage = float(result.x[0]), float(result.x[1])
+        attack = result.x[2:2 + n_teams]
+        defense = result.x[2 + n_teams:]
+        self.rho = self._fit_rho(home, away, home_goals, away_goals, weights, attack, defense)
+
+        self.history = df
+        self.reference_date = reference_date
+        self.teams = self._team_table(df, names, attack, defense, weights, home, away)
+        logger.info(f"Ratings ajustados: {n_teams} equipos, {len(df)} partidos, "
+                    f"{result.nit} iteraciones (ventaja local {self.home_advantage:.3f}, rho {self.rho:.3f})")
+        return self
+
+    def update(self, matches):
+        """
+        Añade partidos nuevos (p.ej. una jornada) y reajusta en caliente.
+
+        Args:
+            matches (pandas.DataFrame): Partidos nuevos
+
+        Returns:
+            RatingsEngine: self
+        """
+        if matches.empty:
+            return self
+        history = pd.concat([self.history, matches], ignore_index=True) if not self.history.empty else matches
+        return self.fit(history)
+
+    def _fit_rho(self, home, away, home_goals, away_goals, weights, attack, defense):
+        """Rho de Dixon-Coles con los ratings fijos (solo influyen los marcadores bajos)"""
+        low = (home_goals <= 1) & (away_goals <= 1)
+        if not low.any():
+            return 0.0
+
+        lambda_home = np.exp(self.mu + self.home_advantage + attack[home[low]] - defense[away[low]])
+        lambda_away = np.exp(self.mu + attack[away[low]] - defense[home[low]])
+
+        def objective(rho):
+            tau = dixon_coles_tau(home_goals[low], away_goals[low], lambda_home, lambda_away, rho)
+            return -(weights[low] @ np.log(np.maximum(tau, 1e-10)))
+
+        return float(minimize_scalar(objective, bounds=RHO_BOUNDS, method='bounded').x)
+
+    def _team_table(self, df, names, attack, defense, weights, home, away):
+        """Ratings, partidos, forma y liga más reciente de cada equipo"""
+        n_teams = len(names)
+        matches = np.bincount(home, minlength=n_teams) + np.bincount(away, minlength=n_teams)
+        weight = np.bincount(home, weights, n_teams) + np.bincount(away, weights, n_teams)
+
+        # Vista por equipo: (equipo, fecha, puntos, liga)
+        result = np.select(
+            [df['home_goals'] > df['away_goals'], df['home_goals'] < df['away_goals']], ['H', 'A'], default='D'
+        )
+        points = np.array([RESULT_POINTS[r] for r in 'HDA'])[pd.Index(list('HDA')).get_indexer(result)]
+        league = df['league'] if 'league' in df.columns else pd.Series('Unknown', index=df.index)
+        long = pd.DataFrame({
+            'team': np.concatenate([home, away]),
+            'date': np.concatenate([df['date'].to_numpy()] * 2),
+            'points': np.concatenate([points[:, 0], points[:, 1]]),
+            'league': np.concatenate([league.to_numpy()] * 2)
+        }).sort_values(['team', 'date'], kind='stable')
+        recent = long.groupby('team').tail(FORM_MATCHES).groupby('team')
+        form = recent['points'].mean() / 3
+        last = long.groupby('team').tail(1).set_index('team')
+
+        return {
+            name: {
+                'attack': round(float(attack[i]), 5),
+                'defense': round(float(defense[i]), 5),
+                'matches': int(matches[i]),
+                'weight': round(float(weight[i]), 3),
+                'form': round(float(form.get(i, 0.5)), 3),
+                'league': str(last.at[i, 'league']),
+                'last_match': pd.Timestamp(last.at[i, 'date']).strftime('%Y-%m-%d')
+            }
+            for i, name in enumerate(names)
+        }
+
+    def expected_goals(self, home_team, away_team):
+        """
+        Goles esperados de un partido (equipos desconocidos = rating medio).
+
+        Returns:
+            tuple: (lambda_local, lambda_visitante)
+        """
+        home = self.teams.get(home_team, {})
+        away = self.teams.get(away_team, {})
+        lambda_home = np.exp(self.mu + self.home_advantage + home.get('attack', 0.0) - away.get('defense', 0.0))
+        lambda_away = np.exp(self.mu + away.get('attack', 0.0) - home.get('defense', 0.0))
+        return float(lambda_home), float(lambda_away)
+
+    def team_stats(self, team_name):
+        """
+        Estadísticas de un equipo en el formato de la API.
+
+        attack, defense y strength son índices 0-1 (logística del rating);
+        xg_per_game y xga_per_game son goles esperados contra un rival medio
+        en campo neutral.
+
+        Returns:
+            dict: Estadísticas o None si el equipo no tiene rating
+        """
+        rating = self.teams.get(team_name)
+        if rating is None:
+            return None
+
+        def index(value):
+            return round(float(1 / (1 + np.exp(-INDEX_SCALE * value))), 3)
+
+        return {
+            'strength': index((rating['attack'] + rating['defense']) / 2),
+            'attack': index(rating['attack']),
+            'defense': index(rating['defense']),
+            'form': rating['form'],
+            'home_advantage': round(float(np.exp(self.home_advantage) - 1), 3),
+            'xg_per_game': round(float(np.exp(self.mu + self.home_advantage / 2 + rating['attack'])), 2),
+            'xga_per_game': round(float(np.exp(self.mu + self.home_advantage / 2 - rating['defense'])), 2),
+            'possession_avg': 50.0,
+            'shots_per_game': 13.0,
+            'league': rating['league'],
+            'rating_attack': rating['attack'],
+            'rating_defense': rating['defense']
+        }
+
+    def to_dict(self):
+        """Tabla publicada (parámetros globales + ratings por equipo)"""
+        return {
+            'model': 'dixon_coles',
+            'fitted_at': datetime.now().isoformat(),
+            'reference_date': self.reference_date.strftime('%Y-%m-%d') if self.reference_date is not None else None,
+            'half_life_days': self.half_life_days,
+            'regularization': self.regularization,
+            'mu': self.mu,
+            'home_advantage': self.home_advantage,
+            'rho': self.rho,
+            'teams': self.teams
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruye el motor desde to_dict() (sin histórico)"""
+        engine = cls(data.get('half_life_days', DEFAULT_HALF_LIFE_DAYS),
+                     data.get('regularization', DEFAULT_REGULARIZATION))
+        engine.mu = data['mu']
+        engine.home_advantage = data['home_advantage']
+        engine.rho = data.get('rho', 0.0)
+        engine.teams = data['teams']
+        if data.get('reference_date'):
+            engine.reference_date = pd.Timestamp(data['reference_date'])
+        return engine
+
+    def save(self, path=RATINGS_PATH):
+        """Publica la tabla de ratings de forma atómica"""
+        directory = os.path.dirname(str(path)) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.ratings_', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logger.info(f"Tabla de ratings publicada en {path} ({len(self.teams)} equipos)")
+
+    @classmethod
+    def load(cls, path=RATINGS_PATH):
+        """Carga una tabla publicada"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def history_window_days(half_life_days=DEFAULT_HALF_LIFE_DAYS):
+    """Días de histórico con peso no despreciable (>= MIN_WEIGHT)"""
+    return int(np.ceil(-np.log(MIN_WEIGHT) / decay_rate(half_life_days)))
+
+
+def load_ratings(path=RATINGS_PATH, fit_if_missing=False):
+    """
+    Carga la tabla de ratings publicada.
+
+    Args:
+        path (str): Ruta de la tabla
+        fit_if_missing (bool): Si no existe, ajustarla con el histórico local y publicarla
+
+    Returns:
+        RatingsEngine: Motor con los ratings, o None si no hay tabla ni histórico
+    """
+    if os.path.exists(path):
+        return RatingsEngine.load(path)
+    if not fit_if_missing:
+        return None
+
+    from utils.match_dataset import load_matches
+    try:
+        df = load_matches(columns=['date', 'league', 'home_team', 'away_team', 'home_goals', 'away_goals'])
+    except (FileNotFoundError, ValueError) as e:
+        logger.warning(f"Sin tabla de ratings ni histórico para ajustarla: {e}")
+        return None
+
+    engine = RatingsEngine().fit(df)
+    engine.save(path)
+    return engine
+
+
+def main():
+    """Ajusta (o actualiza) y publica la tabla de ratings"""
+    from utils.match_dataset import load_matches
+
+    parser = argparse.ArgumentParser(description='Ratings de ataque/defensa (Dixon-Coles) por equipo')
+    parser.add_argument('--data', '-d', help='Dataset Parquet o CSV de partidos (por defecto el histórico local)')
+    parser.add_argument('--half-life', type=float, default=DEFAULT_HALF_LIFE_DAYS,
+                        help='Vida media del peso de un partido en días')
+    parser.add_argument('--regularization', type=float, default=DEFAULT_REGULARIZATION,
+                        help='Penalización L2 de los ratings')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Partir de la tabla publicada y leer solo la ventana con peso')
+    parser.add_argument('--output', '-o', default=RATINGS_PATH, help='Ruta de la tabla publicada')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    engine = RatingsEngine(args.half_life, args.regularization)
+    date_from = None
+    if args.incremental and os.path.exists(args.output):
+        previous = RatingsEngine.load(args.output)
+        engine.mu, engine.home_advantage, engine.teams = previous.mu, previous.home_advantage, previous.teams
+        date_from = (pd.Timestamp.now() - pd.Timedelta(days=history_window_days(args.half_life))).strftime('%Y-%m-%d')
+
+    columns = ['date', 'league', 'home_team', 'away_team', 'home_goals', 'away_goals']
+    df = load_matches(args.data, columns=columns, date_from=date_from)
+    engine.fit(df)
+    engine.save(args.output)
+
+    top = sorted(engine.teams.items(), key=lambda item: item[1]['attack'] + item[1]['defense'], reverse=True)[:10]
+    for name, rating in top:
+        print(f"{name:30s} ataque {rating['attack']:+.3f}  defensa {rating['defense']:+.3f}  ({rating['league']})")
+
+
+if __name__ == '__main__':
+    main()
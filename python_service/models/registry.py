@@ -0,0 +1,472 @@
+# models/registry.py
+import os
+import sys
+import json
+import glob
+import pickle
+import shutil
+import signal
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime
+
+# Añadir directorio del servicio al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.artifacts import load_artifact
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.registry')
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_REGISTRY_DIR = BASE_DIR / 'models' / 'registry'
+
+MANIFEST_NAME = 'manifest.json'
+VERSIONS_DIR = 'versions'
+
+# Ficheros que forman parte de una versión del modelo
+# (calibrador y tabla de ratings de api.py incluidos; el estado Elo en vivo no se versiona)
+ARTIFACT_PATTERNS = ('*.joblib', '*.pkl', 'metadata.json', 'api_calibrator.json', 'team_ratings.json')
+
+
+class ModelRegistry:
+    """
+    Registro local de modelos versionados.
+
+    Estructura en disco:
+        registry/
+            manifest.json           versiones, métricas, versión activa y fijada
+            versions/v0001/...      artefactos inmutables de cada versión
+
+    Todas las escrituras del manifiesto son atómicas (temporal + rename), de
+    modo que los workers que lo vigilan nunca leen un fichero a medias.
+    """
+
+    def __init__(self, root=DEFAULT_REGISTRY_DIR):
+        """
+        Inicializa el registro.
+
+        Args:
+            root (str): Directorio raíz del registro
+        """
+        self.root = Path(root)
+        self.versions_dir = self.root / VERSIONS_DIR
+        self.manifest_path = self.root / MANIFEST_NAME
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+
+    def _read_manifest(self):
+        if not self.manifest_path.exists():
+            return {'versions': {}, 'active': None, 'pinned': None, 'history': []}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        manifest['updated_at'] = datetime.now().isoformat()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.manifest_', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _next_version(self, manifest):
+        numbers = [int(v[1:]) for v in manifest['versions'] if v[1:].isdigit()]
+        return f"v{max(numbers, default=0) + 1:04d}"
+
+    def register(self, source, metadata=None):
+        """
+        Registra una nueva versión copiando los artefactos de `source`.
+
+        Args:
+            source (str or list): Directorio con los artefactos (p.ej.
+                models/saved) o lista de ficheros
+            metadata (dict, optional): Metadatos del entrenamiento. Si no se
+                indican, se leen de `metadata.json` en el origen
+
+        Returns:
+            str: Identificador de la nueva versión
+        """
+        if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+            files = []
+            for pattern in ARTIFACT_PATTERNS:
+                files.extend(glob.glob(os.path.join(str(source), pattern)))
+        else:
+            files = [str(f) for f in ([source] if isinstance(source, (str, os.PathLike)) else source)]
+
+        if not files:
+            raise ValueError(f"No se encontraron artefactos en {source}")
+
+        if metadata is None:
+            metadata_files = [f for f in files if os.path.basename(f) == 'metadata.json']
+            if metadata_files:
+                with open(metadata_files[0], 'r') as f:
+                    metadata = json.load(f)
+            else:
+                metadata = {}
+
+        manifest = self._read_manifest()
+        version = self._next_version(manifest)
+
+        # Copiar a un directorio temporal y renombrar: la versión aparece completa o no aparece
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.versions_dir, prefix='.tmp_'))
+        try:
+            for filepath in files:
+                shutil.copy2(filepath, tmp_dir / os.path.basename(filepath))
+            os.rename(tmp_dir, self.versions_dir / version)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        manifest['versions'][version] = {
+            'created_at': datetime.now().isoformat(),
+            'name': metadata.get('name'),
+            'model_version': metadata.get('version'),
+            'backend': metadata.get('backend'),
+            'training_date': metadata.get('training_date'),
+            'metrics': metadata.get('metrics', {}),
+            'samples': metadata.get('samples', {}),
+            'files': sorted(os.path.basename(f) for f in files)
+        }
+        self._write_manifest(manifest)
+
+        logger.info(f"Versión {version} registrada con {len(files)} artefactos")
+        return version
+
+    def promote(self, version, force=False):
+        """
+        Activa una versión. Los workers que vigilan el registro la cargarán.
+
+        Args:
+            version (str): Versión a activar
+            force (bool): Ignorar la versión fijada (pin)
+
+        Returns:
+            str: Versión activa
+        """
+        manifest = self._read_manifest()
+
+        if version not in manifest['versions']:
+            raise ValueError(f"Versión no registrada: {version}")
+
+        pinned = manifest.get('pinned')
+        if pinned and pinned != version and not force:
+            raise ValueError(f"La versión {pinned} está fijada; usa force=True o unpin()")
+
+        if manifest.get('active') == version:
+            logger.info(f"La versión {version} ya está activa")
+            return version
+
+        manifest['active'] = version
+        manifest.setdefault('history', []).append(version)
+        self._write_manifest(manifest)
+
+        logger.info(f"Versión {version} promovida a activa")
+        return version
+
+    def rollback(self, force=False):
+        """
+        Vuelve a la versión activa anterior.
+
+        Args:
+            force (bool): Ignorar la versión fijada (pin)
+
+        Returns:
+            str: Versión activa tras el rollback
+        """
+        manifest = self._read_manifest()
+        history = manifest.get('history', [])
+
+        if len(history) < 2:
+            raise ValueError("No hay versión anterior a la que volver")
+
+        pinned = manifest.get('pinned')
+        if pinned and not force:
+            raise ValueError(f"La versión {pinned} está fijada; usa force=True o unpin()")
+
+        history.pop()
+        previous = history[-1]
+        manifest['active'] = previous
+        manifest['history'] = history
+        self._write_manifest(manifest)
+
+        logger.info(f"Rollback a la versión {previous}")
+        return previous
+
+    def pin(self, version):
+        """Fija una versión: se activa y bloquea promociones posteriores"""
+        self.promote(version, force=True)
+        manifest = self._read_manifest()
+        manifest['pinned'] = version
+        self._write_manifest(manifest)
+        logger.info(f"Versión {version} fijada")
+        return version
+
+    def unpin(self):
+        """Libera la versión fijada"""
+        manifest = self._read_manifest()
+        manifest['pinned'] = None
+        self._write_manifest(manifest)
+        logger.info("Versión fijada liberada")
+
+    def active_version(self):
+        """Devuelve la versión activa (o None)"""
+        return self._read_manifest().get('active')
+
+    def version_path(self, version):
+        """Directorio de artefactos de una versión"""
+        return self.versions_dir / version
+
+    def list_versions(self):
+        """
+        Lista las versiones registradas.
+
+        Returns:
+            list: Diccionarios con versión, métricas y estado
+        """
+        manifest = self._read_manifest()
+        return [
+            {
+                'version': version,
+                'active': version == manifest.get('active'),
+                'pinned': version == manifest.get('pinned'),
+                **info
+            }
+            for version, info in sorted(manifest['versions'].items())
+        ]
+
+
+class ModelHandle:
+    """
+    Referencia intercambiable a la versión activa del registro.
+
+    Cada petición obtiene el bundle con `get()` y lo usa hasta terminar. Una
+    recarga construye el bundle nuevo por completo y después sustituye la
+    referencia (asignación atómica), así que las peticiones en curso siguen
+    con la versión con la que empezaron y ninguna se descarta.
+    """
+
+    def __init__(self, registry, poll_interval=5.0):
+        """
+        Inicializa el handle.
+
+        Args:
+            registry (ModelRegistry): Registro a vigilar
+            poll_interval (float): Segundos entre comprobaciones del manifiesto
+        """
+        self.registry = registry
+        self.poll_interval = poll_interval
+        self._bundle = None
+        self._manifest_stamp = None
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher = None
+
+    def _load_bundle(self, version):
+        path = self.registry.version_path(version)
+        artifacts = {}
+
+        for filepath in sorted(glob.glob(str(path / '*.joblib'))):
+            artifacts[Path(filepath).stem] = load_artifact(filepath)
+
+        for filepath in sorted(glob.glob(str(path / '*.pkl'))):
+            with open(filepath, 'rb') as f:
+                artifacts[Path(filepath).stem] = pickle.load(f)
+
+        for filepath in sorted(glob.glob(str(path / '*.json'))):
+            if os.path.basename(filepath) != 'metadata.json':
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    artifacts[Path(filepath).stem] = json.load(f)
+
+        metadata_path = path / 'metadata.json'
+        metadata = {}
+        if metadata_path.exists():
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+
+        return {'version': version, 'artifacts': artifacts, 'metadata': metadata}
+
+    def get(self):
+        """
+        Devuelve el bundle activo ({'version', 'artifacts', 'metadata'}) o None.
+
+        Es barato: los predictores lo llaman en cada petición. Si no hay
+        hilo vigilando el registro, comprueba el manifiesto (un stat) y solo
+        lo vuelve a leer si ha cambiado.
+        """
+        if self._watcher is None or not self._watcher.is_alive():
+            self.check_for_update()
+        return self._bundle
+
+    @property
+    def version(self):
+        bundle = self._bundle
+        return bundle['version'] if bundle else None
+
+    def reload(self, force=False):
+        """
+        Carga la versión activa si ha cambiado.
+
+        Args:
+            force (bool): Recargar aunque la versión no haya cambiado
+
+        Returns:
+            bool: True si se cambió de versión
+        """
+        with self._reload_lock:
+            self._manifest_stamp = self._stamp()
+
+            active = self.registry.active_version()
+            if active is None:
+                logger.warning("El registro no tiene versión activa")
+                return False
+
+            if not force and self.version == active:
+                return False
+
+            try:
+                bundle = self._load_bundle(active)
+            except Exception as e:
+                # Se mantiene la versión anterior: un artefacto corrupto no tumba el servicio
+                logger.error(f"Error cargando la versión {active}; se mantiene {self.version}: {e}")
+                return False
+
+            previous = self.version
+            self._bundle = bundle
+            logger.info(f"Modelo recargado: {previous} -> {active}")
+            return True
+
+    def _stamp(self):
+        # El manifiesto se reemplaza con os.replace: cada escritura crea un inodo nuevo
+        try:
+            st = os.stat(self.registry.manifest_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    def check_for_update(self):
+        """Recarga solo si el manifiesto ha cambiado desde la última lectura"""
+        stamp = self._stamp()
+        if stamp is None or stamp == self._manifest_stamp:
+            return False
+        return self.reload()
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                logger.error(f"Error vigilando el registro de modelos: {e}")
+
+    def start_watching(self):
+        """Arranca el hilo que vigila el manifiesto (llamar tras el fork)"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, name='model-registry-watcher', daemon=True)
+        self._watcher.start()
+        logger.info(f"Vigilando el registro de modelos cada {self.poll_interval}s")
+
+    def stop_watching(self):
+        """Detiene el hilo de vigilancia"""
+        self._stop_event.set()
+
+    def install_signal_handler(self, signum=signal.SIGUSR2):
+        """
+        Recarga al recibir una señal (solo desde el hilo principal).
+
+        La recarga se hace en un hilo aparte para no bloquear al worker
+        dentro del manejador de la señal.
+        """
+        def _handler(received_signum, frame):
+            threading.Thread(target=self.reload, name='model-registry-reload', daemon=True).start()
+
+        signal.signal(signum, _handler)
+        logger.info(f"Recarga de modelo asociada a la señal {signum}")
+
+
+_model_handle = None
+_handle_lock = threading.Lock()
+
+
+def get_model_handle(registry_root=DEFAULT_REGISTRY_DIR, poll_interval=5.0):
+    """Devuelve el ModelHandle del proceso (se crea en la primera llamada)"""
+    global _model_handle
+    with _handle_lock:
+        if _model_handle is None:
+            _model_handle = ModelHandle(ModelRegistry(registry_root), poll_interval=poll_interval)
+        return _model_handle
+
+
+def active_artifact(name, handle=None):
+    """
+    Artefacto `name` de la versión activa del registro.
+
+    Args:
+        name (str): Nombre del fichero sin extensión (p.ej. 'football_predictor')
+        handle (ModelHandle, optional): Handle a consultar (por defecto el del proceso)
+
+    Returns:
+        tuple: (versión, artefacto) o (None, None) si no hay versión activa que lo contenga
+    """
+    bundle = (handle or get_model_handle()).get()
+    if bundle is None or name not in bundle['artifacts']:
+        return None, None
+    return bundle['version'], bundle['artifacts'][name]
+
+
+def main():
+    """Gestión del registro de modelos desde línea de comandos"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Registro de modelos versionados')
+    parser.add_argument('--root', default=str(DEFAULT_REGISTRY_DIR), help='Directorio del registro')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    register_parser = subparsers.add_parser('register', help='Registrar artefactos como nueva versión')
+    register_parser.add_argument('source', help='Directorio con los artefactos (p.ej. models/saved)')
+    register_parser.add_argument('--promote', action='store_true', help='Activar la versión registrada')
+
+    subparsers.add_parser('list', help='Listar versiones')
+
+    promote_parser = subparsers.add_parser('promote', help='Activar una versión')
+    promote_parser.add_argument('version')
+    promote_parser.add_argument('--force', action='store_true', help='Ignorar la versión fijada')
+
+    rollback_parser = subparsers.add_parser('rollback', help='Volver a la versión anterior')
+    rollback_parser.add_argument('--force', action='store_true', help='Ignorar la versión fijada')
+
+    pin_parser = subparsers.add_parser('pin', help='Fijar una versión')
+    pin_parser.add_argument('version')
+
+    subparsers.add_parser('unpin', help='Liberar la versión fijada')
+
+    args = parser.parse_args()
+    registry = ModelRegistry(args.root)
+
+    if args.command == 'register':
+        version = registry.register(args.source)
+        if args.promote:
+            registry.promote(version)
+        print(version)
+    elif args.command == 'list':
+        for info in registry.list_versions():
+            flags = ''.join(['*' if info['active'] else ' ', 'P' if info['pinned'] else ' '])
+            print(f"{flags} {info['version']}  {info['created_at']}  {json.dumps(info['metrics'])}")
+    elif args.command == 'promote':
+        registry.promote(args.version, force=args.force)
+    elif args.command == 'rollback':
+        print(registry.rollback(force=args.force))
+    elif args.command == 'pin':
+        registry.pin(args.version)
+    elif args.command == 'unpin':
+        registry.unpin()
+
+
+if __name__ == '__main__':
+    main()
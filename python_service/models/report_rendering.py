@@ -0,0 +1,249 @@
+# models/report_rendering.py
+import os
+import atexit
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.metrics import auc, precision_recall_curve, roc_curve
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.report_rendering')
+
+DEFAULT_DPI = 300
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_pyplot():
+    """
+    pyplot con backend Agg (sin pantalla).
+
+    matplotlib y seaborn tardan segundos en importarse, así que solo se
+    cargan al renderizar la primera figura y nunca al importar los módulos
+    de evaluación.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _finish(fig, path, close, dpi=DEFAULT_DPI):
+    """Guarda la figura si hay ruta y la cierra si se pide"""
+    if path:
+        fig.savefig(path, bbox_inches='tight', dpi=dpi)
+    if close:
+        get_pyplot().close(fig)
+        return path
+    return fig
+
+
+def compute_curves(y_true, y_prob, n_classes):
+    """
+    Curvas ROC y precisión-recall one-vs-rest de cada clase.
+
+    Returns:
+        dict: Listas 'roc' (fpr, tpr, auc) y 'pr' (recall, precision, auc) por clase
+    """
+    y_true = np.asarray(y_true)
+    y_prob = np.asarray(y_prob)
+    curves = {'roc': [], 'pr': []}
+
+    for i in range(n_classes):
+        positive = (y_true == i).astype(int)
+        fpr, tpr, _ = roc_curve(positive, y_prob[:, i])
+        curves['roc'].append((fpr, tpr, auc(fpr, tpr)))
+        precision, recall, _ = precision_recall_curve(positive, y_prob[:, i])
+        curves['pr'].append((recall, precision, auc(recall, precision)))
+
+    return curves
+
+
+def load_or_compute_curves(cache_dir, y_true, y_prob, n_classes):
+    """
+    Curvas ROC/PR cacheadas en disco según el contenido de los datos.
+
+    La clave es un hash de `y_true` y `y_prob`, así que volver a renderizar
+    el informe de las mismas predicciones no recalcula las curvas.
+
+    Args:
+        cache_dir (str): Directorio de la caché (None = sin caché)
+        y_true (array-like): Valores reales
+        y_prob (array-like): Probabilidades de predicción
+        n_classes (int): Número de clases
+
+    Returns:
+        dict: Curvas en el formato de compute_curves
+    """
+    y_true = np.ascontiguousarray(y_true)
+    y_prob = np.ascontiguousarray(y_prob, dtype=np.float64)
+    if cache_dir is None:
+        return compute_curves(y_true, y_prob, n_classes)
+
+    digest = hashlib.sha1()
+    digest.update(y_true.astype(np.int64).tobytes())
+    digest.update(y_prob.tobytes())
+    path = os.path.join(cache_dir, f"curves_{n_classes}_{digest.hexdigest()[:16]}.npz")
+
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return {
+                kind: [(data[f'{kind}_x_{i}'], data[f'{kind}_y_{i}'], float(data[f'{kind}_auc'][i]))
+                       for i in range(n_classes)]
+                for kind in ('roc', 'pr')
+            }
+
+    curves = compute_curves(y_true, y_prob, n_classes)
+    arrays = {}
+    for kind, per_class in curves.items():
+        for i, (x, y, _) in enumerate(per_class):
+            arrays[f'{kind}_x_{i}'] = x
+            arrays[f'{kind}_y_{i}'] = y
+        arrays[f'{kind}_auc'] = np.array([area for _, _, area in per_class])
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return curves
+
+
+def render_heatmap(matrix, labels, title, path=None, fmt='d', figsize=(10, 8),
+                   xlabel='Predicción', ylabel='Resultado Real', close=False):
+    """Matriz (de confusión) como mapa de calor"""
+    plt = get_pyplot()
+    import seaborn as sns
+
+    fig = plt.figure(figsize=figsize)
+    sns.heatmap(np.asarray(matrix), annot=True, fmt=fmt, cmap='Blues',
+                xticklabels=labels, yticklabels=labels)
+    plt.title(title)
+    plt.ylabel(ylabel)
+    plt.xlabel(xlabel)
+    plt.tight_layout()
+    return _finish(fig, path, close)
+
+
+def render_roc_curves(curves, class_names, title, path=None, figsize=(10, 8), close=False):
+    """Curvas ROC precalculadas de cada clase"""
+    plt = get_pyplot()
+
+    fig = plt.figure(figsize=figsize)
+    for (fpr, tpr, roc_auc), class_name in zip(curves['roc'], class_names):
+        plt.plot(fpr, tpr, lw=2, label=f'{class_name} (AUC = {roc_auc:.2f})')
+
+    plt.plot([0, 1], [0, 1], 'k--', lw=2)
+    plt.xlim([0.0, 1.0])
+    plt.ylim([0.0, 1.05])
+    plt.xlabel('Tasa de Falsos Positivos')
+    plt.ylabel('Tasa de Verdaderos Positivos')
+    plt.title(title)
+    plt.legend(loc="lower right")
+    return _finish(fig, path, close)
+
+
+def render_precision_recall_curves(curves, class_names, title, path=None, figsize=(10, 8), close=False):
+    """Curvas precisión-recall precalculadas de cada clase"""
+    plt = get_pyplot()
+
+    fig = plt.figure(figsize=figsize)
+    for (recall, precision, pr_auc), class_name in zip(curves['pr'], class_names):
+        plt.plot(recall, precision, lw=2, label=f'{class_name} (AUC = {pr_auc:.2f})')
+
+    plt.xlim([0.0, 1.0])
+    plt.ylim([0.0, 1.05])
+    plt.xlabel('Recall')
+    plt.ylabel('Precisión')
+    plt.title(title)
+    plt.legend(loc="lower left")
+    return _finish(fig, path, close)
+
+
+def render_confidence_distribution(max_probs, title, path=None, bins=20, figsize=(10, 6), close=False):
+    """Histograma de la probabilidad máxima de cada predicción"""
+    plt = get_pyplot()
+
+    fig = plt.figure(figsize=figsize)
+    plt.hist(max_probs, bins=bins, color='skyblue', edgecolor='black', alpha=0.7)
+    plt.axvline(x=0.6, color='red', linestyle='--', label='Umbral de confianza (0.6)')
+    plt.axvline(x=0.8, color='green', linestyle='--', label='Umbral de alta confianza (0.8)')
+
+    plt.xlabel('Probabilidad máxima (confianza)')
+    plt.ylabel('Número de predicciones')
+    plt.title(title)
+    plt.legend()
+    plt.grid(alpha=0.3)
+    return _finish(fig, path, close)
+
+
+class ReportRenderer:
+    """
+    Renderiza figuras en un pool de procesos.
+
+    Cada figura es un trabajo independiente que recibe solo datos ya
+    calculados (matrices, curvas), de modo que quien evalúa no espera al
+    renderizado: recibe futures y sigue trabajando.
+    """
+
+    def __init__(self, max_workers=None):
+        """
+        Inicializa el renderizador.
+
+        Args:
+            max_workers (int, optional): Procesos del pool (por defecto, 4 como máximo)
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """Pool creado en el primer trabajo"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def submit(self, render_fn, *args, **kwargs):
+        """
+        Encola el renderizado de una figura.
+
+        Args:
+            render_fn (callable): Función render_* de este módulo
+            *args, **kwargs: Argumentos de la función (debe incluir `path`)
+
+        Returns:
+            concurrent.futures.Future: Ruta de la figura guardada
+        """
+        kwargs['close'] = True
+        future = self._get_executor().submit(render_fn, *args, **kwargs)
+        future.add_done_callback(self._log_result)
+        return future
+
+    @staticmethod
+    def _log_result(future):
+        """Registra el resultado de cada figura"""
+        if future.exception() is not None:
+            logger.error(f"Error renderizando figura: {future.exception()}")
+        else:
+            logger.info(f"Figura guardada: {future.result()}")
+
+    def shutdown(self, wait=True):
+        """Espera a las figuras pendientes (si `wait`) y cierra el pool"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+def get_renderer():
+    """Renderizador compartido del proceso (se vacía al salir)"""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ReportRenderer()
+            atexit.register(_renderer.shutdown)
+        return _renderer
@@ -0,0 +1,391 @@
+# models/scoreline.py
+import os
+import sys
+import logging
+import argparse
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+
+# Añadir directorio del servicio al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ratings import dixon_coles_tau
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.scoreline')
+
+MODELS = ('poisson', 'dixon_coles', 'bivariate')
+DEFAULT_MODEL = 'dixon_coles'
+
+# Goles máximos por equipo en la matriz (la masa restante se reparte al normalizar)
+MAX_GOALS = 10
+
+# Corrección de marcadores bajos si no hay una rho ajustada con los ratings
+DEFAULT_RHO = -0.05
+
+# Componente común (lambda3) del Poisson bivariante
+DEFAULT_COVARIANCE = 0.1
+
+OVER_UNDER_LINES = (0.5, 1.5, 2.5, 3.5, 4.5)
+
+# Mercados derivados de la matriz
+CORRECT_SCORE_MAX = 5          # marcadores exactos hasta 5-5; el resto es 'other'
+WINNING_MARGIN_MAX = 3         # márgenes 1, 2 y 3+
+TEAM_TOTAL_LINES = (0.5, 1.5, 2.5)
+
+# Parte de los goles esperados que se marca en la primera parte (HT/FT)
+HALF_TIME_SHARE = 0.45
+
+OUTCOME_LABELS = ('1', 'X', '2')
+
+# Partidos por bloque al evaluar (cada matriz ocupa (MAX_GOALS + 1)^2 floats)
+EVAL_CHUNK_SIZE = 50000
+
+
+def poisson_pmf(lambdas, max_goals=MAX_GOALS):
+    """
+    Probabilidades de 0..max_goals goles para un lote de medias.
+
+    Returns:
+        numpy.ndarray: Matriz (partidos, max_goals + 1)
+    """
+    lambdas = np.maximum(np.asarray(lambdas, dtype=float), 1e-10)[:, None]
+    goals = np.arange(max_goals + 1)
+    return np.exp(goals * np.log(lambdas) - lambdas - gammaln(goals + 1))
+
+
+@lru_cache(maxsize=None)
+def _grid(size):
+    """
+    Índices precalculados para una matriz de marcadores de lado `size`.
+
+    Las matrices indicadoras (celdas x total, celdas x diferencia) convierten
+    las sumas por antidiagonal y por diagonal en un producto de matrices.
+    """
+    home_goals, away_goals = np.indices((size, size))
+    totals = (home_goals + away_goals).ravel()
+    differences = (home_goals - away_goals).ravel() + size - 1
+    return {
+        'home_goals': home_goals,
+        'away_goals': away_goals,
+        'home_win': (home_goals > away_goals).ravel().astype(float),
+        'draw': (home_goals == away_goals).ravel().astype(float),
+        'away_win': (home_goals < away_goals).ravel().astype(float),
+        'total': np.eye(2 * size - 1)[totals],
+        'difference': np.eye(2 * size - 1)[differences]
+    }
+
+
+def scoreline_matrix(lambda_home, lambda_away, model=DEFAULT_MODEL, rho=DEFAULT_RHO,
+                     covariance=DEFAULT_COVARIANCE, max_goals=MAX_GOALS):
+    """
+    Probabilidad de cada marcador para un lote de partidos.
+
+    Args:
+        lambda_home (array-like): Goles esperados del local
+        lambda_away (array-like): Goles esperados del visitante
+        model (str): 'poisson' (independientes), 'dixon_coles' (corrección
+            tau de los marcadores bajos) o 'bivariate' (Poisson bivariante)
+        rho (float): Parámetro de Dixon-Coles
+        covariance (float): Componente común del Poisson bivariante
+        max_goals (int): Goles máximos por equipo
+
+    Returns:
+        numpy.ndarray: Matrices (partidos, max_goals + 1, max_goals + 1) que suman 1;
+            [i, j] es la probabilidad de i goles del local y j del visitante
+    """
+    if model not in MODELS:
+        raise ValueError(f"Modelo de marcadores desconocido: {model} (opciones: {', '.join(MODELS)})")
+
+    lambda_home = np.atleast_1d(np.asarray(lambda_home, dtype=float))
+    lambda_away = np.atleast_1d(np.asarray(lambda_away, dtype=float))
+
+    if model == 'bivariate':
+        # X = X1 + Z, Y = X2 + Z con Z ~ Poisson(lambda3): mismas medias, goles correlados
+        shared = np.minimum(covariance, 0.9 * np.minimum(lambda_home, lambda_away))
+        home_pmf = poisson_pmf(lambda_home - shared, max_goals)
+        away_pmf = poisson_pmf(lambda_away - shared, max_goals)
+        shared_pmf = poisson_pmf(shared, max_goals)
+        independent = home_pmf[:, :, None] * away_pmf[:, None, :]
+        matrix = shared_pmf[:, 0, None, None] * independent
+        for k in range(1, max_goals + 1):
+            matrix[:, k:, k:] += shared_pmf[:, k, None, None] * independent[:, :-k, :-k]
+    else:
+        matrix = poisson_pmf(lambda_home, max_goals)[:, :, None] * poisson_pmf(lambda_away, max_goals)[:, None, :]
+        if model == 'dixon_coles':
+            grid = _grid(2)
+            matrix[:, :2, :2] *= np.maximum(dixon_coles_tau(
+                grid['home_goals'], grid['away_goals'],
+                lambda_home[:, None, None], lambda_away[:, None, None], rho
+            ), 0)
+
+    return matrix / matrix.sum(axis=(1, 2), keepdims=True)
+
+
+def _flat(matrix):
+    """Matrices aplanadas (partidos, celdas) y su lado"""
+    matrix = np.asarray(matrix)
+    if matrix.ndim == 2:
+        matrix = matrix[None]
+    return matrix.reshape(len(matrix), -1), matrix.shape[-1]
+
+
+def outcome_probabilities(matrix):
+    """Probabilidades 1X2: (partidos, 3) con local, empate y visitante"""
+    flat, size = _flat(matrix)
+    grid = _grid(size)
+    return np.column_stack([flat @ grid['home_win'], flat @ grid['draw'], flat @ grid['away_win']])
+
+
+def total_goals_distribution(matrix):
+    """Probabilidad de cada total de goles: (partidos, 2 * lado - 1)"""
+    flat, size = _flat(matrix)
+    return flat @ _grid(size)['total']
+
+
+def goal_difference_distribution(matrix):
+    """
+    Probabilidad de cada diferencia local - visitante (sumas por diagonal).
+
+    Returns:
+        numpy.ndarray: (partidos, 2 * lado - 1); la columna c es la diferencia c - (lado - 1)
+    """
+    flat, size = _flat(matrix)
+    return flat @ _grid(size)['difference']
+
+
+def over_under(matrix, lines=OVER_UNDER_LINES):
+    """
+    Probabilidad de más goles que cada línea (.5).
+
+    Returns:
+        dict: Línea -> array de probabilidades del over
+    """
+    cumulative = np.cumsum(total_goals_distribution(matrix), axis=1)
+    return {line: 1 - cumulative[:, int(np.floor(line))] for line in lines}
+
+
+def both_teams_score(matrix):
+    """Probabilidad de que marquen los dos equipos"""
+    matrix = np.asarray(matrix)
+    if matrix.ndim == 2:
+        matrix = matrix[None]
+    return 1 - matrix[:, 0, :].sum(axis=1) - matrix[:, :, 0].sum(axis=1) + matrix[:, 0, 0]
+
+
+def _outcome_of(difference):
+    """Clase 1X2 (0 local, 1 empate, 2 visitante) de una diferencia de goles"""
+    return np.select([difference > 0, difference == 0], [0, 1], default=2)
+
+
+@lru_cache(maxsize=None)
+def _exotic_masks(size):
+    """
+    Máscaras de los mercados derivados para matrices de lado `size`.
+
+    Se calculan una vez por tamaño; cada mercado es después un producto de
+    las distribuciones del lote por su máscara.
+    """
+    differences = np.arange(-(size - 1), size)
+
+    # Margen de victoria: local por 1..N+, empate, visitante por 1..N+
+    margin = np.minimum(np.abs(differences), WINNING_MARGIN_MAX)
+    margin_labels = ([f'home_{m}' for m in range(1, WINNING_MARGIN_MAX)] + [f'home_{WINNING_MARGIN_MAX}+', 'draw']
+                     + [f'away_{m}' for m in range(1, WINNING_MARGIN_MAX)] + [f'away_{WINNING_MARGIN_MAX}+'])
+    margin_column = np.where(differences > 0, margin - 1,
+                             np.where(differences == 0, WINNING_MARGIN_MAX, WINNING_MARGIN_MAX + margin))
+    margin_mask = np.eye(len(margin_labels))[margin_column]
+
+    # HT/FT: (diferencia 1ª parte, diferencia 2ª parte) -> (resultado al descanso, resultado final)
+    first, second = np.meshgrid(differences, differences, indexing='ij')
+    rows, columns = np.indices(first.shape)
+    ht_ft_mask = np.zeros((3, 3) + first.shape)
+    ht_ft_mask[_outcome_of(first), _outcome_of(first + second), rows, columns] = 1
+
+    return {
+        'differences': differences,
+        'margin_labels': margin_labels,
+        'margin': margin_mask,
+        'ht_ft': ht_ft_mask
+    }
+
+
+def half_time_full_time(lambda_home, lambda_away, half_time_share=HALF_TIME_SHARE, max_goals=MAX_GOALS):
+    """
+    Probabilidades HT/FT suponiendo goles de cada parte independientes.
+
+    Returns:
+        numpy.ndarray: (partidos, 3, 3) con [resultado al descanso, resultado final]
+    """
+    lambda_home = np.atleast_1d(np.asarray(lambda_home, dtype=float))
+    lambda_away = np.atleast_1d(np.asarray(lambda_away, dtype=float))
+    first_half = goal_difference_distribution(scoreline_matrix(
+        lambda_home * half_time_share, lambda_away * half_time_share, model='poisson', max_goals=max_goals
+    ))
+    second_half = goal_difference_distribution(scoreline_matrix(
+        lambda_home * (1 - half_time_share), lambda_away * (1 - half_time_share), model='poisson', max_goals=max_goals
+    ))
+    mask = _exotic_masks(max_goals + 1)['ht_ft']
+    width = mask.shape[-1]
+    by_first_half = (second_half @ mask.reshape(-1, width).T).reshape(len(first_half), 9, width)
+    return (by_first_half * first_half[:, None, :]).sum(axis=2).reshape(-1, 3, 3)
+
+
+def exotic_markets(matrix, lambda_home, lambda_away):
+    """
+    Mercados derivados de la matriz de marcadores de un lote de partidos.
+
+    Incluye resultado exacto, margen de victoria, HT/FT, totales por
+    equipo, doble oportunidad y empate no válido (el hándicap asiático está
+    en models/handicap.py). Todo sale de las distribuciones marginales, de
+    diferencia y 1X2 del lote multiplicadas por máscaras precalculadas.
+
+    Args:
+        matrix (numpy.ndarray): Matrices (partidos, lado, lado)
+        lambda_home (array-like): Goles esperados del local (para HT/FT)
+        lambda_away (array-like): Goles esperados del visitante (para HT/FT)
+
+    Returns:
+        dict: Mercado -> selección -> array de probabilidades del lote
+    """
+    matrix = np.asarray(matrix)
+    if matrix.ndim == 2:
+        matrix = matrix[None]
+    size = matrix.shape[-1]
+    masks = _exotic_masks(size)
+    outcomes = outcome_probabilities(matrix)
+    differences = goal_difference_distribution(matrix)
+
+    # Resultado exacto
+    shown = min(CORRECT_SCORE_MAX + 1, size)
+    scores = matrix[:, :shown, :shown]
+    correct_score = {f'{i}-{j}': scores[:, i, j] for i in range(shown) for j in range(shown)}
+    correct_score['other'] = 1 - scores.sum(axis=(1, 2))
+
+    # Margen de victoria
+    margins = differences @ masks['margin']
+    winning_margin = {label: margins[:, k] for k, label in enumerate(masks['margin_labels'])}
+
+    # HT/FT (reescalado para que el resultado final coincida con el 1X2 de la matriz)
+    ht_ft = half_time_full_time(lambda_home, lambda_away, max_goals=size - 1)
+    ht_ft *= (outcomes / np.maximum(ht_ft.sum(axis=1), 1e-15))[:, None, :]
+    half_time_full_time_market = {
+        f'{OUTCOME_LABELS[a]}/{OUTCOME_LABELS[b]}': ht_ft[:, a, b] for a in range(3) for b in range(3)
+    }
+
+    # Totales por equipo
+    team_totals = {}
+    for side, marginal in (('home', matrix.sum(axis=2)), ('away', matrix.sum(axis=1))):
+        cumulative = np.cumsum(marginal, axis=1)
+        for line in TEAM_TOTAL_LINES:
+            over = 1 - cumulative[:, int(np.floor(line))]
+            label = str(line).replace('.', '_')
+            team_totals[f'{side}_over_{label}'] = over
+            team_totals[f'{side}_under_{label}'] = 1 - over
+
+    # Doble oportunidad y empate no válido
+    double_chance = {
+        '1X': outcomes[:, 0] + outcomes[:, 1],
+        'X2': outcomes[:, 1] + outcomes[:, 2],
+        '12': outcomes[:, 0] + outcomes[:, 2]
+    }
+    decisive = np.maximum(outcomes[:, 0] + outcomes[:, 2], 1e-15)
+    draw_no_bet = {'home': outcomes[:, 0] / decisive, 'away': outcomes[:, 2] / decisive}
+
+    return {
+        'correct_score': correct_score,
+        'winning_margin': winning_margin,
+        'ht_ft': half_time_full_time_market,
+        'team_totals': team_totals,
+        'double_chance': double_chance,
+        'draw_no_bet': draw_no_bet
+    }
+
+
+def select_match(markets, index=0, decimals=3):
+    """Mercados de un partido del lote (floats redondeados, listos para JSON)"""
+    if isinstance(markets, dict):
+        return {key: select_match(value, index, decimals) for key, value in markets.items()}
+    return round(float(markets[index]), decimals)
+
+
+def score_log_likelihood(matrix, home_goals, away_goals):
+    """Log-probabilidad del marcador observado de cada partido (fuera de la matriz: el último)"""
+    matrix = np.asarray(matrix)
+    last = matrix.shape[-1] - 1
+    home_goals = np.minimum(np.asarray(home_goals, dtype=np.int64), last)
+    away_goals = np.minimum(np.asarray(away_goals, dtype=np.int64), last)
+    return np.log(np.maximum(matrix[np.arange(len(matrix)), home_goals, away_goals], 1e-15))
+
+
+def compare_models(lambda_home, lambda_away, home_goals, away_goals, rho=DEFAULT_RHO,
+                   covariance=DEFAULT_COVARIANCE, max_goals=MAX_GOALS):
+    """
+    Compara las variantes sobre partidos jugados (por bloques vectorizados).
+
+    Returns:
+        pandas.DataFrame: Log-verosimilitud media del marcador, log-loss 1X2
+            y Brier 1X2 de cada modelo
+    """
+    home_goals = np.asarray(home_goals, dtype=np.int64)
+    away_goals = np.asarray(away_goals, dtype=np.int64)
+    outcome = np.select([home_goals > away_goals, home_goals == away_goals], [0, 1], default=2)
+    rows = []
+    for model in MODELS:
+        score_ll, log_loss, brier = 0.0, 0.0, 0.0
+        for start in range(0, len(home_goals), EVAL_CHUNK_SIZE):
+            chunk = slice(start, start + EVAL_CHUNK_SIZE)
+            matrix = scoreline_matrix(lambda_home[chunk], lambda_away[chunk], model, rho, covariance, max_goals)
+            probabilities = outcome_probabilities(matrix)
+            observed = np.eye(3)[outcome[chunk]]
+            score_ll += score_log_likelihood(matrix, home_goals[chunk], away_goals[chunk]).sum()
+            log_loss -= np.log(np.maximum((probabilities * observed).sum(axis=1), 1e-15)).sum()
+            brier += ((probabilities - observed) ** 2).sum()
+        rows.append({
+            'model': model,
+            'score_log_likelihood': score_ll / len(home_goals),
+            'log_loss_1x2': log_loss / len(home_goals),
+            'brier_1x2': brier / len(home_goals)
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    """Compara los modelos de marcador con los ratings publicados"""
+    from models.ratings import RATINGS_PATH, RatingsEngine
+    from utils.match_dataset import load_matches
+
+    parser = argparse.ArgumentParser(description='Comparación de modelos de marcador sobre el histórico')
+    parser.add_argument('--data', '-d', help='Dataset Parquet o CSV de partidos (por defecto el histórico local)')
+    parser.add_argument('--ratings', default=RATINGS_PATH, help='Tabla de ratings publicada')
+    parser.add_argument('--date-from', help='Evaluar solo partidos desde esta fecha (YYYY-MM-DD)')
+    parser.add_argument('--covariance', type=float, default=DEFAULT_COVARIANCE,
+                        help='Componente común del Poisson bivariante')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    engine = RatingsEngine.load(args.ratings)
+    df = load_matches(args.data, columns=['date', 'home_team', 'away_team', 'home_goals', 'away_goals'],
+                      date_from=args.date_from)
+    attack = pd.Series({name: rating['attack'] for name, rating in engine.teams.items()}, dtype=float)
+    defense = pd.Series({name: rating['defense'] for name, rating in engine.teams.items()}, dtype=float)
+
+    lambda_home = np.exp(engine.mu + engine.home_advantage
+                         + df['home_team'].map(attack).fillna(0).to_numpy()
+                         - df['away_team'].map(defense).fillna(0).to_numpy())
+    lambda_away = np.exp(engine.mu
+                         + df['away_team'].map(attack).fillna(0).to_numpy()
+                         - df['home_team'].map(defense).fillna(0).to_numpy())
+
+    report = compare_models(lambda_home, lambda_away, df['home_goals'], df['away_goals'],
+                            rho=engine.rho, covariance=args.covariance)
+    print(f"Partidos evaluados: {len(df)} (rho {engine.rho:.3f})")
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+# models/streaming_metrics.py
+import os
+import glob
+import json
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.streaming_metrics')
+
+RESULT_CLASSES = ('H', 'D', 'A')
+
+# Intervalos de probabilidad para la tabla de calibración y para el AUC aproximado
+CALIBRATION_BINS = 10
+AUC_BINS = 200
+
+EPSILON = 1e-15
+
+
+class StreamingMetrics:
+    """
+    Acumuladores de evaluación que se actualizan partido a partido.
+
+    Solo guarda contadores de tamaño fijo (matriz de confusión, sumas de
+    Brier y log-loss, histogramas de probabilidad por clase), así que cada
+    predicción liquidada cuesta O(n_clases) sin importar cuántas se hayan
+    visto y dos acumuladores se combinan sumando sus contadores (p.ej. los
+    de varios workers).
+
+    El AUC de cada clase se aproxima con histogramas de la probabilidad en
+    positivos y negativos: cuenta los pares ordenados entre intervalos y
+    la mitad de los pares dentro del mismo intervalo.
+    """
+
+    def __init__(self, classes=RESULT_CLASSES, calibration_bins=CALIBRATION_BINS, auc_bins=AUC_BINS):
+        """
+        Inicializa los acumuladores vacíos.
+
+        Args:
+            classes (tuple): Clases en el orden de las columnas de probabilidad
+            calibration_bins (int): Intervalos de la tabla de calibración
+            auc_bins (int): Intervalos de los histogramas del AUC
+        """
+        self.classes = tuple(classes)
+        self.calibration_bins = calibration_bins
+        self.auc_bins = auc_bins
+        self._class_index = {cls: i for i, cls in enumerate(self.classes)}
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Vacía todos los acumuladores"""
+        k = len(self.classes)
+        self.count = 0
+        self.confusion = np.zeros((k, k), dtype=np.int64)
+        self.brier_sum = 0.0
+        self.log_loss_sum = 0.0
+        # Calibración de la clase predicha: predicciones, suma de confianza y aciertos por intervalo
+        self.calibration_count = np.zeros(self.calibration_bins, dtype=np.int64)
+        self.calibration_confidence = np.zeros(self.calibration_bins)
+        self.calibration_hits = np.zeros(self.calibration_bins, dtype=np.int64)
+        # Histogramas de probabilidad por clase en positivos y negativos (AUC)
+        self.auc_positive = np.zeros((k, self.auc_bins), dtype=np.int64)
+        self.auc_negative = np.zeros((k, self.auc_bins), dtype=np.int64)
+
+    def _bins(self, proba, n_bins):
+        """Intervalo de cada probabilidad en [0, 1] dividido en n_bins"""
+        return np.minimum((np.asarray(proba) * n_bins).astype(np.int64), n_bins - 1)
+
+    def update(self, y_true, proba):
+        """
+        Añade una predicción liquidada.
+
+        Args:
+            y_true: Resultado real (etiqueta de `classes` o su índice)
+            proba (array-like): Probabilidad de cada clase
+        """
+        self.update_batch([y_true], np.asarray(proba, dtype=np.float64)[None, :])
+
+    def update_batch(self, y_true, proba):
+        """
+        Añade varias predicciones liquidadas con operaciones vectorizadas.
+
+        Args:
+            y_true (array-like): Resultados reales (etiquetas o índices)
+            proba (numpy.ndarray): Probabilidades (n, n_clases)
+        """
+        proba = np.clip(np.asarray(proba, dtype=np.float64), 0.0, 1.0)
+        y_idx = np.array([self._class_index.get(y, y) for y in y_true], dtype=np.int64)
+        k = len(self.classes)
+        n = len(y_idx)
+        rows = np.arange(n)
+
+        pred_idx = proba.argmax(axis=1)
+        confidence = proba[rows, pred_idx]
+        onehot = np.zeros_like(proba)
+        onehot[rows, y_idx] = 1.0
+
+        calibration_bin = self._bins(confidence, self.calibration_bins)
+        auc_bin = self._bins(proba, self.auc_bins)
+        # Índice plano (clase, intervalo) para contar todas las clases en una pasada
+        flat = (np.arange(k) * self.auc_bins + auc_bin).ravel()
+        positive = onehot.ravel().astype(bool)
+
+        with self._lock:
+            self.count += n
+            self.confusion += np.bincount(y_idx * k + pred_idx, minlength=k * k).reshape(k, k)
+            self.brier_sum += float(((proba - onehot) ** 2).sum())
+            self.log_loss_sum += float(-np.log(np.maximum(proba[rows, y_idx], EPSILON)).sum())
+
+            self.calibration_count += np.bincount(calibration_bin, minlength=self.calibration_bins)
+            self.calibration_confidence += np.bincount(
+                calibration_bin, weights=confidence, minlength=self.calibration_bins
+            )
+            self.calibration_hits += np.bincount(
+                calibration_bin, weights=pred_idx == y_idx, minlength=self.calibration_bins
+            ).astype(np.int64)
+
+            size = k * self.auc_bins
+            self.auc_positive += np.bincount(flat[positive], minlength=size).reshape(k, self.auc_bins)
+            self.auc_negative += np.bincount(flat[~positive], minlength=size).reshape(k, self.auc_bins)
+
+    def merge(self, other):
+        """
+        Suma los acumuladores de otra instancia (mismas clases e intervalos).
+
+        Returns:
+            StreamingMetrics: Esta instancia, ya combinada
+        """
+        if (other.classes, other.calibration_bins, other.auc_bins) != \
+                (self.classes, self.calibration_bins, self.auc_bins):
+            raise ValueError("Solo se pueden combinar acumuladores con las mismas clases e intervalos")
+
+        with self._lock:
+            self.count += other.count
+            self.confusion += other.confusion
+            self.brier_sum += other.brier_sum
+            self.log_loss_sum += other.log_loss_sum
+            self.calibration_count += other.calibration_count
+            self.calibration_confidence += other.calibration_confidence
+            self.calibration_hits += other.calibration_hits
+            self.auc_positive += other.auc_positive
+            self.auc_negative += other.auc_negative
+        return self
+
+    def _auc(self):
+        """AUC one-vs-rest aproximado de cada clase a partir de los histogramas"""
+        positives = self.auc_positive.sum(axis=1)
+        negatives = self.auc_negative.sum(axis=1)
+        # Negativos con probabilidad en un intervalo inferior al de cada positivo
+        negatives_below = np.cumsum(self.auc_negative, axis=1) - self.auc_negative
+        pairs = (self.auc_positive * (negatives_below + 0.5 * self.auc_negative)).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(positives * negatives > 0, pairs / (positives * negatives), np.nan)
+
+    def calibration_table(self):
+        """
+        Tabla de fiabilidad de la clase predicha.
+
+        Returns:
+            pandas.DataFrame: Por intervalo: predicciones, confianza media y acierto real
+        """
+        edges = np.linspace(0.0, 1.0, self.calibration_bins + 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_confidence = self.calibration_confidence / self.calibration_count
+            accuracy = self.calibration_hits / self.calibration_count
+        return pd.DataFrame({
+            'bin_start': edges[:-1],
+            'bin_end': edges[1:],
+            'count': self.calibration_count,
+            'mean_confidence': mean_confidence,
+            'accuracy': accuracy
+        })
+
+    def metrics(self):
+        """
+        Métricas actuales calculadas a partir de los acumuladores.
+
+        Returns:
+            dict: Accuracy, Brier, log-loss, ECE y métricas por clase
+        """
+        with self._lock:
+            if self.count == 0:
+                return {'count': 0}
+
+            true_counts = self.confusion.sum(axis=1)
+            predicted_counts = self.confusion.sum(axis=0)
+            hits = np.diag(self.confusion)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                precision = np.where(predicted_counts > 0, hits / predicted_counts, 0.0)
+                recall = np.where(true_counts > 0, hits / true_counts, 0.0)
+                f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+            auc = self._auc()
+
+            gap = np.abs(self.calibration_confidence - self.calibration_hits)
+            ece = float(gap.sum() / self.count)
+
+            return {
+                'count': int(self.count),
+                'accuracy': float(hits.sum() / self.count),
+                'brier_score': self.brier_sum / self.count,
+                'log_loss': self.log_loss_sum / self.count,
+                'expected_calibration_error': ece,
+                'confusion_matrix': self.confusion.tolist(),
+                'class_metrics': {
+                    cls: {
+                        'support': int(true_counts[i]),
+                        'predicted': int(predicted_counts[i]),
+                        'precision': float(precision[i]),
+                        'recall': float(recall[i]),
+                        'f1-score': float(f1[i]),
+                        'roc_auc': None if np.isnan(auc[i]) else float(auc[i])
+                    } for i, cls in enumerate(self.classes)
+                }
+            }
+
+    def to_dict(self):
+        """Estado serializable en JSON (para guardar o enviar entre procesos)"""
+        with self._lock:
+            return {
+                'classes': list(self.classes),
+                'calibration_bins': self.calibration_bins,
+                'auc_bins': self.auc_bins,
+                'count': self.count,
+                'confusion': self.confusion.tolist(),
+                'brier_sum': self.brier_sum,
+                'log_loss_sum': self.log_loss_sum,
+                'calibration_count': self.calibration_count.tolist(),
+                'calibration_confidence': self.calibration_confidence.tolist(),
+                'calibration_hits': self.calibration_hits.tolist(),
+                'auc_positive': self.auc_positive.tolist(),
+                'auc_negative': self.auc_negative.tolist()
+            }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Reconstruye un acumulador a partir de to_dict()"""
+        metrics = cls(state['classes'], state['calibration_bins'], state['auc_bins'])
+        metrics.count = int(state['count'])
+        metrics.confusion = np.asarray(state['confusion'], dtype=np.int64)
+        metrics.brier_sum = float(state['brier_sum'])
+        metrics.log_loss_sum = float(state['log_loss_sum'])
+        metrics.calibration_count = np.asarray(state['calibration_count'], dtype=np.int64)
+        metrics.calibration_confidence = np.asarray(state['calibration_confidence'], dtype=np.float64)
+        metrics.calibration_hits = np.asarray(state['calibration_hits'], dtype=np.int64)
+        metrics.auc_positive = np.asarray(state['auc_positive'], dtype=np.int64)
+        metrics.auc_negative = np.asarray(state['auc_negative'], dtype=np.int64)
+        return metrics
+
+    def save(self, path):
+        """Guarda el estado de forma atómica"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Carga un estado guardado con save()"""
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+
+def merge_snapshots(directory, pattern='*.json', base=None):
+    """
+    Combina los estados guardados en un directorio (uno por worker).
+
+    Args:
+        directory (str): Directorio de estados
+        pattern (str): Patrón de los ficheros
+        base (StreamingMetrics, optional): Acumulador al que sumar (no se modifica)
+
+    Returns:
+        StreamingMetrics: Acumulador combinado
+    """
+    merged = StreamingMetrics.from_dict(base.to_dict()) if base is not None else None
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        try:
+            snapshot = StreamingMetrics.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Estado de métricas ignorado ({path}): {str(e)}")
+            continue
+        merged = snapshot if merged is None else merged.merge(snapshot)
+    return merged if merged is not None else StreamingMetrics()
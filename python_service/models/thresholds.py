@@ -0,0 +1,288 @@
+# models/thresholds.py
+import logging
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.thresholds')
+
+# Umbrales candidatos por clase (los mismos que usaba el validador)
+DEFAULT_THRESHOLDS = np.linspace(0.1, 0.9, 50)
+
+# Rejilla para la búsqueda conjunta de umbrales (len(grid) ** n_clases combinaciones)
+DEFAULT_JOINT_GRID = np.linspace(0.2, 0.7, 21)
+
+OBJECTIVES = ('f1', 'accuracy', 'roi')
+
+
+def _class_indices(y, classes):
+    """Posición de cada etiqueta en `classes` (-1 si no está)"""
+    return pd.Index(classes).get_indexer(np.asarray(y))
+
+
+def threshold_curve(scores, y_binary, thresholds=DEFAULT_THRESHOLDS, odds=None):
+    """
+    Métricas de "predecir positivo si score >= umbral" para todos los umbrales.
+
+    Las probabilidades se ordenan una sola vez; aciertos y beneficio se
+    obtienen con sumas acumuladas y cada umbral se resuelve con una búsqueda
+    binaria, de modo que el coste es O(n log n + m log n).
+
+    Args:
+        scores (array-like): Probabilidad de la clase positiva
+        y_binary (array-like): 1 si la clase real es la positiva
+        thresholds (array-like): Umbrales candidatos
+        odds (array-like, optional): Cuota de la clase positiva en cada fila
+
+    Returns:
+        dict: Arrays por umbral: n_pred, tp, precision, f1 y, con cuotas,
+            profit y roi
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    y_binary = np.asarray(y_binary).astype(bool)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    order = np.argsort(-scores, kind='stable')
+    descending = -scores[order]  # ascendente: apto para searchsorted
+
+    # Filas con score >= t = prefijo de longitud n_pred en orden descendente
+    n_pred = np.searchsorted(descending, -thresholds, side='right')
+    tp = np.concatenate(([0], np.cumsum(y_binary[order])))[n_pred]
+    positives = y_binary.sum()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(n_pred > 0, tp / n_pred, 0.0)
+        f1 = np.where(n_pred + positives > 0, 2.0 * tp / (n_pred + positives), 0.0)
+
+    curve = {
+        'thresholds': thresholds,
+        'n_pred': n_pred,
+        'tp': tp,
+        'precision': precision,
+        'f1': f1
+    }
+
+    if odds is not None:
+        odds = np.asarray(odds, dtype=np.float64)
+        profit_per_bet = np.where(y_binary, odds - 1.0, -1.0)
+        profit = np.concatenate(([0.0], np.cumsum(profit_per_bet[order])))[n_pred]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            curve['profit'] = profit
+            curve['roi'] = np.where(n_pred > 0, profit / n_pred, 0.0)
+
+    return curve
+
+
+def optimize_class_thresholds(proba, y, classes, thresholds=DEFAULT_THRESHOLDS,
+                              objective='f1', odds=None, min_predictions=1):
+    """
+    Mejor umbral independiente para cada clase.
+
+    Args:
+        proba (numpy.ndarray): Probabilidades (n_muestras, n_clases)
+        y (array-like): Etiquetas reales
+        classes (array-like): Clases en el orden de las columnas de `proba`
+        thresholds (array-like): Umbrales candidatos
+        objective (str): 'f1' o 'roi'
+        odds (numpy.ndarray, optional): Cuotas (n_muestras, n_clases), necesarias para 'roi'
+        min_predictions (int): Mínimo de filas que deben superar el umbral
+
+    Returns:
+        tuple: (umbral por clase, valor del objetivo por clase)
+    """
+    if objective not in ('f1', 'roi'):
+        raise ValueError(f"Objetivo no soportado por clase: {objective}")
+    if objective == 'roi' and odds is None:
+        raise ValueError("El objetivo 'roi' necesita las cuotas de cada clase")
+
+    proba = np.asarray(proba, dtype=np.float64)
+    y = np.asarray(y)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    best_thresholds = {}
+    best_scores = {}
+
+    for i, cls in enumerate(classes):
+        curve = threshold_curve(
+            proba[:, i], y == cls, thresholds,
+            odds=None if odds is None else np.asarray(odds)[:, i]
+        )
+        metric = curve[objective]
+
+        # Con F1 solo cuentan mejoras sobre 0; el primer máximo gana (mismo criterio que el bucle original)
+        baseline = 0.0 if objective == 'f1' else -np.inf
+        valid = (curve['n_pred'] >= min_predictions) & (metric > baseline)
+
+        if valid.any():
+            idx = int(np.argmax(np.where(valid, metric, -np.inf)))
+            best_thresholds[cls] = float(thresholds[idx])
+            best_scores[cls] = float(metric[idx])
+        else:
+            best_thresholds[cls] = 0.5
+            best_scores[cls] = float(baseline) if objective == 'f1' else None
+
+    return best_thresholds, best_scores
+
+
+def predict_with_thresholds(proba, thresholds, classes):
+    """
+    Predicción con umbrales por clase.
+
+    Entre las clases que superan su umbral se elige la más probable; si
+    ninguna lo supera, la de mayor probabilidad.
+
+    Args:
+        proba (numpy.ndarray): Probabilidades (n_muestras, n_clases)
+        thresholds (dict or array-like): Umbral por clase
+        classes (array-like): Clases en el orden de las columnas de `proba`
+
+    Returns:
+        numpy.ndarray: Clases predichas
+    """
+    proba = np.asarray(proba, dtype=np.float64)
+    classes = np.asarray(classes)
+    if isinstance(thresholds, dict):
+        thresholds = [thresholds[cls] for cls in classes]
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    passing = proba >= thresholds
+    masked = np.where(passing, proba, -np.inf)
+    predicted = np.where(passing.any(axis=1), masked.argmax(axis=1), proba.argmax(axis=1))
+
+    return classes[predicted]
+
+
+def _pattern_counts(histogram, pattern, n_classes):
+    """
+    Cuenta, para todas las combinaciones de umbrales a la vez, las filas cuyo
+    patrón "supera / no supera" coincide con `pattern`.
+
+    `histogram` tiene un eje por clase con el índice de rejilla k (número de
+    umbrales <= probabilidad); la clase j supera el umbral g_j si k > g_j.
+    """
+    counts = histogram
+    lead = counts.ndim - n_classes
+    for j in range(n_classes):
+        axis = lead + j
+        if pattern[j]:
+            # k > g  ->  suma desde g + 1 hasta el final
+            suffix = np.flip(np.cumsum(np.flip(counts, axis=axis), axis=axis), axis=axis)
+            counts = np.take(suffix, np.arange(1, suffix.shape[axis]), axis=axis)
+        else:
+            # k <= g ->  suma desde 0 hasta g
+            prefix = np.cumsum(counts, axis=axis)
+            counts = np.take(prefix, np.arange(prefix.shape[axis] - 1), axis=axis)
+    return counts
+
+
+def joint_threshold_search(proba, y, classes, grid=DEFAULT_JOINT_GRID, objective='accuracy',
+                           odds=None, min_bets=1):
+    """
+    Búsqueda conjunta de umbrales sobre una rejilla (todas las combinaciones).
+
+    En lugar de predecir cada combinación, cada fila se resume en su celda de
+    rejilla por clase, el orden de sus probabilidades y su clase real. Un
+    histograma de esas celdas (una pasada con bincount) y sumas acumuladas por
+    eje dan, por difusión, la matriz de confusión de todas las combinaciones.
+    El coste es O(n + len(grid) ** n_clases).
+
+    Args:
+        proba (numpy.ndarray): Probabilidades (n_muestras, n_clases)
+        y (array-like): Etiquetas reales
+        classes (array-like): Clases en el orden de las columnas de `proba`
+        grid (array-like): Umbrales candidatos (comunes a todas las clases)
+        objective (str): 'accuracy', 'f1' (ponderado) o 'roi'
+        odds (numpy.ndarray, optional): Cuotas (n_muestras, n_clases), necesarias para 'roi'
+        min_bets (int): Mínimo de apuestas para aceptar una combinación ('roi')
+
+    Returns:
+        dict: Umbrales por clase, valor del objetivo y tabla completa de valores
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Objetivo no soportado: {objective}. Opciones: {', '.join(OBJECTIVES)}")
+    if objective == 'roi' and odds is None:
+        raise ValueError("El objetivo 'roi' necesita las cuotas de cada clase")
+
+    proba = np.asarray(proba, dtype=np.float64)
+    grid = np.asarray(grid, dtype=np.float64)
+    classes = np.asarray(classes)
+    n_classes = len(classes)
+    n_grid = len(grid)
+
+    y_idx = _class_indices(y, classes)
+    known = y_idx >= 0
+    proba, y_idx = proba[known], y_idx[known]
+
+    # Celda de rejilla de cada probabilidad: la clase j supera grid[g] si k > g
+    cells = np.searchsorted(grid, proba, side='right')
+
+    # Orden de las clases por probabilidad (desempate: menor índice primero)
+    order = np.argsort(-proba, axis=1, kind='stable')
+    permutations = list(itertools.permutations(range(n_classes)))
+    perm_lookup = {perm: p for p, perm in enumerate(permutations)}
+    perm_code = np.zeros(len(proba), dtype=np.int64)
+    for j in range(n_classes):
+        perm_code = perm_code * n_classes + order[:, j]
+    code_to_perm = np.full(n_classes ** n_classes, -1, dtype=np.int64)
+    for perm, p in perm_lookup.items():
+        code = 0
+        for c in perm:
+            code = code * n_classes + c
+        code_to_perm[code] = p
+    perm_idx = code_to_perm[perm_code]
+
+    # Histograma (permutación, clase real, celda_0, ..., celda_{k-1})
+    shape = (len(permutations), n_classes) + (n_grid + 1,) * n_classes
+    flat = np.ravel_multi_index((perm_idx, y_idx) + tuple(cells.T), shape)
+    histogram = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape).astype(np.float64)
+
+    if objective == 'roi':
+        odds = np.asarray(odds, dtype=np.float64)[known]
+        won_odds = odds[np.arange(len(odds)), y_idx]
+        odds_histogram = np.bincount(flat, weights=won_odds, minlength=int(np.prod(shape))).reshape(shape)
+
+    combo_shape = (n_grid,) * n_classes
+    confusion = np.zeros((n_classes, n_classes) + combo_shape)
+    bets = np.zeros(combo_shape)
+    profit = np.zeros(combo_shape)
+
+    for pattern in itertools.product((False, True), repeat=n_classes):
+        counts = _pattern_counts(histogram, pattern, n_classes)
+        if objective == 'roi' and any(pattern):
+            won = _pattern_counts(odds_histogram, pattern, n_classes)
+
+        for p, perm in enumerate(permutations):
+            # Clase más probable entre las que superan su umbral (o la más probable)
+            predicted = next((c for c in perm if pattern[c]), perm[0])
+            confusion[:, predicted] += counts[p]
+
+            if objective == 'roi' and any(pattern):
+                bets += counts[p].sum(axis=0)
+                profit += won[p, predicted] - counts[p].sum(axis=0)
+
+    total = confusion.sum(axis=(0, 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if objective == 'accuracy':
+            values = np.trace(confusion) / total
+        elif objective == 'f1':
+            true_positive = np.einsum('ii...->i...', confusion)
+            support = confusion.sum(axis=1)
+            predicted_count = confusion.sum(axis=0)
+            f1_per_class = np.where(support + predicted_count > 0,
+                                    2.0 * true_positive / (support + predicted_count), 0.0)
+            values = (f1_per_class * support).sum(axis=0) / total
+        else:
+            values = np.where(bets >= min_bets, profit / bets, -np.inf)
+
+    values = np.nan_to_num(values, nan=-np.inf)
+    best = np.unravel_index(int(np.argmax(values)), combo_shape)
+
+    return {
+        'thresholds': {cls: float(grid[g]) for cls, g in zip(classes, best)},
+        'score': float(values[best]),
+        'objective': objective,
+        'grid': grid,
+        'values': values
+    }
@@ -1,24 +1,37 @@
 #!/usr/bin/env python3
 import pandas as pd
 import numpy as np
-import joblib
 import logging
 from datetime import datetime
 import json
+from pathlib import Path
+
+from models.artifacts import load_artifact
+from models.calibration import load_calibrator
+from models.encoding import UNKNOWN_ID, load_encoding_tables
+from models.registry import active_artifact, get_model_handle
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('match_predictor')
 
 class MatchPredictor:
-    def __init__(self, model_path='models/saved/football_predictor.joblib'):
-        """Inicializa el predictor con el modelo entrenado"""
-        self.model_data = joblib.load(model_path)
-        self.model = self.model_data['model']
-        self.home_encoder = self.model_data['home_encoder']
-        self.away_encoder = self.model_data['away_encoder']
-        self.league_encoder = self.model_data['league_encoder']
-        self.feature_names = self.model_data['feature_names']
+    def __init__(self, model_path='models/saved/football_predictor.joblib', model_handle=None):
+        """
+        Inicializa el predictor con el modelo entrenado.
+
+        Si el registro de modelos tiene una versión activa con el artefacto
+        (mismo nombre de fichero), se sirve esa versión y se cambia a la
+        nueva en cuanto el registro promociona o revierte; si no, se usa
+        el fichero de `model_path`.
+        """
+        self.model_path = model_path
+        self.artifact_name = Path(model_path).stem
+        self.model_handle = model_handle or get_model_handle()
+        self._state = None
+
+        if self._refresh() is None:
+            self._bind(load_artifact(model_path), version=None)
         
         # Umbrales optimizados (valores por defecto)
         self.thresholds = {
@@ -26,10 +39,48 @@ class MatchPredictor:
             'D': 0.33,  # Empate
             'A': 0.32   # Victoria Visitante
         }
-    
+
+    def _bind(self, model_data, version):
+        """Construye el estado de predicción de un artefacto y lo publica de una vez"""
+        state = {
+            'version': version,
+            'model': model_data['model'],
+            'encoding_tables': load_encoding_tables(model_data),
+            'calibrator': load_calibrator(model_data),
+            'feature_names': model_data['feature_names']
+        }
+        encoders = (model_data['home_encoder'], model_data['away_encoder'], model_data['league_encoder'])
+        # Una sola asignación: las peticiones en curso conservan el estado con el que empezaron
+        self._state = state
+        self.model_data = model_data
+        self.model = state['model']
+        self.home_encoder, self.away_encoder, self.league_encoder = encoders
+        self.encoding_tables = state['encoding_tables']
+        self.calibrator = state['calibrator']
+        self.feature_names = state['feature_names']
+        return state
+
+    def _refresh(self):
+        """
+        Estado de predicción de la versión activa del registro.
+
+        Returns:
+            dict: Estado vigente, o None si el registro no sirve este artefacto
+                y aún no hay estado cargado
+        """
+        version, model_data = active_artifact(self.artifact_name, self.model_handle)
+        if version is not None and (self._state is None or self._state['version'] != version):
+            try:
+                self._bind(model_data, version)
+                logger.info(f"Predictor usando la versión {version} del registro")
+            except (KeyError, TypeError) as e:
+                logger.error(f"Artefacto de la versión {version} no válido; se mantiene el actual: {e}")
+        return self._state
+
     def predict_single_match(self, home_team, away_team, league='Premier League', 
                            stats=None, use_thresholds=True):
         """Predice el resultado de un partido individual"""
+        state = self._refresh()
         
         # Valores por defecto para estadísticas si no se proporcionan
         if stats is None:
@@ -57,24 +108,16 @@ class MatchPredictor:
         # Preparar características
         features = []
         
-        # Codificar equipos
-        if home_team in self.home_encoder.classes_:
-            features.append(self.home_encoder.transform([home_team])[0])
-        else:
-            features.append(-1)
-            logger.warning(f"⚠️ Equipo local '{home_team}' no encontrado en datos de entrenamiento")
-        
-        if away_team in self.away_encoder.classes_:
-            features.append(self.away_encoder.transform([away_team])[0])
-        else:
-            features.append(-1)
-            logger.warning(f"⚠️ Equipo visitante '{away_team}' no encontrado en datos de entrenamiento")
-        
-        if league in self.league_encoder.classes_:
-            features.append(self.league_encoder.transform([league])[0])
-        else:
-            features.append(-1)
-            logger.warning(f"⚠️ Liga '{league}' no encontrada en datos de entrenamiento")
+        # Codificar equipos (consulta O(1) en las tablas exportadas)
+        for value, column, message in (
+            (home_team, 'home_team', f"⚠️ Equipo local '{home_team}' no encontrado en datos de entrenamiento"),
+            (away_team, 'away_team', f"⚠️ Equipo visitante '{away_team}' no encontrado en datos de entrenamiento"),
+            (league, 'league', f"⚠️ Liga '{league}' no encontrada en datos de entrenamiento")
+        ):
+            code = state['encoding_tables'][column].encode(value)
+            if code == UNKNOWN_ID:
+                logger.warning(message)
+            features.append(code)
         
         # Agregar estadísticas
         for key in ['home_shots_on_target', 'away_shots_on_target', 'home_corners', 
@@ -92,10 +135,10 @@ class MatchPredictor:
         
         # Hacer predicción
         X = np.array(features).reshape(1, -1)
-        probabilities = self.model.predict_proba(X)[0]
+        probabilities = state['calibrator'].transform(state['model'].predict_proba(X))[0]
         
         # Obtener clases y sus probabilidades
-        classes = self.model.classes_
+        classes = state['model'].classes_
         prob_dict = {cls: prob for cls, prob in zip(classes, probabilities)}
         
         # Aplicar umbrales si está habilitado
@@ -2,6 +2,7 @@
 # python_service/run.py
 
 import os
+import gc
 import sys
 import argparse
 import logging
@@ -120,6 +121,36 @@ def load_model(app, config):
     except Exception as e:
         logger.error(f"Error cargando modelo predictivo: {e}")
 
+def preload_model_artifacts(config):
+    """Precarga los artefactos de modelo en el proceso actual (master de gunicorn)"""
+    try:
+        from models.artifacts import preload_artifacts
+        
+        save_path = config.get('models', {}).get('save_path', str(BASE_DIR / 'models' / 'saved'))
+        if not os.path.isabs(save_path):
+            save_path = str(BASE_DIR / save_path)
+        
+        artifacts = preload_artifacts(save_path)
+        logger.info(f"Artefactos de modelo precargados en el master: {len(artifacts)}")
+        
+        # Versión activa del registro (si existe), compartida igual que el resto
+        from models.registry import get_model_handle
+        
+        handle = get_model_handle()
+        if handle.get() is not None:
+            logger.info(f"Versión de modelo activa: {handle.version}")
+    except Exception as e:
+        logger.error(f"Error precargando artefactos de modelo: {e}")
+
+def start_model_watcher(server, worker):
+    """Hook post_fork de gunicorn: cada worker vigila el registro de modelos"""
+    try:
+        from models.registry import get_model_handle
+        
+        get_model_handle().start_watching()
+    except Exception as e:
+        logger.error(f"Error iniciando la vigilancia del registro de modelos: {e}")
+
 def run_development_server(app, config):
     """Ejecuta el servidor de desarrollo Flask"""
     host = config.get('host', '0.0.0.0')
@@ -176,6 +207,19 @@ def run_production_server(app, config):
     if socket_path:
         options['bind'] = f"unix:{socket_path}"
     
+    # Cargar los modelos una sola vez antes del fork: los workers comparten
+    # los arrays mapeados en memoria en lugar de deserializar cada uno su copia
+    options['preload_app'] = True
+    preload_model_artifacts(config)
+    
+    # Los hilos no sobreviven al fork: la vigilancia del registro se arranca
+    # en cada worker, que cambia de versión sin cortar peticiones en curso
+    options['post_fork'] = start_model_watcher
+    
+    # Mover los objetos ya cargados a la generación permanente para que el GC
+    # de los workers no toque sus páginas (evita copias copy-on-write)
+    gc.freeze()
+    
     logger.info(f"Iniciando servidor de producción con Gunicorn ({workers} workers)")
     GunicornApp(app, options).run()
 
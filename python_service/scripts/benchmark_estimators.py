@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# python_service/scripts/benchmark_estimators.py
+
+import sys
+import time
+import json
+import logging
+import argparse
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, log_loss
+
+# Añadir directorio padre al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from models.estimators import BACKENDS, build_pipeline
+from utils.match_dataset import load_matches
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('estimator_benchmark')
+
+
+CATEGORICAL_FEATURES = ['home_team', 'away_team', 'league']
+
+NUMERICAL_FEATURES = [
+    'home_shots_on_target', 'away_shots_on_target',
+    'home_corners', 'away_corners',
+    'home_fouls', 'away_fouls',
+    'home_yellow_cards', 'away_yellow_cards',
+    'home_red_cards', 'away_red_cards'
+]
+
+# Mismos hiperparámetros que train_simple.py
+BENCHMARK_PARAMS = {
+    'n_estimators': 200,
+    'learning_rate': 0.1,
+    'max_depth': 5,
+    'random_state': 42
+}
+
+
+def load_benchmark_data(data_path=None, use_sample=False):
+    """Carga el dataset del benchmark (dataset histórico, CSV o datos de muestra)"""
+    if use_sample:
+        from scripts.fetch_historical_data import HistoricalDataFetcher
+        return HistoricalDataFetcher().fetch_from_kaggle_sample()
+
+    logger.info(f"Cargando datos desde: {data_path or 'dataset por defecto'}")
+    return load_matches(data_path)
+
+
+def benchmark_backend(backend, numerical, X_train, X_test, y_train, y_test):
+    """
+    Entrena un backend y mide tiempo de ajuste, memoria pico y calidad.
+
+    Returns:
+        dict: Métricas del backend
+    """
+    pipeline = build_pipeline(numerical, CATEGORICAL_FEATURES, backend=backend, params=BENCHMARK_PARAMS)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    probabilities = pipeline.predict_proba(X_test)
+    predict_time = time.perf_counter() - start
+
+    classes = pipeline.classes_
+    y_pred = classes[np.argmax(probabilities, axis=1)]
+
+    return {
+        'backend': backend,
+        'fit_time_s': round(fit_time, 4),
+        'predict_time_s': round(predict_time, 4),
+        'peak_memory_mb': round(peak_memory / (1024 * 1024), 2),
+        'log_loss': round(float(log_loss(y_test, probabilities, labels=classes)), 4),
+        'accuracy': round(float(accuracy_score(y_test, y_pred)), 4)
+    }
+
+
+def run_benchmark(df, backends=BACKENDS, test_size=0.2, random_state=42):
+    """
+    Compara los backends sobre la misma partición de datos.
+
+    Args:
+        df (pandas.DataFrame): Partidos con columnas de equipos, liga y resultado
+        backends (tuple): Backends a comparar
+        test_size (float): Proporción de datos para test
+        random_state (int): Semilla para reproducibilidad
+
+    Returns:
+        pandas.DataFrame: Una fila de métricas por backend
+    """
+    numerical = [col for col in NUMERICAL_FEATURES if col in df.columns]
+    X = df[numerical + CATEGORICAL_FEATURES]
+    y = df['result']
+
+    stratify = y if y.value_counts().min() >= 2 else None
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=stratify
+    )
+
+    logger.info(f"Benchmark con {len(X_train)} partidos de entrenamiento y {len(X_test)} de prueba")
+
+    results = []
+    for backend in backends:
+        logger.info(f"Entrenando backend: {backend}")
+        metrics = benchmark_backend(backend, numerical, X_train, X_test, y_train, y_test)
+        logger.info(f"  {metrics}")
+        results.append(metrics)
+
+    return pd.DataFrame(results).set_index('backend')
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Benchmark de backends de gradient boosting')
+    parser.add_argument('--data', '-d', help='Dataset Parquet o CSV de partidos históricos')
+    parser.add_argument('--sample', action='store_true', help='Usar datos de muestra generados')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS,
+                      help='Backends a comparar')
+    parser.add_argument('--output', '-o', help='Guardar resultados en JSON')
+
+    args = parser.parse_args()
+
+    df = load_benchmark_data(args.data, args.sample)
+    results = run_benchmark(df, backends=tuple(args.backends))
+
+    print("\n" + results.to_string())
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results.reset_index().to_dict(orient='records'), f, indent=2)
+        logger.info(f"Resultados guardados en: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
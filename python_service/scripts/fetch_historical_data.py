@@ -9,14 +9,21 @@ import requests
 import time
 import json
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 import argparse
+from io import BytesIO
 from typing import List, Dict, Optional
 
 # Añadir directorio padre al path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from utils.downloads import CachedDownloader, api_errors
+from utils.match_dataset import order_columns, upsert_matches, write_matches
+from utils.sync_state import SyncState
+from utils.team_registry import TeamRegistry, deduplicate_matches
+from utils.synthetic_matches import generate_matches
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,20 +35,72 @@ logger = logging.getLogger('data_fetcher')
 DATA_DIR = Path(__file__).parent.parent / 'data'
 DATA_DIR.mkdir(exist_ok=True)
 
+# Caché de ficheros descargados (permite reanudar y revalidar con ETag/Last-Modified)
+RAW_CACHE_DIR = DATA_DIR / 'raw'
+
+# Marcas de agua de la sincronización incremental (dentro del directorio de datos)
+SYNC_STATE_FILE = 'sync_state.json'
+
+# Fuente de cada opción de --source en las marcas de agua
+SYNC_SOURCES = {'api': 'api_football', 'free': 'football_data'}
+
+# Segundos mínimos entre peticiones a cada fuente
+RATE_LIMITS = {
+    'api_football': 1.0,
+    'football_data': 0.25
+}
+
+# Football-Data.co.uk -> esquema canónico (las temporadas antiguas usan HG/AG)
+FOOTBALL_DATA_COLUMNS = {
+    'HomeTeam': 'home_team', 'Home': 'home_team',
+    'AwayTeam': 'away_team', 'Away': 'away_team',
+    'FTHG': 'home_goals', 'HG': 'home_goals',
+    'FTAG': 'away_goals', 'AG': 'away_goals',
+    'HST': 'home_shots_on_target', 'AST': 'away_shots_on_target',
+    'HC': 'home_corners', 'AC': 'away_corners',
+    'HY': 'home_yellow_cards', 'AY': 'away_yellow_cards',
+    'HR': 'home_red_cards', 'AR': 'away_red_cards',
+    'HF': 'home_fouls', 'AF': 'away_fouls'
+}
+
+# Casas de apuestas en orden de preferencia para odds_home/draw/away
+FOOTBALL_DATA_ODDS = (
+    ('PSH', 'PSD', 'PSA'),
+    ('AvgH', 'AvgD', 'AvgA'),
+    ('B365H', 'B365D', 'B365A')
+)
+
+# API-Football (json_normalize) -> esquema canónico
+API_FOOTBALL_COLUMNS = {
+    'fixture.id': 'match_id',
+    'fixture.date': 'date',
+    'teams.home.name': 'home_team',
+    'teams.away.name': 'away_team',
+    'teams.home.id': 'home_team_id',
+    'teams.away.id': 'away_team_id',
+    'goals.home': 'home_goals',
+    'goals.away': 'away_goals'
+}
+
 class HistoricalDataFetcher:
     """
     Clase para obtener datos históricos de fútbol desde múltiples fuentes.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, max_workers: int = 8,
+                 cache_dir: Optional[Path] = None):
         """
         Inicializar el fetcher de datos.
         
         Args:
             api_key: Clave de API para servicios premium (API-Football)
+            max_workers: Descargas simultáneas
+            cache_dir: Directorio de la caché de descargas
         """
         self.api_key = api_key or os.environ.get('API_FOOTBALL_KEY')
         self.data_dir = DATA_DIR
+        self.downloader = CachedDownloader(cache_dir or RAW_CACHE_DIR, RATE_LIMITS, max_workers=max_workers)
+        self.registry = TeamRegistry.load()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
@@ -91,13 +150,28 @@ class HistoricalDataFetcher:
             }
         }
     
-    def fetch_from_api_football(self, leagues: List[str], seasons: List[int]) -> pd.DataFrame:
+    def _season_of(self, date: Optional[str] = None) -> int:
+        """Temporada (año de inicio) de una fecha; sin fecha, la temporada en curso"""
+        day = datetime.strptime(date[:10], '%Y-%m-%d') if date else datetime.now()
+        return day.year if day.month >= 8 else day.year - 1
+    
+    def _current_season(self) -> int:
+        """Temporada en curso (las temporadas empiezan en agosto)"""
+        return self._season_of()
+    
+    def fetch_from_api_football(self, leagues: List[str], seasons: List[int],
+                                since: Optional[Dict[str, str]] = None) -> pd.DataFrame:
         """
         Obtener datos desde API-Football (requiere clave de API).
         
+        Las temporadas se descargan en paralelo respetando el límite de la API.
+        Las temporadas cerradas se sirven desde la caché sin nuevas llamadas.
+        
         Args:
             leagues: Lista de nombres de ligas
             seasons: Lista de temporadas (años)
+            since: Fecha mínima por liga; solo se piden los partidos desde
+                esa fecha (parámetros from/to) y las temporadas que la alcanzan
             
         Returns:
             DataFrame con datos de partidos
@@ -106,7 +180,10 @@ class HistoricalDataFetcher:
             raise ValueError("Se requiere API key para usar API-Football")
         
         logger.info("Obteniendo datos desde API-Football...")
-        all_matches = []
+        current_season = self._current_season()
+        today = datetime.now().strftime('%Y-%m-%d')
+        since = since or {}
+        jobs = {}
         
         for league_name in leagues:
             if league_name not in self.leagues_config:
@@ -114,60 +191,75 @@ class HistoricalDataFetcher:
                 continue
                 
             league_id = self.leagues_config[league_name]['api_football_id']
-            logger.info(f"Procesando {league_name} (ID: {league_id})")
-            
+            league_since = since.get(league_name)
             for season in seasons:
-                logger.info(f"Temporada {season}")
+                params = {'league': league_id, 'season': season}
+                key = f"api_football/{league_id}/{season}.json"
+                # Una temporada cerrada ya no cambia (una vez descargada tras el cierre)
+                closed = season < current_season
                 
-                try:
-                    # Obtener partidos de la temporada
-                    url = f"{self.api_football_url}/fixtures"
-                    params = {
-                        'league': league_id,
-                        'season': season
-                    }
-                    
-                    response = requests.get(url, headers=self.api_headers, params=params)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        if 'response' in data:
-                            matches = self._process_api_football_matches(
-                                data['response'], league_name, season
-                            )
-                            all_matches.extend(matches)
-                            logger.info(f"Obtenidos {len(matches)} partidos")
-                        
-                        # Esperar para respetar límites de API
-                        time.sleep(1)
-                    else:
-                        logger.error(f"Error API: {response.status_code} - {response.text}")
-                        
-                except Exception as e:
-                    logger.error(f"Error obteniendo datos para {league_name} {season}: {e}")
-                    continue
+                if league_since:
+                    if season < self._season_of(league_since):
+                        continue
+                    params.update({'from': league_since, 'to': today})
+                    key = f"api_football/{league_id}/{season}_incremental.json"
+                    closed = False
+                
+                jobs[(league_name, season)] = {
+                    'source': 'api_football',
+                    'key': key,
+                    'url': f"{self.api_football_url}/fixtures",
+                    'headers': self.api_headers,
+                    'params': params,
+                    'closed': closed,
+                    'validate': api_errors
+                }
+        
+        results = self.downloader.fetch_many(jobs)
+        all_matches = []
+        
+        for (league_name, season) in jobs:
+            result = results[(league_name, season)]
+            if isinstance(result, Exception):
+                logger.error(f"Error obteniendo datos para {league_name} {season}: {result}")
+                continue
+            
+            try:
+                data = json.loads(result[0])
+                if 'response' in data:
+                    matches = self._process_api_football_matches(data['response'], league_name, season)
+                    all_matches.append(matches)
+                    logger.info(f"{league_name} {season}: {len(matches)} partidos ({result[1]})")
+            except ValueError as e:
+                logger.error(f"Respuesta no válida para {league_name} {season}: {e}")
         
         if all_matches:
-            df = pd.DataFrame(all_matches)
+            df = pd.concat(all_matches, ignore_index=True)
             logger.info(f"Total de partidos obtenidos desde API-Football: {len(df)}")
             return df
         else:
             return pd.DataFrame()
     
-    def fetch_from_football_data(self, leagues: List[str], seasons: List[int]) -> pd.DataFrame:
+    def fetch_from_football_data(self, leagues: List[str], seasons: List[int],
+                                 since: Optional[Dict[str, str]] = None) -> pd.DataFrame:
         """
         Obtener datos desde Football-Data.co.uk (gratuito).
         
+        Los ficheros liga x temporada se descargan en paralelo y quedan en la
+        caché; al repetir la ejecución solo se transfieren los que cambiaron.
+        
         Args:
             leagues: Lista de nombres de ligas
             seasons: Lista de temporadas
+            since: Fecha mínima por liga; se omiten las temporadas anteriores
+                y se descartan los partidos previos a esa fecha
             
         Returns:
             DataFrame con datos de partidos
         """
         logger.info("Obteniendo datos desde Football-Data.co.uk...")
-        all_matches = []
+        since = since or {}
+        jobs = {}
         
         for league_name in leagues:
             if league_name not in self.leagues_config:
@@ -178,344 +270,279 @@ class HistoricalDataFetcher:
             if not league_code:
                 logger.warning(f"Liga {league_name} no disponible en Football-Data")
                 continue
-                
-            logger.info(f"Procesando {league_name} ({league_code})")
             
             for season in seasons:
-                # Formato de temporada para Football-Data
-                season_str = f"{season-1}{str(season)[2:]}"  # 2324 para 2023-24
-                
-                try:
-                    # URL del archivo CSV
-                    if season >= 2020:
-                        url = f"{self.football_data_url}/mmz4281/{season_str}/{league_code}.csv"
-                    else:
-                        url = f"{self.football_data_url}/mmz4281/{season_str}/{league_code}.csv"
-                    
-                    logger.info(f"Descargando: {url}")
-                    
-                    # Intentar descargar el archivo
-                    response = requests.get(url, headers=self.headers)
-                    
-                    if response.status_code == 200:
-                        # Leer CSV desde el contenido
-                        from io import StringIO
-                        csv_data = StringIO(response.text)
-                        df = pd.read_csv(csv_data)
-                        
-                        # Procesar datos
-                        matches = self._process_football_data_matches(
-                            df, league_name, season
-                        )
-                        all_matches.extend(matches)
-                        logger.info(f"Obtenidos {len(matches)} partidos")
-                        
-                        # Pequeña pausa entre requests
-                        time.sleep(0.5)
-                    else:
-                        logger.warning(f"No se pudo descargar {url}: {response.status_code}")
-                        
-                except Exception as e:
-                    logger.error(f"Error obteniendo datos para {league_name} {season}: {e}")
+                # Football-Data numera la temporada por su año de fin
+                if league_name in since and season - 1 < self._season_of(since[league_name]):
                     continue
+                
+                # Formato de temporada para Football-Data
+                season_str = f"{str(season-1)[2:]}{str(season)[2:]}"  # 2324 para 2023-24
+                jobs[(league_name, season)] = {
+                    'source': 'football_data',
+                    'key': f"football_data/{season_str}/{league_code}.csv",
+                    'url': f"{self.football_data_url}/mmz4281/{season_str}/{league_code}.csv",
+                    'headers': self.headers
+                }
+        
+        results = self.downloader.fetch_many(jobs)
+        all_matches = []
+        
+        for (league_name, season) in jobs:
+            result = results[(league_name, season)]
+            if isinstance(result, Exception):
+                logger.warning(f"No se pudo descargar {league_name} {season}: {result}")
+                continue
+            
+            try:
+                df = pd.read_csv(BytesIO(result[0]), encoding='latin-1')
+                matches = self._process_football_data_matches(df, league_name, season)
+                all_matches.append(matches)
+                logger.info(f"{league_name} {season}: {len(matches)} partidos ({result[1]})")
+            except Exception as e:
+                logger.error(f"Error procesando {league_name} {season}: {e}")
         
         if all_matches:
-            df = pd.DataFrame(all_matches)
+            df = pd.concat(all_matches, ignore_index=True)
+            if since:
+                df = df[df['date'] >= df['league'].map(since).fillna('')].reset_index(drop=True)
             logger.info(f"Total de partidos obtenidos desde Football-Data: {len(df)}")
             return df
         else:
             return pd.DataFrame()
     
-    def fetch_from_kaggle_sample(self) -> pd.DataFrame:
+    def sync(self, source: str, leagues: List[str], seasons: List[int],
+             filename: str = 'partidos_historicos.csv', csv: bool = True) -> pd.DataFrame:
+        """
+        Sincronización incremental: solo pide partidos posteriores a la marca de agua.
+        
+        Las ligas ya sincronizadas piden desde la fecha de su último partido
+        (incluida, por si faltaban partidos de ese día); las nuevas descargan
+        las temporadas indicadas. Los partidos nuevos se añaden al dataset
+        sin reescribirlo y, si existe, al final del CSV.
+        
+        Args:
+            source: 'api' (API-Football) o 'free' (Football-Data)
+            leagues: Ligas a sincronizar
+            seasons: Temporadas de las ligas sin marca de agua
+            filename: Nombre del archivo CSV (el dataset usa el mismo nombre sin extensión)
+            csv: Añadir también los partidos nuevos al CSV
+            
+        Returns:
+            DataFrame con los partidos añadidos
+        """
+        source_name = SYNC_SOURCES[source]
+        fetch = self.fetch_from_api_football if source == 'api' else self.fetch_from_football_data
+        state = SyncState(self.data_dir / SYNC_STATE_FILE)
+        since = state.since(source_name, leagues)
+        
+        # Temporadas desde la marca de agua más antigua hasta la actual
+        # (Football-Data numera por año de fin)
+        offset = 1 if source == 'free' else 0
+        frames = []
+        if since:
+            first_season = min(self._season_of(date) for date in since.values())
+            recent = list(range(first_season + offset, self._current_season() + offset + 1))
+            frames.append(fetch(list(since), recent, since=since))
+        new_leagues = [league for league in leagues if league not in since]
+        if new_leagues:
+            frames.append(fetch(new_leagues, seasons))
+        
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            logger.info("Sin partidos desde la última sincronización")
+            return pd.DataFrame()
+        df = order_columns(self._deduplicate(pd.concat(frames, ignore_index=True)))
+        
+        filepath = self.data_dir / filename
+        added = upsert_matches(df, filepath.with_suffix(''))
+        
+        if csv and not added.empty:
+            if filepath.exists():
+                header = pd.read_csv(filepath, nrows=0).columns
+                added.reindex(columns=header).to_csv(filepath, mode='a', header=False, index=False)
+            else:
+                added.to_csv(filepath, index=False)
+        
+        state.update(source_name, df)
+        logger.info(f"Sincronización completada: {len(df)} partidos recibidos, {len(added)} nuevos")
+        return added
+    
+    def fetch_from_kaggle_sample(self, leagues: Optional[List[str]] = None,
+                                 seasons: Optional[List[int]] = None,
+                                 extra_leagues: int = 0, teams_per_league: int = 20,
+                                 seed: int = 42) -> pd.DataFrame:
         """
         Generar datos de muestra basados en patrones realistas.
-        Útil para testing cuando no hay acceso a APIs.
+        Útil para testing cuando no hay acceso a APIs, y para pruebas de
+        carga con millones de partidos (ligas sintéticas adicionales).
         
+        Args:
+            leagues: Ligas a generar (por defecto Premier League y La Liga)
+            seasons: Temporadas a generar (por defecto 2023 y 2024)
+            extra_leagues: Ligas sintéticas adicionales
+            teams_per_league: Equipos de las ligas sin plantilla conocida
+            seed: Semilla (misma semilla = mismos partidos e IDs)
+            
         Returns:
             DataFrame con datos de muestra
         """
         logger.info("Generando datos de muestra...")
-        
-        # Equipos de ejemplo por liga
-        teams_data = {
-            'Premier League': [
-                'Manchester City', 'Manchester United', 'Liverpool', 'Chelsea', 
-                'Arsenal', 'Tottenham', 'Newcastle', 'Brighton',
-                'West Ham', 'Aston Villa', 'Crystal Palace', 'Brentford',
-                'Fulham', 'Wolves', 'Everton', 'Nottingham Forest',
-                'Burnley', 'Sheffield United', 'Luton Town', 'Bournemouth'
-            ],
-            'La Liga': [
-                'Real Madrid', 'Barcelona', 'Atlético Madrid', 'Sevilla',
-                'Real Sociedad', 'Real Betis', 'Villarreal', 'Valencia',
-                'Athletic Bilbao', 'Getafe', 'Osasuna', 'Las Palmas',
-                'Girona', 'Rayo Vallecano', 'Mallorca', 'Celta Vigo',
-                'Cadiz', 'Granada', 'Almeria', 'Alaves'
-            ]
-        }
-        
-        all_matches = []
-        match_id = 1
-        
-        # Generar 2 temporadas de datos
-        for season in [2023, 2024]:
-            for league_name, teams in teams_data.items():
-                logger.info(f"Generando datos para {league_name} {season}")
-                
-                # Generar partidos de ida y vuelta
-                for i, home_team in enumerate(teams):
-                    for j, away_team in enumerate(teams):
-                        if i != j:  # No jugar contra sí mismo
-                            # Generar resultado realista
-                            match_data = self._generate_realistic_match(
-                                match_id, home_team, away_team, league_name, season
-                            )
-                            all_matches.append(match_data)
-                            match_id += 1
-        
-        df = pd.DataFrame(all_matches)
-        logger.info(f"Generados {len(df)} partidos de muestra")
-        return df
+        return generate_matches(leagues, seasons or [2023, 2024], extra_leagues, teams_per_league, seed)
     
-    def _process_api_football_matches(self, matches: List[Dict], league_name: str, season: int) -> List[Dict]:
+    def _process_api_football_matches(self, matches: List[Dict], league_name: str, season: int) -> pd.DataFrame:
         """Procesar partidos desde API-Football"""
-        processed_matches = []
+        if not matches:
+            return pd.DataFrame()
         
-        for match in matches:
-            # Solo procesar partidos finalizados
-            if match['fixture']['status']['short'] != 'FT':
-                continue
-                
-            # Extraer información básica
-            match_data = {
-                'match_id': match['fixture']['id'],
-                'date': match['fixture']['date'][:10],  # Solo fecha
-                'season': season,
-                'league': league_name,
-                'home_team': match['teams']['home']['name'],
-                'away_team': match['teams']['away']['name'],
-                'home_team_id': match['teams']['home']['id'],
-                'away_team_id': match['teams']['away']['id'],
-                'home_goals': match['goals']['home'],
-                'away_goals': match['goals']['away'],
-                'result': self._determine_result(match['goals']['home'], match['goals']['away']),
-                'total_goals': match['goals']['home'] + match['goals']['away']
-            }
-            
-            # Añadir datos de estadísticas si están disponibles
-            if 'statistics' in match and match['statistics']:
-                stats = self._extract_match_statistics(match['statistics'])
-                match_data.update(stats)
-            
-            processed_matches.append(match_data)
+        raw = pd.json_normalize(matches, max_level=3)
         
-        return processed_matches
-    
-    def _process_football_data_matches(self, df: pd.DataFrame, league_name: str, season: int) -> List[Dict]:
-        """Procesar partidos desde Football-Data.co.uk"""
-        processed_matches = []
+        # Solo procesar partidos finalizados
+        raw = raw[raw['fixture.status.short'] == 'FT']
+        df = raw.reindex(columns=list(API_FOOTBALL_COLUMNS)).rename(columns=API_FOOTBALL_COLUMNS)
+        df['date'] = df['date'].str[:10]  # Solo fecha
+        df.insert(2, 'season', season)
+        df.insert(3, 'league', league_name)
+        df = self._finalize_matches(df)
         
-        for _, row in df.iterrows():
-            try:
-                # Mapear columnas (pueden variar según la fuente)
-                home_goals = int(row.get('FTHG', 0))  # Full Time Home Goals
-                away_goals = int(row.get('FTAG', 0))  # Full Time Away Goals
-                
-                match_data = {
-                    'match_id': f"{league_name}_{season}_{len(processed_matches)}",
-                    'date': pd.to_datetime(row['Date']).strftime('%Y-%m-%d'),
-                    'season': season,
-                    'league': league_name,
-                    'home_team': row['HomeTeam'],
-                    'away_team': row['AwayTeam'],
-                    'home_team_id': None,  # No disponible en Football-Data
-                    'away_team_id': None,
-                    'home_goals': home_goals,
-                    'away_goals': away_goals,
-                    'result': self._determine_result(home_goals, away_goals),
-                    'total_goals': home_goals + away_goals
-                }
-                
-                # Añadir estadísticas adicionales si están disponibles
-                additional_stats = {}
-                
-                # Tiros
-                if 'HST' in row:  # Home Shots on Target
-                    additional_stats['home_shots_on_target'] = int(row.get('HST', 0))
-                if 'AST' in row:  # Away Shots on Target
-                    additional_stats['away_shots_on_target'] = int(row.get('AST', 0))
-                
-                # Corners
-                if 'HC' in row:  # Home Corners
-                    additional_stats['home_corners'] = int(row.get('HC', 0))
-                if 'AC' in row:  # Away Corners
-                    additional_stats['away_corners'] = int(row.get('AC', 0))
-                
-                # Tarjetas
-                if 'HY' in row:  # Home Yellow Cards
-                    additional_stats['home_yellow_cards'] = int(row.get('HY', 0))
-                if 'AY' in row:  # Away Yellow Cards
-                    additional_stats['away_yellow_cards'] = int(row.get('AY', 0))
-                
-                if 'HR' in row:  # Home Red Cards
-                    additional_stats['home_red_cards'] = int(row.get('HR', 0))
-                if 'AR' in row:  # Away Red Cards
-                    additional_stats['away_red_cards'] = int(row.get('AR', 0))
-                
-                # Faltas
-                if 'HF' in row:  # Home Fouls
-                    additional_stats['home_fouls'] = int(row.get('HF', 0))
-                if 'AF' in row:  # Away Fouls
-                    additional_stats['away_fouls'] = int(row.get('AF', 0))
-                
-                match_data.update(additional_stats)
-                processed_matches.append(match_data)
-                
-            except Exception as e:
-                logger.warning(f"Error procesando fila: {e}")
-                continue
+        # Añadir datos de estadísticas si están disponibles
+        if 'statistics' in raw.columns:
+            stats = self._extract_match_statistics(raw['statistics'], raw['teams.home.id'])
+            df = df.join(stats)
         
-        return processed_matches
+        return df.reset_index(drop=True)
     
-    def _generate_realistic_match(self, match_id: int, home_team: str, away_team: str, 
-                                league_name: str, season: int) -> Dict:
-        """Generar un partido con datos realistas"""
-        
-        # Simular fortaleza de equipos (basado en nombres conocidos)
-        home_strength = self._estimate_team_strength(home_team)
-        away_strength = self._estimate_team_strength(away_team)
-        
-        # Ventaja de local
-        home_advantage = 0.15
-        adjusted_home_strength = min(1.0, home_strength + home_advantage)
-        
-        # Generar goles usando distribución de Poisson ajustada
-        lambda_home = adjusted_home_strength * 2.0
-        lambda_away = away_strength * 1.5
-        
-        home_goals = max(0, int(np.random.poisson(lambda_home)))
-        away_goals = max(0, int(np.random.poisson(lambda_away)))
-        
-        # Generar fecha aleatoria en la temporada
-        start_date = datetime(season, 8, 1)  # Agosto
-        end_date = datetime(season + 1, 5, 31)  # Mayo siguiente
-        random_days = np.random.randint(0, (end_date - start_date).days)
-        match_date = start_date + timedelta(days=random_days)
-        
-        # Generar estadísticas adicionales
-        base_stats = {
-            'home_shots_on_target': max(1, int(np.random.normal(4 + home_goals, 2))),
-            'away_shots_on_target': max(1, int(np.random.normal(3 + away_goals, 2))),
-            'home_corners': max(0, int(np.random.normal(5, 2))),
-            'away_corners': max(0, int(np.random.normal(4, 2))),
-            'home_fouls': max(0, int(np.random.normal(12, 3))),
-            'away_fouls': max(0, int(np.random.normal(13, 3))),
-            'home_yellow_cards': max(0, int(np.random.poisson(2))),
-            'away_yellow_cards': max(0, int(np.random.poisson(2))),
-            'home_red_cards': 1 if np.random.random() < 0.05 else 0,
-            'away_red_cards': 1 if np.random.random() < 0.05 else 0
-        }
-        
-        return {
-            'match_id': match_id,
-            'date': match_date.strftime('%Y-%m-%d'),
-            'season': season,
-            'league': league_name,
-            'home_team': home_team,
-            'away_team': away_team,
-            'home_team_id': hash(home_team) % 10000,  # ID simulado
-            'away_team_id': hash(away_team) % 10000,
-            'home_goals': home_goals,
-            'away_goals': away_goals,
-            'result': self._determine_result(home_goals, away_goals),
-            'total_goals': home_goals + away_goals,
-            **base_stats
-        }
+    def _process_football_data_matches(self, df: pd.DataFrame, league_name: str, season: int) -> pd.DataFrame:
+        """Procesar partidos desde Football-Data.co.uk"""
+        # Mapear columnas (pueden variar según la temporada)
+        columns = {source: target for source, target in FOOTBALL_DATA_COLUMNS.items() if source in df.columns}
+        matches = df[list(columns)].rename(columns=columns)
+        matches = matches.loc[:, ~matches.columns.duplicated()]
+        
+        # Fechas dd/mm/yy o dd/mm/yyyy según la temporada
+        dates = pd.to_datetime(df['Date'], dayfirst=True, format='mixed', errors='coerce')
+        matches.insert(0, 'date', dates.dt.strftime('%Y-%m-%d'))
+        matches.insert(1, 'season', season)
+        matches.insert(2, 'league', league_name)
+        matches.insert(5, 'home_team_id', None)  # No disponible en Football-Data
+        matches.insert(6, 'away_team_id', None)
+        
+        # Cuotas 1X2 de la primera casa con las tres cuotas en cada fila
+        # (nunca se mezclan casas: el margen de las tres cuotas debe ser coherente)
+        bookmakers = [triple for triple in FOOTBALL_DATA_ODDS if all(col in df.columns for col in triple)]
+        if bookmakers:
+            odds = np.stack([df[list(triple)].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+                             for triple in bookmakers])  # (casas, filas, 3)
+            complete = ~np.isnan(odds).any(axis=2)
+            chosen = np.argmax(complete, axis=0)
+            selected = odds[chosen, np.arange(len(df))]
+            selected[~complete.any(axis=0)] = np.nan
+            for k, target in enumerate(('odds_home', 'odds_draw', 'odds_away')):
+                matches[target] = pd.Series(selected[:, k], index=df.index)
+        
+        # Filas incompletas (líneas vacías al final del CSV, partidos aplazados)
+        matches = matches.dropna(subset=['date', 'home_team', 'away_team', 'home_goals', 'away_goals'])
+        if len(matches) < len(df):
+            logger.debug(f"{league_name} {season}: {len(df) - len(matches)} filas descartadas")
+        
+        matches.insert(0, 'match_id', [f"{league_name}_{season}_{i}" for i in range(len(matches))])
+        return self._finalize_matches(matches).reset_index(drop=True)
     
-    def _estimate_team_strength(self, team_name: str) -> float:
-        """Estimar fortaleza de equipo basado en el nombre (para datos sintéticos)"""
-        # Equipos top-tier
-        top_teams = [
-            'Manchester City', 'Real Madrid', 'Barcelona', 'Bayern Munich',
-            'Liverpool', 'Manchester United', 'Chelsea', 'Arsenal'
-        ]
-        
-        # Equipos mid-tier
-        mid_teams = [
-            'Tottenham', 'Atlético Madrid', 'Sevilla', 'Borussia Dortmund',
-            'Inter Milan', 'AC Milan', 'Napoli', 'Paris Saint-Germain'
-        ]
-        
-        if team_name in top_teams:
-            return np.random.uniform(0.75, 0.95)
-        elif team_name in mid_teams:
-            return np.random.uniform(0.55, 0.75)
-        else:
-            return np.random.uniform(0.35, 0.65)
+    def _finalize_matches(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Tipos del esquema canónico, resultado y total de goles"""
+        df = df.dropna(subset=['home_goals', 'away_goals'])
+        
+        # Estadísticas enteras admiten huecos
+        count_columns = [col for col in FOOTBALL_DATA_COLUMNS.values()
+                         if col in df.columns and col not in ('home_team', 'away_team')]
+        df = df.astype({col: 'Int64' for col in count_columns})
+        df = df.astype({'home_goals': 'int64', 'away_goals': 'int64'})
+        
+        df['result'] = self._determine_result(df['home_goals'], df['away_goals'])
+        df['total_goals'] = df['home_goals'] + df['away_goals']
+        return df
     
-    def _determine_result(self, home_goals: int, away_goals: int) -> str:
-        """Determinar resultado del partido"""
-        if home_goals > away_goals:
-            return 'H'  # Home win
-        elif away_goals > home_goals:
-            return 'A'  # Away win
-        else:
-            return 'D'  # Draw
+    def _determine_result(self, home_goals, away_goals):
+        """Determinar resultado del partido (escalares o Series)"""
+        if np.isscalar(home_goals):
+            if home_goals > away_goals:
+                return 'H'  # Home win
+            elif away_goals > home_goals:
+                return 'A'  # Away win
+            else:
+                return 'D'  # Draw
+        
+        return np.select([home_goals > away_goals, away_goals > home_goals], ['H', 'A'], default='D')
     
-    def _extract_match_statistics(self, statistics: List[Dict]) -> Dict:
-        """Extraer estadísticas útiles desde API-Football"""
-        stats = {}
+    def _extract_match_statistics(self, statistics: pd.Series, home_ids: pd.Series) -> pd.DataFrame:
+        """
+        Extraer estadísticas útiles desde API-Football.
         
-        for team_stats in statistics:
-            team_name = 'home' if team_stats['team']['name'] else 'away'
+        Args:
+            statistics: Lista de estadísticas por equipo de cada partido
+            home_ids: ID del equipo local de cada partido (mismo índice)
             
-            for stat in team_stats['statistics']:
-                stat_type = stat['type'].lower().replace(' ', '_')
-                value = stat['value']
-                
-                # Convertir valores a numéricos cuando sea posible
-                if isinstance(value, str):
-                    if value.isdigit():
-                        value = int(value)
-                    elif '%' in value:
-                        value = float(value.replace('%', ''))
-                
-                stats[f"{team_name}_{stat_type}"] = value
+        Returns:
+            DataFrame con columnas home_<stat> / away_<stat> por partido
+        """
+        records = [
+            (idx, team_stats['team']['id'], stat['type'], stat['value'])
+            for idx, match_stats in statistics.items() if isinstance(match_stats, list)
+            for team_stats in match_stats
+            for stat in team_stats['statistics']
+        ]
+        if not records:
+            return pd.DataFrame(index=statistics.index)
         
-        return stats
+        long = pd.DataFrame(records, columns=['idx', 'team_id', 'type', 'value'])
+        side = np.where(long['team_id'].to_numpy() == home_ids.loc[long['idx']].to_numpy(), 'home', 'away')
+        long['stat'] = pd.Series(side) + '_' + long['type'].str.lower().str.replace(' ', '_')
+        
+        # Convertir valores a numéricos ('55%' -> 55.0)
+        long['value'] = pd.to_numeric(long['value'].astype(str).str.rstrip('%'), errors='coerce')
+        
+        stats = long.pivot_table(index='idx', columns='stat', values='value', aggfunc='first', dropna=False)
+        stats.columns.name = None
+        return stats.reindex(statistics.index)
     
-    def save_data(self, df: pd.DataFrame, filename: str = 'partidos_historicos.csv'):
+    def save_data(self, df: pd.DataFrame, filename: str = 'partidos_historicos.csv',
+                  dataset: bool = True, csv: bool = True):
         """
-        Guardar datos en archivo CSV.
+        Guardar datos en el dataset Parquet particionado y/o en CSV.
+        
+        El dataset (directorio con el nombre del archivo sin extensión) es la
+        fuente de los loaders; el CSV queda como exportación.
         
         Args:
             df: DataFrame con los datos
-            filename: Nombre del archivo
+            filename: Nombre del archivo CSV
+            dataset: Escribir el dataset particionado por liga y temporada
+            csv: Escribir también el CSV completo
         """
         filepath = self.data_dir / filename
         
-        # Asegurar que las columnas estén en orden lógico
-        column_order = [
-            'match_id', 'date', 'season', 'league',
-            'home_team', 'away_team', 'home_team_id', 'away_team_id',
-            'home_goals', 'away_goals', 'total_goals', 'result'
-        ]
+        # Nombres canónicos, sin duplicados y con las columnas en orden lógico
+        df = order_columns(self._deduplicate(df))
         
-        # Añadir columnas adicionales que puedan existir
-        additional_columns = [col for col in df.columns if col not in column_order]
-        column_order.extend(additional_columns)
-        
-        # Reordenar columnas
-        df = df.reindex(columns=[col for col in column_order if col in df.columns])
-        
-        # Guardar archivo
-        df.to_csv(filepath, index=False)
-        logger.info(f"Datos guardados en: {filepath}")
+        # Guardar archivos
+        if dataset:
+            write_matches(df, filepath.with_suffix(''))
+            logger.info(f"Dataset guardado en: {filepath.with_suffix('')}")
+        if csv:
+            df.to_csv(filepath, index=False)
+            logger.info(f"Datos guardados en: {filepath}")
         logger.info(f"Total de registros: {len(df)}")
         
         # Mostrar resumen
         self._print_data_summary(df)
     
+    def _deduplicate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Canonicalizar nombres de equipo, eliminar duplicados y guardar alias nuevos"""
+        df = deduplicate_matches(df, self.registry)
+        if self.registry.changed:
+            self.registry.save()
+        return df
+    
     def _print_data_summary(self, df: pd.DataFrame):
         """Mostrar resumen de los datos obtenidos"""
         logger.info("\n" + "="*50)
@@ -555,31 +582,59 @@ def main():
                       default=['Premier League', 'La Liga'],
                       help='Ligas a procesar')
     parser.add_argument('--seasons', nargs='+', type=int,
-                      default=[2022, 2023, 2024],
-                      help='Temporadas a procesar')
+                      help='Temporadas a procesar (por defecto 2022-2024; 2023-2024 en sample)')
     parser.add_argument('--api-key', help='Clave de API para API-Football')
     parser.add_argument('--output', default='partidos_historicos.csv',
                       help='Nombre del archivo de salida')
+    parser.add_argument('--format', choices=['parquet', 'csv', 'both'], default='both',
+                      help='Formato de salida: dataset Parquet particionado, CSV o ambos')
+    parser.add_argument('--workers', type=int, default=8,
+                      help='Descargas simultáneas')
+    parser.add_argument('--cache-dir', default=str(RAW_CACHE_DIR),
+                      help='Directorio de la caché de descargas')
+    parser.add_argument('--incremental', action='store_true',
+                      help='Pedir solo partidos posteriores a la última sincronización y añadirlos al dataset')
+    parser.add_argument('--seed', type=int, default=42,
+                      help='Semilla de los datos de muestra')
+    parser.add_argument('--extra-leagues', type=int, default=0,
+                      help='Ligas sintéticas adicionales en los datos de muestra')
+    parser.add_argument('--teams-per-league', type=int, default=20,
+                      help='Equipos por liga sintética')
     
     args = parser.parse_args()
     
     # Crear fetcher
-    fetcher = HistoricalDataFetcher(api_key=args.api_key)
+    fetcher = HistoricalDataFetcher(api_key=args.api_key, max_workers=args.workers,
+                                    cache_dir=Path(args.cache_dir))
     
     try:
+        if args.incremental:
+            if args.source == 'sample':
+                logger.error("El modo incremental requiere --source api o free")
+                sys.exit(1)
+            if args.source == 'api' and not fetcher.api_key:
+                logger.error("Se requiere API key para usar API-Football")
+                sys.exit(1)
+            fetcher.sync(args.source, args.leagues, args.seasons or [2022, 2023, 2024],
+                         args.output, csv=args.format in ('csv', 'both'))
+            logger.info("✅ Proceso completado exitosamente")
+            return
+        
         # Obtener datos según la fuente seleccionada
         if args.source == 'api':
             if not fetcher.api_key:
                 logger.error("Se requiere API key para usar API-Football")
                 logger.info("Obtén tu API key en: https://rapidapi.com/api-sports/api/api-football")
                 sys.exit(1)
-            df = fetcher.fetch_from_api_football(args.leagues, args.seasons)
+            df = fetcher.fetch_from_api_football(args.leagues, args.seasons or [2022, 2023, 2024])
             
         elif args.source == 'free':
-            df = fetcher.fetch_from_football_data(args.leagues, args.seasons)
+            df = fetcher.fetch_from_football_data(args.leagues, args.seasons or [2022, 2023, 2024])
             
         elif args.source == 'sample':
-            df = fetcher.fetch_from_kaggle_sample()
+            df = fetcher.fetch_from_kaggle_sample(
+                args.leagues, args.seasons, args.extra_leagues, args.teams_per_league, args.seed
+            )
         
         # Verificar que se obtuvieron datos
         if df.empty:
@@ -587,7 +642,13 @@ def main():
             sys.exit(1)
         
         # Guardar datos
-        fetcher.save_data(df, args.output)
+        fetcher.save_data(df, args.output,
+                          dataset=args.format in ('parquet', 'both'),
+                          csv=args.format in ('csv', 'both'))
+        
+        # Punto de partida para las siguientes ejecuciones con --incremental
+        if args.source in SYNC_SOURCES:
+            SyncState(fetcher.data_dir / SYNC_STATE_FILE).update(SYNC_SOURCES[args.source], df)
         
         logger.info("✅ Proceso completado exitosamente")
         
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# python_service/scripts/run_backtest.py
+
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+
+# Añadir directorio padre al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from models.backtesting import Backtester, MAX_MATCHDAY_EXPOSURE, STAKING_STRATEGIES, run_backtest
+from utils.match_dataset import load_matches
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('backtest')
+
+
+def load_backtest_data(data_path=None, use_sample=False):
+    """Carga el histórico del backtest (dataset Parquet, CSV o datos de muestra)"""
+    if use_sample:
+        from scripts.fetch_historical_data import HistoricalDataFetcher
+        return HistoricalDataFetcher().fetch_from_kaggle_sample()
+
+    logger.info(f"Cargando datos desde: {data_path or 'dataset por defecto'}")
+    return load_matches(data_path)
+
+
+def parse_strategies(values, stake, fraction, max_stake, min_edge, max_matchday_exposure=MAX_MATCHDAY_EXPOSURE):
+    """Construye la lista de estrategias a partir de los argumentos"""
+    strategies = []
+    for value in values:
+        spec = {'strategy': value, 'min_edge': min_edge, 'max_matchday_exposure': max_matchday_exposure}
+        if value == 'flat':
+            spec['stake'] = stake
+        else:
+            spec['max_stake'] = max_stake
+        if value == 'fractional_kelly':
+            spec['fraction'] = fraction
+        strategies.append(spec)
+    return strategies
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Backtest walk-forward con simulación de bankroll')
+    parser.add_argument('--data', '-d', help='Dataset Parquet o CSV de partidos históricos')
+    parser.add_argument('--sample', action='store_true', help='Usar datos de muestra generados')
+    parser.add_argument('--strategies', nargs='+', default=list(STAKING_STRATEGIES),
+                      choices=STAKING_STRATEGIES, help='Estrategias de apuesta a simular')
+    parser.add_argument('--stake', type=float, default=0.01,
+                      help='Fracción del bankroll inicial por apuesta (flat)')
+    parser.add_argument('--fraction', type=float, default=0.25, help='Fracción de Kelly')
+    parser.add_argument('--max-stake', type=float, default=0.25,
+                      help='Fracción máxima del bankroll por apuesta (Kelly)')
+    parser.add_argument('--max-matchday-exposure', type=float, default=MAX_MATCHDAY_EXPOSURE,
+                      help='Fracción máxima del bankroll apostada en una jornada')
+    parser.add_argument('--min-edge', type=float, default=0.0, help='Valor esperado mínimo para apostar')
+    parser.add_argument('--retrain-every', type=int, default=4, help='Jornadas entre reentrenamientos')
+    parser.add_argument('--min-train', type=int, default=200, help='Partidos mínimos antes de apostar')
+    parser.add_argument('--update', choices=['refit', 'warm_start'], default='refit',
+                      help='Reentrenamiento completo o ampliación warm start')
+    parser.add_argument('--group-by', default='league', help="Columna que separa los backtests ('' = ninguna)")
+    parser.add_argument('--fallback-odds', nargs=3, type=float, metavar=('H', 'D', 'A'),
+                      help='Cuotas fijas si el histórico no tiene columnas de cuotas')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Procesos en paralelo')
+    parser.add_argument('--output', '-o', help='Guardar resumen y evolución del bankroll en JSON')
+    parser.add_argument('--predictions-output', help='Guardar las predicciones walk-forward en CSV '
+                      '(entrada de models/calibration.py)')
+
+    args = parser.parse_args()
+
+    df = load_backtest_data(args.data, args.sample)
+    logger.info(f"📊 {len(df)} partidos cargados")
+
+    backtester = Backtester(
+        retrain_every=args.retrain_every,
+        min_train_matches=args.min_train,
+        update=args.update
+    )
+    strategies = parse_strategies(args.strategies, args.stake, args.fraction, args.max_stake, args.min_edge,
+                                  args.max_matchday_exposure)
+
+    try:
+        summary, predictions, bankrolls = run_backtest(
+            df, strategies, group_by=args.group_by or None, backtester=backtester,
+            fallback_odds=args.fallback_odds, n_jobs=args.n_jobs
+        )
+    except ValueError as e:
+        logger.error(f"❌ {e}")
+        sys.exit(1)
+
+    if summary.empty or not summary['bets'].any():
+        logger.warning("⚠️ Ninguna apuesta simulada: histórico insuficiente para el entrenamiento mínimo")
+
+    print("\n" + summary.to_string(index=False))
+
+    if args.predictions_output:
+        predictions.to_csv(args.predictions_output, index=False)
+        logger.info(f"✅ Predicciones guardadas en: {args.predictions_output}")
+
+    if args.output:
+        output = {
+            'summary': summary.to_dict(orient='records'),
+            'bankroll': {
+                f"{group}/{name}": series.round(2).tolist()
+                for (group, name), series in bankrolls.items()
+            }
+        }
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2, default=str)
+        logger.info(f"✅ Resultados guardados en: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
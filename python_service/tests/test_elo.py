@@ -0,0 +1,50 @@
+# tests/test_elo.py
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.elo import EloRatings
+
+
+def _history():
+    """Tres Arsenal-Chelsea de Football-Data (sin IDs de equipo)"""
+    return pd.DataFrame({
+        'match_id': ['a', 'b', 'c'],
+        'date': ['2024-01-06', '2024-02-10', '2024-03-16'],
+        'home_team': ['Arsenal', 'Chelsea', 'Arsenal'],
+        'away_team': ['Chelsea', 'Arsenal', 'Chelsea'],
+        'home_goals': [2, 0, 3],
+        'away_goals': [0, 1, 1]
+    })
+
+
+def test_live_update_continues_from_replayed_rating():
+    store = EloRatings()
+    store.replay(_history())
+    arsenal, chelsea = store.get('Arsenal'), store.get('Chelsea')
+    assert arsenal > 1500 > chelsea
+
+    # Resultado en vivo con IDs de API-Football
+    delta = store.update(42, 49, 1, 1, date='2024-03-30', home_name='Arsenal', away_name='Chelsea', match_id=1)
+
+    assert len(store) == 2
+    assert store.get('Arsenal') == pytest.approx(arsenal + delta)
+    assert store.get('Chelsea') == pytest.approx(chelsea - delta)
+    assert store.get(42) == store.get('Arsenal')
+
+
+def test_source_ids_survive_serialization():
+    store = EloRatings()
+    store.replay(_history())
+    store.update(42, 49, 1, 1, date='2024-03-30', home_name='Arsenal', away_name='Chelsea', match_id=1)
+
+    restored = EloRatings.from_dict(store.to_dict())
+    restored.update(42, 49, 2, 0, date='2024-04-06', home_name='Arsenal', away_name='Chelsea', match_id=2)
+
+    assert len(restored) == 2
+    assert restored.get(42) == restored.get('Arsenal') > store.get('Arsenal')
+    assert list(restored.table()['team']) == ['Arsenal', 'Chelsea']
@@ -9,15 +9,23 @@ import yaml
 import pandas as pd
 import numpy as np
 import pickle
-import joblib
 import json
 from pathlib import Path
 from datetime import datetime
 from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.ensemble import GradientBoostingClassifier, GradientBoostingRegressor
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, mean_squared_error
 from sklearn.preprocessing import StandardScaler
 
+from models.artifacts import load_artifact, save_artifact
+from models.estimators import (
+    DEFAULT_BACKEND, build_classifier, build_regressor, translate_param_grid, validate_backend
+)
+from models.incremental import (
+    DEFAULT_EXTRA_ESTIMATORS, DEFAULT_HOLDOUT_SIZE, KEY_COLUMNS,
+    FeatureStore, extend_boosting, guard_evaluation
+)
+from utils.match_dataset import load_matches
+
 # Configurar logging básico
 logging.basicConfig(
     level=logging.INFO,
@@ -59,6 +67,8 @@ def load_data(data_path, format='csv'):
         
         if format.lower() == 'csv':
             data = pd.read_csv(data_path)
+        elif format.lower() == 'parquet':
+            data = load_matches(data_path)
         elif format.lower() == 'excel':
             data = pd.read_excel(data_path)
         elif format.lower() == 'json':
@@ -183,6 +193,8 @@ def train_models(preprocessed_data, model_config):
         
         # Parámetros de entrenamiento
         params = model_config.get('params', {})
+        backend = validate_backend(model_config.get('backend', DEFAULT_BACKEND))
+        logger.info(f"Backend del estimador: {backend}")
         
         # Usar hiperparámetros por defecto si no se especifican
         default_params = {
@@ -207,11 +219,11 @@ def train_models(preprocessed_data, model_config):
             # Seleccionar tipo de modelo según el objetivo
             if target in ['total_goals']:
                 # Regresión para objetivos continuos
-                model = GradientBoostingRegressor(**params)
+                model = build_regressor(backend, params)
                 metrics_func = mean_squared_error
             else:
                 # Clasificación para objetivos categóricos
-                model = GradientBoostingClassifier(**params)
+                model = build_classifier(backend, params)
                 metrics_func = accuracy_score
             
             # Datos de entrenamiento
@@ -260,7 +272,7 @@ def train_models(preprocessed_data, model_config):
             
             # Guardar modelo
             model_path = models_dir / f"model_{target}.joblib"
-            joblib.dump(model, model_path)
+            save_artifact(model, model_path)
             
             # Almacenar modelo y métricas
             trained_models[target] = model
@@ -274,6 +286,7 @@ def train_models(preprocessed_data, model_config):
             'version': model_config.get('version', '1.0'),
             'features': feature_columns,
             'targets': target_columns,
+            'backend': backend,
             'parameters': params,
             'metrics': model_metrics,
             'training_date': datetime.now().isoformat(),
@@ -298,6 +311,111 @@ def train_models(preprocessed_data, model_config):
         logger.error(f"Error entrenando modelos: {e}")
         raise
 
+def get_feature_store(model_config):
+    """Devuelve el feature store configurado para el reentrenamiento incremental"""
+    store_path = model_config.get('incremental', {}).get(
+        'feature_store', str(BASE_DIR / 'data' / 'feature_store' / 'train_model.csv')
+    )
+    if not os.path.isabs(store_path):
+        store_path = BASE_DIR / store_path
+    return FeatureStore(store_path)
+
+def store_columns(data, feature_columns, target_columns):
+    """Columnas que se guardan en el feature store (clave + características + objetivos)"""
+    keys = [col for col in KEY_COLUMNS if col in data.columns]
+    return list(dict.fromkeys(keys + list(feature_columns) + list(target_columns)))
+
+def scale_features(frame, feature_columns, scaler):
+    """Aplica el scaler ya ajustado (los nulos se rellenan con su media)"""
+    X = frame[feature_columns].fillna(pd.Series(scaler.mean_, index=feature_columns))
+    return pd.DataFrame(scaler.transform(X), columns=feature_columns, index=frame.index)
+
+def incremental_update(data, model_config):
+    """
+    Amplía los modelos guardados con los partidos nuevos en lugar de reentrenar.
+    
+    Solo se añaden al feature store las filas que no contenía. Cada modelo
+    recibe árboles extra entrenados sobre los partidos pendientes y se compara
+    con el actual en un holdout rodante (los partidos más recientes). Si algún
+    candidato empeora, se conservan los modelos actuales.
+    """
+    try:
+        logger.info("Iniciando actualización incremental...")
+        
+        incremental_config = model_config.get('incremental', {})
+        extra_estimators = incremental_config.get('extra_estimators', DEFAULT_EXTRA_ESTIMATORS)
+        holdout_size = incremental_config.get('holdout_size', DEFAULT_HOLDOUT_SIZE)
+        tolerance = incremental_config.get('tolerance', 0.0)
+        
+        models_dir = BASE_DIR / 'models' / 'saved'
+        with open(models_dir / 'metadata.json', 'r') as f:
+            metadata = json.load(f)
+        with open(models_dir / 'scaler.pkl', 'rb') as f:
+            scaler = pickle.load(f)
+        
+        feature_columns = metadata['features']
+        target_columns = metadata['targets']
+        
+        store = get_feature_store(model_config)
+        store.append(data[store_columns(data, feature_columns, target_columns)])
+        
+        train_rows, holdout_rows, trained_until = store.pending(holdout_size)
+        if train_rows.empty:
+            logger.info("No hay partidos pendientes fuera del holdout: modelos sin cambios")
+            return None
+        
+        logger.info(f"Ampliando modelos con {len(train_rows)} partidos (holdout: {len(holdout_rows)})")
+        
+        X_new = scale_features(train_rows, feature_columns, scaler)
+        X_holdout = scale_features(holdout_rows, feature_columns, scaler)
+        
+        candidates = {}
+        guards = {}
+        for target in target_columns:
+            # Copia privada: el candidato se construye sin tocar el modelo que se sirve
+            current = load_artifact(models_dir / f"model_{target}.joblib", mmap_mode=None, use_cache=False)
+            candidates[target] = extend_boosting(current, X_new, train_rows[target], extra_estimators)
+            guards[target] = guard_evaluation(
+                current, candidates[target], X_holdout, holdout_rows[target], tolerance
+            )
+            logger.info(f"  {target}: pérdida actual {guards[target]['current']}, "
+                        f"candidato {guards[target]['candidate']}")
+        
+        if not all(guard['passed'] for guard in guards.values()):
+            failed = [target for target, guard in guards.items() if not guard['passed']]
+            logger.warning(f"Evaluación de control no superada ({', '.join(failed)}): se mantienen los modelos actuales")
+            return {'promoted': False, 'guards': guards}
+        
+        for target, model in candidates.items():
+            save_artifact(model, models_dir / f"model_{target}.joblib")
+            metadata['metrics'].setdefault(target, {})['holdout_loss'] = guards[target]['candidate']
+        
+        metadata['samples']['train'] += len(train_rows)
+        metadata['training_date'] = datetime.now().isoformat()
+        metadata.setdefault('incremental_updates', []).append({
+            'date': metadata['training_date'],
+            'rows': len(train_rows),
+            'extra_estimators': extra_estimators,
+            'guards': guards
+        })
+        
+        with open(models_dir / 'metadata.json', 'w') as f:
+            json.dump(metadata, f, indent=2)
+        
+        store.mark_trained(trained_until)
+        logger.info("Modelos ampliados y guardados")
+        
+        return {
+            'promoted': True,
+            'models': candidates,
+            'metrics': metadata['metrics'],
+            'metadata': metadata,
+            'guards': guards
+        }
+    except Exception as e:
+        logger.error(f"Error en actualización incremental: {e}")
+        raise
+
 def optimize_hyperparameters(preprocessed_data, model_config):
     """Optimiza hiperparámetros usando GridSearchCV"""
     try:
@@ -321,8 +439,9 @@ def optimize_hyperparameters(preprocessed_data, model_config):
         X = train_data[feature_columns]
         y = train_data[target]
         
-        # Espacio de parámetros
-        param_grid = hyperopt_config.get('space', {})
+        # Espacio de parámetros (traducido a los nombres del backend)
+        backend = validate_backend(model_config.get('backend', DEFAULT_BACKEND))
+        param_grid = translate_param_grid(hyperopt_config.get('space', {}), backend)
         
         if not param_grid:
             logger.warning("No se encontró espacio de parámetros para optimización")
@@ -330,9 +449,9 @@ def optimize_hyperparameters(preprocessed_data, model_config):
         
         # Seleccionar tipo de modelo según el objetivo
         if target in ['total_goals']:
-            model = GradientBoostingRegressor()
+            model = build_regressor(backend)
         else:
-            model = GradientBoostingClassifier()
+            model = build_classifier(backend)
         
         # Configurar GridSearchCV
         cv = model_config.get('training', {}).get('cv_folds', 5)
@@ -386,11 +505,15 @@ def main():
     """Función principal para entrenamiento de modelos"""
     parser = argparse.ArgumentParser(description='Entrenamiento de modelos para predicción de fútbol')
     parser.add_argument('--data', '-d', required=True, help='Ruta al archivo de datos')
-    parser.add_argument('--format', '-f', default='csv', choices=['csv', 'excel', 'json'],
+    parser.add_argument('--format', '-f', default='csv', choices=['csv', 'parquet', 'excel', 'json'],
                       help='Formato del archivo de datos')
     parser.add_argument('--env', '-e', default='development', choices=['development', 'production'],
                       help='Entorno de ejecución')
     parser.add_argument('--optimize', '-o', action='store_true', help='Optimizar hiperparámetros')
+    parser.add_argument('--register', action='store_true', help='Registrar los artefactos como nueva versión')
+    parser.add_argument('--promote', action='store_true', help='Registrar y activar la nueva versión')
+    parser.add_argument('--incremental', '-i', action='store_true',
+                      help='Ampliar los modelos guardados solo con los partidos nuevos')
     
     args = parser.parse_args()
     
@@ -402,22 +525,35 @@ def main():
         # Cargar datos
         data = load_data(args.data, args.format)
         
-        # Preprocesar datos
-        preprocessed_data = preprocess_data(data, config['model'])
-        
-        # Optimizar hiperparámetros si se solicita
-        if args.optimize:
-            best_params = optimize_hyperparameters(preprocessed_data, config['model'])
+        if args.incremental:
+            result = incremental_update(data, config['model'])
             
-            if best_params:
-                # Actualizar parámetros del modelo
-                config['model']['params'] = best_params
-        
-        # Entrenar modelos
-        result = train_models(preprocessed_data, config['model'])
-        
-        logger.info(f"Entrenamiento completado para {len(result['models'])} modelos.")
-        logger.info(f"Modelos guardados en: {BASE_DIR / 'models' / 'saved'}")
+            if not result or not result['promoted']:
+                logger.info("Actualización incremental sin promoción")
+                return
+        else:
+            # Preprocesar datos (sobre una copia: el feature store guarda los valores originales)
+            preprocessed_data = preprocess_data(data.copy(), config['model'])
+            
+            # Optimizar hiperparámetros si se solicita
+            if args.optimize:
+                best_params = optimize_hyperparameters(preprocessed_data, config['model'])
+                
+                if best_params:
+                    # Actualizar parámetros del modelo
+                    config['model']['params'] = best_params
+            
+            # Entrenar modelos
+            result = train_models(preprocessed_data, config['model'])
+            
+            # Punto de partida para las actualizaciones incrementales
+            # (solo las filas de entrenamiento: las de prueba quedan como partidos nuevos)
+            get_feature_store(config['model']).reset(data.loc[preprocessed_data['train_data'].index, store_columns(
+                data, preprocessed_data['feature_columns'], preprocessed_data['target_columns']
+            )])
+            
+            logger.info(f"Entrenamiento completado para {len(result['models'])} modelos.")
+            logger.info(f"Modelos guardados en: {BASE_DIR / 'models' / 'saved'}")
         
         # Mostrar resumen de métricas
         logger.info("Resumen de métricas:")
@@ -425,6 +561,17 @@ def main():
             metrics_str = ", ".join([f"{k}: {v:.4f}" for k, v in metrics.items()])
             logger.info(f"  {target}: {metrics_str}")
         
+        # Registrar versión (los workers la cargarán al promoverla)
+        if args.register or args.promote:
+            from models.registry import ModelRegistry
+            
+            registry = ModelRegistry()
+            version = registry.register(BASE_DIR / 'models' / 'saved', metadata=result['metadata'])
+            logger.info(f"Versión registrada: {version}")
+            
+            if args.promote:
+                registry.promote(version)
+        
     except Exception as e:
         logger.error(f"Error en entrenamiento: {e}")
         sys.exit(1)
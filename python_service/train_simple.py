@@ -2,105 +2,55 @@
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
-import joblib
 import os
+import argparse
 import logging
 
+from models.artifacts import load_artifact, save_artifact
+from models.calibration import ARTIFACT_KEY, CALIBRATION_SIZE, DEFAULT_METHOD, METHODS, fit_calibrator, load_calibrator
+from models.encoding import CategoryTable, encode_frame, export_encoding_tables, load_encoding_tables
+from models.estimators import (
+    BACKENDS, DEFAULT_BACKEND, build_classifier, get_feature_importances, native_categorical_indices
+)
+from models.incremental import (
+    DEFAULT_EXTRA_ESTIMATORS, DEFAULT_HOLDOUT_SIZE, KEY_COLUMNS,
+    FeatureStore, extend_boosting, guard_evaluation, match_keys
+)
+from utils.match_dataset import load_matches
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('simple_trainer')
 
-def main():
-    logger.info("🚀 Iniciando entrenamiento del modelo de fútbol")
-    
-    # Cargar datos
-    logger.info("📊 Cargando datos...")
-    df = pd.read_csv('data/partidos_historicos.csv')
-    logger.info(f"✅ Datos cargados: {len(df)} partidos, {len(df.columns)} columnas")
-    
-    # Mostrar información de los datos
-    logger.info(f"📅 Rango de fechas: {df['date'].min()} a {df['date'].max()}")
-    logger.info(f"🏆 Ligas: {', '.join(df['league'].unique())}")
-    logger.info(f"📈 Distribución de resultados:")
-    result_counts = df['result'].value_counts()
-    for result, count in result_counts.items():
-        pct = (count / len(df)) * 100
-        result_name = {'H': 'Victoria Local', 'D': 'Empate', 'A': 'Victoria Visitante'}.get(result, result)
-        logger.info(f"     {result_name}: {count} ({pct:.1f}%)")
-    
-    # Preparar características
-    logger.info("🔧 Preparando características...")
-    
-    # Encoders para equipos
-    home_encoder = LabelEncoder()
-    away_encoder = LabelEncoder()
-    league_encoder = LabelEncoder()
-    
-    # Features numéricas disponibles
-    features = []
-    feature_names = []
-    
-    # Codificar equipos
-    features.append(home_encoder.fit_transform(df['home_team']))
-    feature_names.append('home_team_encoded')
-    
-    features.append(away_encoder.fit_transform(df['away_team']))
-    feature_names.append('away_team_encoded')
-    
-    features.append(league_encoder.fit_transform(df['league']))
-    feature_names.append('league_encoded')
-    
-    # IMPORTANTE: NO usar características que contengan el resultado del partido
-    # Solo usar estadísticas del partido que NO incluyan goles
-    pre_match_cols = ['home_shots_on_target', 'away_shots_on_target', 
-                      'home_corners', 'away_corners', 
-                      'home_fouls', 'away_fouls', 
-                      'home_yellow_cards', 'away_yellow_cards', 
-                      'home_red_cards', 'away_red_cards']
-    
-    # Verificar qué columnas están disponibles
-    available_cols = []
-    for col in pre_match_cols:
-        if col in df.columns:
-            available_cols.append(col)
-    
-    if not available_cols:
-        logger.warning("⚠️ No se encontraron estadísticas del partido. Usando solo equipos y liga.")
-        logger.info("📝 Para mejores predicciones, considera agregar estadísticas históricas de los equipos.")
-    else:
-        logger.info(f"📊 Usando estadísticas del partido: {', '.join(available_cols)}")
-        for col in available_cols:
-            features.append(df[col].values)
-            feature_names.append(col)
-        
-        # Crear características derivadas (sin usar goles)
-        if 'home_shots_on_target' in df.columns and 'away_shots_on_target' in df.columns:
-            features.append(df['home_shots_on_target'] - df['away_shots_on_target'])
-            feature_names.append('shots_difference')
-        
-        if 'home_corners' in df.columns and 'away_corners' in df.columns:
-            features.append(df['home_corners'] - df['away_corners'])
-            feature_names.append('corners_difference')
-        
-        if 'home_fouls' in df.columns and 'away_fouls' in df.columns:
-            features.append(df['home_fouls'] - df['away_fouls'])
-            feature_names.append('fouls_difference')
-    
-    # Crear características adicionales basadas en estadísticas históricas
-    logger.info("📈 Calculando estadísticas históricas de equipos...")
-    
-    # Ordenar por fecha para calcular estadísticas correctamente
-    df_sorted = df.sort_values('date').reset_index(drop=True)
-    
-    # Calcular estadísticas móviles para cada equipo (últimos 5 partidos)
-    window_size = 5
+FEATURE_STORE_PATH = 'data/feature_store/train_simple.csv'
+MODEL_PATH = 'models/saved/football_predictor.joblib'
+
+# IMPORTANTE: NO usar características que contengan el resultado del partido
+# Solo usar estadísticas del partido que NO incluyan goles
+PRE_MATCH_COLS = ['home_shots_on_target', 'away_shots_on_target', 
+                  'home_corners', 'away_corners', 
+                  'home_fouls', 'away_fouls', 
+                  'home_yellow_cards', 'away_yellow_cards', 
+                  'home_red_cards', 'away_red_cards']
+
+def compute_team_form(df_sorted, rows, window_size=5):
+    """
+    Tasas de victoria/empate de cada equipo en sus últimos partidos.
+    
+    Args:
+        df_sorted (pandas.DataFrame): Historial completo ordenado por fecha
+        rows (iterable): Posiciones de los partidos para los que calcularlas
+        window_size (int): Partidos anteriores considerados
+    
+    Returns:
+        tuple: (home_stats, away_stats) como arrays [win_rate, draw_rate]
+    """
     home_stats = []
     away_stats = []
     
-    for idx in range(len(df_sorted)):
+    for idx in rows:
         current_date = df_sorted.loc[idx, 'date']
         home_team = df_sorted.loc[idx, 'home_team']
         away_team = df_sorted.loc[idx, 'away_team']
@@ -162,10 +112,57 @@ def main():
         home_stats.append([home_win_rate, home_draw_rate])
         away_stats.append([away_win_rate, away_draw_rate])
     
-    # Agregar estadísticas históricas como características
-    home_stats_array = np.array(home_stats)
-    away_stats_array = np.array(away_stats)
+    return np.array(home_stats).reshape(-1, 2), np.array(away_stats).reshape(-1, 2)
+
+def build_features(df_sorted, tables, rows=None, available_cols=None):
+    """
+    Construye la matriz de características para los partidos indicados.
+    
+    Args:
+        df_sorted (pandas.DataFrame): Historial completo ordenado por fecha
+        tables (dict): CategoryTable de 'home_team', 'away_team' y 'league'
+        rows (array-like, optional): Posiciones de los partidos (todos por defecto)
+        available_cols (list, optional): Estadísticas del partido a usar
+    
+    Returns:
+        tuple: (X, feature_names)
+    """
+    if rows is None:
+        rows = np.arange(len(df_sorted))
+    df = df_sorted.iloc[rows]
+    if available_cols is None:
+        available_cols = [col for col in PRE_MATCH_COLS if col in df_sorted.columns]
+    
+    features = []
+    feature_names = []
+    
+    # Codificar equipos y liga (desconocidos -> UNKNOWN_ID)
+    encoded = encode_frame(df, tables, columns=['home_team', 'away_team', 'league'])
+    features.extend(encoded.T)
+    feature_names.extend(['home_team_encoded', 'away_team_encoded', 'league_encoded'])
     
+    for col in available_cols:
+        features.append(df[col].values)
+        feature_names.append(col)
+    
+    if available_cols:
+        # Crear características derivadas (sin usar goles)
+        if 'home_shots_on_target' in df.columns and 'away_shots_on_target' in df.columns:
+            features.append(df['home_shots_on_target'] - df['away_shots_on_target'])
+            feature_names.append('shots_difference')
+        
+        if 'home_corners' in df.columns and 'away_corners' in df.columns:
+            features.append(df['home_corners'] - df['away_corners'])
+            feature_names.append('corners_difference')
+        
+        if 'home_fouls' in df.columns and 'away_fouls' in df.columns:
+            features.append(df['home_fouls'] - df['away_fouls'])
+            feature_names.append('fouls_difference')
+    
+    # Estadísticas históricas (solo se recorren los partidos pedidos)
+    home_stats_array, away_stats_array = compute_team_form(df_sorted, rows)
+    
+    # Agregar estadísticas históricas como características
     features.append(home_stats_array[:, 0])  # Tasa de victorias local
     feature_names.append('home_win_rate')
     
@@ -182,36 +179,103 @@ def main():
     features.append(home_stats_array[:, 0] - away_stats_array[:, 0])
     feature_names.append('win_rate_difference')
     
-    # Combinar todas las características
-    X = np.column_stack(features)
-    y = df_sorted['result'].values
+    return np.column_stack(features), feature_names
+
+def feature_frame(df_sorted, X, feature_names, rows):
+    """Filas para el feature store: clave del partido + características (X, ya de las filas `rows`) + resultado"""
+    frame = pd.DataFrame(X, columns=feature_names)
+    keys = df_sorted.iloc[rows][list(KEY_COLUMNS) + ['result']].reset_index(drop=True)
+    return pd.concat([keys, frame], axis=1)
+
+def main(backend=DEFAULT_BACKEND, calibration=DEFAULT_METHOD):
+    logger.info("🚀 Iniciando entrenamiento del modelo de fútbol")
+    
+    # Cargar datos
+    logger.info("📊 Cargando datos...")
+    df = load_matches()
+    logger.info(f"✅ Datos cargados: {len(df)} partidos, {len(df.columns)} columnas")
+    
+    # Ordenar por fecha para calcular estadísticas correctamente (características
+    # y resultados se toman del mismo DataFrame ordenado)
+    df = df.sort_values('date').reset_index(drop=True)
+    
+    # Mostrar información de los datos
+    logger.info(f"📅 Rango de fechas: {df['date'].min()} a {df['date'].max()}")
+    logger.info(f"🏆 Ligas: {', '.join(df['league'].unique())}")
+    logger.info(f"📈 Distribución de resultados:")
+    result_counts = df['result'].value_counts()
+    for result, count in result_counts.items():
+        pct = (count / len(df)) * 100
+        result_name = {'H': 'Victoria Local', 'D': 'Empate', 'A': 'Victoria Visitante'}.get(result, result)
+        logger.info(f"     {result_name}: {count} ({pct:.1f}%)")
+    
+    # Preparar características
+    logger.info("🔧 Preparando características...")
+    
+    # Encoders para equipos
+    home_encoder = LabelEncoder().fit(df['home_team'])
+    away_encoder = LabelEncoder().fit(df['away_team'])
+    league_encoder = LabelEncoder().fit(df['league'])
+    encoders = {'home_team': home_encoder, 'away_team': away_encoder, 'league': league_encoder}
+    tables = {column: CategoryTable.from_label_encoder(encoder) for column, encoder in encoders.items()}
+    
+    available_cols = [col for col in PRE_MATCH_COLS if col in df.columns]
+    
+    if not available_cols:
+        logger.warning("⚠️ No se encontraron estadísticas del partido. Usando solo equipos y liga.")
+        logger.info("📝 Para mejores predicciones, considera agregar estadísticas históricas de los equipos.")
+    else:
+        logger.info(f"📊 Usando estadísticas del partido: {', '.join(available_cols)}")
+    
+    # Crear características adicionales basadas en estadísticas históricas
+    logger.info("📈 Calculando estadísticas históricas de equipos...")
+    
+    X, feature_names = build_features(df, tables, available_cols=available_cols)
+    y = df['result'].values
     
     logger.info(f"✅ Características preparadas: {X.shape[1]} features")
     logger.info(f"📋 Features: {', '.join(feature_names)}")
     
-    # Dividir datos
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
+    # Dividir datos: entrenamiento, calibración (separada del entrenamiento) y prueba
+    train_rows, test_rows = train_test_split(
+        np.arange(len(X)), test_size=0.2, random_state=42, stratify=y
     )
+    train_rows, calibration_rows = train_test_split(
+        train_rows, test_size=CALIBRATION_SIZE, random_state=42, stratify=y[train_rows]
+    )
+    X_train, X_test, y_train, y_test = X[train_rows], X[test_rows], y[train_rows], y[test_rows]
+    X_calibration, y_calibration = X[calibration_rows], y[calibration_rows]
     
-    logger.info(f"📊 Datos divididos: {len(X_train)} entrenamiento, {len(X_test)} prueba")
+    logger.info(f"📊 Datos divididos: {len(X_train)} entrenamiento, {len(X_calibration)} calibración, "
+                f"{len(X_test)} prueba")
     
     # Entrenar modelo
-    logger.info("🤖 Entrenando modelo Gradient Boosting...")
+    logger.info(f"🤖 Entrenando modelo Gradient Boosting (backend: {backend})...")
     
-    model = GradientBoostingClassifier(
-        n_estimators=200,
-        learning_rate=0.1,
-        max_depth=5,
-        random_state=42
-    )
+    # Equipos y liga (columnas 0-2) como categorías nativas en el backend histograma
+    categorical_idx = native_categorical_indices(X_train, [0, 1, 2]) or None
+    
+    model = build_classifier(backend, {
+        'n_estimators': 200,
+        'learning_rate': 0.1,
+        'max_depth': 5,
+        'random_state': 42
+    }, categorical_features=categorical_idx)
     
     model.fit(X_train, y_train)
     logger.info("✅ Modelo entrenado")
     
-    # Evaluar modelo
+    # Calibrar probabilidades en el conjunto de calibración; el informe se mide en prueba
+    logger.info(f"📐 Calibrando probabilidades ({calibration})...")
+    test_proba = model.predict_proba(X_test)
+    calibrator, calibration_report = fit_calibrator(
+        model.predict_proba(X_calibration), y_calibration, classes=model.classes_, method=calibration,
+        eval_proba=test_proba, eval_y=y_test
+    )
+    
+    # Evaluar modelo (la predicción servida es la clase más probable tras calibrar)
     logger.info("📈 Evaluando modelo...")
-    y_pred = model.predict(X_test)
+    y_pred = model.classes_[np.argmax(calibrator.transform(test_proba), axis=1)]
     
     accuracy = accuracy_score(y_test, y_pred)
     precision = precision_score(y_test, y_pred, average='weighted')
@@ -231,7 +295,7 @@ def main():
     
     # Importancia de características
     logger.info("🔍 Top 10 características más importantes:")
-    feature_importance = model.feature_importances_
+    feature_importance = get_feature_importances(model, X_test, y_test)
     importance_pairs = list(zip(feature_names, feature_importance))
     importance_pairs.sort(key=lambda x: x[1], reverse=True)
     
@@ -247,24 +311,35 @@ def main():
         'home_encoder': home_encoder,
         'away_encoder': away_encoder,
         'league_encoder': league_encoder,
+        'encoding_tables': export_encoding_tables(encoders),
         'feature_names': feature_names,
+        'backend': backend,
+        ARTIFACT_KEY: calibrator.to_dict(),
         'metrics': {
             'accuracy': accuracy,
             'precision': precision,
             'recall': recall,
-            'f1_score': f1
+            'f1_score': f1,
+            'calibration': calibration_report
         }
     }
     
-    joblib.dump(model_data, 'models/saved/football_predictor.joblib')
-    logger.info("✅ Modelo guardado en models/saved/football_predictor.joblib")
+    save_artifact(model_data, MODEL_PATH)
+    logger.info(f"✅ Modelo guardado en {MODEL_PATH}")
+    
+    # Punto de partida para las actualizaciones incrementales: todas las filas que
+    # han visto el modelo o el calibrador. Las de prueba entrarán como partidos
+    # pendientes, y el store mantiene ese bloque por fecha para que el holdout
+    # sean siempre los pendientes más recientes
+    seen_rows = np.sort(np.concatenate([train_rows, calibration_rows]))
+    FeatureStore(FEATURE_STORE_PATH).reset(feature_frame(df, X[seen_rows], feature_names, seen_rows))
     
     # Ejemplo de predicción
     logger.info("🧪 Probando predicción de ejemplo...")
     sample_idx = 0
     sample_features = X_test[sample_idx:sample_idx+1]
-    prediction = model.predict(sample_features)[0]
-    probabilities = model.predict_proba(sample_features)[0]
+    probabilities = calibrator.transform(model.predict_proba(sample_features))[0]
+    prediction = model.classes_[np.argmax(probabilities)]
     actual = y_test[sample_idx]
     
     result_names = {'H': 'Victoria Local', 'D': 'Empate', 'A': 'Victoria Visitante'}
@@ -286,5 +361,90 @@ def main():
         'f1_score': f1
     }
 
+def update_incremental(extra_estimators=DEFAULT_EXTRA_ESTIMATORS, holdout_size=DEFAULT_HOLDOUT_SIZE):
+    """
+    Amplía el modelo guardado con los partidos nuevos del CSV.
+    
+    Solo se calculan características para los partidos que no están en el
+    feature store. El modelo recibe árboles extra entrenados con los partidos
+    pendientes y solo se guarda si no empeora en el holdout rodante.
+    """
+    logger.info("🔄 Iniciando actualización incremental del modelo")
+    
+    df = load_matches()
+    df = df.sort_values('date').reset_index(drop=True)
+    
+    # Copia privada: el modelo servido no se modifica hasta pasar el control
+    model_data = load_artifact(MODEL_PATH, mmap_mode=None, use_cache=False)
+    feature_names = model_data['feature_names']
+    tables = load_encoding_tables(model_data)
+    
+    store = FeatureStore(FEATURE_STORE_PATH)
+    new_rows = np.flatnonzero(~match_keys(df).isin(store.keys()))
+    logger.info(f"🆕 Partidos nuevos: {len(new_rows)}")
+    
+    if len(new_rows) > 0:
+        available_cols = [col for col in PRE_MATCH_COLS if col in feature_names]
+        X_new, new_feature_names = build_features(df, tables, rows=new_rows, available_cols=available_cols)
+        if new_feature_names != feature_names:
+            raise ValueError("Las características de los partidos nuevos no coinciden con las del modelo")
+        store.append(feature_frame(df, X_new, feature_names, new_rows))
+    
+    train_rows, holdout_rows, trained_until = store.pending(holdout_size)
+    if train_rows.empty:
+        logger.info("✅ No hay partidos pendientes fuera del holdout: modelo sin cambios")
+        return None
+    
+    logger.info(f"🤖 Añadiendo {extra_estimators} árboles con {len(train_rows)} partidos "
+                f"(holdout: {len(holdout_rows)})")
+    candidate = extend_boosting(
+        model_data['model'], train_rows[feature_names].values, train_rows['result'].values, extra_estimators
+    )
+    
+    guard = guard_evaluation(
+        model_data['model'], candidate, holdout_rows[feature_names].values, holdout_rows['result'].values
+    )
+    logger.info(f"📈 Log-loss en holdout: actual {guard['current']}, candidato {guard['candidate']}")
+    
+    if not guard['passed']:
+        logger.warning("⚠️ El modelo ampliado no mejora en el holdout: se mantiene el actual")
+        return guard
+    
+    model_data['model'] = candidate
+    model_data['metrics']['holdout_log_loss'] = guard['candidate']
+    
+    # El calibrador anterior corresponde al modelo sin ampliar: se reajusta en el holdout
+    method = load_calibrator(model_data).method
+    try:
+        calibrator, calibration_report = fit_calibrator(
+            candidate.predict_proba(holdout_rows[feature_names].values), holdout_rows['result'].values,
+            classes=candidate.classes_, method=method
+        )
+        model_data[ARTIFACT_KEY] = calibrator.to_dict()
+        model_data['metrics']['calibration'] = calibration_report
+    except ValueError as e:
+        logger.warning(f"⚠️ Calibración no actualizada: {str(e)}")
+    save_artifact(model_data, MODEL_PATH)
+    store.mark_trained(trained_until)
+    
+    logger.info(f"✅ Modelo actualizado en {MODEL_PATH}")
+    return guard
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Entrenamiento simple del modelo de fútbol')
+    parser.add_argument('--backend', '-b', default=DEFAULT_BACKEND, choices=BACKENDS,
+                      help='Backend del estimador de boosting')
+    parser.add_argument('--incremental', '-i', action='store_true',
+                      help='Ampliar el modelo guardado solo con los partidos nuevos')
+    parser.add_argument('--extra-estimators', type=int, default=DEFAULT_EXTRA_ESTIMATORS,
+                      help='Árboles añadidos en la actualización incremental')
+    parser.add_argument('--holdout-size', type=int, default=DEFAULT_HOLDOUT_SIZE,
+                      help='Partidos más recientes reservados para la evaluación de control')
+    parser.add_argument('--calibration', '-c', default=DEFAULT_METHOD, choices=METHODS,
+                      help='Método de calibración de probabilidades')
+    args = parser.parse_args()
+    
+    if args.incremental:
+        update_incremental(args.extra_estimators, args.holdout_size)
+    else:
+        main(backend=args.backend, calibration=args.calibration)
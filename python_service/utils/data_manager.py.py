@@ -9,6 +9,9 @@ from datetime import datetime, timedelta
 import sqlite3
 import traceback
 
+from models.elo import ELO_PATH, FINISHED_STATUSES, EloRatings, locked_state
+from utils.team_registry import get_registry
+
 # Configurar logging
 logger = logging.getLogger('predictor_futbol_premium.data_manager')
 
@@ -18,13 +21,14 @@ class DataManager:
     Se encarga de obtener, procesar y almacenar datos de partidos y equipos.
     """
     
-    def __init__(self, db_path=None, api_key=None):
+    def __init__(self, db_path=None, api_key=None, elo_path=ELO_PATH):
         """
         Inicializa el gestor de datos.
         
         Args:
             db_path (str, opcional): Ruta a la base de datos SQLite. Por defecto usa memoria.
             api_key (str, opcional): Clave de API para servicios externos.
+            elo_path (str, opcional): Estado de los ratings Elo (None para no actualizarlos)
         """
         # Configuración básica
         self.db_path = db_path or ':memory:'
@@ -40,6 +44,10 @@ class DataManager:
             'x-rapidapi-host': 'api-football-v1.p.rapidapi.com'
         }
         
+        # Ratings Elo que se actualizan con cada partido terminado
+        self.elo_path = elo_path
+        self.elo = EloRatings.load(elo_path) if elo_path else None
+        
         # Inicializar base de datos
         self._init_database()
         
@@ -902,11 +910,50 @@ class DataManager:
             )
             
             self.conn.commit()
-            return True
             
         except Exception as e:
             logger.error(f"Error guardando partido en BD: {str(e)}")
             return False
+        
+        # Fuera del try: un fallo del Elo no invalida el partido ya guardado
+        self._update_elo(match_data)
+        return True
+    
+    def _update_elo(self, match_data):
+        """
+        Aplica al Elo el resultado de un partido recién terminado.
+        
+        El estado guardado registra los IDs de partido aplicados, así que un
+        partido que se vuelve a descargar no cuenta dos veces. Se recarga y
+        se guarda bajo bloqueo para no perder resultados de otros procesos.
+        Los equipos se identifican por su nombre canónico, el mismo con el
+        que `EloRatings.replay` reconstruye el histórico.
+        
+        Returns:
+            bool: False si la actualización falló
+        """
+        score = match_data.get('score') or {}
+        if (self.elo is None or match_data['status'].get('short') not in FINISHED_STATUSES
+                or score.get('home') is None or score.get('away') is None):
+            return True
+        
+        registry = get_registry()
+        home_name = registry.lookup(match_data['home_team']['name']) or match_data['home_team']['name']
+        away_name = registry.lookup(match_data['away_team']['name']) or match_data['away_team']['name']
+        try:
+            with locked_state(self.elo_path):
+                self.elo = EloRatings.load(self.elo_path)
+                delta = self.elo.update(
+                    match_data['home_team']['id'], match_data['away_team']['id'],
+                    score['home'], score['away'], date=match_data['date'],
+                    home_name=home_name, away_name=away_name, match_id=match_data['id']
+                )
+                if delta is not None:
+                    self.elo.save(self.elo_path)
+            return True
+        except Exception as e:
+            logger.error(f"Error actualizando el Elo con el partido {match_data.get('id')}: {str(e)}")
+            return False
     
     def _calculate_h2h_stats(self, matches, team1_id, team2_id):
         """Calcula estadísticas de enfrentamientos directos"""
@@ -0,0 +1,254 @@
+# utils/downloads.py
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.downloads')
+
+# Respuestas que merece la pena reintentar
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def api_errors(content):
+    """
+    Errores que una API JSON devuelve con HTTP 200 (campo 'errors' de API-Football).
+
+    Args:
+        content (bytes): Cuerpo de la respuesta
+
+    Returns:
+        str: Descripción de los errores, o None si la respuesta es válida
+    """
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return "Respuesta JSON no válida"
+    errors = data.get('errors') if isinstance(data, dict) else None
+    return json.dumps(errors, ensure_ascii=False) if errors else None
+
+
+class RateLimiter:
+    """
+    Espaciado mínimo entre peticiones a una misma fuente, compartido entre hilos.
+
+    Cada hilo reserva el siguiente hueco libre y solo duerme lo que le falta
+    hasta él, así que varias descargas pueden estar en vuelo a la vez sin
+    superar el ritmo permitido de inicio de peticiones.
+    """
+
+    def __init__(self, min_interval=0.0):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Espera hasta el siguiente hueco permitido"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class RawCache:
+    """
+    Caché en disco de ficheros descargados, con sus metadatos HTTP.
+
+    Cada entrada es el contenido en bruto más un JSON con ETag,
+    Last-Modified y fecha de descarga. Ambos se escriben de forma atómica,
+    así que una ejecución interrumpida nunca deja entradas a medias: al
+    reanudar, lo ya descargado se revalida con peticiones condicionales.
+    """
+
+    def __init__(self, root):
+        self.root = str(root)
+
+    def _paths(self, key):
+        path = os.path.join(self.root, key)
+        return path, f"{path}.meta.json"
+
+    def get(self, key):
+        """
+        Contenido y metadatos de una entrada.
+
+        Returns:
+            tuple: (bytes, dict) o (None, None) si no está en caché
+        """
+        path, meta_path = self._paths(key)
+        if not (os.path.exists(path) and os.path.exists(meta_path)):
+            return None, None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        with open(path, 'rb') as f:
+            return f.read(), meta
+
+    def put(self, key, content, meta):
+        """Guarda contenido y metadatos (primero el contenido, después el JSON)"""
+        path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for target, data, mode in ((path, content, 'wb'), (meta_path, json.dumps(meta, indent=2), 'w')):
+            tmp_path = f"{target}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+
+    def touch(self, key, meta):
+        """Actualiza solo los metadatos (revalidación sin cambios)"""
+        path, meta_path = self._paths(key)
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, meta_path)
+
+
+class CachedDownloader:
+    """
+    Descargas concurrentes con caché condicional y límites por fuente.
+
+    Las descargas se reparten en un pool de hilos acotado; cada fuente tiene
+    su propio RateLimiter. Si una entrada está en caché se envían
+    If-None-Match / If-Modified-Since y un 304 reutiliza el contenido local,
+    de modo que repetir una descarga completa apenas consume ancho de banda.
+    """
+
+    def __init__(self, cache_dir, rate_limits=None, max_workers=8, timeout=30, retries=3):
+        """
+        Inicializa el descargador.
+
+        Args:
+            cache_dir (str): Directorio de la caché en bruto
+            rate_limits (dict, optional): Fuente -> segundos mínimos entre peticiones
+            max_workers (int): Descargas simultáneas
+            timeout (int): Timeout de cada petición en segundos
+            retries (int): Intentos ante errores de red, 429 o 5xx
+        """
+        self.cache = RawCache(cache_dir)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.limiters = {source: RateLimiter(interval) for source, interval in (rate_limits or {}).items()}
+        self._limiters_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self):
+        """Sesión HTTP por hilo (reutiliza conexiones)"""
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _limiter(self, source):
+        with self._limiters_lock:
+            return self.limiters.setdefault(source, RateLimiter())
+
+    def fetch(self, source, key, url, headers=None, params=None, max_age=None, closed=False, validate=None):
+        """
+        Descarga un fichero usando la caché.
+
+        Args:
+            source (str): Fuente (para el límite de peticiones)
+            key (str): Ruta relativa de la entrada en caché
+            url (str): URL
+            headers (dict, optional): Cabeceras de la petición
+            params (dict, optional): Parámetros de la query
+            max_age (float, optional): Segundos durante los que la copia local
+                se usa sin preguntar al servidor (None = revalidar siempre)
+            closed (bool): El recurso ya no cambia (p.ej. una temporada cerrada).
+                La copia local se usa sin revalidar solo si se descargó o
+                revalidó cuando ya estaba cerrado (`closed_at_fetch` en los metadatos)
+            validate (callable, optional): Recibe el contenido de una respuesta 200
+                y devuelve un mensaje de error si no es válida; una respuesta
+                rechazada no se guarda en caché
+
+        Returns:
+            tuple: (contenido en bytes, estado: 'cached', 'not_modified' o 'downloaded')
+        """
+        content, meta = self.cache.get(key)
+
+        if content is not None:
+            if closed and meta.get('closed_at_fetch'):
+                return content, 'cached'
+            if max_age is not None and time.time() - meta.get('fetched_at_ts', 0) < max_age:
+                return content, 'cached'
+
+        request_headers = dict(headers or {})
+        if content is not None:
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+
+        last_error = None
+        for attempt in range(self.retries):
+            self._limiter(source).acquire()
+            try:
+                response = self._session().get(url, headers=request_headers, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                last_error = e
+            else:
+                if response.status_code == 304 and content is not None:
+                    meta['fetched_at_ts'] = time.time()
+                    meta['closed_at_fetch'] = bool(closed)
+                    self.cache.touch(key, meta)
+                    return content, 'not_modified'
+
+                error = validate(response.content) if response.status_code == 200 and validate else None
+                if response.status_code == 200 and error is None:
+                    self.cache.put(key, response.content, {
+                        'url': url if not params else f"{url}?{urlencode(params)}",
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'fetched_at': datetime.now().isoformat(),
+                        'fetched_at_ts': time.time(),
+                        'closed_at_fetch': bool(closed)
+                    })
+                    return response.content, 'downloaded'
+
+                if error is not None:
+                    last_error = ValueError(f"Respuesta rechazada de {url}: {error}")
+                    break
+
+                last_error = requests.HTTPError(f"HTTP {response.status_code} en {url}")
+                if response.status_code not in RETRY_STATUS:
+                    break
+
+            time.sleep(min(2 ** attempt, 30))
+
+        if content is not None:
+            logger.warning(f"Usando copia en caché de {key}: {last_error}")
+            return content, 'cached'
+        raise last_error
+
+    def fetch_many(self, jobs):
+        """
+        Descarga varios ficheros en paralelo.
+
+        Args:
+            jobs (dict): Identificador -> kwargs de fetch()
+
+        Returns:
+            dict: Identificador -> (contenido, estado) o la excepción producida
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch, **kwargs): job_id for job_id, kwargs in jobs.items()}
+            for future in as_completed(futures):
+                job_id = futures[future]
+                try:
+                    results[job_id] = future.result()
+                except Exception as e:
+                    results[job_id] = e
+
+        statuses = [result[1] for result in results.values() if not isinstance(result, Exception)]
+        logger.info(f"Descargas: {statuses.count('downloaded')} nuevas, "
+                    f"{statuses.count('not_modified') + statuses.count('cached')} desde caché, "
+                    f"{len(results) - len(statuses)} con error")
+        return results
@@ -0,0 +1,345 @@
+# utils/match_dataset.py
+import time
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.match_dataset')
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+
+# Dataset particionado por defecto y su exportación CSV
+DEFAULT_DATASET = DATA_DIR / 'partidos_historicos'
+DEFAULT_CSV = DATA_DIR / 'partidos_historicos.csv'
+
+# Particiones en disco (league=.../season=.../part-0.parquet)
+PARTITION_COLUMNS = ['league', 'season']
+
+# Filas mínimas por row group (evita grupos diminutos al repartir por partición)
+MIN_ROWS_PER_GROUP = 128 * 1024
+
+# Ficheros por partición a partir de los que se compacta tras añadir filas
+MAX_FILES_PER_PARTITION = 16
+
+# Columnas que identifican un partido
+KEY_COLUMNS = ['date', 'home_team', 'away_team']
+
+# Orden lógico de las columnas principales (el resto va detrás)
+COLUMN_ORDER = [
+    'match_id', 'date', 'season', 'league',
+    'home_team', 'away_team', 'home_team_id', 'away_team_id',
+    'home_goals', 'away_goals', 'total_goals', 'result'
+]
+
+# Texto repetitivo guardado como diccionario (índices int32 en todas las particiones)
+DICTIONARY_COLUMNS = ['home_team', 'away_team', 'result']
+
+# Tipos fijos para que todas las particiones compartan esquema
+COLUMN_DTYPES = {
+    'match_id': 'string',
+    'season': 'int16',
+    'home_team_id': 'Int64',
+    'away_team_id': 'Int64',
+    'home_goals': 'int16',
+    'away_goals': 'int16',
+    'total_goals': 'int16',
+    'home_shots_on_target': 'Int16',
+    'away_shots_on_target': 'Int16',
+    'home_corners': 'Int16',
+    'away_corners': 'Int16',
+    'home_yellow_cards': 'Int16',
+    'away_yellow_cards': 'Int16',
+    'home_red_cards': 'Int16',
+    'away_red_cards': 'Int16',
+    'home_fouls': 'Int16',
+    'away_fouls': 'Int16'
+}
+
+
+def get_arrow():
+    """
+    Módulos de pyarrow (pyarrow, pyarrow.dataset).
+
+    Se importan al usarse para que los módulos que solo leen CSV no dependan
+    de pyarrow.
+    """
+    import pyarrow
+    import pyarrow.dataset
+    return pyarrow, pyarrow.dataset
+
+
+def order_columns(df):
+    """Reordena las columnas según COLUMN_ORDER (las adicionales al final)"""
+    ordered = [col for col in COLUMN_ORDER if col in df.columns]
+    return df[ordered + [col for col in df.columns if col not in ordered]]
+
+
+def coerce_types(df):
+    """
+    Aplica el esquema tipado del dataset.
+
+    Args:
+        df (pandas.DataFrame): Partidos en el esquema canónico
+
+    Returns:
+        pandas.DataFrame: Copia con fechas, enteros compactos y categorías
+    """
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.astype({col: dtype for col, dtype in COLUMN_DTYPES.items() if col in df.columns})
+    for col in DICTIONARY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _to_table(df):
+    """DataFrame tipado -> tabla Arrow con fecha date32 y diccionarios int32"""
+    pa, _ = get_arrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    for col in ['date'] + DICTIONARY_COLUMNS:
+        if col not in table.column_names:
+            continue
+        target = pa.date32() if col == 'date' else pa.dictionary(pa.int32(), pa.string())
+        index = table.column_names.index(col)
+        table = table.set_column(index, col, table[col].cast(target))
+    return table
+
+
+def write_matches(df, root=DEFAULT_DATASET):
+    """
+    Escribe partidos en el dataset Parquet particionado por liga y temporada.
+
+    Solo se reemplazan las particiones presentes en `df`; el resto del
+    dataset queda intacto, de modo que se pueden añadir ligas o temporadas
+    sin reescribir todo el histórico.
+
+    Args:
+        df (pandas.DataFrame): Partidos en el esquema canónico
+        root (str): Directorio del dataset
+
+    Returns:
+        int: Particiones escritas
+    """
+    _, ds = get_arrow()
+    # Filas contiguas por partición y en orden cronológico dentro de cada una
+    df = order_columns(df).sort_values(PARTITION_COLUMNS + ['date'], kind='stable')
+    table = _to_table(coerce_types(df))
+
+    ds.write_dataset(
+        table, str(root), format='parquet',
+        partitioning=PARTITION_COLUMNS, partitioning_flavor='hive',
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.parquet',
+        min_rows_per_group=MIN_ROWS_PER_GROUP
+    )
+
+    partitions = df[PARTITION_COLUMNS].drop_duplicates()
+    logger.info(f"{len(df)} partidos escritos en {root} ({len(partitions)} particiones)")
+    return len(partitions)
+
+
+def _key_index(df):
+    """Índice (fecha, local, visitante) con la fecha normalizada"""
+    return pd.MultiIndex.from_arrays([
+        pd.to_datetime(df['date']).dt.normalize(),
+        df['home_team'].astype(str),
+        df['away_team'].astype(str)
+    ])
+
+
+def _append(df, root):
+    """Añade filas como ficheros nuevos en sus particiones (sin tocar los existentes)"""
+    _, ds = get_arrow()
+    df = order_columns(df).sort_values(PARTITION_COLUMNS + ['date'], kind='stable')
+    ds.write_dataset(
+        _to_table(coerce_types(df)), str(root), format='parquet',
+        partitioning=PARTITION_COLUMNS, partitioning_flavor='hive',
+        existing_data_behavior='overwrite_or_ignore',
+        basename_template=f"part-{time.time_ns()}-{{i}}.parquet",
+        min_rows_per_group=MIN_ROWS_PER_GROUP
+    )
+
+
+def _compact(root, partitions):
+    """Reescribe en un único fichero las particiones con demasiados ficheros"""
+    _, ds = get_arrow()
+    dataset = ds.dataset(str(root), format='parquet', partitioning='hive')
+
+    for league, season in partitions.itertuples(index=False):
+        expression = (ds.field('league') == league) & (ds.field('season') == int(season))
+        if len(list(dataset.get_fragments(filter=expression))) > MAX_FILES_PER_PARTITION:
+            write_matches(load_matches(root, leagues=[league], seasons=[season]), root)
+            logger.info(f"Partición {league} {season} compactada")
+
+
+def upsert_matches(df, root=DEFAULT_DATASET):
+    """
+    Añade al dataset los partidos que aún no contiene.
+
+    Solo se leen las claves de las particiones afectadas y las filas nuevas
+    se escriben como ficheros adicionales, sin reescribir el dataset. Un
+    partido ya almacenado (misma fecha, local y visitante) se ignora: los
+    partidos terminados no cambian, y una descarga completa sin modo
+    incremental reescribe sus particiones si hace falta corregirlos.
+
+    Args:
+        df (pandas.DataFrame): Partidos recibidos (pueden incluir ya almacenados)
+        root (str): Directorio del dataset
+
+    Returns:
+        pandas.DataFrame: Partidos efectivamente añadidos
+    """
+    if df.empty:
+        return df
+
+    df = df.drop_duplicates(subset=KEY_COLUMNS, keep='last')
+    if not Path(root).is_dir():
+        write_matches(df, root)
+        return df
+
+    partitions = df[PARTITION_COLUMNS].drop_duplicates()
+    stored = load_matches(root, columns=KEY_COLUMNS,
+                          leagues=partitions['league'].unique(), seasons=partitions['season'].unique())
+    new_rows = df[~_key_index(df).isin(_key_index(stored))]
+
+    if new_rows.empty:
+        logger.info("Sin partidos nuevos para el dataset")
+        return new_rows
+
+    _append(new_rows, root)
+    _compact(root, new_rows[PARTITION_COLUMNS].drop_duplicates())
+    logger.info(f"{len(new_rows)} partidos nuevos añadidos a {root}")
+    return new_rows
+
+
+def _filter_expression(leagues=None, seasons=None, date_from=None, date_to=None):
+    """Predicado de Arrow a partir de los filtros (None = sin filtro)"""
+    pa, ds = get_arrow()
+    conditions = []
+    if leagues is not None:
+        conditions.append(ds.field('league').isin(list(leagues)))
+    if seasons is not None:
+        conditions.append(ds.field('season').isin([int(season) for season in seasons]))
+    if date_from is not None:
+        conditions.append(ds.field('date') >= pa.scalar(pd.Timestamp(date_from).date(), pa.date32()))
+    if date_to is not None:
+        conditions.append(ds.field('date') <= pa.scalar(pd.Timestamp(date_to).date(), pa.date32()))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _open_dataset(root, expression):
+    """
+    Abre el dataset con el esquema unificado de las particiones a leer.
+
+    El esquema se deduce de los pies de página de los ficheros que pasan el
+    filtro de partición, así una columna añadida en ejecuciones posteriores
+    no se pierde aunque el primer fichero no la tenga.
+    """
+    pa, ds = get_arrow()
+    dataset = ds.dataset(str(root), format='parquet', partitioning='hive')
+    fragments = list(dataset.get_fragments(filter=expression))
+    if len(fragments) > 1:
+        schema = pa.unify_schemas([dataset.schema] + [fragment.physical_schema for fragment in fragments])
+        dataset = ds.dataset(str(root), format='parquet', partitioning='hive', schema=schema)
+    return dataset
+
+
+def _load_csv(path, columns, leagues, seasons, date_from, date_to):
+    """Lectura equivalente desde un CSV (sin pushdown)"""
+    needed = None
+    if columns is not None:
+        filters = [col for col, value in (('league', leagues), ('season', seasons),
+                                          ('date', date_from or date_to)) if value is not None]
+        needed = list(dict.fromkeys(list(columns) + filters))
+
+    df = pd.read_csv(path, usecols=needed)
+    mask = pd.Series(True, index=df.index)
+    if leagues is not None:
+        mask &= df['league'].isin(list(leagues))
+    if seasons is not None:
+        mask &= df['season'].isin([int(season) for season in seasons])
+    if date_from is not None or date_to is not None:
+        dates = pd.to_datetime(df['date'])
+        if date_from is not None:
+            mask &= dates >= pd.Timestamp(date_from)
+        if date_to is not None:
+            mask &= dates <= pd.Timestamp(date_to)
+
+    df = df[mask]
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
+
+
+def load_matches(path=None, columns=None, leagues=None, seasons=None,
+                 date_from=None, date_to=None, categorical=False):
+    """
+    Carga partidos históricos leyendo solo las columnas y particiones necesarias.
+
+    Sin ruta usa el dataset Parquet por defecto y, si no existe (o falta
+    pyarrow), la exportación CSV.
+
+    Args:
+        path (str, optional): Directorio del dataset o fichero CSV
+        columns (list, optional): Columnas a leer (None = todas)
+        leagues (list, optional): Ligas a leer
+        seasons (list, optional): Temporadas a leer
+        date_from (str, optional): Fecha mínima (incluida)
+        date_to (str, optional): Fecha máxima (incluida)
+        categorical (bool): Devolver equipos y resultado como category
+
+    Returns:
+        pandas.DataFrame: Partidos
+    """
+    path = Path(path) if path is not None else None
+    if path is None:
+        path = DEFAULT_DATASET if DEFAULT_DATASET.is_dir() else DEFAULT_CSV
+
+    if path.is_dir():
+        try:
+            get_arrow()
+        except ImportError:
+            logger.warning(f"pyarrow no está instalado; usando {DEFAULT_CSV}")
+            path = DEFAULT_CSV
+        else:
+            expression = _filter_expression(leagues, seasons, date_from, date_to)
+            dataset = _open_dataset(path, expression)
+            table = dataset.to_table(columns=list(columns) if columns is not None else None, filter=expression)
+            df = table.to_pandas(date_as_object=False)
+            if 'date' in df.columns:
+                df['date'] = df['date'].astype('datetime64[ns]')
+
+            if columns is None:
+                df = order_columns(df)
+            if not categorical:
+                for col in df.columns[df.dtypes == 'category']:
+                    df[col] = df[col].astype(object)
+            return df
+
+    return _load_csv(path, columns, leagues, seasons, date_from, date_to)
+
+
+def export_csv(output, root=DEFAULT_DATASET, **filters):
+    """
+    Exporta (parte de) el dataset a CSV.
+
+    Args:
+        output (str): Ruta del CSV
+        root (str): Directorio del dataset
+        **filters: Filtros de load_matches (leagues, seasons, date_from, date_to)
+
+    Returns:
+        int: Partidos exportados
+    """
+    df = load_matches(root, **filters)
+    df.sort_values('date', kind='stable').to_csv(output, index=False, date_format='%Y-%m-%d')
+    logger.info(f"{len(df)} partidos exportados a {output}")
+    return len(df)
@@ -0,0 +1,93 @@
+# utils/sync_state.py
+import os
+import json
+import logging
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.sync_state')
+
+
+class SyncState:
+    """
+    Marcas de agua de la sincronización incremental, por fuente y liga.
+
+    Cada marca guarda la fecha y el ID del último partido recibido; la
+    siguiente sincronización solo pide partidos desde esa fecha. El fichero
+    se reescribe de forma atómica para que una ejecución interrumpida nunca
+    deje marcas a medias.
+    """
+
+    def __init__(self, path):
+        """
+        Inicializa el estado.
+
+        Args:
+            path (str): Ruta del JSON de estado
+        """
+        self.path = str(path)
+        self.state = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                self.state = json.load(f)
+
+    def get(self, source, league):
+        """
+        Marca de agua de una liga.
+
+        Returns:
+            dict: {'last_date', 'last_id', 'synced_at'} o None si nunca se sincronizó
+        """
+        return self.state.get(source, {}).get(league)
+
+    def since(self, source, leagues):
+        """Fecha de la marca de agua de cada liga ya sincronizada"""
+        return {
+            league: self.get(source, league)['last_date']
+            for league in leagues if self.get(source, league)
+        }
+
+    def update(self, source, df):
+        """
+        Avanza las marcas de agua con los partidos recibidos.
+
+        Args:
+            source (str): Fuente
+            df (pandas.DataFrame): Partidos recibidos (columnas league, date, match_id)
+        """
+        if df.empty:
+            return
+
+        synced_at = datetime.now().isoformat()
+        latest = df.sort_values('date', kind='stable').groupby('league').tail(1)
+        marks = self.state.setdefault(source, {})
+
+        for _, row in latest.iterrows():
+            previous = marks.get(row['league'], {}).get('last_date', '')
+            last_date = str(row['date'])[:10]
+            if last_date < previous:
+                continue
+            marks[row['league']] = {
+                'last_date': last_date,
+                'last_id': None if pd.isna(row['match_id']) else str(row['match_id']),
+                'synced_at': synced_at
+            }
+
+        self.save()
+
+    def save(self):
+        """Escribe el estado de forma atómica"""
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.sync_', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,193 @@
+# utils/synthetic_matches.py
+import zlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.synthetic_matches')
+
+# Equipos de ejemplo por liga
+SAMPLE_TEAMS = {
+    'Premier League': [
+        'Manchester City', 'Manchester United', 'Liverpool', 'Chelsea',
+        'Arsenal', 'Tottenham', 'Newcastle', 'Brighton',
+        'West Ham', 'Aston Villa', 'Crystal Palace', 'Brentford',
+        'Fulham', 'Wolves', 'Everton', 'Nottingham Forest',
+        'Burnley', 'Sheffield United', 'Luton Town', 'Bournemouth'
+    ],
+    'La Liga': [
+        'Real Madrid', 'Barcelona', 'Atlético Madrid', 'Sevilla',
+        'Real Sociedad', 'Real Betis', 'Villarreal', 'Valencia',
+        'Athletic Bilbao', 'Getafe', 'Osasuna', 'Las Palmas',
+        'Girona', 'Rayo Vallecano', 'Mallorca', 'Celta Vigo',
+        'Cadiz', 'Granada', 'Almeria', 'Alaves'
+    ]
+}
+
+# Niveles de equipo (el resto se considera de nivel bajo)
+TOP_TEAMS = {
+    'Manchester City', 'Real Madrid', 'Barcelona', 'Bayern Munich',
+    'Liverpool', 'Manchester United', 'Chelsea', 'Arsenal'
+}
+MID_TEAMS = {
+    'Tottenham', 'Atlético Madrid', 'Sevilla', 'Borussia Dortmund',
+    'Inter Milan', 'AC Milan', 'Napoli', 'Paris Saint-Germain'
+}
+
+# Fortaleza (mínimo, máximo) por nivel de equipo
+STRENGTH_RANGES = np.array([
+    (0.75, 0.95),  # top
+    (0.55, 0.75),  # mid
+    (0.35, 0.65)   # resto
+])
+
+# Variación de la fortaleza de cada equipo entre temporadas
+SEASON_DRIFT = 0.03
+
+HOME_ADVANTAGE = 0.15
+
+# Estadísticas adicionales: (columna, distribución, parámetros, mínimo, goles que suma)
+STAT_SPECS = [
+    ('home_shots_on_target', 'normal', (4, 2), 1, 'home'),
+    ('away_shots_on_target', 'normal', (3, 2), 1, 'away'),
+    ('home_corners', 'normal', (5, 2), 0, None),
+    ('away_corners', 'normal', (4, 2), 0, None),
+    ('home_fouls', 'normal', (12, 3), 0, None),
+    ('away_fouls', 'normal', (13, 3), 0, None),
+    ('home_yellow_cards', 'poisson', (2,), 0, None),
+    ('away_yellow_cards', 'poisson', (2,), 0, None)
+]
+RED_CARD_PROBABILITY = 0.05
+
+
+def stable_id(name, modulo=10 ** 9):
+    """
+    ID numérico estable de un nombre (CRC32, igual en todas las ejecuciones).
+
+    A diferencia de hash(), no depende de PYTHONHASHSEED.
+    """
+    return zlib.crc32(name.encode('utf-8')) % modulo
+
+
+def league_teams(leagues=None, extra_leagues=0, teams_per_league=20):
+    """
+    Equipos de cada liga a generar.
+
+    Las ligas de SAMPLE_TEAMS usan sus equipos reales; el resto (y las
+    `extra_leagues` sintéticas) reciben `teams_per_league` equipos numerados.
+
+    Returns:
+        dict: Liga -> lista de equipos
+    """
+    leagues = list(SAMPLE_TEAMS) if leagues is None else list(leagues)
+    leagues += [f"Liga Sintética {i + 1}" for i in range(extra_leagues)]
+    return {
+        league: SAMPLE_TEAMS.get(league) or [f"{league} FC {j + 1:02d}" for j in range(teams_per_league)]
+        for league in leagues
+    }
+
+
+def _base_strengths(teams, rng):
+    """Fortaleza base de cada equipo según su nivel"""
+    tiers = np.select([np.isin(teams, list(TOP_TEAMS)), np.isin(teams, list(MID_TEAMS))], [0, 1], default=2)
+    return rng.uniform(STRENGTH_RANGES[tiers, 0], STRENGTH_RANGES[tiers, 1])
+
+
+def generate_matches(leagues=None, seasons=(2023, 2024), extra_leagues=0, teams_per_league=20, seed=42):
+    """
+    Genera partidos sintéticos realistas (liga a doble vuelta).
+
+    Todo se sortea con un único generador sembrado y en bloque, así que la
+    misma configuración produce exactamente los mismos partidos e IDs.
+    Millones de partidos se generan en pocos segundos.
+
+    Args:
+        leagues (list, optional): Ligas (por defecto las de SAMPLE_TEAMS)
+        seasons (list): Temporadas (año de inicio)
+        extra_leagues (int): Ligas sintéticas adicionales
+        teams_per_league (int): Equipos de las ligas sin plantilla conocida
+        seed (int): Semilla
+
+    Returns:
+        pandas.DataFrame: Partidos en el esquema canónico
+    """
+    rng = np.random.default_rng(seed)
+    teams_by_league = league_teams(leagues, extra_leagues, teams_per_league)
+    seasons = np.asarray(sorted(seasons), dtype=np.int64)
+
+    # Catálogo de equipos: un índice global por (liga, equipo)
+    league_names = np.array(list(teams_by_league), dtype=object)
+    team_names = np.array([team for teams in teams_by_league.values() for team in teams], dtype=object)
+    team_league = np.repeat(np.arange(len(teams_by_league)), [len(teams) for teams in teams_by_league.values()])
+    team_offsets = np.concatenate([[0], np.cumsum([len(teams) for teams in teams_by_league.values()])])
+    team_ids = np.array([stable_id(team) for team in team_names], dtype=np.int64)
+
+    # Fortaleza por equipo y temporada: base del nivel + deriva aleatoria
+    drift = rng.normal(0, SEASON_DRIFT, (len(team_names), len(seasons)))
+    strength = _base_strengths(team_names, rng)[:, None] + drift
+    strength = np.clip(strength, 0.2, 1.0)
+
+    # Emparejamientos de ida y vuelta de cada liga (todos los pares ordenados)
+    home_parts, away_parts = [], []
+    for league_index, teams in enumerate(teams_by_league.values()):
+        n_teams = len(teams)
+        home, away = np.nonzero(~np.eye(n_teams, dtype=bool))
+        home_parts.append(home + team_offsets[league_index])
+        away_parts.append(away + team_offsets[league_index])
+    fixture_home = np.concatenate(home_parts)
+    fixture_away = np.concatenate(away_parts)
+
+    # Mismo calendario de emparejamientos en cada temporada
+    n_fixtures = len(fixture_home)
+    home = np.tile(fixture_home, len(seasons))
+    away = np.tile(fixture_away, len(seasons))
+    season_index = np.repeat(np.arange(len(seasons)), n_fixtures)
+    n_matches = len(home)
+
+    # Goles con Poisson ajustada (ventaja de local)
+    lambda_home = np.minimum(1.0, strength[home, season_index] + HOME_ADVANTAGE) * 2.0
+    lambda_away = strength[away, season_index] * 1.5
+    home_goals = rng.poisson(lambda_home)
+    away_goals = rng.poisson(lambda_away)
+
+    # Fecha aleatoria entre el 1 de agosto y el 31 de mayo siguiente
+    season_start = np.array([f"{season}-08-01" for season in seasons], dtype='datetime64[D]')
+    season_end = np.array([f"{season + 1}-05-31" for season in seasons], dtype='datetime64[D]')
+    season_days = (season_end - season_start).astype(np.int64)
+    dates = season_start[season_index] + rng.integers(0, season_days[season_index]).astype('timedelta64[D]')
+
+    df = pd.DataFrame({
+        'date': np.datetime_as_string(dates, unit='D'),
+        'season': seasons[season_index],
+        'league': league_names[team_league[home]],
+        'home_team': team_names[home],
+        'away_team': team_names[away],
+        'home_team_id': team_ids[home],
+        'away_team_id': team_ids[away],
+        'home_goals': home_goals,
+        'away_goals': away_goals,
+        'result': np.select([home_goals > away_goals, away_goals > home_goals], ['H', 'A'], default='D'),
+        'total_goals': home_goals + away_goals
+    })
+
+    # Estadísticas adicionales
+    goals = {'home': home_goals, 'away': away_goals}
+    for column, distribution, params, minimum, goals_side in STAT_SPECS:
+        if distribution == 'normal':
+            mean = params[0] + (goals[goals_side] if goals_side else 0)
+            values = rng.normal(mean, params[1], n_matches).astype(np.int64)
+        else:
+            values = rng.poisson(params[0], n_matches)
+        df[column] = np.maximum(minimum, values)
+    df['home_red_cards'] = (rng.random(n_matches) < RED_CARD_PROBABILITY).astype(np.int64)
+    df['away_red_cards'] = (rng.random(n_matches) < RED_CARD_PROBABILITY).astype(np.int64)
+
+    # Orden cronológico determinista e IDs de partido consecutivos
+    df = df.sort_values(['date', 'league', 'home_team_id'], kind='stable').reset_index(drop=True)
+    df.insert(0, 'match_id', np.arange(1, len(df) + 1))
+
+    logger.info(f"Generados {len(df)} partidos sintéticos ({len(teams_by_league)} ligas, "
+                f"{len(seasons)} temporadas, semilla {seed})")
+    return df
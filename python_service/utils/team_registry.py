@@ -0,0 +1,296 @@
+# utils/team_registry.py
+import os
+import re
+import json
+import difflib
+import logging
+import threading
+import unicodedata
+from pathlib import Path
+
+import pandas as pd
+
+# Configurar logging
+logger = logging.getLogger('predictor_futbol_premium.team_registry')
+
+REGISTRY_PATH = Path(__file__).parent.parent / 'data' / 'team_registry.json'
+
+# Parecido mínimo (difflib) para aceptar un nombre desconocido como alias
+FUZZY_CUTOFF = 0.88
+
+# Palabras genéricas ('Real Madrid CF' = 'Real Madrid'). Solo se quitan cuando
+# el resultado es exactamente un nombre o alias conocido: nunca crean equipos
+# ni acercan nombres en la búsqueda aproximada
+STOPWORDS = {'fc', 'cf', 'afc', 'club', 'calcio'}
+
+# Siglas que distinguen clubes y forman parte del nombre ('Barcelona SC' no es
+# 'Barcelona'); las equivalencias como 'AC Milan' = 'Milan' van en DEFAULT_ALIASES
+CLUB_TOKENS = {'sc', 'ac', 'as', 'ssc', 'cd', 'ud', 'sd', 'rc', 'olympique'}
+
+# Nombres canónicos y variantes conocidas (Football-Data, API-Football, app.py)
+DEFAULT_ALIASES = {
+    'Manchester City': ['Man City'],
+    'Manchester United': ['Man United', 'Man Utd', 'Manchester Utd'],
+    'Newcastle': ['Newcastle United', 'Newcastle Utd'],
+    'Tottenham': ['Tottenham Hotspur', 'Spurs'],
+    'West Ham': ['West Ham United'],
+    'Brighton': ['Brighton & Hove Albion', 'Brighton and Hove Albion'],
+    'Wolves': ['Wolverhampton Wanderers', 'Wolverhampton'],
+    'Nottingham Forest': ["Nott'm Forest"],
+    'Sheffield United': ['Sheffield Utd'],
+    'Sheffield Wednesday': ['Sheffield Weds'],
+    'Luton Town': ['Luton'],
+    'Atlético Madrid': ['Ath Madrid', 'Atl Madrid', 'Club Atletico de Madrid'],
+    'Athletic Bilbao': ['Ath Bilbao', 'Athletic Club'],
+    'Real Betis': ['Betis'],
+    'Real Sociedad': ['Sociedad'],
+    'Celta Vigo': ['Celta', 'RC Celta'],
+    'Rayo Vallecano': ['Vallecano'],
+    'Espanyol': ['Espanol'],
+    'Bayern Munich': ['Bayern Munchen', 'Bayern München', 'FC Bayern'],
+    'Borussia Dortmund': ['Dortmund'],
+    'Bayer Leverkusen': ['Leverkusen'],
+    'Eintracht Frankfurt': ['Ein Frankfurt'],
+    'Borussia Monchengladbach': ["M'gladbach", 'Borussia Mönchengladbach'],
+    'Inter Milan': ['Inter', 'Internazionale'],
+    'AC Milan': ['Milan'],
+    'AS Roma': ['Roma'],
+    'Napoli': ['SSC Napoli'],
+    'Paris Saint-Germain': ['Paris SG', 'PSG'],
+    'AS Monaco': ['Monaco'],
+    'Olympique Marseille': ['Marseille'],
+    'Olympique Lyonnais': ['Lyon']
+}
+
+# Nombres canónicos sin variantes conocidas (api.py, app.py y datos de muestra)
+KNOWN_TEAMS = [
+    'Arsenal', 'Liverpool', 'Chelsea', 'Aston Villa', 'Crystal Palace', 'Brentford',
+    'Fulham', 'Everton', 'Burnley', 'Bournemouth',
+    'Real Madrid', 'Barcelona', 'Sevilla', 'Villarreal', 'Valencia', 'Getafe',
+    'Osasuna', 'Las Palmas', 'Girona', 'Mallorca', 'Cadiz', 'Granada', 'Almeria', 'Alaves',
+    'RB Leipzig', 'Juventus', 'Lazio', 'Lille'
+]
+
+# Marcas de filial o categoría que nunca se consideran equivalentes entre sí
+RESERVE_TOKENS = {'b', 'ii', 'iii', 'u19', 'u21', 'u23', 'women', 'w'}
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def normalize_name(name):
+    """
+    Forma normalizada de un nombre de equipo.
+
+    Sin acentos, en minúsculas y sin puntuación: 'Atlético Madrid' y
+    'Atletico  Madrid' coinciden. Las palabras genéricas se conservan
+    (ver `strip_stopwords`).
+    """
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return ' '.join(token for token in re.split(r"[^a-z0-9]+", text) if token)
+
+
+def strip_stopwords(key):
+    """Nombre normalizado sin palabras genéricas ('real madrid cf' -> 'real madrid')"""
+    return ' '.join(token for token in key.split() if token not in STOPWORDS) or key
+
+
+def _signature(key):
+    """Números, marcas de filial y siglas de club de un nombre normalizado"""
+    tokens = set(key.split())
+    return (tuple(re.findall(r'\d+', key)), tuple(sorted(tokens & RESERVE_TOKENS)),
+            tuple(sorted(tokens & CLUB_TOKENS)))
+
+
+class TeamRegistry:
+    """
+    Registro de nombres canónicos de equipos con índice de alias.
+
+    El índice es un diccionario nombre normalizado -> nombre canónico, así
+    que resolver un nombre conocido es O(1). Un nombre desconocido se
+    compara una sola vez (difflib) con los canónicos; el resultado, alias o
+    equipo nuevo, queda en el índice para las siguientes búsquedas.
+    """
+
+    def __init__(self, aliases=None, fuzzy_cutoff=FUZZY_CUTOFF):
+        """
+        Inicializa el registro.
+
+        Args:
+            aliases (dict, optional): Nombre canónico -> lista de alias
+            fuzzy_cutoff (float): Parecido mínimo para la búsqueda aproximada
+        """
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.canonical = {}   # normalizado -> canónico (solo nombres canónicos)
+        self.index = {}       # normalizado -> canónico (canónicos, alias y aprendidos)
+        self.stripped = {}    # normalizado sin palabras genéricas -> canónico
+        self.by_signature = {}  # firma -> normalizados canónicos (candidatos aproximados)
+        self.changed = False
+        if aliases is None:
+            aliases = dict(DEFAULT_ALIASES, **{name: [] for name in KNOWN_TEAMS})
+        for name, names in aliases.items():
+            self.add(name, names)
+        self.changed = False
+
+    def add(self, canonical, aliases=()):
+        """Registra un nombre canónico y sus alias"""
+        key = normalize_name(canonical)
+        if key not in self.canonical:
+            self.canonical[key] = canonical
+            self.by_signature.setdefault(_signature(key), []).append(key)
+        for alias_key in [key] + [normalize_name(alias) for alias in aliases]:
+            self.index[alias_key] = self.canonical[key]
+            self.stripped.setdefault(strip_stopwords(alias_key), self.canonical[key])
+        self.changed = True
+
+    def _exact(self, key):
+        """
+        Nombre canónico de un nombre normalizado conocido, o None.
+
+        Las palabras genéricas solo se ignoran si así se llega exactamente
+        a un nombre o alias registrado ('Real Madrid CF' -> 'Real Madrid').
+        """
+        if key in self.index:
+            return self.index[key]
+        stripped = strip_stopwords(key)
+        return self.index.get(stripped) or self.stripped.get(stripped)
+
+    def _closest(self, key):
+        """Nombre normalizado canónico más parecido con la misma firma, o None"""
+        candidates = self.by_signature.get(_signature(key), [])
+        match = difflib.get_close_matches(key, candidates, n=1, cutoff=self.fuzzy_cutoff)
+        return match[0] if match else None
+
+    def resolve(self, name):
+        """
+        Nombre canónico de un equipo.
+
+        Args:
+            name (str): Nombre tal como llega de la fuente
+
+        Returns:
+            str: Nombre canónico (el propio nombre si es un equipo nuevo)
+        """
+        key = normalize_name(name)
+        canonical = self._exact(key)
+        if canonical is not None:
+            if key not in self.index:
+                self.index[key] = canonical
+                self.changed = True
+            return canonical
+
+        # Solo candidatos con los mismos números, marcas de filial y siglas de club
+        # ('Equipo 01' no es 'Equipo 02', 'Hertha Berlin II' no es 'Hertha Berlin')
+        match = self._closest(key)
+        if match:
+            canonical = self.canonical[match]
+            logger.info(f"Alias aproximado: '{name}' -> '{canonical}'")
+            self.index[key] = canonical
+            self.changed = True
+            return canonical
+
+        self.add(name)
+        return name
+
+    def lookup(self, name):
+        """
+        Nombre canónico sin aprender nada (para entradas de usuario).
+
+        Returns:
+            str: Nombre canónico o None si no se reconoce
+        """
+        key = normalize_name(name)
+        canonical = self._exact(key)
+        if canonical is not None:
+            return canonical
+        match = self._closest(key)
+        return self.canonical[match] if match else None
+
+    def canonicalize(self, names):
+        """
+        Resuelve una columna de nombres (cada nombre distinto una sola vez).
+
+        Args:
+            names (pandas.Series): Nombres de equipos
+
+        Returns:
+            pandas.Series: Nombres canónicos (mismo índice; nulos intactos)
+        """
+        codes, uniques = pd.factorize(names)
+        resolved = pd.Index([self.resolve(name) for name in uniques], dtype=object)
+        result = pd.Series(resolved.take(codes), index=names.index, dtype=object)
+        return result.where(codes >= 0)
+
+    def to_dict(self):
+        """Alias agrupados por nombre canónico"""
+        aliases = {name: [] for name in self.canonical.values()}
+        for key, canonical in self.index.items():
+            if key != normalize_name(canonical):
+                aliases[canonical].append(key)
+        return {'fuzzy_cutoff': self.fuzzy_cutoff, 'aliases': aliases}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruye el registro desde to_dict()"""
+        return cls(data['aliases'], data.get('fuzzy_cutoff', FUZZY_CUTOFF))
+
+    def save(self, path=REGISTRY_PATH):
+        """Guarda el registro (incluidos los alias aprendidos) de forma atómica"""
+        os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.changed = False
+
+    @classmethod
+    def load(cls, path=REGISTRY_PATH):
+        """Carga el registro guardado o, si no existe, el de alias por defecto"""
+        if not os.path.exists(str(path)):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def get_registry():
+    """Registro compartido del proceso (se carga una vez)"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TeamRegistry.load()
+        return _registry
+
+
+def deduplicate_matches(df, registry=None, keep='first'):
+    """
+    Canonicaliza los nombres de equipo y elimina partidos duplicados.
+
+    La clave es (fecha, local canónico, visitante canónico) y la
+    deduplicación es por hash (O(n)). Con varias fuentes concatenadas, `keep`
+    decide cuál se conserva.
+
+    Args:
+        df (pandas.DataFrame): Partidos (columnas date, home_team, away_team)
+        registry (TeamRegistry, optional): Registro (por defecto el compartido)
+        keep (str): 'first' o 'last'
+
+    Returns:
+        pandas.DataFrame: Partidos únicos con nombres canónicos
+    """
+    if df.empty:
+        return df
+
+    registry = registry or get_registry()
+    df = df.copy()
+    df['home_team'] = registry.canonicalize(df['home_team'])
+    df['away_team'] = registry.canonicalize(df['away_team'])
+
+    dates = pd.to_datetime(df['date'], format='mixed').dt.normalize()
+    duplicated = pd.DataFrame({
+        'date': dates, 'home_team': df['home_team'], 'away_team': df['away_team']
+    }).duplicated(keep=keep)
+
+    if duplicated.any():
+        logger.info(f"{int(duplicated.sum())} partidos duplicados eliminados")
+    return df[~duplicated.to_numpy()]
@@ -1,17 +1,22 @@
 #!/usr/bin/env python3
 import pandas as pd
 import numpy as np
-import joblib
 import logging
 from datetime import datetime, timedelta
-from sklearn.model_selection import cross_val_score, StratifiedKFold
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
 from sklearn.metrics import classification_report, roc_curve, auc
-import matplotlib.pyplot as plt
-import seaborn as sns
 import warnings
 warnings.filterwarnings('ignore')
 
+from models.artifacts import load_artifact
+from models.cross_validation import (
+    STRATEGIES as CV_STRATEGIES, cross_validate_time_ordered, season_splits, walk_forward_splits
+)
+from models.encoding import encode_frame, load_encoding_tables
+from models.report_rendering import get_renderer, render_heatmap
+from models.thresholds import joint_threshold_search, optimize_class_thresholds, predict_with_thresholds
+from utils.match_dataset import load_matches
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('model_validator')
@@ -20,46 +25,24 @@ class FootballPredictorValidator:
     def __init__(self, model_path='models/saved/football_predictor.joblib'):
         """Inicializa el validador con el modelo entrenado"""
         logger.info("📂 Cargando modelo...")
-        self.model_data = joblib.load(model_path)
+        self.model_data = load_artifact(model_path)
         self.model = self.model_data['model']
         self.home_encoder = self.model_data['home_encoder']
         self.away_encoder = self.model_data['away_encoder']
         self.league_encoder = self.model_data['league_encoder']
+        self.encoding_tables = load_encoding_tables(self.model_data)
         self.feature_names = self.model_data['feature_names']
         self.metrics = self.model_data['metrics']
+        self.figures = []  # Figuras renderizándose en segundo plano
         logger.info("✅ Modelo cargado exitosamente")
         
     def prepare_features(self, df):
         """Prepara las características para predicción"""
         features = []
         
-        # Codificar equipos (manejar equipos nuevos)
-        home_encoded = []
-        away_encoded = []
-        league_encoded = []
-        
-        for idx, row in df.iterrows():
-            # Home team
-            if row['home_team'] in self.home_encoder.classes_:
-                home_encoded.append(self.home_encoder.transform([row['home_team']])[0])
-            else:
-                home_encoded.append(-1)  # Equipo desconocido
-            
-            # Away team
-            if row['away_team'] in self.away_encoder.classes_:
-                away_encoded.append(self.away_encoder.transform([row['away_team']])[0])
-            else:
-                away_encoded.append(-1)
-            
-            # League
-            if row['league'] in self.league_encoder.classes_:
-                league_encoded.append(self.league_encoder.transform([row['league']])[0])
-            else:
-                league_encoded.append(-1)
-        
-        features.append(home_encoded)
-        features.append(away_encoded)
-        features.append(league_encoded)
+        # Codificar equipos y liga de todas las filas a la vez (equipos nuevos -> UNKNOWN_ID)
+        encoded = encode_frame(df, self.encoding_tables, columns=['home_team', 'away_team', 'league'])
+        features.extend(encoded.T)
         
         # Agregar otras características según el modelo
         stat_cols = ['home_shots_on_target', 'away_shots_on_target', 
@@ -158,69 +141,46 @@ class FootballPredictorValidator:
         
         return results
     
-    def optimize_thresholds(self, X_val, y_val):
-        """Optimiza los umbrales de decisión para cada clase"""
+    def optimize_thresholds(self, X_val, y_val, objective='f1', odds=None, joint=False):
+        """
+        Optimiza los umbrales de decisión para cada clase.
+        
+        Args:
+            X_val (numpy.ndarray): Características de validación
+            y_val (numpy.ndarray): Resultados reales
+            objective (str): 'f1', 'roi' o, en la búsqueda conjunta, 'accuracy'
+            odds (numpy.ndarray, optional): Cuotas (n_muestras, n_clases) en el
+                orden de `self.model.classes_`, necesarias para 'roi'
+            joint (bool): Buscar los tres umbrales a la vez sobre una rejilla
+        
+        Returns:
+            tuple: (umbrales por clase, predicciones con los umbrales)
+        """
         logger.info("🎯 Optimizando umbrales de decisión...")
         
         # Obtener probabilidades
         y_proba = self.model.predict_proba(X_val)
         classes = self.model.classes_
         
-        # Diccionario para guardar mejores umbrales
-        best_thresholds = {}
-        
-        # Para cada clase, encontrar el mejor umbral
-        for i, cls in enumerate(classes):
-            logger.info(f"\n  Optimizando para clase: {cls}")
-            
-            # Probabilidades para esta clase
-            proba_cls = y_proba[:, i]
-            
-            # Crear etiquetas binarias
-            y_binary = (y_val == cls).astype(int)
-            
-            # Probar diferentes umbrales
-            thresholds = np.linspace(0.1, 0.9, 50)
-            best_f1 = 0
-            best_threshold = 0.5
-            
-            for threshold in thresholds:
-                # Hacer predicciones con este umbral
-                y_pred_binary = (proba_cls >= threshold).astype(int)
-                
-                # Calcular F1 score
-                if y_pred_binary.sum() > 0:  # Evitar división por cero
-                    f1 = f1_score(y_binary, y_pred_binary)
-                    
-                    if f1 > best_f1:
-                        best_f1 = f1
-                        best_threshold = threshold
-            
-            best_thresholds[cls] = best_threshold
-            logger.info(f"    Mejor umbral: {best_threshold:.3f} (F1: {best_f1:.3f})")
-        
-        # Aplicar umbrales optimizados para hacer predicciones
-        def predict_with_thresholds(probas):
-            predictions = []
-            for proba in probas:
-                # Aplicar umbrales específicos por clase
-                adjusted_scores = {}
-                for i, cls in enumerate(classes):
-                    if proba[i] >= best_thresholds[cls]:
-                        adjusted_scores[cls] = proba[i]
-                
-                # Si hay múltiples clases que superan su umbral, elegir la de mayor probabilidad
-                if adjusted_scores:
-                    predictions.append(max(adjusted_scores, key=adjusted_scores.get))
-                else:
-                    # Si ninguna supera su umbral, elegir la de mayor probabilidad original
-                    predictions.append(classes[np.argmax(proba)])
-            
-            return np.array(predictions)
+        if joint:
+            result = joint_threshold_search(y_proba, y_val, classes, objective=objective, odds=odds)
+            best_thresholds = result['thresholds']
+            logger.info(f"  Umbrales conjuntos ({objective}: {result['score']:.3f}): "
+                        + ", ".join(f"{cls}={thr:.3f}" for cls, thr in best_thresholds.items()))
+        else:
+            # Curvas de todos los umbrales con una sola ordenación por clase
+            best_thresholds, best_scores = optimize_class_thresholds(
+                y_proba, y_val, classes, objective=objective, odds=odds
+            )
+            for cls in classes:
+                logger.info(f"\n  Optimizando para clase: {cls}")
+                score = best_scores[cls]
+                score_str = f"{score:.3f}" if score is not None else "n/a"
+                logger.info(f"    Mejor umbral: {best_thresholds[cls]:.3f} ({objective.upper()}: {score_str})")
         
         # Comparar predicciones originales vs optimizadas
         y_pred_original = self.model.predict(X_val)
-        y_pred_optimized = predict_with_thresholds(y_proba)
+        y_pred_optimized = predict_with_thresholds(y_proba, best_thresholds, classes)
         
         # Métricas originales
         acc_original = accuracy_score(y_val, y_pred_original)
@@ -239,57 +199,64 @@ class FootballPredictorValidator:
         
         return best_thresholds, y_pred_optimized
     
-    def cross_validation(self, X, y, cv_folds=5):
-        """Implementa validación cruzada k-fold"""
-        logger.info(f"🔄 Ejecutando validación cruzada con {cv_folds} folds...")
-        
-        # Configurar StratifiedKFold
-        skf = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42)
+    def cross_validation(self, X, y, cv_folds=5, dates=None, seasons=None, strategy='walk_forward', n_jobs=-1):
+        """
+        Validación cruzada respetando el orden temporal de los partidos.
+        
+        Cada fold se entrena una sola vez (en paralelo) sobre una copia del
+        modelo; todas las métricas y matrices de confusión salen de las
+        predicciones guardadas de cada fold.
+        
+        Args:
+            X (numpy.ndarray): Características
+            y (numpy.ndarray): Resultados reales
+            cv_folds (int): Número de folds (walk-forward)
+            dates (array-like, optional): Fecha de cada partido. Sin fechas se
+                asume que las filas ya están en orden cronológico
+            seasons (array-like, optional): Temporada de cada partido (strategy='season')
+            strategy (str): 'walk_forward' o 'season'
+            n_jobs (int): Procesos en paralelo (-1 = todos los núcleos)
+        
+        Returns:
+            dict: Scores por fold de cada métrica
+        """
+        if strategy not in CV_STRATEGIES:
+            raise ValueError(f"Estrategia no soportada: {strategy}. Opciones: {', '.join(CV_STRATEGIES)}")
+        
+        if strategy == 'season':
+            if seasons is None:
+                raise ValueError("La validación por temporadas necesita la temporada de cada partido")
+            splits = season_splits(seasons)
+        else:
+            if dates is None:
+                dates = np.arange(len(y))
+            splits = walk_forward_splits(dates, n_splits=cv_folds)
         
-        # Métricas a evaluar
-        scoring_metrics = ['accuracy', 'precision_weighted', 'recall_weighted', 'f1_weighted']
+        logger.info(f"🔄 Ejecutando validación cruzada {strategy} con {len(splits)} folds...")
         
-        # Almacenar resultados
-        cv_results = {}
+        result = cross_validate_time_ordered(self.model, X, y, splits, n_jobs=n_jobs)
+        cv_results = result['scores']
+        confusion_matrices = result['confusion_matrices']
         
-        for metric in scoring_metrics:
-            logger.info(f"\n  Evaluando {metric}...")
-            scores = cross_val_score(self.model, X, y, cv=skf, scoring=metric, n_jobs=-1)
-            cv_results[metric] = scores
+        for metric, scores in cv_results.items():
+            logger.info(f"\n  {metric}:")
             logger.info(f"    Scores por fold: {scores.round(3)}")
             logger.info(f"    Media: {scores.mean():.3f} (+/- {scores.std() * 2:.3f})")
         
-        # Validación manual para obtener matrices de confusión
-        logger.info("\n📊 Matrices de confusión por fold:")
-        confusion_matrices = []
-        
-        for fold, (train_idx, val_idx) in enumerate(skf.split(X, y)):
-            X_train_fold, X_val_fold = X[train_idx], X[val_idx]
-            y_train_fold, y_val_fold = y[train_idx], y[val_idx]
-            
-            # Entrenar modelo en este fold
-            self.model.fit(X_train_fold, y_train_fold)
-            y_pred_fold = self.model.predict(X_val_fold)
-            
-            # Calcular matriz de confusión
-            cm = confusion_matrix(y_val_fold, y_pred_fold)
-            confusion_matrices.append(cm)
-            
-            logger.info(f"\n  Fold {fold + 1}:")
-            logger.info(f"    Accuracy: {accuracy_score(y_val_fold, y_pred_fold):.3f}")
+        logger.info("\n📊 Folds:")
+        for fold, ((n_train, n_val), accuracy) in enumerate(zip(result['fold_sizes'], cv_results['accuracy'])):
+            logger.info(f"\n  Fold {fold + 1} ({n_train} entrenamiento, {n_val} validación):")
+            logger.info(f"    Accuracy: {accuracy:.3f}")
         
         # Matriz de confusión promedio
         avg_cm = np.mean(confusion_matrices, axis=0).astype(int)
         
-        # Visualizar matriz de confusión promedio
-        plt.figure(figsize=(8, 6))
-        sns.heatmap(avg_cm, annot=True, fmt='d', cmap='Blues')
-        plt.title('Matriz de Confusión Promedio (Validación Cruzada)')
-        plt.ylabel('Valor Real')
-        plt.xlabel('Predicción')
-        plt.tight_layout()
-        plt.savefig('confusion_matrix_cv.png')
-        logger.info(f"\n💾 Matriz de confusión guardada en: confusion_matrix_cv.png")
+        # Visualizar matriz de confusión promedio (en segundo plano)
+        self.figures.append(get_renderer().submit(
+            render_heatmap, avg_cm, result['labels'], 'Matriz de Confusión Promedio (Validación Cruzada)',
+            'confusion_matrix_cv.png', figsize=(8, 6), ylabel='Valor Real'
+        ))
+        logger.info(f"\n💾 Generando matriz de confusión en: confusion_matrix_cv.png")
         
         # Resumen de resultados
         logger.info("\n📈 Resumen de Validación Cruzada:")
@@ -333,7 +300,7 @@ def main():
     """Función principal para validación y optimización"""
     # Cargar datos
     logger.info("📂 Cargando datos de validación...")
-    df = pd.read_csv('data/partidos_historicos.csv')
+    df = load_matches()
     
     # Crear instancia del validador
     validator = FootballPredictorValidator()
@@ -362,11 +329,12 @@ def main():
     logger.info("3. VALIDACIÓN CRUZADA K-FOLD")
     logger.info("="*80)
     
-    # Usar todos los datos para validación cruzada
-    X_all = validator.prepare_features(df)
-    y_all = df['result'].values
+    # Usar todos los datos para validación cruzada, en orden cronológico
+    df_sorted = df.sort_values('date', kind='stable')
+    X_all = validator.prepare_features(df_sorted)
+    y_all = df_sorted['result'].values
     
-    cv_results = validator.cross_validation(X_all, y_all, cv_folds=5)
+    cv_results = validator.cross_validation(X_all, y_all, cv_folds=5, dates=df_sorted['date'].values)
     
     # 4. Generar informe
     logger.info("\n" + "="*80)
@@ -374,6 +342,10 @@ def main():
     logger.info("="*80)
     validator.generate_report()
     
+    # Esperar a las figuras pendientes
+    for figure in validator.figures:
+        figure.result()
+    
     logger.info("\n🎉 ¡Validación y optimización completadas!")
     logger.info("📊 Revisa los archivos generados:")
     logger.info("   - confusion_matrix_cv.png")